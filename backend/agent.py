@@ -4,24 +4,72 @@ Implements the FETCH → APPEND → RUN → PERSIST → RESPOND lifecycle.
 Uses OpenAI for intent recognition and response generation.
 """
 
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Callable, Optional
 from sqlmodel import Session
 from . import crud
+from . import context_window
+from . import intent_router
+from . import tool_calling
+from . import metrics
+from . import tracing
+from .chat_context import ChatContext, load_chat_context
 from .mcp_official_wrapper import mcp_official_wrapper as mcp_server
 from .agents_sdk import run_todo_agent
 from .openai_client import openai_client
+import asyncio
+import inspect
+import os
 import uuid
 import re
 import logging
 
 # Configure logging
 logger = logging.getLogger(__name__)
+
+# Replies that confirm a pending destructive operation
+AFFIRMATIVE_REPLIES = frozenset(["yes", "yeah", "yep", "confirm", "do it", "sure", "okay", "ok", "y", "confirmed"])
+
+# How the LLM is used for messages the fast-path router does not handle:
+# "classify" - intent classification, then a chat completion for general queries
+# "tools"    - a single completion with the MCP tools declared as function tools (see tool_calling.py)
+ORCHESTRATION_MODES = ("classify", "tools")
+CHAT_ORCHESTRATION_MODE = os.getenv("CHAT_ORCHESTRATION_MODE", "classify")
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
 
+class ToolRecorder:
+    """
+    Wraps the MCP tools and reports every completed tool call ({"name", "arguments", "result"})
+    to a callback, so callers can see which tools a turn invoked.
+    """
+
+    def __init__(self, tools, on_call: Callable[[Dict[str, Any]], None]):
+        self._tools = tools
+        self._on_call = on_call
+
+    def __getattr__(self, name: str):
+        handler = getattr(self._tools, name)
+        if not name.startswith("handle_"):
+            return handler
+
+        def call(session, user_id, *args, **kwargs):
+            with tracing.span(f"mcp.{name[len('handle_'):]}"):
+                result = handler(session, user_id, *args, **kwargs)
+            bound = inspect.signature(handler).bind(session, user_id, *args, **kwargs).arguments
+            self._on_call({
+                "name": name[len("handle_"):],
+                # The session, the user and the task snapshot are not tool arguments
+                "arguments": {k: v for k, v in bound.items() if k not in ("session", "user_id", "task")},
+                "result": result,
+            })
+            return result
+
+        return call
+
+
 class AgentOrchestrator:
     """
     Orchestrates the conversation flow between the user and the MCP tools.
@@ -29,70 +77,360 @@ class AgentOrchestrator:
     Strictly follows the Phase 3 Agent Behavior Specification.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, mode: Optional[str] = None):
         self.session = session
-
-    def handle_message(self, user_id: str, conversation_id: str, message_text: str) -> str:
+        self.mode = mode or CHAT_ORCHESTRATION_MODE
+        if self.mode not in ORCHESTRATION_MODES:
+            raise ValueError(f"Unknown chat orchestration mode: {self.mode}")
+        # Set per message by handle_message; scopes the pending-action record
+        self.conversation_id: Optional[int] = None
+        self.context: Optional[ChatContext] = None
+        # MCP tool calls made while handling the current message
+        self.tool_calls: List[Dict[str, Any]] = []
+        self.tools = ToolRecorder(mcp_server, self._record_tool_call)
+        # Set by handle_message_stream: receive tool calls as they complete and reply text as it is generated
+        self.on_tool_call: Optional[Callable[[Dict[str, Any]], None]] = None
+        self.on_token: Optional[Callable[[str], None]] = None
+
+    def handle_message(
+        self, user_id: str, conversation_id: str, message_text: str, context: Optional[ChatContext] = None
+    ) -> str:
         """
         Main orchestration loop: FETCH → APPEND → RUN → PERSIST → RESPOND.
+        `context` is the request's preloaded ChatContext; it is loaded here when not given.
         """
         # Convert conversation_id string back to integer for database operations
         try:
             conv_id_int = int(conversation_id)
         except (ValueError, TypeError):
             return "Error: Invalid conversation ID provided."
+        self.conversation_id = conv_id_int
+        self.tool_calls = []
 
-        # 1. FETCH: Retrieve unsummarized conversation history from DB
-        history = crud.get_messages(self.session, conv_id_int, user_id)
-        history_dicts = [
-            {"role": m.role, "content": m.content}
-            for m in history
-        ]
+        # 1. FETCH: Conversation, pending action, bounded history and task snapshot, loaded once
+        if context is None:
+            context = load_chat_context(self.session, conv_id_int, user_id, message_text)
+            if context is None:
+                return "Error: Conversation not found."
+        self.context = context
 
         # 2. APPEND: The current user message is appended to the context for the model
         # (Implicitly handled by passing it along with history to the "RUN" phase)
 
         # 3. RUN: Use OpenAI for intent recognition and response generation
-        response_text = self._orchestrate_llm_logic(
-            user_id, conversation_id, message_text, history_dicts
-        )
+        with self._run_span(context):
+            response_text = self._orchestrate_llm_logic(user_id, message_text, context)
 
         # 4. PERSIST: Save both user input and agent response to DB
-        crud.save_message(self.session, conv_id_int, user_id, "user", message_text)
-        crud.save_message(self.session, conv_id_int, user_id, "assistant", response_text)
+        self._persist_turn(conv_id_int, user_id, message_text, response_text)
 
         # 5. RESPOND: Deliver the final NL response
         return response_text
 
-    def _orchestrate_llm_logic(
-        self, user_id: str, conversation_id: str, message_text: str, history: List[Dict[str, str]]
+    async def handle_message_async(
+        self, user_id: str, conversation_id: str, message_text: str, context: Optional[ChatContext] = None
     ) -> str:
+        """
+        Non-blocking variant of handle_message for async endpoints.
+        LLM calls are awaited on the async OpenAI client; database work (sync Session)
+        runs in a worker thread so the event loop stays free for other requests.
+        """
+        try:
+            conv_id_int = int(conversation_id)
+        except (ValueError, TypeError):
+            return "Error: Invalid conversation ID provided."
+        self.conversation_id = conv_id_int
+        self.tool_calls = []
+
+        # 1. FETCH
+        if context is None:
+            context = await asyncio.to_thread(load_chat_context, self.session, conv_id_int, user_id, message_text)
+            if context is None:
+                return "Error: Conversation not found."
+        self.context = context
+
+        # 2. APPEND (implicit) / 3. RUN
+        with self._run_span(context):
+            response_text = await self._orchestrate_llm_logic_async(user_id, message_text, context)
+
+        # 4. PERSIST
+        await asyncio.to_thread(self._persist_turn, conv_id_int, user_id, message_text, response_text)
+
+        # 5. RESPOND
+        return response_text
+
+    async def handle_message_stream(
+        self, user_id: str, conversation_id: str, message_text: str, context: Optional[ChatContext] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Streaming variant of handle_message_async. Yields events as the turn progresses:
+        {"type": "tool_call", ...} when an MCP tool call completes, {"type": "token", "content": ...}
+        for reply text (chunk by chunk when the reply comes from the LLM chat completion, otherwise
+        in one piece), and finally {"type": "done", "conversation_id": ..., "response": ...} once the
+        turn has been persisted. The done event's response is the complete reply.
+        """
+        loop = asyncio.get_running_loop()
+        events: asyncio.Queue = asyncio.Queue()
+        streamed = []
+
+        def on_token(text: str) -> None:
+            streamed.append(text)
+            events.put_nowait({"type": "token", "content": text})
+
+        # Tool calls complete in worker threads; hand them to the event loop
+        self.on_tool_call = lambda call: loop.call_soon_threadsafe(events.put_nowait, {"type": "tool_call", **call})
+        self.on_token = on_token
+        turn = asyncio.ensure_future(self.handle_message_async(user_id, conversation_id, message_text, context))
+        # Queued after any events the turn produced
+        turn.add_done_callback(lambda _: events.put_nowait(None))
+        try:
+            while (event := await events.get()) is not None:
+                yield event
+            response_text = turn.result()
+        finally:
+            self.on_tool_call = None
+            self.on_token = None
+            # The consumer went away before the end of the turn
+            if not turn.done():
+                turn.cancel()
+
+        if not streamed:
+            yield {"type": "token", "content": response_text}
+        yield {"type": "done", "conversation_id": self.conversation_id, "response": response_text}
+
+    def _record_tool_call(self, call: Dict[str, Any]) -> None:
+        self.tool_calls.append(call)
+        if self.on_tool_call is not None:
+            self.on_tool_call(call)
+
+    async def _chat_async(self, message_text: str, history: List[Dict[str, str]]) -> str:
+        # Stream the completion to the on_token listener when there is one
+        if self.on_token is None:
+            return await openai_client.chat_async(message_text, history)
+        chunks = []
+        async for chunk in openai_client.chat_stream_async(message_text, history):
+            chunks.append(chunk)
+            self.on_token(chunk)
+        return "".join(chunks)
+
+    def _run_span(self, context: ChatContext):
+        # The intent (or the tool calls) is added to the span once it is known
+        return tracing.span(
+            "chat.run", mode=self.mode, history_length=len(context.history), task_count=len(context.tasks)
+        )
+
+    def _persist_turn(self, conversation_id: int, user_id: str, message_text: str, response_text: str) -> None:
+        with tracing.span("chat.persist"):
+            crud.save_messages(self.session, conversation_id, user_id, [("user", message_text), ("assistant", response_text)])
+            # Fold turns that left the context window into the persisted summary (every CHAT_SUMMARY_BATCH messages);
+            # the loaded message count lets turns that cannot trigger a fold skip the lookup
+            unsummarized_count = self.context.unsummarized_count + 2 if self.context is not None else None
+            context_window.roll_summary(self.session, conversation_id, user_id, self._summarize, unsummarized_count)
+
+    def _summarize(self, previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+        try:
+            summary = openai_client.summarize(previous_summary, messages, max_chars=context_window.CHAT_SUMMARY_MAX_CHARS)
+            if summary:
+                return summary
+        except RuntimeError as e:
+            logger.warning(f"OpenAI summary failed, using extractive summary: {e}")
+        return context_window.extractive_summary(previous_summary, messages)
+
+    def _orchestrate_llm_logic(self, user_id: str, message_text: str, context: ChatContext) -> str:
         """
         Uses OpenAI for intent recognition and generates appropriate responses.
         Enforces the Two-Step Mutation Rule for destructive operations.
         """
-        # Get user's tasks for ID mapping (user-friendly 1-based IDs)
-        user_tasks = crud.get_tasks_by_user(self.session, user_id)
-
-        # Create mapping from user-friendly ID to database ID
-        id_mapping = {i+1: t.id for i, t in enumerate(user_tasks)}
-        # And reverse mapping for easy lookup
-        db_to_user_id = {t.id: i+1 for i, t in enumerate(user_tasks)}
+        # User's tasks with the user-friendly (1-based) ID mappings, from the request's snapshot
+        history = context.history
+        user_tasks, id_mapping, db_to_user_id = context.tasks, context.id_mapping, context.db_to_user_id
 
-        # Check for pending confirmation from history (handles multi-turn confirmation flows)
-        confirmation_result = self._check_for_confirmation(history, message_text, user_tasks)
+        # Check for a pending confirmation (handles multi-turn confirmation flows)
+        confirmation_result = self._check_for_confirmation(message_text, user_tasks, user_id)
         if confirmation_result:
             return confirmation_result
 
+        # Fast path: unambiguous commands are classified locally, without an LLM round-trip
+        response = self._route_fast_path(message_text, history, user_id, user_tasks, id_mapping, db_to_user_id)
+        if response is not None:
+            return response
+
+        if self.mode == "tools":
+            try:
+                content, raw_calls = openai_client.complete_with_tools(
+                    tool_calling.build_messages(message_text, history, user_tasks), tool_calling.TOOL_SCHEMAS
+                )
+                calls = tool_calling.parse_tool_calls(raw_calls)
+                tracing.annotate(tool_call_count=len(calls))
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"OpenAI tool calling failed, using fallback: {e}")
+                return self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping, reason="tools_error")
+            return self._execute_tool_calls(calls, content, user_id, context)
+
         # Use OpenAI for intent classification with enhanced context
         try:
             intent_data = openai_client.classify_intent(message_text, history)
             logger.info(f"OpenAI intent classification successful: {intent_data.get('intent')}")
+            tracing.annotate(intent=str(intent_data.get("intent")), intent_source="llm")
         except RuntimeError as e:
             # Fallback to rule-based parsing if OpenAI fails
             logger.warning(f"OpenAI intent classification failed, using fallback: {e}")
-            return self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping)
+            return self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping, reason="classify_error")
+
+        response = self._route_intent(intent_data, message_text, history, user_id, user_tasks, id_mapping, db_to_user_id)
+        if response is not None:
+            return response
+
+        # Use full chat with OpenAI for general queries
+        try:
+            response = openai_client.chat(message_text, history)
+            logger.info("OpenAI chat response generated successfully")
+            return response
+        except RuntimeError as e:
+            logger.warning(f"OpenAI chat failed, using fallback: {e}")
+            return self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping, reason="chat_error")
+
+    async def _orchestrate_llm_logic_async(self, user_id: str, message_text: str, context: ChatContext) -> str:
+        """
+        Async counterpart of _orchestrate_llm_logic: same routing, but LLM calls are awaited
+        and the DB-bound steps run in a worker thread.
+        """
+        history = context.history
+        user_tasks, id_mapping, db_to_user_id = context.tasks, context.id_mapping, context.db_to_user_id
+
+        if context.pending_action is not None:
+            confirmation_result = await asyncio.to_thread(self._check_for_confirmation, message_text, user_tasks, user_id)
+            if confirmation_result:
+                return confirmation_result
+
+        routed = intent_router.route(message_text, user_tasks)
+        if routed.is_confident:
+            response = await asyncio.to_thread(
+                self._route_fast_path, message_text, history, user_id, user_tasks, id_mapping, db_to_user_id, routed
+            )
+            if response is not None:
+                return response
+
+        if self.mode == "tools":
+            try:
+                content, raw_calls = await openai_client.complete_with_tools_async(
+                    tool_calling.build_messages(message_text, history, user_tasks), tool_calling.TOOL_SCHEMAS
+                )
+                calls = tool_calling.parse_tool_calls(raw_calls)
+                tracing.annotate(tool_call_count=len(calls))
+            except (RuntimeError, ValueError) as e:
+                logger.warning(f"OpenAI tool calling failed, using fallback: {e}")
+                return await asyncio.to_thread(
+                    self._fallback_logic, message_text, history, user_id, user_tasks, id_mapping, reason="tools_error"
+                )
+            return await asyncio.to_thread(self._execute_tool_calls, calls, content, user_id, context)
+
+        try:
+            intent_data = await openai_client.classify_intent_async(message_text, history)
+            logger.info(f"OpenAI intent classification successful: {intent_data.get('intent')}")
+            tracing.annotate(intent=str(intent_data.get("intent")), intent_source="llm")
+        except RuntimeError as e:
+            logger.warning(f"OpenAI intent classification failed, using fallback: {e}")
+            return await asyncio.to_thread(
+                self._fallback_logic, message_text, history, user_id, user_tasks, id_mapping, reason="classify_error"
+            )
+
+        response = await asyncio.to_thread(
+            self._route_intent, intent_data, message_text, history, user_id, user_tasks, id_mapping, db_to_user_id
+        )
+        if response is not None:
+            return response
+
+        try:
+            response = await self._chat_async(message_text, history)
+            logger.info("OpenAI chat response generated successfully")
+            return response
+        except RuntimeError as e:
+            logger.warning(f"OpenAI chat failed, using fallback: {e}")
+            return await asyncio.to_thread(
+                self._fallback_logic, message_text, history, user_id, user_tasks, id_mapping, reason="chat_error"
+            )
+
+    def _execute_tool_calls(
+        self, calls: List[tool_calling.ToolCall], content: str, user_id: str, context: ChatContext
+    ) -> str:
+        """
+        Run the tool calls returned by the model; without tool calls its text is the reply.
+        """
+        if not calls:
+            return content or "I'm sorry, I didn't quite catch that. You can ask me to add, list, complete, rename, or delete tasks."
+        return "\n".join(self._execute_tool_call(call, user_id, context) for call in calls)
+
+    def _execute_tool_call(self, call: tool_calling.ToolCall, user_id: str, context: ChatContext) -> str:
+        """
+        Execute one tool call against the MCP tools, with the same replies (and the same
+        confirmation step for deletes and renames) as the intent handlers.
+        """
+        args = call.arguments
+        user_tasks, db_to_user_id = context.tasks, context.db_to_user_id
+
+        if call.name == "add_task":
+            title = (args.get("title") or "").strip()
+            if not title:
+                return "What would you like to add to your todo list?"
+            self.tools.handle_add_task(self.session, user_id, title, args.get("description"))
+            return f"Task '{title}' has been added to your list."
+
+        if call.name == "list_tasks":
+            status = args.get("status") or "all"
+            if status == "all":
+                return self._handle_read_intent(user_tasks)
+            shown = [t for t in user_tasks if t.completed == (status == "completed")]
+            if not shown:
+                return f"You have no {status} tasks."
+            # Keep the numbering of the full list so follow-up commands refer to the right task
+            task_list = "\n".join(f"{db_to_user_id[t.id]}. {t.title} [{'x' if t.completed else ' '}]" for t in shown)
+            return f"Here are your {status} tasks:\n{task_list}"
+
+        number = args.get("task_number")
+        task_id = context.id_mapping.get(number)
+        if task_id is None:
+            return f"Task {number} not found. Use 'list my tasks' to see available tasks."
+
+        if call.name == "complete_task":
+            return self._handle_complete_intent(task_id, None, user_tasks, db_to_user_id, user_id)
+
+        if call.name == "delete_task":
+            return self._handle_delete_intent(task_id, None, user_tasks, db_to_user_id, True, user_id)
+
+        # update_task
+        if args.get("title"):
+            return self._handle_rename_intent(task_id, None, args["title"], user_tasks, db_to_user_id, True, user_id)
+        if args.get("description") is not None:
+            title = next(t.title for t in user_tasks if t.id == task_id)
+            self.tools.handle_update_task(self.session, user_id, task_id, description=args["description"])
+            return f"Task '{title}' has been updated."
+        return "Please specify which task to rename and the new title."
 
+    def _route_fast_path(
+        self, message_text: str, history: List[Dict[str, str]], user_id: str,
+        user_tasks: List, id_mapping: Dict, db_to_user_id: Dict,
+        routed: Optional[intent_router.RoutedIntent] = None
+    ) -> Optional[str]:
+        """
+        Handle the message with the rule-based intent router when it is confident.
+        Returns None when the message needs the LLM classifier.
+        """
+        routed = routed or intent_router.route(message_text, user_tasks)
+        if not routed.is_confident:
+            return None
+        logger.info(f"Fast-path intent: {routed.intent} (rule {routed.rule}, confidence {routed.confidence:.2f})")
+        tracing.annotate(intent=routed.intent, intent_source="fast_path")
+        return self._route_intent(routed.data, message_text, history, user_id, user_tasks, id_mapping, db_to_user_id)
+
+    def _route_intent(
+        self, intent_data: Dict[str, Any], message_text: str, history: List[Dict[str, str]], user_id: str,
+        user_tasks: List, id_mapping: Dict, db_to_user_id: Dict
+    ) -> Optional[str]:
+        """
+        Execute the classified intent against the MCP tools.
+        Returns None when the message needs a general chat response from the LLM.
+        """
         # Extract intent and entities from OpenAI response
         intent = intent_data.get("intent", "unknown")
         task_id = intent_data.get("task_id")
@@ -144,234 +482,75 @@ class AgentOrchestrator:
         elif intent == "unknown":
             # Before defaulting to general chat, try rule-based parsing for common operations
             # This handles cases where OpenAI doesn't recognize the intent but it's a clear task operation
-            fallback_result = self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping)
+            fallback_result = self._fallback_logic(
+                message_text, history, user_id, user_tasks, id_mapping, reason="unknown_intent"
+            )
             # If fallback logic returns a specific task operation result, use it
             if fallback_result and not fallback_result.startswith("I'm sorry"):
                 return fallback_result
 
-            # Use full chat with OpenAI for general queries
-            try:
-                response = openai_client.chat(message_text, history)
-                logger.info("OpenAI chat response generated successfully")
-                return response
-            except RuntimeError as e:
-                logger.warning(f"OpenAI chat failed, using fallback: {e}")
-                return self._fallback_logic(message_text, history, user_id, user_tasks, id_mapping)
+            # Needs a general chat response
+            return None
 
         # Default response if intent is not recognized
         return "I'm sorry, I didn't quite catch that. You can ask me to add, list, complete, rename, or delete tasks."
 
-    def _check_for_confirmation(self, history: List[Dict[str, str]], message_text: str, user_tasks: List) -> Optional[str]:
+    def _check_for_confirmation(self, message_text: str, user_tasks: List, user_id: str) -> Optional[str]:
         """
         Check if the current message is a confirmation for a previous destructive operation.
-        Enhanced to properly track conversation context and task information.
+        The pending operation is read from its PendingAction record (a primary-key lookup)
+        instead of being re-parsed from the conversation history.
+        A pending action only applies to the next user message, so it is consumed either way.
         Returns response if confirmation is detected, None otherwise.
         """
-        if not history:
+        if self.conversation_id is None:
             return None
-
-        # Find the last assistant message that requested confirmation
-        last_assistant_msg = None
-        for msg in reversed(history):
-            if msg.get("role") == "assistant":
-                last_assistant_msg = msg
-                break
-
-        if not last_assistant_msg:
+        # The request's context already knows whether an action is pending (and holds it
+        # in the session, so the pop below needs no lookup)
+        if self.context is not None and self.context.pending_action is None:
             return None
 
-        # Check if last assistant message was a confirmation request
-        content_lower = last_assistant_msg.get("content", "").lower()
-        is_confirmation_request = (
-            "are you sure" in content_lower or
-            "confirm" in content_lower or
-            "delete" in content_lower or
-            "rename" in content_lower or
-            "update" in content_lower or
-            "yes" in content_lower or
-            "to proceed" in content_lower or
-            "please confirm" in content_lower
-        )
-
-        if not is_confirmation_request:
+        # Committed with the turn's next write, so the task snapshot is not expired here
+        pending = crud.pop_pending_action(self.session, self.conversation_id, user_id, commit=False)
+        if self.context is not None:
+            self.context.pending_action = None
+        if pending is None:
             return None
 
         # Check if current user message is affirmative
-        msg_lower = message_text.lower().strip()
-        is_affirmative = msg_lower in ["yes", "yeah", "yep", "confirm", "do it", "sure", "okay", "ok", "y", "confirmed"]
-
-        if not is_affirmative:
+        if message_text.lower().strip() not in AFFIRMATIVE_REPLIES:
             return None  # Not a confirmation, continue normal processing
 
-        # Look for task information in the assistant's confirmation request
-        import re
-
-        # Create user-friendly ID mapping for proper lookup
-        db_to_user_id = {t.id: i+1 for i, t in enumerate(user_tasks)}
+        target_task = next((t for t in user_tasks if t.id == pending.task_id), None)
+        if target_task is None:
+            return "Task not found. Could not process your confirmation."
+        title = target_task.title
 
-        # Extract task ID or title from the assistant's confirmation request
-        # Look for patterns like "task 1", "task 'title'", etc.
-        task_id_match = re.search(r"task\s+(\d+)", last_assistant_msg.get("content", ""), re.IGNORECASE)
-        task_title_match = re.search(r"task\s+'([^']+)'|task\s+\"([^\"]+)\"", last_assistant_msg.get("content", ""), re.IGNORECASE)
+        if pending.operation == "delete":
+            self.tools.handle_delete_task(self.session, user_id, target_task.id)
+            return f"Task '{title}' has been deleted."
 
-        # Find the original user command that triggered the confirmation
-        original_command = None
-        for msg in reversed(history):
-            if msg.get("role") == "user":
-                original_command = msg.get("content", "")
-                break
-
-        if not original_command:
-            return "I couldn't find the original request to process your confirmation. Please try the command again."
-
-        # Determine operation type from original command
-        original_lower = original_command.lower()
-
-        if "delete" in original_lower or "remove" in original_lower:
-            if task_id_match:
-                requested_user_id = int(task_id_match.group(1))
-
-                # Find the actual database ID that corresponds to the user-friendly ID
-                target_task = next((t for t in user_tasks if db_to_user_id[t.id] == requested_user_id), None)
-
-                if target_task:
-                    result = mcp_server.handle_delete_task(self.session, target_task.user_id, target_task.id)
-                    return f"Task '{target_task.title}' has been deleted."
-                else:
-                    return "Task not found. Could not process deletion."
-            elif task_title_match:
-                title = task_title_match.group(1) or task_title_match.group(2)
-                target_task = next((t for t in user_tasks if t.title.lower() == title.lower()), None)
-                if target_task:
-                    result = mcp_server.handle_delete_task(self.session, target_task.user_id, target_task.id)
-                    return f"Task '{target_task.title}' has been deleted."
-                else:
-                    return "Task not found. Could not process deletion."
-            else:
-                return "Could not determine task for deletion operation."
-
-        elif "rename" in original_lower or "update" in original_lower or "change" in original_lower:
-            if task_id_match:
-                requested_user_id = int(task_id_match.group(1))
-
-                # Find the actual database ID that corresponds to the user-friendly ID
-                target_task = next((t for t in user_tasks if db_to_user_id[t.id] == requested_user_id), None)
-
-                if not target_task:
-                    return "Task not found. Could not process update."
-
-                # Extract new title from original command - more flexible pattern matching
-                # Pattern: "update/rename [old_title] to [new_title]" or similar variations
-                update_patterns = [
-                    r"(?:update|rename|change)\s+(?:task\s+\d+\s+)?(?:['\"]?)([^'\"]+)(?:['\"]?)\s+to\s+(.+)",
-                    r"(?:update|rename|change)\s+(?:task\s+\d+\s+)?(.+?)\s+to\s+(.+)",
-                    r"(?:update|rename|change)\s+(?:task\s+)?(.+?)\s+to\s+(.+)"
-                ]
-
-                new_title = None
-                for pattern in update_patterns:
-                    update_match = re.search(pattern, original_command, re.IGNORECASE)
-                    if update_match:
-                        new_title = update_match.group(2).strip().strip('"\'""')
-                        break
-
-                if new_title:
-                    result = mcp_server.handle_update_task(
-                        self.session, target_task.user_id, target_task.id, title=new_title
-                    )
-                    return f"Task '{target_task.title}' has been renamed to '{new_title}'."
-                else:
-                    return "Could not determine new title for update operation."
-
-            elif task_title_match:
-                title = task_title_match.group(1) or task_title_match.group(2)
-                # Extract new title from original command - more flexible pattern matching
-                update_patterns = [
-                    r"(?:update|rename|change)\s+(?:task\s+)?(?:['\"]?)" + re.escape(title) + r"(?:['\"]?)\s+to\s+(.+)",
-                    r"(?:update|rename|change)\s+(?:task\s+)?(.+?)\s+to\s+(.+)",
-                    r"(?:update|rename|change)\s+(.+?)\s+to\s+(.+)"
-                ]
-
-                new_title = None
-                for pattern in update_patterns:
-                    update_match = re.search(pattern, original_command, re.IGNORECASE)
-                    if update_match:
-                        new_title = update_match.group(2).strip().strip('"\'""')
-                        break
-
-                if not new_title:
-                    # Try to extract new title from after the "to" part in the original command
-                    parts = original_command.rsplit(" to ", 1)
-                    if len(parts) == 2:
-                        new_title = parts[1].strip().strip('"\'""')
-
-                if new_title:
-                    # Find the task by title
-                    target_task = next((t for t in user_tasks if t.title.lower() == title.lower()), None)
-                    if target_task:
-                        result = mcp_server.handle_update_task(
-                            self.session, target_task.user_id, target_task.id, title=new_title
-                        )
-                        return f"Task '{target_task.title}' has been renamed to '{new_title}'."
-                    else:
-                        return "Task not found. Could not process update."
-                else:
-                    return "Could not determine new title for update operation."
-            else:
-                return "Could not determine task for update operation."
+        if pending.operation == "rename":
+            self.tools.handle_update_task(self.session, user_id, target_task.id, title=pending.new_title)
+            return f"Task '{title}' has been renamed to '{pending.new_title}'."
 
         return "Processed your confirmation."
 
-    def _process_confirmation(self, history: List[Dict[str, str]], last_assistant_msg: Dict, message_text: str, user_tasks: List) -> str:
+    def _request_confirmation(
+        self, operation: str, task, user_friendly_id: int, user_id: str, new_title: Optional[str] = None
+    ) -> str:
         """
-        Process a confirmed destructive operation based on the original request.
+        Ask the user to confirm a destructive operation and record it as the conversation's pending action.
         """
-        import re
-
-        # Extract task ID from confirmation prompt
-        match = re.search(r"task\s*(\d+)", last_assistant_msg.get("content", ""))
-        if not match:
-            return "I couldn't process your confirmation. Please try the command again."
-
-        user_task_id = int(match.group(1))
-
-        # Find the task to operate on by user-friendly ID
-        target_task = next((t for t in user_tasks if t.id == user_task_id), None)
-        if not target_task:
-            return "Task not found. Could not process confirmation."
-
-        # Find the original user request before the confirmation prompt
-        original_message = None
-        for msg in reversed(history):
-            if msg.get("role") == "user":
-                original_message = msg.get("content", "")
-                break
-
-        if not original_message:
-            return "I couldn't find the original request. Please try again."
-
-        # Determine the operation type from the original message
-        original_lower = original_message.lower()
-
-        if "delete" in original_lower or "remove" in original_lower:
-            result = mcp_server.handle_delete_task(self.session, target_task.user_id, target_task.id)
-            return f"Task '{target_task.title}' has been deleted."
-
-        elif "rename" in original_lower or "change" in original_lower or "update" in original_lower:
-            # Extract new title from original message for rename operations
-            rename_match = re.search(
-                r"(?:rename|change|update).*?(?:task\s*\d+)?\s*(?:to\s*|=)\s*(.+)", original_message
-            )
-            if rename_match:
-                new_title = rename_match.group(1).strip().strip('"\'""')
-                result = mcp_server.handle_update_task(
-                    self.session, target_task.user_id, target_task.id, title=new_title
-                )
-                return f"Task '{target_task.title}' has been renamed to '{new_title}'."
-            else:
-                return "Could not determine new title for rename operation."
+        # Format before recording: the commit expires the snapshot task
+        if operation == "rename":
+            prompt = f"Are you sure you want to rename task {user_friendly_id} ('{task.title}') to '{new_title}'? Please confirm with 'yes' to proceed."
+        else:
+            prompt = f"Are you sure you want to delete task {user_friendly_id} ('{task.title}')? Please confirm with 'yes' to proceed."
 
-        return "Processed your confirmation."
+        if self.conversation_id is not None:
+            crud.set_pending_action(self.session, self.conversation_id, user_id, operation, task.id, new_title)
+        return prompt
 
     def _handle_create_intent(self, task_title: Optional[str], message_text: str, user_id: str) -> str:
         """
@@ -386,7 +565,7 @@ class AgentOrchestrator:
                     break
 
         if title:
-            result = mcp_server.handle_add_task(self.session, user_id, title.strip(), None)
+            result = self.tools.handle_add_task(self.session, user_id, title.strip(), None)
             return f"Task '{title.strip()}' has been added to your list."
         else:
             return "What would you like to add to your todo list?"
@@ -419,10 +598,10 @@ class AgentOrchestrator:
 
             if existing_task:
                 if needs_confirmation:
-                    return f"Are you sure you want to delete task {user_friendly_id} ('{existing_task.title}')? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("delete", existing_task, user_friendly_id, user_id)
                 else:
-                    result = mcp_server.handle_delete_task(self.session, user_id, task_id)
-                    return f"Task '{existing_task.title}' has been deleted."
+                    result = self.tools.handle_delete_task(self.session, user_id, task_id)
+                    return f"Task '{result['title']}' has been deleted."
             else:
                 return f"Task {user_friendly_id} not found. Use 'list my tasks' to see available tasks."
         else:
@@ -433,10 +612,10 @@ class AgentOrchestrator:
                     task = matching_tasks[0]
                     user_friendly_id = db_to_user_id[task.id]
                     if needs_confirmation:
-                        return f"Are you sure you want to delete task {user_friendly_id} ('{task.title}')? Please confirm with 'yes' to proceed."
+                        return self._request_confirmation("delete", task, user_friendly_id, user_id)
                     else:
-                        result = mcp_server.handle_delete_task(self.session, user_id, task.id)
-                        return f"Task '{task.title}' has been deleted."
+                        result = self.tools.handle_delete_task(self.session, user_id, task.id)
+                        return f"Task '{result['title']}' has been deleted."
                 elif len(matching_tasks) > 1:
                     task_list = ", ".join([f"'{t.title}'" for t in matching_tasks])
                     return f"Multiple tasks match '{task_title}': {task_list}. Please specify by number or exact title."
@@ -459,9 +638,9 @@ class AgentOrchestrator:
 
             if existing_task:
                 if needs_confirmation:
-                    return f"Are you sure you want to rename task {user_friendly_id} ('{existing_task.title}') to '{new_title}'? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("rename", existing_task, user_friendly_id, user_id, new_title)
                 else:
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, user_id, task_id, title=new_title
                     )
                     return f"Task '{existing_task.title}' has been successfully updated to '{new_title}'."
@@ -473,9 +652,9 @@ class AgentOrchestrator:
             if exact_match:
                 user_friendly_id = db_to_user_id[exact_match.id]
                 if needs_confirmation:
-                    return f"Are you sure you want to rename task {user_friendly_id} ('{exact_match.title}') to '{new_title}'? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("rename", exact_match, user_friendly_id, user_id, new_title)
                 else:
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, user_id, exact_match.id, title=new_title
                     )
                     return f"Task '{exact_match.title}' has been successfully updated to '{new_title}'."
@@ -486,9 +665,9 @@ class AgentOrchestrator:
                 task = partial_matches[0]
                 user_friendly_id = db_to_user_id[task.id]
                 if needs_confirmation:
-                    return f"Are you sure you want to rename task {user_friendly_id} ('{task.title}') to '{new_title}'? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("rename", task, user_friendly_id, user_id, new_title)
                 else:
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, user_id, task.id, title=new_title
                     )
                     return f"Task '{task.title}' has been successfully updated to '{new_title}'."
@@ -501,9 +680,9 @@ class AgentOrchestrator:
                     if task_title.lower() in t.title.lower() or t.title.lower() in task_title.lower():
                         user_friendly_id = db_to_user_id[t.id]
                         if needs_confirmation:
-                            return f"Are you sure you want to rename task {user_friendly_id} ('{t.title}') to '{new_title}'? Please confirm with 'yes' to proceed."
+                            return self._request_confirmation("rename", t, user_friendly_id, user_id, new_title)
                         else:
-                            result = mcp_server.handle_update_task(
+                            result = self.tools.handle_update_task(
                                 self.session, user_id, t.id, title=new_title
                             )
                             return f"Task '{t.title}' has been successfully updated to '{new_title}'."
@@ -528,7 +707,7 @@ class AgentOrchestrator:
                 if existing_task.completed:
                     return f"Task {user_friendly_id} ('{existing_task.title}') is already completed."
                 else:
-                    result = mcp_server.handle_complete_task(
+                    result = self.tools.handle_complete_task(
                         self.session, user_id, task_id
                     )
                     return f"Task '{existing_task.title}' has been successfully marked as completed."
@@ -542,7 +721,7 @@ class AgentOrchestrator:
                 if exact_match.completed:
                     return f"Task '{exact_match.title}' is already completed."
                 else:
-                    result = mcp_server.handle_complete_task(
+                    result = self.tools.handle_complete_task(
                         self.session, user_id, exact_match.id
                     )
                     return f"Task '{exact_match.title}' has been successfully marked as completed."
@@ -554,7 +733,7 @@ class AgentOrchestrator:
                 if task.completed:
                     return f"Task '{task.title}' is already completed."
                 else:
-                    result = mcp_server.handle_complete_task(
+                    result = self.tools.handle_complete_task(
                         self.session, user_id, task.id
                     )
                     return f"Task '{task.title}' has been successfully marked as completed."
@@ -568,7 +747,7 @@ class AgentOrchestrator:
                         if t.completed:
                             return f"Task '{t.title}' is already completed."
                         else:
-                            result = mcp_server.handle_complete_task(
+                            result = self.tools.handle_complete_task(
                                 self.session, user_id, t.id
                             )
                             return f"Task '{t.title}' has been successfully marked as completed."
@@ -579,16 +758,18 @@ class AgentOrchestrator:
 
     def _fallback_logic(
         self, message_text: str, history: List[Dict[str, str]], user_id: str,
-        user_tasks: List, id_mapping: Dict
+        user_tasks: List, id_mapping: Dict, reason: str = "unavailable"
     ) -> str:
         """
         Fallback rule-based logic when OpenAI is unavailable.
         Enhanced with better task lookup, natural language processing, and error handling.
+        `reason` labels the todo_chat_fallback_total metric.
         """
+        metrics.chat_fallbacks.labels(reason).inc()
         msg_lower = message_text.lower().strip()
 
         # Check for pending confirmation first
-        confirmation_result = self._check_for_confirmation(history, message_text, user_tasks)
+        confirmation_result = self._check_for_confirmation(message_text, user_tasks, user_id)
         if confirmation_result:
             return confirmation_result
 
@@ -610,7 +791,7 @@ class AgentOrchestrator:
                     title = message_text.strip()
 
             if title and title.lower() not in ["add", "create", "new task", "remind me"]:
-                result = mcp_server.handle_add_task(self.session, user_id, title, None)
+                result = self.tools.handle_add_task(self.session, user_id, title, None)
                 return f"Task '{title}' has been added to your list."
             return "What would you like to add to your todo list?"
 
@@ -636,7 +817,7 @@ class AgentOrchestrator:
                         # Find the task object to get the current title
                         target_task = next((t for t in user_tasks if t.id == db_task_id), None)
                         if target_task:
-                            result = mcp_server.handle_update_task(
+                            result = self.tools.handle_update_task(
                                 self.session, user_id, db_task_id, title=new_title
                             )
                             return f"Task '{target_task.title}' has been successfully updated to '{new_title}'."
@@ -646,7 +827,7 @@ class AgentOrchestrator:
                 # Find task by exact title match first
                 exact_match = next((t for t in user_tasks if t.title.lower() == old_title.lower()), None)
                 if exact_match:
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, user_id, exact_match.id, title=new_title
                     )
                     return f"Task '{exact_match.title}' has been successfully updated to '{new_title}'."
@@ -655,7 +836,7 @@ class AgentOrchestrator:
                 partial_matches = [t for t in user_tasks if old_title.lower() in t.title.lower()]
                 if len(partial_matches) == 1:
                     task = partial_matches[0]
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, user_id, task.id, title=new_title
                     )
                     return f"Task '{task.title}' has been successfully updated to '{new_title}'."
@@ -666,7 +847,7 @@ class AgentOrchestrator:
                     # Try broader matching (titles that contain the old_title or vice versa)
                     for t in user_tasks:
                         if old_title.lower() in t.title.lower() or t.title.lower() in old_title.lower():
-                            result = mcp_server.handle_update_task(
+                            result = self.tools.handle_update_task(
                                 self.session, user_id, t.id, title=new_title
                             )
                             return f"Task '{t.title}' has been successfully updated to '{new_title}'."
@@ -676,7 +857,7 @@ class AgentOrchestrator:
                     if original_old_title != old_title:
                         exact_match = next((t for t in user_tasks if t.title.lower() == original_old_title.lower()), None)
                         if exact_match:
-                            result = mcp_server.handle_update_task(
+                            result = self.tools.handle_update_task(
                                 self.session, exact_match.id, user_id, new_title=new_title
                             )
                             return f"Task '{exact_match.title}' has been successfully updated to '{new_title}'."
@@ -684,7 +865,7 @@ class AgentOrchestrator:
                         partial_matches = [t for t in user_tasks if original_old_title.lower() in t.title.lower()]
                         if len(partial_matches) == 1:
                             task = partial_matches[0]
-                            result = mcp_server.handle_update_task(
+                            result = self.tools.handle_update_task(
                                 self.session, task.id, user_id, new_title=new_title
                             )
                             return f"Task '{task.title}' has been successfully updated to '{new_title}'."
@@ -702,7 +883,7 @@ class AgentOrchestrator:
                     # Find the task to get its title
                     matching_task = next((t for t in user_tasks if t.id == db_task_id), None)
                     if matching_task:
-                        result = mcp_server.handle_complete_task(
+                        result = self.tools.handle_complete_task(
                             self.session, user_id, db_task_id
                         )
                         return f"Task '{matching_task.title}' has been successfully marked as completed."
@@ -722,7 +903,7 @@ class AgentOrchestrator:
                         # Find task by exact title match first
                         exact_match = next((t for t in user_tasks if t.title.lower() == title_part.lower()), None)
                         if exact_match:
-                            result = mcp_server.handle_complete_task(
+                            result = self.tools.handle_complete_task(
                                 self.session, user_id, exact_match.id
                             )
                             return f"Task '{exact_match.title}' has been successfully marked as completed."
@@ -731,7 +912,7 @@ class AgentOrchestrator:
                         partial_matches = [t for t in user_tasks if title_part.lower() in t.title.lower()]
                         if len(partial_matches) == 1:
                             task = partial_matches[0]
-                            result = mcp_server.handle_complete_task(
+                            result = self.tools.handle_complete_task(
                                 self.session, user_id, task.id
                             )
                             return f"Task '{task.title}' has been successfully marked as completed."
@@ -742,7 +923,7 @@ class AgentOrchestrator:
                             # Try more flexible matching (titles that contain the title_part or vice versa)
                             for t in user_tasks:
                                 if title_part.lower() in t.title.lower() or t.title.lower() in title_part.lower():
-                                    result = mcp_server.handle_complete_task(
+                                    result = self.tools.handle_complete_task(
                                         self.session, user_id, t.id
                                     )
                                     return f"Task '{t.title}' has been successfully marked as completed."
@@ -758,7 +939,7 @@ class AgentOrchestrator:
                     # Find the task to get its title
                     matching_task = next((t for t in user_tasks if t.id == db_task_id), None)
                     if matching_task:
-                        result = mcp_server.handle_complete_task(
+                        result = self.tools.handle_complete_task(
                             self.session, user_id, db_task_id
                         )
                         return f"Task '{matching_task.title}' has been successfully marked as completed."
@@ -779,7 +960,7 @@ class AgentOrchestrator:
                 # Try exact match
                 exact_match = next((t for t in user_tasks if t.title.lower() == remaining_text), None)
                 if exact_match:
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, exact_match.id, user_id, completed=True
                     )
                     return f"Task '{exact_match.title}' has been successfully marked as completed."
@@ -788,7 +969,7 @@ class AgentOrchestrator:
                 partial_matches = [t for t in user_tasks if remaining_text in t.title.lower()]
                 if len(partial_matches) == 1:
                     task = partial_matches[0]
-                    result = mcp_server.handle_update_task(
+                    result = self.tools.handle_update_task(
                         self.session, task.id, user_id, completed=True
                     )
                     return f"Task '{task.title}' has been successfully marked as completed."
@@ -806,7 +987,7 @@ class AgentOrchestrator:
                     # Find the task to get its title
                     matching_task = next((t for t in user_tasks if t.id == db_task_id), None)
                     if matching_task:
-                        return f"Are you sure you want to delete task {task_num} ('{matching_task.title}')? Please confirm with 'yes' to proceed."
+                        return self._request_confirmation("delete", matching_task, task_num, user_id)
                     else:
                         return f"Task with ID {task_num} not found. Use 'list my tasks' to see available tasks."
                 else:
@@ -821,7 +1002,7 @@ class AgentOrchestrator:
                     # Find the task to get its title
                     matching_task = next((t for t in user_tasks if t.id == db_task_id), None)
                     if matching_task:
-                        return f"Are you sure you want to delete task {task_num} ('{matching_task.title}')? Please confirm with 'yes' to proceed."
+                        return self._request_confirmation("delete", matching_task, task_num, user_id)
                     else:
                         return f"Task with ID {task_num} not found. Use 'list my tasks' to see available tasks."
                 else:
@@ -837,13 +1018,13 @@ class AgentOrchestrator:
                         exact_match = next((t for t in user_tasks if t.title.lower() == title_part.lower()), None)
                         if exact_match:
                             user_friendly_id = next(k for k, v in id_mapping.items() if v == exact_match.id)
-                            return f"Are you sure you want to delete task {user_friendly_id} ('{exact_match.title}')? Please confirm with 'yes' to proceed."
+                            return self._request_confirmation("delete", exact_match, user_friendly_id, user_id)
 
                         # If no exact match, try partial match
                         matching_tasks = [t for t in user_tasks if title_part.lower() in t.title.lower()]
                         if len(matching_tasks) == 1:
                             user_friendly_id = next(k for k, v in id_mapping.items() if v == matching_tasks[0].id)
-                            return f"Are you sure you want to delete task {user_friendly_id} ('{matching_tasks[0].title}')? Please confirm with 'yes' to proceed."
+                            return self._request_confirmation("delete", matching_tasks[0], user_friendly_id, user_id)
                         elif len(matching_tasks) > 1:
                             task_list = ", ".join([f"'{t.title}'" for t in matching_tasks])
                             return f"Multiple tasks match '{title_part}': {task_list}. Please specify by number or exact title."
@@ -852,7 +1033,7 @@ class AgentOrchestrator:
                             for t in user_tasks:
                                 if title_part.lower() in t.title.lower() or t.title.lower() in title_part.lower():
                                     user_friendly_id = next(k for k, v in id_mapping.items() if v == t.id)
-                                    return f"Are you sure you want to delete task {user_friendly_id} ('{t.title}')? Please confirm with 'yes' to proceed."
+                                    return self._request_confirmation("delete", t, user_friendly_id, user_id)
 
                     break  # Process only the first match
 
@@ -869,13 +1050,13 @@ class AgentOrchestrator:
                 exact_match = next((t for t in user_tasks if t.title.lower() == remaining_text), None)
                 if exact_match:
                     user_friendly_id = next(k for k, v in id_mapping.items() if v == exact_match.id)
-                    return f"Are you sure you want to delete task {user_friendly_id} ('{exact_match.title}')? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("delete", exact_match, user_friendly_id, user_id)
 
                 # Try partial match
                 partial_matches = [t for t in user_tasks if remaining_text in t.title.lower()]
                 if len(partial_matches) == 1:
                     user_friendly_id = next(k for k, v in id_mapping.items() if v == partial_matches[0].id)
-                    return f"Are you sure you want to delete task {user_friendly_id} ('{partial_matches[0].title}')? Please confirm with 'yes' to proceed."
+                    return self._request_confirmation("delete", partial_matches[0], user_friendly_id, user_id)
 
             return "Please specify which task to delete by number or title."
 
@@ -1,137 +1,414 @@
 """
 OpenAI Agents SDK Implementation for Phase 3
 Replaces custom agent with official OpenAI Assistants API
+
+Assistants are created once per (model, tool schema) and reused: their ids are cached
+in-process and tagged with the schema hash in the assistant metadata, so a restarted
+process finds the existing assistant instead of creating another one. Each Conversation
+keeps its own thread (Conversation.assistant_thread_id), so a turn only appends the
+user's message and starts a run.
+
+Runs are driven over the streaming API: tool calls are executed as soon as the run asks
+for them and the reply arrives with the run's events, instead of sleeping and re-fetching
+the run. With streaming disabled (ASSISTANT_RUN_STREAMING=false) the run is polled with a
+growing delay. Either way a run that exceeds its time budget (ASSISTANT_RUN_TIMEOUT_SECONDS,
+or the timeout argument) is cancelled and TimeoutError is raised.
 """
-from openai import OpenAI
-from typing import List, Dict, Any, Optional
+from openai import APITimeoutError
+import httpx
+from typing import Callable, List, Dict, Any, Optional
 from sqlmodel import Session
+import hashlib
 import os
+import threading
 from dotenv import load_dotenv
 import json
 import time
 
+from . import crud, llm_transport
+
 load_dotenv()
 
+# Overall time budget for one assistant run, including tool calls
+ASSISTANT_RUN_TIMEOUT_SECONDS = float(os.getenv("ASSISTANT_RUN_TIMEOUT_SECONDS", "60"))
+ASSISTANT_RUN_STREAMING = os.getenv("ASSISTANT_RUN_STREAMING", "true").lower() == "true"
+# Polling schedule when streaming is disabled
+ASSISTANT_POLL_INITIAL_SECONDS = float(os.getenv("ASSISTANT_POLL_INITIAL_SECONDS", "0.05"))
+ASSISTANT_POLL_MAX_SECONDS = float(os.getenv("ASSISTANT_POLL_MAX_SECONDS", "1.0"))
+
+_FAILED_RUN_EVENTS = ("thread.run.failed", "thread.run.cancelled", "thread.run.expired", "thread.run.incomplete")
+
+# Receives the tool calls a run is waiting on and returns their outputs
+ToolCallHandler = Callable[[List[Any]], List[Dict[str, str]]]
+
+TODO_AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "create_task",
+            "description": "Create a new task",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "title": {"type": "string", "description": "The task title"}
+                },
+                "required": ["title"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_tasks",
+            "description": "List all tasks for the user",
+            "parameters": {
+                "type": "object",
+                "properties": {},
+                "required": []
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_task",
+            "description": "Update a task (complete or rename)",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "integer", "description": "The task ID"},
+                    "new_title": {"type": "string", "description": "New title for the task (optional)"},
+                    "completed": {"type": "boolean", "description": "Completion status (optional)"}
+                },
+                "required": ["task_id"],
+                "anyOf": [
+                    {"required": ["new_title"]},
+                    {"required": ["completed"]}
+                ]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "delete_task",
+            "description": "Delete a task",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "task_id": {"type": "integer", "description": "The task ID to delete"}
+                },
+                "required": ["task_id"]
+            }
+        }
+    }
+]
+
+MCP_AGENT_TOOLS = [
+    {
+        "type": "function",
+        "function": {
+            "name": "add_task",
+            "description": "Add a new task to the list",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "string", "description": "The user ID"},
+                    "title": {"type": "string", "description": "The task title"},
+                    "description": {"type": "string", "description": "Optional task description"}
+                },
+                "required": ["user_id", "title"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "list_tasks",
+            "description": "List tasks for the user",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "string", "description": "The user ID"},
+                    "status": {"type": "string", "description": "Filter by status: 'all', 'pending', or 'completed'"}
+                },
+                "required": ["user_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "complete_task",
+            "description": "Mark a task as complete",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "string", "description": "The user ID"},
+                    "task_id": {"type": "integer", "description": "The task ID to complete"}
+                },
+                "required": ["user_id", "task_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "delete_task",
+            "description": "Delete a task from the list",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "string", "description": "The user ID"},
+                    "task_id": {"type": "integer", "description": "The task ID to delete"}
+                },
+                "required": ["user_id", "task_id"]
+            }
+        }
+    },
+    {
+        "type": "function",
+        "function": {
+            "name": "update_task",
+            "description": "Update a task title or description",
+            "parameters": {
+                "type": "object",
+                "properties": {
+                    "user_id": {"type": "string", "description": "The user ID"},
+                    "task_id": {"type": "integer", "description": "The task ID to update"},
+                    "title": {"type": "string", "description": "New title for the task (optional)"},
+                    "description": {"type": "string", "description": "New description for the task (optional)"}
+                },
+                "required": ["user_id", "task_id"]
+            }
+        }
+    }
+]
+
+# Assistant id per assistant_cache_key()
+_assistant_ids: Dict[str, str] = {}
+_assistant_lock = threading.Lock()
+
 
 def get_openai_client():
-    """Get OpenAI client with API key from environment"""
+    """Get the shared OpenAI client (see llm_transport) with API key from environment"""
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise ValueError("OPENAI_API_KEY environment variable is not set")
-    return OpenAI(api_key=api_key)
+    return llm_transport.get_openai(api_key)
 
 
-def create_todo_agent(session: Session, user_id: str):
-    """Create and configure the Todo Agent using OpenAI Assistants API"""
+def assistant_cache_key(name: str, model: str, tools: List[Dict[str, Any]]) -> str:
+    """
+    Hash identifying an assistant configuration; a changed model or tool schema gets a new assistant.
+    """
+    payload = json.dumps({"name": name, "model": model, "tools": tools}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()[:32]
 
-    client = get_openai_client()
 
-    # Create an assistant for todo management
-    assistant = client.beta.assistants.create(
+def get_assistant_id(client, name: str, description: str, tools: List[Dict[str, Any]]) -> str:
+    """
+    Return the id of the assistant for this configuration, creating it only if it does not exist yet.
+    """
+    model = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+    key = assistant_cache_key(name, model, tools)
+    assistant_id = _assistant_ids.get(key)
+    if assistant_id is not None:
+        return assistant_id
+
+    with _assistant_lock:
+        if key in _assistant_ids:
+            return _assistant_ids[key]
+        # Reuse an assistant created by an earlier process with the same configuration
+        existing = next(
+            (a for a in client.beta.assistants.list(limit=100).data if (a.metadata or {}).get("schema_hash") == key),
+            None
+        )
+        if existing is None:
+            existing = client.beta.assistants.create(
+                name=name,
+                description=description,
+                model=model,
+                tools=tools,
+                metadata={"schema_hash": key}
+            )
+        _assistant_ids[key] = existing.id
+        return existing.id
+
+
+def create_todo_agent(session: Session, user_id: str) -> str:
+    """Get the Todo Agent's assistant id (created once per model and tool schema)"""
+
+    client = get_openai_client()
+    return get_assistant_id(
+        client,
         name="Todo Assistant",
         description="A helpful assistant that manages todo lists",
-        model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-        tools=[
-            {
-                "type": "function",
-                "function": {
-                    "name": "create_task",
-                    "description": "Create a new task",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "title": {"type": "string", "description": "The task title"}
-                        },
-                        "required": ["title"]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "list_tasks",
-                    "description": "List all tasks for the user",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {},
-                        "required": []
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "update_task",
-                    "description": "Update a task (complete or rename)",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "task_id": {"type": "integer", "description": "The task ID"},
-                            "new_title": {"type": "string", "description": "New title for the task (optional)"},
-                            "completed": {"type": "boolean", "description": "Completion status (optional)"}
-                        },
-                        "required": ["task_id"],
-                        "anyOf": [
-                            {"required": ["new_title"]},
-                            {"required": ["completed"]}
-                        ]
-                    }
-                }
-            },
-            {
-                "type": "function",
-                "function": {
-                    "name": "delete_task",
-                    "description": "Delete a task",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "task_id": {"type": "integer", "description": "The task ID to delete"}
-                        },
-                        "required": ["task_id"]
-                    }
-                }
-            }
-        ]
+        tools=TODO_AGENT_TOOLS
     )
 
-    return assistant
+
+def get_conversation_thread(client, session: Session, user_id: str, conversation_id: Optional[int]) -> str:
+    """
+    Return the conversation's Assistants thread id, creating and persisting it on first use.
+    Without a conversation, a one-off thread is created.
+    """
+    conversation = crud.get_conversation(session, conversation_id, user_id) if conversation_id is not None else None
+    if conversation is not None and conversation.assistant_thread_id:
+        return conversation.assistant_thread_id
+
+    thread = client.beta.threads.create()
+    if conversation is not None:
+        crud.set_conversation_thread(session, conversation, thread.id)
+    return thread.id
+
+
+def _message_text(message) -> Optional[str]:
+    if message.role == "assistant" and message.content and message.content[0].type == "text":
+        return message.content[0].text.value
+    return None
 
 
-def run_todo_agent(session: Session, user_id: str, message: str) -> str:
+def _cancel_run(client, thread_id: str, run_id: Optional[str]) -> None:
+    """Best-effort cancel of a run that exceeded its time budget."""
+    if run_id is None:
+        return
+    try:
+        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        print(f"Could not cancel run {run_id}: {e}")
+
+
+def _api_request(request: Callable[..., Any], deadline: float, **kwargs) -> Any:
+    """
+    Make one Assistants API request of a run under the LLM circuit breaker, which refuses it
+    with CircuitOpenError while open. Only the request itself is a breaker outcome: tool
+    calls and the waits between requests are not, and a request cut short by the run's
+    own time budget is not a provider failure.
+    """
+    budget_exceeded = None
+    with llm_transport.call("assistants_run"):
+        try:
+            return request(**kwargs)
+        except (APITimeoutError, httpx.TimeoutException) as e:
+            if time.monotonic() < deadline:
+                raise
+            budget_exceeded = e
+    raise TimeoutError("Assistant run exceeded its time budget") from budget_exceeded
+
+
+def _stream_run(client, thread_id: str, assistant_id: str, instructions: str,
+                handle_tool_calls: ToolCallHandler, deadline: float) -> Optional[str]:
+    """
+    Drive a run over the streaming API: tool calls are executed as soon as the
+    requires_action event arrives and the reply is taken from the message events.
+    """
+    stream = _api_request(
+        client.beta.threads.runs.create, deadline,
+        thread_id=thread_id, assistant_id=assistant_id, instructions=instructions,
+        stream=True, timeout=max(deadline - time.monotonic(), 0.001)
+    )
+    run_id = None
+    reply = None
+    try:
+        while stream is not None:
+            tool_run = None
+            with stream:
+                for event in stream:
+                    if event.event.startswith("thread.run.") and not event.event.startswith("thread.run.step"):
+                        run_id = event.data.id
+                    if event.event == "thread.message.completed":
+                        reply = _message_text(event.data) or reply
+                    elif event.event == "thread.run.requires_action":
+                        tool_run = event.data
+                    elif event.event in _FAILED_RUN_EVENTS:
+                        raise RuntimeError(f"Assistant run ended with status {event.data.status}")
+                    if time.monotonic() > deadline:
+                        raise TimeoutError("Assistant run exceeded its time budget")
+
+            # The stream ends at requires_action; submitting the outputs continues the run on a new stream
+            stream = None
+            if tool_run is not None:
+                tool_outputs = handle_tool_calls(tool_run.required_action.submit_tool_outputs.tool_calls)
+                stream = _api_request(
+                    client.beta.threads.runs.submit_tool_outputs, deadline,
+                    thread_id=thread_id, run_id=tool_run.id, tool_outputs=tool_outputs,
+                    stream=True, timeout=max(deadline - time.monotonic(), 0.001)
+                )
+    except (TimeoutError, APITimeoutError, httpx.TimeoutException) as e:
+        # A stalled stream hits the request timeout, which is capped at the remaining budget
+        _cancel_run(client, thread_id, run_id)
+        raise TimeoutError("Assistant run exceeded its time budget") from e
+    return reply
+
+
+def _poll_run(client, thread_id: str, assistant_id: str, instructions: str,
+              handle_tool_calls: ToolCallHandler, deadline: float) -> Optional[str]:
+    """
+    Drive a run by polling, for APIs without streaming: the delay between polls starts at
+    ASSISTANT_POLL_INITIAL_SECONDS and grows by half each time up to ASSISTANT_POLL_MAX_SECONDS,
+    so short runs are picked up quickly without hammering the API on long ones.
+    """
+    run = _api_request(client.beta.threads.runs.create, deadline,
+                       thread_id=thread_id, assistant_id=assistant_id, instructions=instructions)
+    delay = ASSISTANT_POLL_INITIAL_SECONDS
+    while run.status != "completed":
+        if run.status == "requires_action" and run.required_action.type == "submit_tool_outputs":
+            tool_outputs = handle_tool_calls(run.required_action.submit_tool_outputs.tool_calls)
+            run = _api_request(
+                client.beta.threads.runs.submit_tool_outputs, deadline,
+                thread_id=thread_id, run_id=run.id, tool_outputs=tool_outputs
+            )
+            delay = ASSISTANT_POLL_INITIAL_SECONDS
+            continue
+        if run.status not in ("queued", "in_progress", "cancelling"):
+            raise RuntimeError(f"Assistant run ended with status {run.status}")
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _cancel_run(client, thread_id, run.id)
+            raise TimeoutError("Assistant run exceeded its time budget")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 1.5, ASSISTANT_POLL_MAX_SECONDS)
+        run = _api_request(client.beta.threads.runs.retrieve, deadline, thread_id=thread_id, run_id=run.id)
+
+    # Get this run's messages (the conversation's thread also holds the earlier turns)
+    messages = _api_request(client.beta.threads.messages.list, deadline, thread_id=thread_id, run_id=run.id)
+    return next((text for text in map(_message_text, messages.data) if text is not None), None)
+
+
+def execute_run(client, thread_id: str, assistant_id: str, instructions: str,
+                handle_tool_calls: ToolCallHandler, timeout: Optional[float] = None) -> Optional[str]:
+    """
+    Run the assistant on the thread to completion and return its reply (None if it sent none).
+    handle_tool_calls receives each batch of requested tool calls and returns the tool outputs.
+    Raises TimeoutError (after cancelling the run) once timeout seconds have passed
+    (default ASSISTANT_RUN_TIMEOUT_SECONDS), and RuntimeError if the run fails or the
+    LLM circuit breaker is open (checked on each API request of the run, see _api_request).
+    """
+    deadline = time.monotonic() + (timeout if timeout is not None else ASSISTANT_RUN_TIMEOUT_SECONDS)
+    drive = _stream_run if ASSISTANT_RUN_STREAMING else _poll_run
+    return drive(client, thread_id, assistant_id, instructions, handle_tool_calls, deadline)
+
+
+def run_todo_agent(session: Session, user_id: str, message: str, conversation_id: Optional[int] = None,
+                   timeout: Optional[float] = None) -> str:
     """Run the todo agent with a user message using OpenAI Assistants API"""
 
     client = get_openai_client()
+    assistant_id = create_todo_agent(session, user_id)
 
-    # Create a thread for this conversation
-    thread = client.beta.threads.create()
+    # The conversation's thread already holds the earlier turns
+    thread_id = get_conversation_thread(client, session, user_id, conversation_id)
 
     # Add the user's message to the thread
     client.beta.threads.messages.create(
-        thread_id=thread.id,
+        thread_id=thread_id,
         role="user",
         content=message
     )
 
-    # Run the assistant
-    run = client.beta.threads.runs.create(
-        thread_id=thread.id,
-        assistant_id=create_todo_agent(session, user_id).id,
-        instructions=f"You are a helpful todo list assistant. The current user ID is {user_id}. "
-                    "Use the available tools to manage tasks. "
-                    "For destructive operations (delete, rename), always ask for confirmation first, "
-                    "and only proceed after the user explicitly confirms with 'yes', 'confirm', or similar."
-    )
-
-    # Wait for the run to complete
-    while run.status in ["queued", "in_progress"]:
-        time.sleep(0.5)
-        run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-
-    # Handle tool calls if any
-    if run.status == "requires_action" and run.required_action.type == "submit_tool_outputs":
-        tool_calls = run.required_action.submit_tool_outputs.tool_calls
-
+    def handle_tool_calls(tool_calls) -> List[Dict[str, str]]:
         tool_outputs = []
         for tool_call in tool_calls:
             function_name = tool_call.function.name
@@ -139,15 +416,12 @@ def run_todo_agent(session: Session, user_id: str, message: str) -> str:
 
             # Execute the function based on the function name
             if function_name == "create_task":
-                from . import crud
                 task = crud.create_task(session, title=function_args["title"], description=None, user_id=user_id)
                 output = {"id": task.id, "title": task.title, "completed": task.completed}
             elif function_name == "list_tasks":
-                from . import crud
                 tasks = crud.get_tasks_by_user(session, user_id)
                 output = [{"id": t.id, "title": t.title, "completed": t.completed} for t in tasks]
             elif function_name == "update_task":
-                from . import crud
                 task = crud.update_task(
                     session,
                     function_args["task_id"],
@@ -160,7 +434,6 @@ def run_todo_agent(session: Session, user_id: str, message: str) -> str:
                 else:
                     output = {"error": "Task not found"}
             elif function_name == "delete_task":
-                from . import crud
                 success = crud.delete_task(session, function_args["task_id"], user_id)
                 output = {"success": success}
             else:
@@ -170,207 +443,99 @@ def run_todo_agent(session: Session, user_id: str, message: str) -> str:
                 "tool_call_id": tool_call.id,
                 "output": json.dumps(output)
             })
-
-        # Submit the tool outputs
-        run = client.beta.threads.runs.submit_tool_outputs(
-            thread_id=thread.id,
-            run_id=run.id,
-            tool_outputs=tool_outputs
-        )
-
-        # Wait for the run to complete after tool outputs
-        while run.status in ["queued", "in_progress"]:
-            time.sleep(0.5)
-            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-
-    # Get the messages from the thread
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
-
-    # Extract the assistant's response (last message)
-    for msg in messages.data:
-        if msg.role == "assistant":
-            # Get the content of the message
-            if msg.content and len(msg.content) > 0 and msg.content[0].type == "text":
-                return msg.content[0].text.value
-
-    return "I couldn't process your request. Please try again."
+        return tool_outputs
+
+    reply = execute_run(
+        client,
+        thread_id,
+        assistant_id,
+        f"You are a helpful todo list assistant. The current user ID is {user_id}. "
+        "Use the available tools to manage tasks. "
+        "For destructive operations (delete, rename), always ask for confirmation first, "
+        "and only proceed after the user explicitly confirms with 'yes', 'confirm', or similar.",
+        handle_tool_calls,
+        timeout
+    )
+    return reply or "I couldn't process your request. Please try again."
 
 
-def run_todo_agent_with_mcp_tools(session: Session, user_id: str, message: str, conversation_history: List[Dict[str, str]]) -> tuple[str, List[Dict[str, Any]]]:
+def run_todo_agent_with_mcp_tools(
+    session: Session, user_id: str, message: str, conversation_history: List[Dict[str, str]],
+    conversation_id: Optional[int] = None, timeout: Optional[float] = None
+) -> tuple[str, List[Dict[str, Any]]]:
     """
     Run the todo agent with MCP tools using OpenAI Assistants API
+    With a conversation_id, the conversation's thread already holds the earlier turns
+    and conversation_history is not resent.
     Returns: (response_text, tool_calls_made)
     """
     try:
         client = get_openai_client()
 
-        # Create an assistant with MCP tools
-        assistant = client.beta.assistants.create(
+        # Assistant with MCP tools (created once per model and tool schema)
+        assistant_id = get_assistant_id(
+            client,
             name="Todo Assistant with MCP Tools",
             description="A helpful assistant that manages todo lists using MCP tools",
-            model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"),
-            tools=[
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "add_task",
-                        "description": "Add a new task to the list",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "user_id": {"type": "string", "description": "The user ID"},
-                                "title": {"type": "string", "description": "The task title"},
-                                "description": {"type": "string", "description": "Optional task description"}
-                            },
-                            "required": ["user_id", "title"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "list_tasks",
-                        "description": "List tasks for the user",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "user_id": {"type": "string", "description": "The user ID"},
-                                "status": {"type": "string", "description": "Filter by status: 'all', 'pending', or 'completed'"}
-                            },
-                            "required": ["user_id"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "complete_task",
-                        "description": "Mark a task as complete",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "user_id": {"type": "string", "description": "The user ID"},
-                                "task_id": {"type": "integer", "description": "The task ID to complete"}
-                            },
-                            "required": ["user_id", "task_id"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "delete_task",
-                        "description": "Delete a task from the list",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "user_id": {"type": "string", "description": "The user ID"},
-                                "task_id": {"type": "integer", "description": "The task ID to delete"}
-                            },
-                            "required": ["user_id", "task_id"]
-                        }
-                    }
-                },
-                {
-                    "type": "function",
-                    "function": {
-                        "name": "update_task",
-                        "description": "Update a task title or description",
-                        "parameters": {
-                            "type": "object",
-                            "properties": {
-                                "user_id": {"type": "string", "description": "The user ID"},
-                                "task_id": {"type": "integer", "description": "The task ID to update"},
-                                "title": {"type": "string", "description": "New title for the task (optional)"},
-                                "description": {"type": "string", "description": "New description for the task (optional)"}
-                            },
-                            "required": ["user_id", "task_id"]
-                        }
-                    }
-                }
-            ]
+            tools=MCP_AGENT_TOOLS
         )
 
-        # Create a thread for this conversation
-        thread = client.beta.threads.create()
+        thread_id = get_conversation_thread(client, session, user_id, conversation_id)
 
         # Add the user's message to the thread
         client.beta.threads.messages.create(
-            thread_id=thread.id,
+            thread_id=thread_id,
             role="user",
             content=message
         )
 
-        # Run the assistant
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=assistant.id,
-            instructions=f"You are a helpful todo list assistant. The current user ID is {user_id}. "
-                        "Use the available MCP tools to manage tasks. "
-                        "For destructive operations (delete, rename), always ask for confirmation first, "
-                        "and only proceed after the user explicitly confirms with 'yes', 'confirm', or similar."
-        )
-
-        # Wait for the run to complete
-        while run.status in ["queued", "in_progress"]:
-            time.sleep(0.5)
-            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-
-        # Handle tool calls if any
         tool_calls_made = []
-        if run.status == "requires_action" and run.required_action.type == "submit_tool_outputs":
-            tool_calls = run.required_action.submit_tool_outputs.tool_calls
+
+        def handle_tool_calls(tool_calls) -> List[Dict[str, str]]:
+            from .mcp_official_wrapper import mcp_official_wrapper
 
             tool_outputs = []
             for tool_call in tool_calls:
                 function_name = tool_call.function.name
                 function_args = json.loads(tool_call.function.arguments)
 
-                # Execute the function based on the function name using MCP tools
+                # Execute the function based on the function name using MCP tools.
+                # The assistant is shared by all users, so the user_id argument the model
+                # supplies is ignored in favour of the authenticated user's
                 try:
                     if function_name == "add_task":
-                        from .mcp_official_wrapper import mcp_official_wrapper
-                        result = mcp_official_wrapper.handle_add_task(
+                        output = mcp_official_wrapper.handle_add_task(
                             session,
-                            function_args["user_id"],
+                            user_id,
                             function_args["title"],
                             function_args.get("description")
                         )
-                        output = result
                     elif function_name == "list_tasks":
-                        from .mcp_official_wrapper import mcp_official_wrapper
-                        result = mcp_official_wrapper.handle_list_tasks(
+                        output = mcp_official_wrapper.handle_list_tasks(
                             session,
-                            function_args["user_id"],
+                            user_id,
                             function_args.get("status")
                         )
-                        output = result
                     elif function_name == "complete_task":
-                        from .mcp_official_wrapper import mcp_official_wrapper
-                        result = mcp_official_wrapper.handle_complete_task(
+                        output = mcp_official_wrapper.handle_complete_task(
                             session,
-                            function_args["user_id"],
+                            user_id,
                             function_args["task_id"]
                         )
-                        output = result
                     elif function_name == "delete_task":
-                        from .mcp_official_wrapper import mcp_official_wrapper
-                        result = mcp_official_wrapper.handle_delete_task(
+                        output = mcp_official_wrapper.handle_delete_task(
                             session,
-                            function_args["user_id"],
+                            user_id,
                             function_args["task_id"]
                         )
-                        output = result
                     elif function_name == "update_task":
-                        from .mcp_official_wrapper import mcp_official_wrapper
-                        result = mcp_official_wrapper.handle_update_task(
+                        output = mcp_official_wrapper.handle_update_task(
                             session,
-                            function_args["user_id"],
+                            user_id,
                             function_args["task_id"],
                             function_args.get("title"),
                             function_args.get("description")
                         )
-                        output = result
                     else:
                         output = {"error": f"Unknown function: {function_name}"}
 
@@ -390,32 +555,20 @@ def run_todo_agent_with_mcp_tools(session: Session, user_id: str, message: str,
                         "tool_call_id": tool_call.id,
                         "output": json.dumps({"error": str(e)})
                     })
-
-            # Submit the tool outputs
-            run = client.beta.threads.runs.submit_tool_outputs(
-                thread_id=thread.id,
-                run_id=run.id,
-                tool_outputs=tool_outputs
-            )
-
-            # Wait for the run to complete after tool outputs
-            while run.status in ["queued", "in_progress"]:
-                time.sleep(0.5)
-                run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-
-        # Get the messages from the thread
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-
-        # Extract the assistant's response (last message)
-        response_text = "I processed your request."
-        for msg in messages.data:
-            if msg.role == "assistant":
-                # Get the content of the message
-                if msg.content and len(msg.content) > 0 and msg.content[0].type == "text":
-                    response_text = msg.content[0].text.value
-                    break
-
-        return response_text, tool_calls_made
+            return tool_outputs
+
+        reply = execute_run(
+            client,
+            thread_id,
+            assistant_id,
+            f"You are a helpful todo list assistant. The current user ID is {user_id}. "
+            "Use the available MCP tools to manage tasks. "
+            "For destructive operations (delete, rename), always ask for confirmation first, "
+            "and only proceed after the user explicitly confirms with 'yes', 'confirm', or similar.",
+            handle_tool_calls,
+            timeout
+        )
+        return reply or "I processed your request.", tool_calls_made
     except Exception as e:
         # If OpenAI API is not available, return a fallback response
         print(f"OpenAI API error: {e}")
@@ -0,0 +1,196 @@
+"""
+Async versions of the crud functions, for use with AsyncSession (see database.get_async_session).
+
+Query construction (filters, keyset cursors, batch planning) is shared with crud; only the
+I/O is awaited. Sessions are expected to use expire_on_commit=False, so objects stay
+loaded after commit and no refresh round-trip is needed.
+"""
+from sqlmodel import select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import insert, update, delete
+from typing import List, Optional, Tuple, Dict, Any
+from datetime import datetime
+from .models import Task, User, Message, Conversation, TaskBatchOperation
+from . import crud
+from . import passwords
+
+
+async def get_tasks_by_user(session: AsyncSession, user_id: str, status: Optional[str] = None, updated_since: Optional[datetime] = None) -> List[Task]:
+    """
+    Retrieve all tasks for a specific user from the database, oldest first.
+    """
+    statement = crud._filter_user_tasks(select(Task), user_id, status, updated_since)
+    statement = statement.order_by(Task.created_at, Task.id)
+    result = await session.exec(statement)
+    return result.all()
+
+
+async def get_tasks_page(
+    session: AsyncSession,
+    user_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    updated_since: Optional[datetime] = None
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    Retrieve one page of a user's tasks using keyset pagination on (created_at, id).
+    Returns the tasks and an opaque cursor for the next page (None on the last page).
+    """
+    statement, limit = crud._task_page_statement(user_id, limit, cursor, status, updated_since)
+    tasks = (await session.exec(statement)).all()
+    return crud._split_task_page(tasks, limit)
+
+
+async def get_task_by_user(session: AsyncSession, task_id: int, user_id: str) -> Optional[Task]:
+    """
+    Retrieve a specific task by ID for a specific user from the database.
+    """
+    statement = select(Task).where(Task.id == task_id, Task.user_id == user_id)
+    result = await session.exec(statement)
+    return result.first()
+
+
+async def create_task(session: AsyncSession, title: str, description: Optional[str], user_id: str) -> Task:
+    """
+    Create a new task in the database.
+    """
+    task = Task(title=title, description=description, completed=False, user_id=user_id)
+    session.add(task)
+    await session.commit()
+    return task
+
+
+async def update_task(session: AsyncSession, task_id: int, user_id: str, title: Optional[str] = None, description: Optional[str] = None, completed: Optional[bool] = None) -> Optional[Task]:
+    """
+    Update a task's title, description and/or completion status (one UPDATE ... RETURNING).
+    """
+    task = (await session.scalars(crud._task_update_statement(task_id, user_id, title, description, completed))).first()
+    await session.commit()
+    return task
+
+
+async def delete_task(session: AsyncSession, task_id: int, user_id: str) -> bool:
+    """
+    Delete a task from the database by ID (one DELETE ... RETURNING).
+    """
+    task = (await session.scalars(crud._task_delete_statement(task_id, user_id))).first()
+    if task is not None:
+        session.expunge(task)
+    await session.commit()
+    return task is not None
+
+
+async def toggle_task_completion(session: AsyncSession, task_id: int, user_id: str) -> Optional[Task]:
+    """
+    Mark a task as completed (completion can only go false→true).
+    """
+    task = (await session.scalars(crud._task_complete_statement(task_id, user_id))).first()
+    if task is None:
+        # Already completed (returned unchanged), or not the user's task
+        return await get_task_by_user(session, task_id, user_id)
+    await session.commit()
+    return task
+
+
+async def apply_task_batch(session: AsyncSession, user_id: str, operations: List[TaskBatchOperation]) -> List[Dict[str, Any]]:
+    """
+    Apply a mixed list of create/update/complete/delete operations in a single transaction.
+    See crud.apply_task_batch.
+    """
+    if len(operations) > crud.TASKS_MAX_BATCH_SIZE:
+        raise ValueError(f"A batch may contain at most {crud.TASKS_MAX_BATCH_SIZE} operations")
+
+    existing = {}
+    select_statement = crud._task_batch_select(user_id, operations)
+    if select_statement is not None:
+        tasks = (await session.exec(select_statement)).all()
+        existing = {task.id: crud._task_state(task) for task in tasks}
+
+    plan = crud._plan_task_batch(user_id, operations, existing)
+
+    if plan["inserts"]:
+        created = (await session.scalars(insert(Task).returning(Task), plan["inserts"])).all()
+        crud._apply_created_tasks(plan, created)
+    if plan["updates"]:
+        await session.execute(update(Task), plan["updates"])
+    if plan["deleted_ids"]:
+        await session.execute(delete(Task).where(Task.user_id == user_id, Task.id.in_(plan["deleted_ids"])))
+
+    await session.commit()
+    return plan["results"]
+
+
+async def get_user_by_email(session: AsyncSession, email: str) -> Optional[User]:
+    """
+    Retrieve a user by their email from the database.
+    """
+    result = await session.exec(select(User).where(User.email == email))
+    return result.first()
+
+
+async def get_user_by_id(session: AsyncSession, user_id: str) -> Optional[User]:
+    """
+    Retrieve a user by their ID from the database.
+    """
+    result = await session.exec(select(User).where(User.id == user_id))
+    return result.first()
+
+
+async def create_user(session: AsyncSession, email: str, password: str) -> User:
+    """
+    Create a new user in the database with hashed password.
+    """
+    # bcrypt is CPU-bound; it runs on the bounded password pool, off the event loop
+    hashed_password = await passwords.hash_password_async(password)
+
+    user = User(email=email, password_hash=hashed_password)
+    session.add(user)
+    await session.commit()
+    return user
+
+
+async def create_conversation(session: AsyncSession, user_id: str) -> Conversation:
+    """
+    Create a new conversation in the database.
+    """
+    conversation = Conversation(user_id=user_id)
+    session.add(conversation)
+    await session.commit()
+    return conversation
+
+
+async def get_conversation(session: AsyncSession, conversation_id: int, user_id: str) -> Optional[Conversation]:
+    """
+    Retrieve a specific conversation by ID for a specific user from the database.
+    """
+    statement = select(Conversation).where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+    result = await session.exec(statement)
+    return result.first()
+
+
+async def get_messages(session: AsyncSession, conversation_id: int, user_id: str) -> List[Message]:
+    """
+    Retrieve conversation history for a specific conversation and user, ordered by creation date.
+    """
+    statement = select(Message).where(
+        Message.conversation_id == conversation_id,
+        Message.user_id == user_id
+    ).order_by(Message.created_at)
+    result = await session.exec(statement)
+    return result.all()
+
+
+async def save_message(session: AsyncSession, conversation_id: int, user_id: str, role: str, content: str) -> Message:
+    """
+    Persist a message to the database.
+    """
+    message = Message(
+        conversation_id=conversation_id,
+        user_id=user_id,
+        role=role,
+        content=content
+    )
+    session.add(message)
+    await session.commit()
+    return message
@@ -0,0 +1,162 @@
+"""
+Async task API for the Evolution of Todo backend.
+
+Same routes and responses as the sync task handlers in main.py, but served with an
+AsyncSession (asyncpg / aiosqlite) so requests do not occupy a threadpool worker while
+waiting on the database. Enabled with USE_ASYNC_DB=true.
+"""
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import List, Optional
+from datetime import datetime
+
+from .database import get_async_session
+from .models import (
+    TaskResponse, TaskCreate, TaskUpdate,
+    TaskBatchRequest, TaskBatchResponse,
+)
+from . import async_crud
+from .metrics import InstrumentedRoute
+from .better_auth import get_current_user_async
+
+router = APIRouter(route_class=InstrumentedRoute)
+
+
+def _check_access(current_user, user_id: str) -> None:
+    # Verify the requesting user matches the user_id in the path
+    if str(current_user.id) != user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+
+@router.get("/api/{user_id}/tasks", response_model=List[TaskResponse])
+async def read_tasks(
+    user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Retrieve one page of tasks for a user from the database, oldest first.
+    When more tasks exist, the X-Next-Cursor response header carries the cursor for the next page.
+    """
+    _check_access(current_user, user_id)
+    try:
+        tasks, next_cursor = await async_crud.get_tasks_page(
+            session, current_user.id, limit=limit, cursor=cursor, status=status, updated_since=updated_since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
+
+@router.post("/api/{user_id}/tasks", response_model=TaskResponse, status_code=201)
+async def create_task(
+    user_id: str,
+    task_create: TaskCreate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Create a new task for a user in the database.
+    """
+    _check_access(current_user, user_id)
+    return await async_crud.create_task(session, title=task_create.title, description=None, user_id=current_user.id)
+
+
+@router.post("/api/{user_id}/tasks:batch", response_model=TaskBatchResponse)
+async def batch_tasks(
+    user_id: str,
+    batch: TaskBatchRequest,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Apply a mixed list of create/update/complete/delete operations in a single transaction.
+    """
+    _check_access(current_user, user_id)
+    try:
+        results = await async_crud.apply_task_batch(session, current_user.id, batch.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskBatchResponse(results=results)
+
+
+@router.get("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
+async def read_task(
+    user_id: str,
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Retrieve a specific task by ID for a user from the database.
+    """
+    _check_access(current_user, user_id)
+    task = await async_crud.get_task_by_user(session, task_id, current_user.id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@router.put("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
+async def update_task(
+    user_id: str,
+    task_id: int,
+    task_update: TaskUpdate = Body(...),
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Update an existing task's title for a user in the database.
+    """
+    _check_access(current_user, user_id)
+    task = await async_crud.update_task(
+        session,
+        task_id,
+        current_user.id,
+        title=task_update.title,
+        completed=task_update.completed
+    )
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
+
+
+@router.delete("/api/{user_id}/tasks/{task_id}", status_code=204)
+async def delete_task(
+    user_id: str,
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Delete a task from the database by ID for a user.
+    """
+    _check_access(current_user, user_id)
+    success = await async_crud.delete_task(session, task_id, current_user.id)
+    if not success:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return  # Return empty response for 204 status
+
+
+@router.patch("/api/{user_id}/tasks/{task_id}/complete", response_model=TaskResponse)
+async def toggle_task_completion(
+    user_id: str,
+    task_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    current_user = Depends(get_current_user_async)
+):
+    """
+    Mark a task as completed for a user (completion can only go false→true).
+    """
+    _check_access(current_user, user_id)
+    task = await async_crud.toggle_task_completion(session, task_id, current_user.id)
+    if not task:
+        raise HTTPException(status_code=404, detail="Task not found")
+    return task
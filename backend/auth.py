@@ -1,13 +1,13 @@
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
-import bcrypt
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session
 from .database import get_session
 from .models import User, TokenData
 from . import crud
+from . import passwords
 import os
 from dotenv import load_dotenv
 
@@ -95,4 +95,4 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password.
     """
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
\ No newline at end of file
+    return passwords.verify_password(plain_password, hashed_password)
\ No newline at end of file
@@ -0,0 +1,7 @@
+"""
+Performance benchmarks for the Evolution of Todo backend.
+
+Each module is a standalone script, run from the repository root, e.g.:
+
+    python -m backend.benchmarks.bench_indexes --tasks 100000 --messages 1000000
+"""
@@ -0,0 +1,82 @@
+"""
+Benchmark: waiting for Assistants runs.
+
+Runs agents_sdk.run_todo_agent against the local mock OpenAI server for a mix of plain
+and tool-calling turns, with three ways of waiting for the run: the previous fixed 0.5s
+sleep between status polls, polling with a growing delay, and the streaming run API.
+Reports turn latency and API requests per turn for each run duration.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_assistant_runs --turns 10 --rtt-ms 20 --latency-ms 100 300 1000
+"""
+import argparse
+import logging
+import os
+import time
+
+from sqlmodel import Session
+
+from .. import agents_sdk, crud
+from ..models import User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer
+
+# (label, streaming, initial poll delay, max poll delay)
+STRATEGIES = [
+    ("fixed 0.5s poll", False, 0.5, 0.5),
+    ("adaptive poll", False, 0.05, 1.0),
+    ("streaming", True, 0.05, 1.0),
+]
+
+
+def _run_turns(engine, turns):
+    latencies = []
+    with Session(engine) as session:
+        conversation_id = crud.create_conversation(session, "bench-user").id
+        for i in range(turns):
+            # Every other turn makes the run call a tool first
+            message = f"add Task {i}" if i % 2 else f"what should I do next? ({i})"
+            start = time.perf_counter()
+            agents_sdk.run_todo_agent(session, "bench-user", message, conversation_id)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark waiting for Assistants runs")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--rtt-ms", type=float, default=20.0, help="Mock network round-trip per API request")
+    parser.add_argument("--latency-ms", type=float, nargs="+", default=[100.0, 300.0, 1000.0],
+                        help="Mock run durations")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    print(f"Mock RTT {args.rtt_ms:.0f}ms, {args.turns} turns (half with a tool call)")
+    print(f"{'run':>7} {'strategy':<16} {'req/turn':>9} {'mean':>9} {'p50':>9} {'p95':>9}")
+    for latency_ms in args.latency_ms:
+        with MockOpenAIServer(latency_ms=latency_ms, rtt_ms=args.rtt_ms) as server:
+            os.environ["OPENAI_API_KEY"] = "mock-key"
+            os.environ["OPENAI_BASE_URL"] = server.base_url
+            for label, streaming, initial, maximum in STRATEGIES:
+                agents_sdk._assistant_ids.clear()
+                agents_sdk.ASSISTANT_RUN_STREAMING = streaming
+                agents_sdk.ASSISTANT_POLL_INITIAL_SECONDS = initial
+                agents_sdk.ASSISTANT_POLL_MAX_SECONDS = maximum
+                engine = make_engine(args.database_url)
+                with Session(engine) as session:
+                    session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+                    session.commit()
+
+                before = server.request_count
+                stats = summarize(_run_turns(engine, args.turns))
+                requests = (server.request_count - before) / args.turns
+                print(f"{latency_ms:>5.0f}ms {label:<16} {requests:>9.1f} {stats['mean_ms']:>7.0f}ms "
+                      f"{stats['p50_ms']:>7.0f}ms {stats['p95_ms']:>7.0f}ms")
+                engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: Assistants API round-trips per chat turn.
+
+Runs agents_sdk.run_todo_agent against the local mock OpenAI server (Assistants endpoints,
+see mock_openai.py) for a series of turns in one conversation, once with the previous
+behaviour (a new assistant and a new thread on every message) and once with the cached
+assistant and the conversation's persisted thread. Reports API requests per turn by
+endpoint and turn latency.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_assistants --turns 10 --rtt-ms 50 --latency-ms 200
+"""
+import argparse
+import logging
+import os
+import time
+
+from sqlmodel import Session
+
+from .. import agents_sdk, crud
+from ..models import User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer
+
+
+def _create_every_time(client, name, description, tools):
+    """The previous behaviour: a new assistant for every message."""
+    return client.beta.assistants.create(
+        name=name, description=description, model=os.getenv("OPENAI_MODEL", "gpt-4o-mini"), tools=tools
+    ).id
+
+
+def _run_turns(engine, turns, per_message):
+    latencies = []
+    with Session(engine) as session:
+        conversation_id = crud.create_conversation(session, "bench-user").id
+        for i in range(turns):
+            start = time.perf_counter()
+            agents_sdk.run_todo_agent(
+                session, "bench-user", f"what should I do next? ({i})",
+                # Without a conversation every message gets a new thread
+                None if per_message else conversation_id
+            )
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark Assistants API round-trips per chat turn")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--turns", type=int, default=10)
+    parser.add_argument("--rtt-ms", type=float, default=50.0, help="Mock network round-trip per API request")
+    parser.add_argument("--latency-ms", type=float, default=200.0, help="Mock run duration")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with MockOpenAIServer(latency_ms=args.latency_ms, rtt_ms=args.rtt_ms) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        print(f"Mock RTT {args.rtt_ms:.0f}ms, run duration {args.latency_ms:.0f}ms, {args.turns} turns")
+        cached_lookup = agents_sdk.get_assistant_id
+        for label, per_message in (("per message", True), ("cached", False)):
+            agents_sdk._assistant_ids.clear()
+            agents_sdk.get_assistant_id = _create_every_time if per_message else cached_lookup
+            engine = make_engine(args.database_url)
+            with Session(engine) as session:
+                session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+                session.commit()
+
+            before, before_routes = server.request_count, server.requests_by_route
+            stats = summarize(_run_turns(engine, args.turns, per_message))
+            routes = {
+                route: count - before_routes.get(route, 0)
+                for route, count in server.requests_by_route.items() if count > before_routes.get(route, 0)
+            }
+            print(f"\n{label}: {(server.request_count - before) / args.turns:.1f} requests/turn, "
+                  f"mean {stats['mean_ms']:.0f}ms, p50 {stats['p50_ms']:.0f}ms")
+            for route, count in sorted(routes.items()):
+                print(f"  {route:<45} {count:>4}")
+            engine.dispose()
+        agents_sdk.get_assistant_id = cached_lookup
+
+
+if __name__ == "__main__":
+    main()
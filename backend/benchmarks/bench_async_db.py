@@ -0,0 +1,107 @@
+"""
+Benchmark: sync (threadpool) versus async (AsyncSession) task API under concurrency.
+
+Drives GET /api/{user_id}/tasks and POST /api/{user_id}/tasks against both the sync
+router from main.py and the async router (async_task_routes) in-process, at a fixed
+concurrency, and reports throughput and latency percentiles for each.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_async_db --requests 2000 --concurrency 100
+    python -m backend.benchmarks.bench_async_db --database-url postgresql://...
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import httpx
+from fastapi import FastAPI
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..database import get_session, get_async_session, create_async_db_engine
+from ..better_auth import get_current_user, get_current_user_async
+from ..models import User
+from ..async_task_routes import router as async_tasks_router
+from .common import make_engine, seed_dataset, summarize
+
+
+def _build_app(mode: str, engine, async_engine, user: User) -> FastAPI:
+    # Imported here so the benchmark does not depend on USE_ASYNC_DB at import time
+    from ..main import tasks_router
+
+    app = FastAPI()
+    if mode == "sync":
+        app.include_router(tasks_router)
+
+        def session_override():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        app.dependency_overrides[get_current_user] = lambda: user
+    else:
+        app.include_router(async_tasks_router)
+
+        async def async_session_override():
+            async with AsyncSession(async_engine, expire_on_commit=False) as session:
+                yield session
+
+        app.dependency_overrides[get_async_session] = async_session_override
+        app.dependency_overrides[get_current_user_async] = lambda: user
+    return app
+
+
+async def _drive(app: FastAPI, user_id: str, total: int, concurrency: int, write_ratio: float):
+    latencies = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                if (i % 100) < write_ratio * 100:
+                    response = await client.post(f"/api/{user_id}/tasks", json={"title": f"Bench {i}"})
+                else:
+                    response = await client.get(f"/api/{user_id}/tasks", params={"limit": 50})
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - start) * 1000.0)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(total)))
+        elapsed = time.perf_counter() - start
+    return elapsed, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark sync vs async database mode for the task API")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--tasks", type=int, default=500, help="Tasks seeded for the benchmark user")
+    parser.add_argument("--write-ratio", type=float, default=0.1, help="Share of requests that create a task")
+    args = parser.parse_args()
+    # Per-request INFO logs would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    engine = make_engine(args.database_url)
+    user_id = seed_dataset(engine, users=1, tasks=args.tasks, messages=0)["user_ids"][0]
+    user = User(id=user_id, email=f"{user_id}@bench.local", password_hash="x")
+    async_engine = create_async_db_engine(engine.url.render_as_string(hide_password=False))
+
+    print(f"Backend: {engine.url.get_backend_name()}, {args.requests} requests at concurrency {args.concurrency}")
+    print(f"{'mode':<6} {'req/s':>9} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for mode in ("sync", "async"):
+        app = _build_app(mode, engine, async_engine, user)
+        elapsed, latencies = asyncio.run(_drive(app, user_id, args.requests, args.concurrency, args.write_ratio))
+        stats = summarize(latencies)
+        print(f"{mode:<6} {args.requests / elapsed:>9.0f} {stats['p50_ms']:>7.1f}ms "
+              f"{stats['p95_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
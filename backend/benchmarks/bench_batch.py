@@ -0,0 +1,69 @@
+"""
+Benchmark: bulk task mutations via crud.apply_task_batch versus the per-item crud path.
+
+Each round imports N tasks, completes half of them and deletes the rest, once with
+create_task/toggle_task_completion/delete_task (one commit per call) and once with a
+single apply_task_batch call per phase.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_batch                              # SQLite file
+    python -m backend.benchmarks.bench_batch --database-url postgresql://...
+"""
+import argparse
+import time
+
+from sqlmodel import Session
+
+from .. import crud
+from ..models import TaskBatchOperation
+from .common import make_engine, seed_dataset
+
+
+def _per_item(engine, user_id: str, count: int) -> float:
+    start = time.perf_counter()
+    with Session(engine) as session:
+        tasks = [crud.create_task(session, f"Imported {i}", None, user_id) for i in range(count)]
+        task_ids = [t.id for t in tasks]
+        for task_id in task_ids[: count // 2]:
+            crud.toggle_task_completion(session, task_id, user_id)
+        for task_id in task_ids[count // 2:]:
+            crud.delete_task(session, task_id, user_id)
+    return time.perf_counter() - start
+
+
+def _batched(engine, user_id: str, count: int) -> float:
+    start = time.perf_counter()
+    with Session(engine) as session:
+        results = crud.apply_task_batch(
+            session, user_id, [TaskBatchOperation(op="create", title=f"Imported {i}") for i in range(count)]
+        )
+        task_ids = [r["task_id"] for r in results]
+        operations = [TaskBatchOperation(op="complete", task_id=task_id) for task_id in task_ids[: count // 2]]
+        operations += [TaskBatchOperation(op="delete", task_id=task_id) for task_id in task_ids[count // 2:]]
+        crud.apply_task_batch(session, user_id, operations)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark batch task mutations against the per-item path")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 500])
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    user_id = seed_dataset(engine, users=1, tasks=0, messages=0)["user_ids"][0]
+    print(f"Backend: {engine.url.get_backend_name()}")
+    print(f"{'ops':>6} {'per-item':>12} {'batch':>12} {'speedup':>8}")
+
+    for size in args.sizes:
+        per_item = min(_per_item(engine, user_id, size) for _ in range(args.rounds))
+        batched = min(_batched(engine, user_id, size) for _ in range(args.rounds))
+        print(f"{size:>6} {per_item * 1000:>10.1f}ms {batched * 1000:>10.1f}ms {per_item / batched:>7.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Benchmark: /tasks latency while chat requests are waiting on the LLM.
+
+Runs the real app in-process against the local mock OpenAI server (see mock_openai.py)
+and keeps N chat requests in flight while a probe repeatedly calls
+GET /api/{user_id}/tasks. Reports probe p50/p99 with no chat load, with the blocking
+chat path (sync AgentOrchestrator.handle_message inside the async endpoint, the previous
+behaviour) and with the non-blocking path (handle_message_async).
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_chat_nonblocking --chats 20 --latency-ms 300
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+import httpx
+from sqlmodel import Session
+
+from ..models import User
+from .common import make_engine, seed_dataset, summarize
+from .mock_openai import MockOpenAIServer
+
+
+async def _blocking_handle_message(self, user_id: str, conversation_id: str, message_text: str, context=None) -> str:
+    # Previous behaviour: sync DB + sync OpenAI calls directly on the event loop
+    return self.handle_message(user_id, conversation_id, message_text, context)
+
+
+async def _run(app, user_id: str, chats: int, duration: float):
+    transport = httpx.ASGITransport(app=app)
+    probe_latencies = []
+    chat_count = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+        deadline = time.perf_counter() + duration
+
+        async def chatter():
+            nonlocal chat_count
+            conversation_id = None
+            while time.perf_counter() < deadline:
+                response = await client.post(
+                    f"/api/{user_id}/chat",
+                    json={"message": "hello there", "conversation_id": conversation_id},
+                )
+                response.raise_for_status()
+                conversation_id = response.json()["conversation_id"]
+                chat_count += 1
+
+        async def probe():
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                response = await client.get(f"/api/{user_id}/tasks", params={"limit": 50})
+                response.raise_for_status()
+                probe_latencies.append((time.perf_counter() - start) * 1000.0)
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(probe(), *(chatter() for _ in range(chats)))
+    return probe_latencies, chat_count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark /tasks latency under concurrent chat load")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--chats", type=int, default=20, help="Chat requests kept in flight")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock LLM latency per completion")
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per scenario")
+    args = parser.parse_args()
+    # Per-request INFO logs would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    with MockOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        from ..main import app, get_session, get_current_better_auth_user, get_current_user
+        from ..agent import AgentOrchestrator
+
+        engine = make_engine(args.database_url)
+        user_id = seed_dataset(engine, users=1, tasks=200, messages=0)["user_ids"][0]
+        user = User(id=user_id, email=f"{user_id}@bench.local", password_hash="x")
+
+        def session_override():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_better_auth_user] = lambda: user
+
+        print(f"Backend: {engine.url.get_backend_name()}, {args.chats} chats in flight, "
+              f"mock LLM latency {args.latency_ms:.0f}ms")
+        print(f"{'scenario':<14} {'chats':>6} {'probes':>7} {'p50':>9} {'p99':>9}")
+
+        non_blocking = AgentOrchestrator.handle_message_async
+        for scenario, chats in (("idle", 0), ("blocking", args.chats), ("non-blocking", args.chats)):
+            AgentOrchestrator.handle_message_async = (
+                _blocking_handle_message if scenario == "blocking" else non_blocking
+            )
+            latencies, completed = asyncio.run(_run(app, user_id, chats, args.duration))
+            stats = summarize(latencies)
+            print(f"{scenario:<14} {completed:>6} {stats['count']:>7} "
+                  f"{stats['p50_ms']:>7.1f}ms {stats['p99_ms']:>7.1f}ms")
+        AgentOrchestrator.handle_message_async = non_blocking
+
+        app.dependency_overrides.clear()
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: time to first byte of a chat reply, buffered against streamed.
+
+Serves the real app with uvicorn against the local mock OpenAI server, configured to
+generate text replies word by word (see mock_openai.py, token_ms), and sends the same
+chat turns to POST /api/{user_id}/chat and to the Server-Sent Events variant
+POST /api/{user_id}/chat/stream. Reports time to the first byte of the reply (for the
+stream: the first token event) and time to the complete reply.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_chat_stream --turns 20 --latency-ms 300 --token-ms 30
+"""
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+
+import httpx
+import uvicorn
+from sqlmodel import Session
+
+from ..models import User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer, _free_port
+
+WORKLOAD = ["hello there", "what can you help me with?", "thanks!", "how do I stay organised?"]
+
+
+def _buffered_turn(client, user_id, conversation_id, message):
+    start = time.perf_counter()
+    response = client.post(f"/api/{user_id}/chat", json={"message": message, "conversation_id": conversation_id})
+    response.raise_for_status()
+    elapsed = (time.perf_counter() - start) * 1000.0
+    # The whole reply arrives at once
+    return elapsed, elapsed, response.json()["conversation_id"]
+
+
+def _streamed_turn(client, user_id, conversation_id, message):
+    start = time.perf_counter()
+    first_token = None
+    payload = {"message": message, "conversation_id": conversation_id}
+    with client.stream("POST", f"/api/{user_id}/chat/stream", json=payload) as response:
+        response.raise_for_status()
+        for line in response.iter_lines():
+            if line == "event: token" and first_token is None:
+                first_token = (time.perf_counter() - start) * 1000.0
+            elif line.startswith("data: ") and '"type": "done"' in line:
+                conversation_id = json.loads(line[len("data: "):])["conversation_id"]
+    return first_token, (time.perf_counter() - start) * 1000.0, conversation_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat time to first byte, buffered vs streamed")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--turns", type=int, default=20, help="Chat turns per endpoint")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock LLM time to first token")
+    parser.add_argument("--token-ms", type=float, default=30.0, help="Mock LLM generation time per word")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    with MockOpenAIServer(latency_ms=args.latency_ms, token_ms=args.token_ms) as mock:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = mock.base_url
+
+        from ..main import app, get_session, get_current_better_auth_user, get_current_user
+
+        engine = make_engine(args.database_url)
+        user = User(id="bench-user", email="bench-user@bench.local", password_hash="x")
+        with Session(engine) as session:
+            session.add(User(id=user.id, email=user.email, password_hash="x"))
+            session.commit()
+
+        def session_override():
+            with Session(engine) as session:
+                yield session
+
+        app.dependency_overrides[get_session] = session_override
+        app.dependency_overrides[get_current_user] = lambda: user
+        app.dependency_overrides[get_current_better_auth_user] = lambda: user
+
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning", access_log=False))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        print(f"Mock LLM: first token after {args.latency_ms:.0f}ms, {args.token_ms:.0f}ms per word; "
+              f"{args.turns} turns per endpoint")
+        print(f"{'endpoint':<14} {'TTFB p50':>9} {'TTFB p95':>9} {'total p50':>10} {'total p95':>10}")
+        try:
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=60) as client:
+                for label, turn in (("buffered", _buffered_turn), ("streamed", _streamed_turn)):
+                    first_bytes, totals = [], []
+                    conversation_id = None
+                    for i in range(args.turns):
+                        first_byte, total, conversation_id = turn(
+                            client, user.id, conversation_id, WORKLOAD[i % len(WORKLOAD)]
+                        )
+                        first_bytes.append(first_byte)
+                        totals.append(total)
+                    ttfb, total = summarize(first_bytes), summarize(totals)
+                    print(f"{label:<14} {ttfb['p50_ms']:>7.0f}ms {ttfb['p95_ms']:>7.0f}ms "
+                          f"{total['p50_ms']:>8.0f}ms {total['p95_ms']:>8.0f}ms")
+        finally:
+            server.should_exit = True
+            thread.join(timeout=10)
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
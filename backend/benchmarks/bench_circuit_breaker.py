@@ -0,0 +1,81 @@
+"""
+Benchmark: chat turns during an LLM provider incident, with and without the circuit breaker.
+
+Points the chat at the local mock OpenAI server with a latency far above the LLM read
+timeout, so every completion times out (a hung provider). Replays chat turns through
+AgentOrchestrator.handle_message_async with the breaker effectively disabled and then
+enabled, and reports turn latency and the LLM requests attempted. The fast-path router
+is disabled so every turn would reach the LLM.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_circuit_breaker --turns 30 --timeout 1
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from sqlmodel import Session
+
+from .. import crud, intent_router, llm_transport
+from ..circuit_breaker import CircuitBreaker
+from ..models import Task, User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer
+
+WORKLOAD = ["hello there", "add Buy groceries", "show everything", "what can you help me with?"]
+
+
+async def _replay(engine, turns):
+    from ..agent import AgentOrchestrator
+
+    latencies = []
+    with Session(engine) as session:
+        conversation_id = crud.create_conversation(session, "bench-user").id
+        orchestrator = AgentOrchestrator(session)
+        for i in range(turns):
+            start = time.perf_counter()
+            await orchestrator.handle_message_async("bench-user", str(conversation_id), WORKLOAD[i % len(WORKLOAD)])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chat turns during an LLM outage")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--turns", type=int, default=30)
+    parser.add_argument("--timeout", type=float, default=1.0, help="LLM read timeout in seconds")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.ERROR)
+    intent_router.INTENT_ROUTER_MIN_CONFIDENCE = 1.1
+    # Clients are created on first use, so this applies to every LLM call below
+    llm_transport.LLM_READ_TIMEOUT_SECONDS = args.timeout
+    llm_transport.LLM_MAX_RETRIES = 0
+
+    with MockOpenAIServer(latency_ms=args.timeout * 1000.0 * 10) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        print(f"LLM read timeout {args.timeout:.1f}s, provider hung, {args.turns} turns")
+        print(f"{'breaker':<10} {'LLM requests':>13} {'mean':>9} {'p50':>9} {'p95':>9}")
+        for label, min_calls in (("disabled", 10 ** 9), ("enabled", llm_transport.LLM_BREAKER_MIN_CALLS)):
+            llm_transport.breaker = CircuitBreaker(
+                "llm", min_calls=min_calls, open_seconds=3600, is_failure=llm_transport._provider_failure
+            )
+            engine = make_engine(args.database_url)
+            with Session(engine) as session:
+                session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+                session.add(Task(user_id="bench-user", title="Water the plants"))
+                session.commit()
+            before = server.request_count
+            stats = summarize(asyncio.run(_replay(engine, args.turns)))
+            print(f"{label:<10} {server.request_count - before:>13} {stats['mean_ms']:>7.0f}ms "
+                  f"{stats['p50_ms']:>7.0f}ms {stats['p95_ms']:>7.0f}ms")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark: resolving a "yes" confirmation in long conversations.
+
+Compares the previous approach (fetch the whole history with crud.get_messages, reverse-scan
+it for the last assistant/user messages and re-run the confirmation regexes) against the
+PendingAction lookup used by AgentOrchestrator._check_for_confirmation, for conversations
+of increasing length. Neither path executes the operation, so the dataset is unchanged.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_confirmation --messages 10 100 1000
+"""
+import argparse
+import re
+import time
+
+from sqlmodel import Session
+
+from .. import crud
+from ..agent import AgentOrchestrator
+from .common import make_engine, seed_dataset, summarize, time_calls
+
+
+def _history_scan(session: Session, conversation_id: int, user_id: str, message_text: str):
+    """The work the history-based confirmation check did on every message."""
+    history = [{"role": m.role, "content": m.content} for m in crud.get_messages(session, conversation_id, user_id)]
+    last_assistant = next((m for m in reversed(history) if m["role"] == "assistant"), None)
+    if not last_assistant or message_text not in ("yes", "y", "confirm"):
+        return None
+    content = last_assistant["content"]
+    task_id_match = re.search(r"task\s+(\d+)", content, re.IGNORECASE)
+    re.search(r"task\s+'([^']+)'|task\s+\"([^\"]+)\"", content, re.IGNORECASE)
+    original = next((m["content"] for m in reversed(history) if m["role"] == "user"), "")
+    for pattern in [
+        r"(?:update|rename|change)\s+(?:task\s+\d+\s+)?(?:['\"]?)([^'\"]+)(?:['\"]?)\s+to\s+(.+)",
+        r"(?:update|rename|change)\s+(?:task\s+\d+\s+)?(.+?)\s+to\s+(.+)",
+        r"(?:update|rename|change)\s+(?:task\s+)?(.+?)\s+to\s+(.+)",
+    ]:
+        if re.search(pattern, original, re.IGNORECASE):
+            break
+    return task_id_match
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark confirmation lookup against the history scan")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    print(f"{'messages':>9} {'history scan p50':>17} {'pending lookup p50':>19} {'speedup':>8}")
+
+    for count in args.messages:
+        engine = make_engine(args.database_url)
+        conversation_id, user_id = seed_dataset(engine, users=1, tasks=0, messages=count)["conversations"][0]
+
+        with Session(engine) as session:
+            orchestrator = AgentOrchestrator(session)
+            orchestrator.conversation_id = conversation_id
+
+            scan = summarize(time_calls(lambda: _history_scan(session, conversation_id, user_id, "yes"), args.repeat))
+
+            lookups = []
+            for _ in range(args.repeat):
+                # Recorded by the previous turn; targets a missing task so nothing is executed
+                crud.set_pending_action(session, conversation_id, user_id, "delete", -1)
+                start = time.perf_counter()
+                orchestrator._check_for_confirmation("yes", [], user_id)
+                lookups.append((time.perf_counter() - start) * 1000.0)
+            pending_p50 = summarize(lookups)["p50_ms"]
+
+        print(f"{count:>9} {scan['p50_ms']:>15.2f}ms {pending_p50:>17.2f}ms {scan['p50_ms'] / pending_p50:>7.1f}x")
+        engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
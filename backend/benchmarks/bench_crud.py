@@ -0,0 +1,262 @@
+"""
+Benchmark: latency of every crud and MCP tool function across data sizes.
+
+For each size, seeds a fresh database with that many tasks and messages (users own
+--tasks-per-user tasks each, one conversation per user) and times each function in
+backend/crud.py and TaskMCPTools on random users' rows. Arguments are prepared outside
+the timed call (e.g. the task delete_task removes is inserted first), and the session
+is cleared after every call so no call is served from the identity map. Functions that
+read whole tables (get_tasks) run fewer repeats. create_user is left out: its cost is
+bcrypt (see bench_passwords); create_user_with_hash covers the database side.
+
+Results can be written as JSON (--output) and compared with an earlier run
+(--baseline): a function whose p50 grew by more than --tolerance (and by more than
+--noise-ms, so sub-millisecond jitter is not reported) is flagged as a regression and
+the script exits with status 1.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_crud --output crud-baseline.json
+    python -m backend.benchmarks.bench_crud --baseline crud-baseline.json --tolerance 0.25
+    python -m backend.benchmarks.bench_crud --sizes 1000 100000 --functions get_tasks_by_user delete_task
+    python -m backend.benchmarks.bench_crud --database-url postgresql://...
+"""
+import argparse
+import json
+import logging
+import random
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import insert
+from sqlalchemy.engine import make_url
+from sqlmodel import Session
+
+from .. import crud
+from ..mcp_tools import TaskMCPTools
+from ..models import Task, TaskBatchOperation
+from .common import make_engine, seed_dataset, summarize, pick
+
+DEFAULT_SIZES = (1_000, 100_000, 1_000_000)
+
+
+class Case(NamedTuple):
+    name: str
+    # run(session, *args) is timed; setup(session, rng) -> args is not
+    run: Callable[..., Any]
+    setup: Optional[Callable[[Session, random.Random], Tuple]] = None
+    # Reads every row of a table: fewer repeats
+    scan: bool = False
+
+
+def _cases(dataset: Dict[str, Any], tasks_per_user: int) -> List[Case]:
+    user_ids = dataset["user_ids"]
+    users = len(user_ids)
+    conversations = dataset["conversations"]
+
+    def user(session, rng):
+        return (pick(user_ids, rng),)
+
+    def owned_task(session, rng):
+        # seed_dataset assigns task i (id i + 1) to user i % users
+        index = rng.randrange(users)
+        return index + 1 + rng.randrange(tasks_per_user) * users, user_ids[index]
+
+    def conversation(session, rng):
+        return pick(conversations, rng)
+
+    def loaded_conversation(session, rng):
+        conversation_id, user_id = pick(conversations, rng)
+        return (crud.get_conversation(session, conversation_id, user_id),)
+
+    def new_task(session, rng):
+        user_id = pick(user_ids, rng)
+        task_id = session.scalar(
+            insert(Task).values(user_id=user_id, title="Bench victim", completed=False).returning(Task.id)
+        )
+        session.commit()
+        return task_id, user_id
+
+    def pending(session, rng):
+        conversation_id, user_id = pick(conversations, rng)
+        crud.set_pending_action(session, conversation_id, user_id, "delete", 1)
+        return conversation_id, user_id
+
+    def batch(session, rng):
+        task_id, user_id = owned_task(session, rng)
+        return user_id, [
+            TaskBatchOperation(op="create", title="Bench batch task"),
+            TaskBatchOperation(op="update", task_id=task_id, title="Bench renamed"),
+            TaskBatchOperation(op="complete", task_id=task_id),
+        ]
+
+    return [
+        Case("crud.get_tasks", lambda s: crud.get_tasks(s), scan=True),
+        Case("crud.get_task", lambda s, task_id, user_id: crud.get_task(s, task_id), owned_task),
+        Case("crud.get_task_by_user", crud.get_task_by_user, owned_task),
+        Case("crud.get_tasks_by_user", crud.get_tasks_by_user, user),
+        Case("crud.get_tasks_page", lambda s, user_id: crud.get_tasks_page(s, user_id, limit=20), user),
+        Case("crud.create_task", lambda s, user_id: crud.create_task(s, "Bench task", None, user_id), user),
+        Case("crud.update_task", lambda s, task_id, user_id: crud.update_task(s, task_id, user_id, title="Bench renamed"),
+             owned_task),
+        Case("crud.toggle_task_completion", crud.toggle_task_completion, owned_task),
+        Case("crud.delete_task", crud.delete_task, new_task),
+        Case("crud.pop_task", crud.pop_task, new_task),
+        Case("crud.apply_task_batch", crud.apply_task_batch, batch),
+        Case("crud.get_user_by_email", lambda s, user_id: crud.get_user_by_email(s, f"{user_id}@bench.local"), user),
+        Case("crud.get_user_by_id", crud.get_user_by_id, user),
+        Case("crud.create_user_with_hash",
+             lambda s: crud.create_user_with_hash(s, f"{uuid.uuid4().hex}@bench.local", "x")),
+        Case("crud.create_conversation", crud.create_conversation, user),
+        Case("crud.get_conversation", crud.get_conversation, conversation),
+        Case("crud.get_messages", crud.get_messages, conversation),
+        Case("crud.get_recent_messages",
+             lambda s, conversation_id, user_id: crud.get_recent_messages(s, conversation_id, user_id, 20),
+             conversation),
+        Case("crud.get_conversation_with_history",
+             lambda s, conversation_id, user_id: crud.get_conversation_with_history(s, conversation_id, user_id, 20),
+             conversation),
+        Case("crud.update_conversation_summary",
+             lambda s, conv: crud.update_conversation_summary(s, conv, "Bench summary", 1), loaded_conversation),
+        Case("crud.set_conversation_thread",
+             lambda s, conv: crud.set_conversation_thread(s, conv, "thread_bench"), loaded_conversation),
+        Case("crud.save_message",
+             lambda s, conversation_id, user_id: crud.save_message(s, conversation_id, user_id, "user", "Bench message"),
+             conversation),
+        Case("crud.save_messages",
+             lambda s, conversation_id, user_id: crud.save_messages(
+                 s, conversation_id, user_id, [("user", "Bench message"), ("assistant", "Bench reply")]),
+             conversation),
+        Case("crud.set_pending_action",
+             lambda s, conversation_id, user_id: crud.set_pending_action(s, conversation_id, user_id, "delete", 1),
+             conversation),
+        Case("crud.pop_pending_action", crud.pop_pending_action, pending),
+        Case("mcp.create_task", lambda s, user_id: TaskMCPTools.create_task(s, user_id, "Bench task"), user),
+        Case("mcp.list_tasks", TaskMCPTools.list_tasks, user),
+        Case("mcp.list_tasks_page", lambda s, user_id: TaskMCPTools.list_tasks_page(s, user_id, limit=20), user),
+        Case("mcp.complete_task", lambda s, task_id, user_id: TaskMCPTools.complete_task(s, user_id, task_id),
+             owned_task),
+        Case("mcp.update_task",
+             lambda s, task_id, user_id: TaskMCPTools.update_task(s, user_id, task_id, title="Bench renamed"),
+             owned_task),
+        Case("mcp.delete_task", lambda s, task_id, user_id: TaskMCPTools.delete_task(s, user_id, task_id), new_task),
+    ]
+
+
+def _time_case(engine, case: Case, repeat: int, rng: random.Random) -> Dict[str, float]:
+    samples = []
+    with Session(engine) as session:
+        # The first call warms up statement caches and is not recorded
+        for _ in range(repeat + 1):
+            args = case.setup(session, rng) if case.setup else ()
+            session.expunge_all()
+            start = time.perf_counter()
+            case.run(session, *args)
+            samples.append((time.perf_counter() - start) * 1000.0)
+            session.rollback()
+            session.expunge_all()
+    return summarize(samples[1:])
+
+
+def run_size(database_url: Optional[str], size: int, tasks_per_user: int, repeat: int, seed: int,
+             functions: Optional[List[str]]) -> Dict[str, Dict[str, float]]:
+    """Seed `size` tasks and messages and time every selected case."""
+    engine = make_engine(database_url)
+    users = max(1, size // tasks_per_user)
+    start = time.perf_counter()
+    dataset = seed_dataset(engine, users, users * tasks_per_user, size)
+    print(f"Seeded {users * tasks_per_user} tasks and {size} messages ({users} users) "
+          f"in {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(seed)
+    results = {}
+    for case in _cases(dataset, tasks_per_user):
+        if functions and not any(name in case.name for name in functions):
+            continue
+        results[case.name] = _time_case(engine, case, max(3, repeat // 10) if case.scan else repeat, rng)
+    engine.dispose()
+    return results
+
+
+def compare(results: Dict[str, dict], baseline: Dict[str, dict], tolerance: float,
+            noise_ms: float) -> List[Tuple[str, str, float, float]]:
+    """(size, function, baseline p50, p50) of every function whose p50 regressed beyond the tolerance."""
+    regressions = []
+    for size, functions in results.items():
+        for name, stats in functions.items():
+            before = baseline.get(size, {}).get(name)
+            if before is None:
+                continue
+            limit = max(before["p50_ms"] * (1.0 + tolerance), before["p50_ms"] + noise_ms)
+            if stats["p50_ms"] > limit:
+                regressions.append((size, name, before["p50_ms"], stats["p50_ms"]))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every crud and MCP tool function across data sizes")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Tasks and messages to seed per run")
+    parser.add_argument("--tasks-per-user", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=50, help="Timed calls per function and size")
+    parser.add_argument("--functions", nargs="+", default=None, help="Only run functions whose name contains one of these")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", default=None, help="Write the results as JSON to this file")
+    parser.add_argument("--baseline", default=None, help="Compare with the JSON results of an earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed p50 growth over the baseline (0.25 = 25%%)")
+    parser.add_argument("--noise-ms", type=float, default=0.05, help="Ignore p50 growth smaller than this")
+    args = parser.parse_args()
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+    results = {}
+    for size in args.sizes:
+        results[str(size)] = run_size(args.database_url, size, args.tasks_per_user, args.repeat, args.seed,
+                                      args.functions)
+
+    print()
+    print(f"{'function':<36} {'size':>9} {'p50':>10} {'p95':>10} {'baseline':>10} {'change':>8}")
+    for size, functions in results.items():
+        for name, stats in functions.items():
+            before = (baseline or {}).get(size, {}).get(name)
+            reference = change = ""
+            if before is not None:
+                reference = f"{before['p50_ms']:.3f}ms"
+                if before["p50_ms"]:
+                    change = f"{(stats['p50_ms'] / before['p50_ms'] - 1.0) * 100.0:+.0f}%"
+            print(f"{name:<36} {size:>9} {stats['p50_ms']:>8.3f}ms {stats['p95_ms']:>8.3f}ms "
+                  f"{reference:>10} {change:>8}")
+
+    if args.output:
+        report = {
+            "database": make_url(args.database_url).get_backend_name() if args.database_url else "sqlite",
+            "created_at": datetime.utcnow().isoformat(),
+            "tasks_per_user": args.tasks_per_user,
+            "repeat": args.repeat,
+            "results": results,
+        }
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Wrote {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance, args.noise_ms)
+        if regressions:
+            print()
+            print(f"{len(regressions)} regression(s) beyond {args.tolerance:.0%}:")
+            for size, name, before, after in regressions:
+                print(f"  {name} at {size}: p50 {before:.3f}ms -> {after:.3f}ms")
+            sys.exit(1)
+        print(f"No regressions beyond {args.tolerance:.0%} of {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark: per-user query latency with and without the composite indexes.
+
+Seeds a synthetic dataset, then times the crud functions every authenticated
+request goes through (get_tasks_by_user, get_task_by_user, get_messages,
+get_conversation) first with the composite indexes dropped, then with them created.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_indexes                      # 1M tasks, 10M messages, SQLite
+    python -m backend.benchmarks.bench_indexes --tasks 100000 --messages 1000000
+    python -m backend.benchmarks.bench_indexes --database-url postgresql://...
+"""
+import argparse
+import random
+import time
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from .. import crud
+from ..models import Task, Conversation, Message
+from .common import make_engine, seed_dataset, time_calls, summarize, pick
+
+INDEXED_MODELS = (Task, Conversation, Message)
+
+
+def _drop_indexes(engine):
+    for model in INDEXED_MODELS:
+        for index in model.__table__.indexes:
+            index.drop(bind=engine, checkfirst=True)
+
+
+def _create_indexes(engine):
+    for model in INDEXED_MODELS:
+        for index in model.__table__.indexes:
+            index.create(bind=engine, checkfirst=True)
+    # Refresh planner statistics so the new indexes are considered
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+def _measure(engine, dataset, repeat: int, seed: int):
+    rng = random.Random(seed)
+    user_ids = dataset["user_ids"]
+    conversations = dataset["conversations"]
+    results = {}
+
+    with Session(engine) as session:
+        def tasks_by_user():
+            crud.get_tasks_by_user(session, pick(user_ids, rng))
+
+        def task_by_user():
+            user_id = pick(user_ids, rng)
+            crud.get_task_by_user(session, rng.randrange(1, 1000), user_id)
+
+        def messages():
+            conversation_id, user_id = pick(conversations, rng)
+            crud.get_messages(session, conversation_id, user_id)
+
+        def conversation():
+            conversation_id, user_id = pick(conversations, rng)
+            crud.get_conversation(session, conversation_id, user_id)
+
+        for name, fn in (
+            ("get_tasks_by_user", tasks_by_user),
+            ("get_task_by_user", task_by_user),
+            ("get_messages", messages),
+            ("get_conversation", conversation),
+        ):
+            fn()  # warm up
+            results[name] = summarize(time_calls(fn, repeat))
+            session.expunge_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark per-user queries with and without composite indexes")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=1_000_000)
+    parser.add_argument("--messages", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=50, help="Calls per query and phase")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    print(f"Seeding {args.users} users, {args.tasks} tasks, {args.messages} messages on {engine.url.get_backend_name()}...")
+    start = time.perf_counter()
+    dataset = seed_dataset(engine, args.users, args.tasks, args.messages)
+    print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+    _drop_indexes(engine)
+    without = _measure(engine, dataset, args.repeat, args.seed)
+    _create_indexes(engine)
+    with_indexes = _measure(engine, dataset, args.repeat, args.seed)
+
+    print()
+    print(f"{'query':<20} {'p50 no-idx':>12} {'p95 no-idx':>12} {'p50 idx':>10} {'p95 idx':>10} {'speedup':>8}")
+    for name in without:
+        before, after = without[name], with_indexes[name]
+        speedup = before["p50_ms"] / after["p50_ms"] if after["p50_ms"] else float("inf")
+        print(f"{name:<20} {before['p50_ms']:>10.3f}ms {before['p95_ms']:>10.3f}ms "
+              f"{after['p50_ms']:>8.3f}ms {after['p95_ms']:>8.3f}ms {speedup:>7.1f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
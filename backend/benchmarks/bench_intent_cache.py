@@ -0,0 +1,77 @@
+"""
+Benchmark: intent classification cache on a repeat-heavy workload.
+
+Opens many short conversations that start with the same handful of phrasings (as new
+users and fresh sessions do) against the local mock OpenAI server, once with the intent
+cache disabled and once enabled. Reports LLM requests, cache hit ratio and turn latency.
+The fast-path router is disabled so every turn would reach the classifier.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_intent_cache --conversations 50 --latency-ms 300
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from sqlmodel import Session
+
+from .. import crud, intent_router, openai_client
+from ..cache import TTLCache
+from ..models import Task, User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer
+
+OPENERS = ["Show my tasks", "show my tasks!", "what's on my list?", "What's on my list", "hello", "Hello!"]
+
+
+async def _replay(engine, conversations):
+    from ..agent import AgentOrchestrator
+
+    latencies = []
+    with Session(engine) as session:
+        orchestrator = AgentOrchestrator(session)
+        for i in range(conversations):
+            conversation_id = crud.create_conversation(session, "bench-user").id
+            start = time.perf_counter()
+            await orchestrator.handle_message_async("bench-user", str(conversation_id), OPENERS[i % len(OPENERS)])
+            latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the intent classification cache")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--conversations", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock completion latency")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("openai").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.ERROR)
+    intent_router.INTENT_ROUTER_MIN_CONFIDENCE = 1.1
+
+    with MockOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        print(f"Mock latency {args.latency_ms:.0f}ms, {args.conversations} conversations")
+        print(f"{'cache':<10} {'LLM requests':>13} {'hit ratio':>10} {'mean':>9} {'p50':>9} {'p95':>9}")
+        for label, max_size in (("disabled", 0), ("enabled", openai_client.INTENT_CACHE_MAX_SIZE)):
+            openai_client.intent_cache = TTLCache(max_size, openai_client.INTENT_CACHE_TTL_SECONDS)
+            engine = make_engine(args.database_url)
+            with Session(engine) as session:
+                session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+                session.add(Task(user_id="bench-user", title="Water the plants"))
+                session.commit()
+            before = server.request_count
+            stats = summarize(asyncio.run(_replay(engine, args.conversations)))
+            cache_stats = openai_client.intent_cache.stats()
+            print(f"{label:<10} {server.request_count - before:>13} {cache_stats['hit_ratio']:>10.2f} "
+                  f"{stats['mean_ms']:>7.0f}ms {stats['p50_ms']:>7.0f}ms {stats['p95_ms']:>7.0f}ms")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Benchmark: fast-path intent router in front of the LLM classifier.
+
+Replays the labelled corpus (intent_corpus.json) through AgentOrchestrator.handle_message_async
+against the local mock OpenAI server, once with the router disabled (every turn is classified
+by the LLM) and once enabled. Reports the share of turns served without a network call, the
+router's own cost, its accuracy on the corpus, and per-turn latency for both runs.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_intent_router --latency-ms 300
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import time
+from pathlib import Path
+
+from sqlmodel import Session
+
+from .. import crud, intent_router
+from ..models import Task, User
+from .common import make_engine, summarize, time_calls
+from .mock_openai import MockOpenAIServer
+
+CORPUS_PATH = Path(__file__).with_name("intent_corpus.json")
+
+
+def _seed(engine, titles):
+    with Session(engine) as session:
+        session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+        session.add_all([Task(user_id="bench-user", title=title) for title in titles])
+        session.commit()
+        return crud.create_conversation(session, "bench-user").id
+
+
+async def _replay(engine, conversation_id, messages):
+    from ..agent import AgentOrchestrator
+
+    latencies = []
+    with Session(engine) as session:
+        orchestrator = AgentOrchestrator(session)
+        for message in messages:
+            start = time.perf_counter()
+            await orchestrator.handle_message_async("bench-user", str(conversation_id), message)
+            latencies.append((time.perf_counter() - start) * 1000.0)
+            # Keep each turn independent of the previous one's pending confirmation
+            crud.pop_pending_action(session, conversation_id, "bench-user")
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the fast-path intent router against LLM classification")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock LLM latency per completion")
+    parser.add_argument("--repeat", type=int, default=1000, help="Router-only classifications per corpus message")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    corpus = json.loads(CORPUS_PATH.read_text())
+    messages = [case["message"] for case in corpus["cases"]]
+    snapshot = [Task(id=i + 1, user_id="bench-user", title=title) for i, title in enumerate(corpus["tasks"])]
+
+    # Router on its own: cost per message and agreement with the labels
+    routed = [intent_router.route(message, snapshot) for message in messages]
+    served = [r for r in routed if r.is_confident]
+    correct = sum(
+        (r.intent if r.is_confident else "llm") == case["intent"] for r, case in zip(routed, corpus["cases"])
+    )
+    router_cost = summarize([
+        sample for message in messages
+        for sample in time_calls(lambda: intent_router.route(message, snapshot), args.repeat // 10 or 1)
+    ])
+    print(f"Corpus: {len(messages)} messages, {len(served)} routed locally ({100.0 * len(served) / len(messages):.0f}%), "
+          f"{correct}/{len(messages)} match the labels")
+    print(f"Router cost: p50 {router_cost['p50_ms'] * 1000:.1f}us, p99 {router_cost['p99_ms'] * 1000:.1f}us")
+
+    with MockOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        print(f"\nMock LLM latency {args.latency_ms:.0f}ms")
+        print(f"{'router':<9} {'LLM calls':>10} {'mean':>9} {'p50':>9} {'p95':>9}")
+        default_threshold = intent_router.INTENT_ROUTER_MIN_CONFIDENCE
+        for label, threshold in (("off", 1.1), ("on", default_threshold)):
+            intent_router.INTENT_ROUTER_MIN_CONFIDENCE = threshold
+            engine = make_engine(args.database_url)
+            conversation_id = _seed(engine, corpus["tasks"])
+            before = server.request_count
+            stats = summarize(asyncio.run(_replay(engine, conversation_id, messages)))
+            print(f"{label:<9} {server.request_count - before:>10} {stats['mean_ms']:>7.1f}ms "
+                  f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms")
+            engine.dispose()
+        intent_router.INTENT_ROUTER_MIN_CONFIDENCE = default_threshold
+
+
+if __name__ == "__main__":
+    main()
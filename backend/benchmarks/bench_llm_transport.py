@@ -0,0 +1,86 @@
+"""
+Benchmark: shared LLM transport against a new OpenAI client per call.
+
+Sends chat completions to the local mock OpenAI server (see mock_openai.py), first with
+a fresh OpenAI client for every call (the previous agents_sdk.get_openai_client
+behaviour: a new connection pool, and a new connection, each time) and then through the
+shared llm_transport client. Then fires a burst of concurrent async calls through the
+shared transport and reports its utilization metrics (in-flight peak, queued requests,
+pooled connections).
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_llm_transport --calls 200 --burst 64 --max-in-flight 16
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from openai import OpenAI
+
+from .. import llm_transport
+from .common import summarize
+from .mock_openai import MockOpenAIServer
+
+MESSAGES = [{"role": "user", "content": "hello there"}]
+
+
+def _timed(call, calls):
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        call()
+        latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+async def _burst(base_url, burst):
+    # The async client belongs to the event loop, so it is fetched inside it
+    client = llm_transport.get_async_openai("mock-key", base_url)
+    await asyncio.gather(*(
+        client.chat.completions.create(model="mock", messages=MESSAGES) for _ in range(burst)
+    ))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the shared LLM transport")
+    parser.add_argument("--calls", type=int, default=200, help="Sequential calls per variant")
+    parser.add_argument("--burst", type=int, default=64, help="Concurrent async calls in the burst")
+    parser.add_argument("--max-in-flight", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock LLM latency per completion")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    with MockOpenAIServer(latency_ms=args.latency_ms) as server:
+        def fresh_client_call():
+            client = OpenAI(api_key="mock-key", base_url=server.base_url)
+            client.chat.completions.create(model="mock", messages=MESSAGES)
+            client.close()
+
+        shared = llm_transport.get_openai("mock-key", server.base_url)
+
+        def shared_client_call():
+            shared.chat.completions.create(model="mock", messages=MESSAGES)
+
+        print(f"Mock LLM latency {args.latency_ms:.0f}ms, {args.calls} sequential calls per variant")
+        print(f"{'variant':<18} {'mean':>9} {'p50':>9} {'p99':>9}")
+        for label, call in (("client per call", fresh_client_call), ("shared transport", shared_client_call)):
+            call()  # warm-up
+            stats = summarize(_timed(call, args.calls))
+            print(f"{label:<18} {stats['mean_ms']:>7.2f}ms {stats['p50_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms")
+
+        llm_transport.limiter.limit = args.max_in_flight
+        start = time.perf_counter()
+        asyncio.run(_burst(server.base_url, args.burst))
+        elapsed = (time.perf_counter() - start) * 1000.0
+        metrics = llm_transport.utilization()
+        print(f"\nburst of {args.burst} async calls, max in flight {args.max_in_flight}: {elapsed:.0f}ms")
+        for key in ("peak_in_flight", "queued_requests", "queue_wait_seconds", "connections",
+                    "idle_connections", "requests", "retries", "http2"):
+            print(f"  {key:<20} {metrics[key]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Benchmark: cost of recording metrics on the hot path.
+
+Times Histogram.observe() on a bound child against a histogram guarded by a single lock
+(the straightforward thread-safe implementation), single-threaded and from several
+threads at once, then the cost of a /metrics scrape.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_metrics --observations 200000 --threads 8
+"""
+import argparse
+import threading
+import time
+from bisect import bisect_left
+
+from .. import metrics
+
+
+class LockedHistogram:
+    """Histogram whose buckets are updated under one lock."""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect_left(self.buckets, value)] += 1
+            self.sum += value
+
+
+def _ns_per_observation(observe, observations, threads):
+    per_thread = observations // threads
+
+    def work():
+        for i in range(per_thread):
+            observe((i % 100) / 1000.0)
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark metric recording overhead")
+    parser.add_argument("--observations", type=int, default=200000)
+    parser.add_argument("--threads", type=int, default=8)
+    args = parser.parse_args()
+
+    registry = metrics.Registry()
+    histogram = metrics.Histogram("bench_seconds", "Benchmark", ("route",), registry=registry)
+    child = histogram.labels("/api/{user_id}/tasks")
+    locked = LockedHistogram(metrics.DEFAULT_BUCKETS)
+
+    print(f"{args.observations} observations")
+    print(f"{'threads':<8} {'locked':>12} {'per-thread':>12}")
+    for threads in (1, args.threads):
+        locked_ns = _ns_per_observation(locked.observe, args.observations, threads)
+        slots_ns = _ns_per_observation(child.observe, args.observations, threads)
+        print(f"{threads:<8} {locked_ns:>10.0f}ns {slots_ns:>10.0f}ns")
+
+    for i in range(200):
+        histogram.labels(f"/route/{i}").observe(0.01)
+    start = time.perf_counter()
+    text = registry.render()
+    print(f"\nscrape of 200 histograms ({len(text.splitlines())} lines): "
+          f"{(time.perf_counter() - start) * 1000.0:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Benchmark: task mutations as read-modify-write vs single statements.
+
+"before" replays the previous crud implementations: update/toggle/delete load the task
+with get_task_by_user, change it in Python, commit and (except delete) refresh it, and
+TaskMCPTools.delete_task looked the task up once more for its title; inserts refreshed
+after commit; sessions expire on commit. "after" is the current crud: one
+UPDATE/DELETE ... RETURNING scoped by user_id, no refreshes, expire_on_commit=False
+sessions (as database.get_session). Each call's result is read afterwards, as the
+endpoints do when they serialize it.
+
+Reports statements per call and latency. --rtt-ms adds a simulated network round-trip
+to every statement, to show what the saved round-trips are worth against a remote
+database such as Neon.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_mutations --repeat 500
+    python -m backend.benchmarks.bench_mutations --rtt-ms 2
+    python -m backend.benchmarks.bench_mutations --database-url postgresql://...
+"""
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import event, insert
+from sqlmodel import Session
+
+from .. import crud, query_profiler
+from ..mcp_tools import TaskMCPTools
+from ..models import Task, Message
+from .common import make_engine, seed_dataset, summarize, pick
+
+
+def _legacy_create_task(session, title, description, user_id):
+    task = Task(title=title, description=description, completed=False, user_id=user_id)
+    session.add(task)
+    session.commit()
+    session.refresh(task)
+    return task
+
+
+def _legacy_update_task(session, task_id, user_id, title=None, completed=None):
+    task = crud.get_task_by_user(session, task_id, user_id)
+    if task:
+        if title is not None:
+            task.title = title
+        if completed is not None and not (task.completed and completed is False):
+            task.completed = completed
+        task.updated_at = datetime.utcnow()
+        session.add(task)
+        session.commit()
+        session.refresh(task)
+    return task
+
+
+def _legacy_toggle_task_completion(session, task_id, user_id):
+    task = crud.get_task_by_user(session, task_id, user_id)
+    if task and not task.completed:
+        task.completed = True
+        task.updated_at = datetime.utcnow()
+        session.add(task)
+        session.commit()
+        session.refresh(task)
+    return task
+
+
+def _legacy_delete_task(session, task_id, user_id):
+    task = crud.get_task_by_user(session, task_id, user_id)
+    if task:
+        session.delete(task)
+        session.commit()
+        return True
+    return False
+
+
+def _legacy_mcp_delete_task(session, user_id, task_id):
+    task = crud.get_task_by_user(session, task_id, user_id)
+    title = task.title
+    _legacy_delete_task(session, task_id, user_id)
+    return {"task_id": task_id, "status": "deleted", "title": title}
+
+
+def _legacy_save_message(session, conversation_id, user_id, role, content):
+    message = Message(conversation_id=conversation_id, user_id=user_id, role=role, content=content)
+    session.add(message)
+    session.commit()
+    session.refresh(message)
+    return message
+
+
+def _operations(dataset):
+    """name -> (needs a fresh task, before(session, task_id, user_id, conv), after(...))"""
+    return {
+        "create_task": (
+            False,
+            lambda s, t, u, c: _legacy_create_task(s, "Bench task", None, u).title,
+            lambda s, t, u, c: crud.create_task(s, "Bench task", None, u).title,
+        ),
+        "update_task": (
+            True,
+            lambda s, t, u, c: _legacy_update_task(s, t, u, title="Renamed").title,
+            lambda s, t, u, c: crud.update_task(s, t, u, title="Renamed").title,
+        ),
+        "toggle_task_completion": (
+            True,
+            lambda s, t, u, c: _legacy_toggle_task_completion(s, t, u).completed,
+            lambda s, t, u, c: crud.toggle_task_completion(s, t, u).completed,
+        ),
+        "delete_task": (
+            True,
+            lambda s, t, u, c: _legacy_delete_task(s, t, u),
+            lambda s, t, u, c: crud.delete_task(s, t, u),
+        ),
+        "mcp.delete_task": (
+            True,
+            lambda s, t, u, c: _legacy_mcp_delete_task(s, u, t)["title"],
+            lambda s, t, u, c: TaskMCPTools.delete_task(s, u, t)["title"],
+        ),
+        "save_message": (
+            False,
+            lambda s, t, u, c: _legacy_save_message(s, c, u, "user", "Bench message").content,
+            lambda s, t, u, c: crud.save_message(s, c, u, "user", "Bench message").content,
+        ),
+    }
+
+
+def _measure(engine, dataset, fn, fresh_task: bool, expire_on_commit: bool, repeat: int, seed: int):
+    rng = random.Random(seed)
+    samples, statements = [], 0
+    with Session(engine, expire_on_commit=expire_on_commit) as session:
+        for i in range(repeat + 1):
+            conversation_id, user_id = pick(dataset["conversations"], rng)
+            task_id = None
+            if fresh_task:
+                task_id = session.scalar(
+                    insert(Task).values(user_id=user_id, title="Bench task", completed=False).returning(Task.id)
+                )
+                session.commit()
+            session.expunge_all()
+            with query_profiler.profile() as profile:
+                start = time.perf_counter()
+                fn(session, task_id, user_id, conversation_id)
+                elapsed = (time.perf_counter() - start) * 1000.0
+            # The first call warms up statement caches and is not recorded
+            if i:
+                samples.append(elapsed)
+                statements += profile.count
+    return summarize(samples), statements / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark read-modify-write vs single-statement task mutations")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=300, help="Timed calls per operation and variant")
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated network round-trip per statement")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    engine = make_engine(args.database_url)
+    dataset = seed_dataset(engine, args.users, args.tasks, args.users)
+    query_profiler.install(engine)
+    if args.rtt_ms:
+        @event.listens_for(engine, "before_cursor_execute")
+        def _round_trip(*_):
+            time.sleep(args.rtt_ms / 1000.0)
+
+    print(f"{args.tasks} tasks, {args.users} users on {engine.url.get_backend_name()}, "
+          f"simulated round-trip {args.rtt_ms:.1f}ms")
+    print(f"{'operation':<24} {'stmts before':>12} {'stmts after':>11} {'p50 before':>11} {'p50 after':>10} "
+          f"{'p95 before':>11} {'p95 after':>10} {'speedup':>8}")
+    for name, (fresh_task, before_fn, after_fn) in _operations(dataset).items():
+        before, before_statements = _measure(engine, dataset, before_fn, fresh_task, True, args.repeat, args.seed)
+        after, after_statements = _measure(engine, dataset, after_fn, fresh_task, False, args.repeat, args.seed)
+        speedup = before["p50_ms"] / after["p50_ms"] if after["p50_ms"] else float("inf")
+        print(f"{name:<24} {before_statements:>12.1f} {after_statements:>11.1f} "
+              f"{before['p50_ms']:>9.3f}ms {after['p50_ms']:>8.3f}ms "
+              f"{before['p95_ms']:>9.3f}ms {after['p95_ms']:>8.3f}ms {speedup:>7.2f}x")
+
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""
+Benchmark: login throughput versus password pool size.
+
+Fires a burst of concurrent POST /api/auth/login requests at the app in-process for each
+pool size, while a probe keeps calling GET /api/{user_id}/tasks, and reports logins/s,
+login p99, requests rejected with 503 (queue full) and the probe's p99.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_passwords --pool-sizes 1 2 4 8 --logins 200
+    python -m backend.benchmarks.bench_passwords --rounds 10 --max-queue 16
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+import bcrypt
+import httpx
+from sqlmodel import Session
+
+from .. import passwords
+from ..models import User
+from ..passwords import PasswordHasher
+from .common import make_engine, seed_dataset, summarize
+
+
+async def _burst(app, user_id: str, email: str, logins: int):
+    transport = httpx.ASGITransport(app=app)
+    login_latencies, probe_latencies = [], []
+    rejected = 0
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        done = asyncio.Event()
+
+        async def login():
+            nonlocal rejected
+            start = time.perf_counter()
+            response = await client.post("/api/auth/login", json={"email": email, "password": "bench-password"})
+            if response.status_code == 503:
+                rejected += 1
+                return
+            response.raise_for_status()
+            login_latencies.append((time.perf_counter() - start) * 1000.0)
+
+        async def probe():
+            while not done.is_set():
+                start = time.perf_counter()
+                response = await client.get(f"/api/{user_id}/tasks", params={"limit": 50})
+                response.raise_for_status()
+                probe_latencies.append((time.perf_counter() - start) * 1000.0)
+                await asyncio.sleep(0.01)
+
+        probe_task = asyncio.create_task(probe())
+        start = time.perf_counter()
+        await asyncio.gather(*(login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        done.set()
+        await probe_task
+    return elapsed, login_latencies, rejected, probe_latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark login throughput versus password pool size")
+    parser.add_argument("--pool-sizes", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--logins", type=int, default=100, help="Concurrent logins per burst")
+    parser.add_argument("--rounds", type=int, default=passwords.BCRYPT_ROUNDS, help="bcrypt cost factor")
+    parser.add_argument("--max-queue", type=int, default=1000, help="Queue-depth limit (lower it to see 503s)")
+    args = parser.parse_args()
+    # Per-request INFO logs would dominate the measurement
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    from ..main import app, get_session, get_current_better_auth_user
+
+    engine = make_engine()
+    user_id = seed_dataset(engine, users=1, tasks=200, messages=0)["user_ids"][0]
+    email = f"{user_id}@bench.local"
+    with Session(engine) as session:
+        user = session.get(User, user_id)
+        user.password_hash = bcrypt.hashpw(b"bench-password", bcrypt.gensalt(rounds=args.rounds)).decode("utf-8")
+        session.add(user)
+        session.commit()
+        session.refresh(user)
+        session.expunge(user)
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = session_override
+    app.dependency_overrides[get_current_better_auth_user] = lambda: user
+
+    print(f"bcrypt cost {args.rounds}, {args.logins} concurrent logins, queue limit {args.max_queue}")
+    print(f"{'pool':>5} {'logins/s':>9} {'login p99':>10} {'rejected':>9} {'tasks p99':>10}")
+    original = passwords.password_hasher
+    for size in args.pool_sizes:
+        passwords.password_hasher = PasswordHasher(workers=size, max_queue=args.max_queue, rounds=args.rounds)
+        elapsed, latencies, rejected, probes = asyncio.run(_burst(app, user_id, email, args.logins))
+        passwords.password_hasher.shutdown()
+        print(f"{size:>5} {len(latencies) / elapsed:>9.1f} {summarize(latencies)['p99_ms']:>8.0f}ms "
+              f"{rejected:>9} {summarize(probes)['p99_ms']:>8.1f}ms")
+    passwords.password_hasher = original
+
+    app.dependency_overrides.clear()
+    engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+"""
+Benchmark: concurrent reads and writes on SQLite under each storage profile.
+
+Worker threads (optionally in several processes, like uvicorn --workers) run a mix of
+task page reads and task writes (create, update, complete) for random users, each
+operation on its own session as a request would, for a fixed duration. The same
+workload runs against a freshly seeded database file in each mode:
+
+- rollback:   the previous default: rollback journal, driver defaults
+- wal:        sqlite_profile.apply_pragmas (WAL, synchronous=NORMAL, busy_timeout, mmap, cache)
+- wal+writer: the pragmas plus the single-writer queue, as database.get_session sets it up
+
+Reports throughput, read and write p50/p95, "database is locked" errors, and in writer
+mode the average number of writes committed together. The writer queue is per process:
+with --processes the writers of different processes still take turns on the file lock,
+which busy_timeout waits out.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_sqlite_concurrency --threads 16 --duration 10
+    python -m backend.benchmarks.bench_sqlite_concurrency --processes 4 --threads 8 --write-ratio 0.5
+    python -m backend.benchmarks.bench_sqlite_concurrency --modes rollback wal+writer
+"""
+import argparse
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, create_engine
+
+from .. import crud
+from ..sqlite_profile import SQLiteWriter, apply_pragmas
+from .common import make_engine, seed_dataset, summarize
+
+MODES = ("rollback", "wal", "wal+writer")
+
+
+def _operation(session: Session, rng: random.Random, users: int, tasks_per_user: int, write_ratio: float) -> bool:
+    """Run one read or write for a random user; True if it was a write."""
+    index = rng.randrange(users)
+    user_id = f"bench-user-{index}"
+    if rng.random() >= write_ratio:
+        crud.get_tasks_page(session, user_id, limit=20)
+        return False
+    # seed_dataset assigns task i (id i + 1) to user i % users
+    task_id = index + 1 + rng.randrange(tasks_per_user) * users
+    kind = rng.randrange(3)
+    if kind == 0:
+        crud.create_task(session, "Bench task", None, user_id)
+    elif kind == 1:
+        crud.update_task(session, task_id, user_id, title=f"Bench {rng.randrange(10**6)}")
+    else:
+        crud.toggle_task_completion(session, task_id, user_id)
+    return True
+
+
+def run_process(database_url: str, mode: str, threads: int, duration: float, users: int, tasks_per_user: int,
+                write_ratio: float, seed: int) -> Dict[str, Any]:
+    """Drive `threads` workers in this process for `duration` seconds; raw samples and counters."""
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    engine = create_engine(database_url, echo=False, connect_args={"check_same_thread": False})
+    writer = None
+    if mode != "rollback":
+        apply_pragmas(engine)
+    if mode == "wal+writer":
+        writer = SQLiteWriter(database_url)
+
+    reads: List[float] = []
+    writes: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker(worker_seed: int):
+        rng = random.Random(worker_seed)
+        read_samples, write_samples, locked = [], [], 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                with Session(engine, expire_on_commit=False) as session:
+                    if writer is not None:
+                        session.info["sqlite_writer"] = writer
+                    wrote = _operation(session, rng, users, tasks_per_user, write_ratio)
+            except OperationalError as exc:
+                if "locked" not in str(exc):
+                    raise
+                locked += 1
+                continue
+            (write_samples if wrote else read_samples).append((time.perf_counter() - start) * 1000.0)
+        with lock:
+            reads.extend(read_samples)
+            writes.extend(write_samples)
+            errors[0] += locked
+
+    pool = [threading.Thread(target=worker, args=(seed * 1000 + i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    batches = committed = 0
+    if writer is not None:
+        writer.close()
+        batches, committed = writer.batches, writer.writes
+    engine.dispose()
+    return {"reads": reads, "writes": writes, "locked": errors[0], "batches": batches, "committed": committed}
+
+
+def run_mode(mode: str, args) -> Dict[str, Any]:
+    """Seed a fresh database file and run the workload against it in `mode`."""
+    engine = make_engine()
+    seed_dataset(engine, args.users, args.users * args.tasks_per_user, args.users)
+    database_url = engine.url.render_as_string(hide_password=False)
+    engine.dispose()
+
+    worker_args = (database_url, mode, args.threads, args.duration, args.users, args.tasks_per_user,
+                   args.write_ratio)
+    start = time.perf_counter()
+    if args.processes == 1:
+        outcomes = [run_process(*worker_args, args.seed)]
+    else:
+        with ProcessPoolExecutor(args.processes) as executor:
+            futures = [executor.submit(run_process, *worker_args, args.seed + i) for i in range(args.processes)]
+            outcomes = [future.result() for future in futures]
+    elapsed = time.perf_counter() - start
+
+    reads = [value for outcome in outcomes for value in outcome["reads"]]
+    writes = [value for outcome in outcomes for value in outcome["writes"]]
+    batches = sum(outcome["batches"] for outcome in outcomes)
+    return {
+        "ops_per_s": (len(reads) + len(writes)) / elapsed,
+        "writes_per_s": len(writes) / elapsed,
+        "read": summarize(reads) if reads else None,
+        "write": summarize(writes) if writes else None,
+        "locked": sum(outcome["locked"] for outcome in outcomes),
+        "batch_size": sum(outcome["committed"] for outcome in outcomes) / batches if batches else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark concurrent SQLite reads and writes per storage profile")
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=list(MODES))
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (like uvicorn --workers)")
+    parser.add_argument("--threads", type=int, default=16, help="Worker threads per process")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run each mode")
+    parser.add_argument("--write-ratio", type=float, default=0.3, help="Share of operations that write")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--tasks-per-user", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    logging.getLogger("backend").setLevel(logging.WARNING)
+
+    print(f"{args.processes} process(es) x {args.threads} threads, {args.write_ratio:.0%} writes, "
+          f"{args.users * args.tasks_per_user} tasks, {args.duration:.0f}s per mode")
+    print(f"{'mode':<11} {'ops/s':>8} {'writes/s':>9} {'read p50':>9} {'read p95':>9} {'write p50':>10} "
+          f"{'write p95':>10} {'locked':>7} {'batch':>6}")
+    for mode in args.modes:
+        result = run_mode(mode, args)
+        read = result["read"] or {"p50_ms": 0.0, "p95_ms": 0.0}
+        write = result["write"] or {"p50_ms": 0.0, "p95_ms": 0.0}
+        batch = f"{result['batch_size']:.1f}" if result["batch_size"] else "-"
+        print(f"{mode:<11} {result['ops_per_s']:>8.0f} {result['writes_per_s']:>9.0f} "
+              f"{read['p50_ms']:>7.2f}ms {read['p95_ms']:>7.2f}ms {write['p50_ms']:>8.2f}ms "
+              f"{write['p95_ms']:>8.2f}ms {result['locked']:>7} {batch:>6}")
+
+
+if __name__ == "__main__":
+    main()
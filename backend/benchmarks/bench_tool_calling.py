@@ -0,0 +1,85 @@
+"""
+Benchmark: single-call tool calling against the classify-then-chat pipeline.
+
+Replays a mixed chat workload through AgentOrchestrator.handle_message_async against the
+local mock OpenAI server in both orchestration modes ("classify" and "tools") and reports
+LLM requests and per-turn latency. The fast-path router is disabled so every turn
+reaches the LLM.
+
+Usage (from the repository root):
+
+    python -m backend.benchmarks.bench_tool_calling --latency-ms 300 --rounds 5
+"""
+import argparse
+import asyncio
+import logging
+import os
+import time
+
+from sqlmodel import Session
+
+from .. import crud, intent_router
+from ..models import Task, User
+from .common import make_engine, summarize
+from .mock_openai import MockOpenAIServer
+
+WORKLOAD = [
+    "add Buy groceries",
+    "list my tasks",
+    "complete task 1",
+    "hello there",
+    "what can you help me with?",
+    "remind me to call mom",
+    "show everything",
+    "thanks!",
+]
+
+
+async def _replay(engine, mode, rounds):
+    from ..agent import AgentOrchestrator
+
+    latencies = []
+    with Session(engine) as session:
+        conversation_id = crud.create_conversation(session, "bench-user").id
+        orchestrator = AgentOrchestrator(session, mode=mode)
+        for _ in range(rounds):
+            for message in WORKLOAD:
+                start = time.perf_counter()
+                await orchestrator.handle_message_async("bench-user", str(conversation_id), message)
+                latencies.append((time.perf_counter() - start) * 1000.0)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark tool-calling mode against classify-then-chat")
+    parser.add_argument("--database-url", default=None, help="Database to benchmark (default: temporary SQLite file)")
+    parser.add_argument("--latency-ms", type=float, default=300.0, help="Mock LLM latency per completion")
+    parser.add_argument("--rounds", type=int, default=5, help="Passes over the workload per mode")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    logging.getLogger("backend").setLevel(logging.WARNING)
+    intent_router.INTENT_ROUTER_MIN_CONFIDENCE = 1.1
+
+    with MockOpenAIServer(latency_ms=args.latency_ms) as server:
+        os.environ["OPENAI_API_KEY"] = "mock-key"
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+
+        turns = len(WORKLOAD) * args.rounds
+        print(f"Mock LLM latency {args.latency_ms:.0f}ms, {turns} turns per mode")
+        print(f"{'mode':<10} {'LLM calls':>10} {'per turn':>9} {'mean':>9} {'p50':>9} {'p95':>9}")
+        for mode in ("classify", "tools"):
+            engine = make_engine(args.database_url)
+            with Session(engine) as session:
+                session.add(User(id="bench-user", email="bench-user@bench.local", password_hash="x"))
+                session.add(Task(user_id="bench-user", title="Water the plants"))
+                session.commit()
+            before = server.request_count
+            stats = summarize(asyncio.run(_replay(engine, mode, args.rounds)))
+            calls = server.request_count - before
+            print(f"{mode:<10} {calls:>10} {calls / turns:>9.2f} {stats['mean_ms']:>7.1f}ms "
+                  f"{stats['p50_ms']:>7.1f}ms {stats['p95_ms']:>7.1f}ms")
+            engine.dispose()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Shared helpers for the benchmark scripts: engine setup, synthetic data seeding
+and latency statistics.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import SQLModel, create_engine
+
+from ..models import User, Task, Conversation, Message
+
+# Rows per executemany() batch while seeding
+SEED_BATCH_SIZE = 50_000
+
+
+def make_engine(database_url: Optional[str] = None):
+    """
+    Create an engine for benchmarking. Defaults to a fresh SQLite file in a temp dir
+    so benchmarks never touch the application database.
+    """
+    if not database_url:
+        db_path = os.path.join(tempfile.mkdtemp(prefix="todo-bench-"), "bench.db")
+        database_url = f"sqlite:///{db_path}"
+    # Sessions may be handed to worker threads (e.g. the async chat path)
+    connect_args = {"check_same_thread": False} if database_url.startswith("sqlite") else {}
+    engine = create_engine(database_url, echo=False, connect_args=connect_args)
+    SQLModel.metadata.drop_all(engine)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _insert_batched(conn, table, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= SEED_BATCH_SIZE:
+            conn.execute(insert(table), batch)
+            batch = []
+    if batch:
+        conn.execute(insert(table), batch)
+
+
+def seed_dataset(engine, users: int, tasks: int, messages: int, conversations_per_user: int = 1) -> Dict[str, list]:
+    """
+    Bulk-load users, tasks, conversations and messages, spread evenly across users.
+    Returns the generated user ids and conversation ids (as (id, user_id) pairs).
+    """
+    user_ids = [f"bench-user-{i}" for i in range(users)]
+    base_time = datetime(2024, 1, 1)
+
+    with engine.begin() as conn:
+        _insert_batched(conn, User.__table__, (
+            {"id": uid, "email": f"{uid}@bench.local", "password_hash": "x",
+             "created_at": base_time, "is_active": True}
+            for uid in user_ids
+        ))
+
+        _insert_batched(conn, Task.__table__, (
+            {"user_id": user_ids[i % users], "title": f"Task {i}", "description": None,
+             "completed": i % 3 == 0,
+             "created_at": base_time + timedelta(seconds=i),
+             "updated_at": base_time + timedelta(seconds=i)}
+            for i in range(tasks)
+        ))
+
+        conversation_count = users * conversations_per_user
+        _insert_batched(conn, Conversation.__table__, (
+            {"id": i + 1, "user_id": user_ids[i % users],
+             "created_at": base_time, "updated_at": base_time}
+            for i in range(conversation_count)
+        ))
+        conversations = [(i + 1, user_ids[i % users]) for i in range(conversation_count)]
+
+        _insert_batched(conn, Message.__table__, (
+            {"user_id": conversations[i % conversation_count][1],
+             "conversation_id": conversations[i % conversation_count][0],
+             "role": "user" if i % 2 == 0 else "assistant",
+             "content": f"Message {i}",
+             "created_at": base_time + timedelta(seconds=i)}
+            for i in range(messages)
+        ))
+
+    return {"user_ids": user_ids, "conversations": conversations}
+
+
+def time_calls(fn: Callable[[], object], repeat: int) -> List[float]:
+    """
+    Call fn() `repeat` times and return the individual latencies in milliseconds.
+    """
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000.0)
+    return samples
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """
+    Nearest-rank percentile of a list of samples.
+    """
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[rank]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Latency summary (milliseconds) for a list of samples.
+    """
+    return {
+        "count": len(samples),
+        "mean_ms": statistics.fmean(samples) if samples else 0.0,
+        "p50_ms": percentile(samples, 50),
+        "p95_ms": percentile(samples, 95),
+        "p99_ms": percentile(samples, 99),
+    }
+
+
+def pick(items: list, rng: random.Random):
+    return items[rng.randrange(len(items))]
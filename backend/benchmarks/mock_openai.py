@@ -0,0 +1,398 @@
+"""
+Local OpenAI-compatible mock server for benchmarks.
+
+Serves POST /v1/chat/completions with a configurable artificial latency, so chat
+benchmarks exercise the real OpenAI SDK and HTTP stack without network access or an
+API key. Intent-classifier prompts get a JSON classification (keyword based); requests
+that declare tools get a keyword-based tool call when one applies; every other prompt
+gets a short plain-text reply. token_ms adds a per-word generation time to text replies;
+requests with "stream": true get them as chat.completion.chunk server-sent events, one
+word per chunk, with the first chunk after latency_ms.
+
+The Assistants API endpoints used by agents_sdk.py (assistants, threads, messages, runs)
+are served from in-memory state. A run stays in progress for latency_ms; messages that
+start with "add" make it require a task-creation tool call first. Runs created (or tool
+outputs submitted) with "stream": true answer with the run's server-sent events. rtt_ms
+adds a fixed delay to every request, standing in for the network round-trip.
+
+Usage from a benchmark:
+
+    with MockOpenAIServer(latency_ms=300) as server:
+        os.environ["OPENAI_BASE_URL"] = server.base_url
+        ...
+
+Or standalone:
+
+    python -m backend.benchmarks.mock_openai --port 8089 --latency-ms 300
+"""
+import argparse
+import asyncio
+import json
+import re
+import socket
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import StreamingResponse
+
+_CURRENT_MESSAGE = re.compile(r'Current message: "(.*)"')
+# Object ids in request paths, collapsed for per-route request counts
+_ROUTE_IDS = re.compile(r"/(asst|thread|run|msg)_[0-9a-f]+")
+
+
+def _classify(prompt: str) -> Dict[str, Any]:
+    match = _CURRENT_MESSAGE.search(prompt)
+    message = (match.group(1) if match else prompt).strip()
+    lowered = message.lower()
+    result = {
+        "intent": "unknown", "task_id": None, "task_title": None, "new_title": None,
+        "needs_confirmation": False, "confirmation_message": None,
+    }
+    if lowered.startswith(("add ", "create ", "remind me to ")):
+        result["intent"] = "create"
+        result["task_title"] = re.sub(r"^(add|create|remind me to)\s+", "", message, flags=re.IGNORECASE)
+    elif lowered.startswith(("list", "show")):
+        result["intent"] = "read"
+    return result
+
+
+def _tool_call_for(message: str) -> Optional[Dict[str, Any]]:
+    lowered = message.lower().strip()
+    number = re.search(r"\d+", lowered)
+    rename = re.match(r"(?:rename|change|update)\s+task\s+(\d+)\s+to\s+(.+)", message, re.IGNORECASE)
+    if lowered.startswith(("add ", "create ", "remind me to ")):
+        title = re.sub(r"^(add|create|remind me to)\s+", "", message, flags=re.IGNORECASE)
+        return {"name": "add_task", "arguments": {"title": title, "description": None}}
+    if lowered.startswith(("list", "show")):
+        return {"name": "list_tasks", "arguments": {"status": "all"}}
+    if rename:
+        return {"name": "update_task", "arguments": {
+            "task_number": int(rename.group(1)), "title": rename.group(2), "description": None,
+        }}
+    if lowered.startswith(("complete", "finish")) and number:
+        return {"name": "complete_task", "arguments": {"task_number": int(number.group())}}
+    if lowered.startswith(("delete", "remove")) and number:
+        return {"name": "delete_task", "arguments": {"task_number": int(number.group())}}
+    return None
+
+
+def _reply_for(messages: List[Dict[str, Any]]) -> str:
+    system = next((m.get("content") or "" for m in messages if m.get("role") == "system"), "")
+    if "intent classifier" in system:
+        return json.dumps(_classify(messages[-1].get("content") or ""))
+    return "Sure - I can help you with your tasks. Try asking me to add, list or complete a task."
+
+
+def _page(items: List[Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "object": "list", "data": items, "has_more": False,
+        "first_id": items[0]["id"] if items else None, "last_id": items[-1]["id"] if items else None,
+    }
+
+
+def _message(thread_id: str, role: str, text: str) -> Dict[str, Any]:
+    return {
+        "id": f"msg_{uuid.uuid4().hex[:24]}", "object": "thread.message", "created_at": int(time.time()),
+        "thread_id": thread_id, "role": role, "status": "completed", "assistant_id": None, "run_id": None,
+        "attachments": [], "metadata": {}, "completed_at": None, "incomplete_at": None, "incomplete_details": None,
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+    }
+
+
+def _add_assistants_routes(app: FastAPI, latency_ms: float) -> None:
+    """
+    In-memory Assistants API: enough of assistants/threads/messages/runs for agents_sdk.py.
+    """
+    assistants: Dict[str, Dict[str, Any]] = {}
+    threads: Dict[str, List[Dict[str, Any]]] = {}
+    runs: Dict[str, Dict[str, Any]] = {}
+
+    def thread_messages(thread_id: str) -> List[Dict[str, Any]]:
+        if thread_id not in threads:
+            raise HTTPException(status_code=404, detail="No thread found")
+        return threads[thread_id]
+
+    def advance(run: Dict[str, Any]) -> Dict[str, Any]:
+        """Move a run along: in progress until ready, then requires_action or completed."""
+        state = run["_state"]
+        if run["status"] in ("completed", "requires_action") or time.monotonic() < state["ready_at"]:
+            return run
+        if state["tool_call"] is not None:
+            run["status"] = "requires_action"
+            run["required_action"] = {"type": "submit_tool_outputs", "submit_tool_outputs": {"tool_calls": [state["tool_call"]]}}
+        else:
+            run["status"] = "completed"
+            run["completed_at"] = int(time.time())
+            threads[run["thread_id"]].append(_message(run["thread_id"], "assistant", state["reply"]))
+        return run
+
+    def public(run: Dict[str, Any]) -> Dict[str, Any]:
+        return {k: v for k, v in run.items() if not k.startswith("_")}
+
+    def sse(event: str, data: Dict[str, Any]) -> str:
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+    async def run_events(run: Dict[str, Any]):
+        """A run's streamed events, until it completes or needs tool outputs."""
+        if run["status"] == "queued":
+            yield sse("thread.run.created", public(run))
+            yield sse("thread.run.queued", public(run))
+        run["status"] = "in_progress"
+        yield sse("thread.run.in_progress", public(run))
+        # The event loop may wake a little early, so wait until the run has actually advanced
+        while advance(run)["status"] == "in_progress":
+            await asyncio.sleep(max(0.001, run["_state"]["ready_at"] - time.monotonic()))
+        if run["status"] == "requires_action":
+            yield sse("thread.run.requires_action", public(run))
+        else:
+            yield sse("thread.message.completed", threads[run["thread_id"]][-1])
+            yield sse("thread.run.completed", public(run))
+        yield "event: done\ndata: [DONE]\n\n"
+
+    def respond(run: Dict[str, Any], stream: bool):
+        if stream:
+            return StreamingResponse(run_events(run), media_type="text/event-stream")
+        return public(run)
+
+    @app.post("/v1/assistants")
+    async def create_assistant(request: Request):
+        body = await request.json()
+        assistant = {
+            "id": f"asst_{uuid.uuid4().hex[:24]}", "object": "assistant", "created_at": int(time.time()),
+            "name": body.get("name"), "description": body.get("description"), "model": body.get("model", "mock"),
+            "instructions": body.get("instructions"), "tools": body.get("tools", []),
+            "metadata": body.get("metadata") or {}, "temperature": 1.0, "top_p": 1.0, "response_format": "auto",
+        }
+        assistants[assistant["id"]] = assistant
+        return assistant
+
+    @app.get("/v1/assistants")
+    async def list_assistants():
+        return _page(list(reversed(assistants.values())))
+
+    @app.post("/v1/threads")
+    async def create_thread():
+        thread_id = f"thread_{uuid.uuid4().hex[:24]}"
+        threads[thread_id] = []
+        return {"id": thread_id, "object": "thread", "created_at": int(time.time()), "metadata": {}, "tool_resources": None}
+
+    @app.post("/v1/threads/{thread_id}/messages")
+    async def create_message(thread_id: str, request: Request):
+        body = await request.json()
+        message = _message(thread_id, body.get("role", "user"), body.get("content", ""))
+        thread_messages(thread_id).append(message)
+        return message
+
+    @app.get("/v1/threads/{thread_id}/messages")
+    async def list_messages(thread_id: str):
+        return _page(list(reversed(thread_messages(thread_id))))
+
+    @app.post("/v1/threads/{thread_id}/runs")
+    async def create_run(thread_id: str, request: Request):
+        body = await request.json()
+        messages = thread_messages(thread_id)
+        assistant = assistants.get(body.get("assistant_id"))
+        if assistant is None:
+            raise HTTPException(status_code=404, detail="No assistant found")
+        text = next((m["content"][0]["text"]["value"] for m in reversed(messages) if m["role"] == "user"), "")
+        tool_names = {tool["function"]["name"] for tool in assistant["tools"] if tool.get("type") == "function"}
+        tool_call = None
+        if text.lower().startswith("add "):
+            name = "add_task" if "add_task" in tool_names else "create_task"
+            arguments = {"title": text[4:].strip()}
+            if name == "add_task":
+                arguments["user_id"] = "model-supplied"
+            tool_call = {"id": f"call_{uuid.uuid4().hex[:12]}", "type": "function",
+                         "function": {"name": name, "arguments": json.dumps(arguments)}}
+        run = {
+            "id": f"run_{uuid.uuid4().hex[:24]}", "object": "thread.run", "created_at": int(time.time()),
+            "thread_id": thread_id, "assistant_id": assistant["id"], "status": "queued", "required_action": None,
+            "last_error": None, "expires_at": None, "started_at": None, "cancelled_at": None, "failed_at": None,
+            "completed_at": None, "incomplete_details": None, "model": assistant["model"],
+            "instructions": body.get("instructions") or "", "tools": assistant["tools"], "metadata": {},
+            "usage": None, "max_completion_tokens": None, "max_prompt_tokens": None, "parallel_tool_calls": True,
+            "response_format": "auto", "tool_choice": "auto", "truncation_strategy": None,
+            "_state": {"ready_at": time.monotonic() + latency_ms / 1000.0, "tool_call": tool_call,
+                       "reply": "Done - I've updated your tasks." if tool_call else "Sure - how can I help with your tasks?"},
+        }
+        runs[run["id"]] = run
+        return respond(run, bool(body.get("stream")))
+
+    @app.get("/v1/threads/{thread_id}/runs/{run_id}")
+    async def retrieve_run(thread_id: str, run_id: str):
+        if run_id not in runs:
+            raise HTTPException(status_code=404, detail="No run found")
+        return public(advance(runs[run_id]))
+
+    @app.post("/v1/threads/{thread_id}/runs/{run_id}/submit_tool_outputs")
+    async def submit_tool_outputs(thread_id: str, run_id: str, request: Request):
+        body = await request.json()
+        run = runs.get(run_id)
+        if run is None or run["status"] != "requires_action":
+            raise HTTPException(status_code=400, detail="Run is not waiting for tool outputs")
+        run["_state"].update(tool_call=None, ready_at=time.monotonic() + latency_ms / 1000.0)
+        run.update(status="in_progress", required_action=None)
+        return respond(run, bool(body.get("stream")))
+
+    @app.post("/v1/threads/{thread_id}/runs/{run_id}/cancel")
+    async def cancel_run(thread_id: str, run_id: str):
+        run = runs.get(run_id)
+        if run is None:
+            raise HTTPException(status_code=404, detail="No run found")
+        if run["status"] not in ("completed", "cancelled"):
+            run.update(status="cancelled", cancelled_at=int(time.time()))
+        return public(run)
+
+
+def _chunk(completion_id: str, model: str, delta: Dict[str, Any], finish_reason: Optional[str] = None) -> str:
+    chunk = {
+        "id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()), "model": model,
+        "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+    }
+    return f"data: {json.dumps(chunk)}\n\n"
+
+
+def create_mock_openai_app(latency_ms: float = 0.0, rtt_ms: float = 0.0, token_ms: float = 0.0) -> FastAPI:
+    """
+    Build the mock app. latency_ms is awaited before every completion is returned
+    (and is how long an Assistants run takes); rtt_ms is added to every request;
+    token_ms is the generation time per word of a text reply.
+    """
+    app = FastAPI()
+    app.state.requests = 0
+    app.state.requests_by_route = {}
+
+    @app.middleware("http")
+    async def count_requests(request: Request, call_next):
+        app.state.requests += 1
+        route = request.method + " " + _ROUTE_IDS.sub(r"/{\1}", request.url.path)
+        app.state.requests_by_route[route] = app.state.requests_by_route.get(route, 0) + 1
+        if rtt_ms:
+            await asyncio.sleep(rtt_ms / 1000.0)
+        return await call_next(request)
+
+    _add_assistants_routes(app, latency_ms)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        await asyncio.sleep(latency_ms / 1000.0)
+        messages = body.get("messages", [])
+        prompt_tokens = sum(len((m.get("content") or "").split()) for m in messages)
+        tool_call = _tool_call_for(messages[-1].get("content") or "") if body.get("tools") and messages else None
+        if tool_call is not None:
+            return {
+                "id": f"chatcmpl-{uuid.uuid4().hex}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": None, "tool_calls": [{
+                        "id": f"call_{uuid.uuid4().hex[:12]}",
+                        "type": "function",
+                        "function": {"name": tool_call["name"], "arguments": json.dumps(tool_call["arguments"])},
+                    }]},
+                    "finish_reason": "tool_calls",
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20, "total_tokens": prompt_tokens + 20},
+            }
+        content = _reply_for(messages)
+        words = content.split(" ")
+        if body.get("stream"):
+            completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+            model = body.get("model", "mock")
+
+            async def chunks():
+                yield _chunk(completion_id, model, {"role": "assistant", "content": ""})
+                for i, word in enumerate(words):
+                    yield _chunk(completion_id, model, {"content": word if i == 0 else " " + word})
+                    await asyncio.sleep(token_ms / 1000.0)
+                yield _chunk(completion_id, model, {}, "stop")
+                yield "data: [DONE]\n\n"
+
+            return StreamingResponse(chunks(), media_type="text/event-stream")
+        await asyncio.sleep(len(words) * token_ms / 1000.0)
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "mock"),
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": content},
+                "finish_reason": "stop",
+            }],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": len(content.split()),
+                "total_tokens": prompt_tokens + len(content.split()),
+            },
+        }
+
+    return app
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class MockOpenAIServer:
+    """
+    Runs the mock app with uvicorn in a background thread (context manager).
+    """
+
+    def __init__(self, latency_ms: float = 0.0, port: Optional[int] = None, rtt_ms: float = 0.0,
+                 token_ms: float = 0.0):
+        self.app = create_mock_openai_app(latency_ms, rtt_ms, token_ms)
+        self.port = port or _free_port()
+        self._server = uvicorn.Server(uvicorn.Config(
+            self.app, host="127.0.0.1", port=self.port, log_level="warning", access_log=False
+        ))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.port}/v1"
+
+    @property
+    def request_count(self) -> int:
+        return self.app.state.requests
+
+    @property
+    def requests_by_route(self) -> Dict[str, int]:
+        return dict(self.app.state.requests_by_route)
+
+    def __enter__(self) -> "MockOpenAIServer":
+        self._thread.start()
+        deadline = time.monotonic() + 10
+        while not self._server.started:
+            if time.monotonic() > deadline:
+                raise RuntimeError("Mock OpenAI server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local OpenAI-compatible mock server")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=float, default=300.0)
+    parser.add_argument("--token-ms", type=float, default=0.0)
+    args = parser.parse_args()
+    print(f"Mock OpenAI API on http://127.0.0.1:{args.port}/v1 (latency {args.latency_ms:.0f}ms)")
+    uvicorn.run(create_mock_openai_app(args.latency_ms, token_ms=args.token_ms), host="127.0.0.1", port=args.port,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -5,12 +5,17 @@ Provides JWT-based authentication compatible with Better Auth frontend
 from datetime import datetime, timedelta
 from typing import Optional
 import jwt
-import bcrypt
 from fastapi import HTTPException, status, Header, Depends
+from fastapi.concurrency import run_in_threadpool
 from sqlmodel import Session
-from .database import get_session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from .database import get_session, get_async_session
 from .models import User, TokenData
 from . import crud
+from . import async_crud
+from . import passwords
+from .cache import TTLCache
+from sqlalchemy import event
 import os
 from dotenv import load_dotenv
 
@@ -22,6 +27,11 @@ BETTER_AUTH_SECRET = os.getenv("BETTER_AUTH_SECRET", "your-default-secret-key-ch
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
 
+# Verified-user cache: maps a bearer token to a snapshot of its User so authenticated
+# requests skip the per-request user lookup. Set either value to 0 to disable.
+AUTH_CACHE_MAX_SIZE = int(os.getenv("AUTH_CACHE_MAX_SIZE", "10000"))
+AUTH_CACHE_TTL_SECONDS = float(os.getenv("AUTH_CACHE_TTL_SECONDS", "60"))
+
 
 class BetterAuth:
     """
@@ -65,32 +75,50 @@ class BetterAuth:
 # Global Better Auth instance
 better_auth = BetterAuth(BETTER_AUTH_SECRET)
 
+# Global verified-user cache (token -> User field snapshot)
+token_user_cache = TTLCache(AUTH_CACHE_MAX_SIZE, AUTH_CACHE_TTL_SECONDS)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+
+def invalidate_user_tokens(user_id: str) -> int:
     """
-    Verify a plain password against a hashed password
+    Drop every cached token for a user. Call this after changing a user's
+    is_active flag or credentials outside the ORM (e.g. bulk UPDATE statements).
     """
-    return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+    return token_user_cache.invalidate_where(lambda token, snapshot: snapshot["id"] == user_id)
 
 
-# Dependency to extract and verify token from Authorization header
-async def get_current_user(
-    authorization: str = Header(...),
-    session: Session = Depends(get_session)
-) -> User:
+@event.listens_for(User.is_active, "set")
+def _invalidate_on_deactivation(target: User, value, oldvalue, initiator):
+    # Deactivating a user through the ORM revokes its cached sessions immediately
+    if value is False and target.id is not None:
+        invalidate_user_tokens(target.id)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
-    Get current authenticated user by verifying JWT token from Authorization header.
-    Compatible with Better Auth frontend token storage.
+    Verify a plain password against a hashed password
     """
+    return passwords.verify_password(plain_password, hashed_password)
+
+
+def _bearer_token(authorization: str) -> str:
     # Extract token from "Bearer <token>" format
     try:
-        token = authorization.replace("Bearer ", "")
+        return authorization.replace("Bearer ", "")
     except AttributeError:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid Authorization header format",
         )
 
+
+def _verify_authorization_header(authorization: str) -> TokenData:
+    """
+    Extract the bearer token from an Authorization header and verify it.
+    Raises 401 if the header is malformed or the token is invalid or expired.
+    """
+    token = _bearer_token(authorization)
+
     # Verify token
     token_data = better_auth.verify_token(token)
 
@@ -100,27 +128,94 @@ async def get_current_user(
             detail="Invalid or expired token",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    return token_data
 
-    # Fetch user from database
-    user = crud.get_user_by_id(session, token_data.user_id)
+
+def _user_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="User not found",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+
+
+def _cached_user(authorization: str) -> Optional[User]:
+    """
+    Return a fresh User built from the cached snapshot for this token, if any.
+    The token itself is still verified, so expiry is enforced on every request.
+    """
+    if not token_user_cache.enabled:
+        return None
+    snapshot = token_user_cache.get(_bearer_token(authorization))
+    if snapshot is None:
+        return None
+    _verify_authorization_header(authorization)
+    return User(**snapshot)
+
+
+def _remember_user(authorization: str, user: Optional[User]) -> User:
+    """
+    Reject missing or deactivated users; cache a snapshot of active ones.
+    """
     if user is None:
+        raise _user_not_found()
+    if not user.is_active:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="User not found",
+            detail="User is inactive",
             headers={"WWW-Authenticate": "Bearer"},
         )
-
+    token_user_cache.set(_bearer_token(authorization), user.model_dump())
     return user
 
 
+# Dependency to extract and verify token from Authorization header
+async def get_current_user(
+    authorization: str = Header(...),
+    session: Session = Depends(get_session)
+) -> User:
+    """
+    Get current authenticated user by verifying JWT token from Authorization header.
+    Compatible with Better Auth frontend token storage.
+    Verified users are served from token_user_cache without a database query.
+    """
+    user = _cached_user(authorization)
+    if user is not None:
+        return user
+
+    token_data = _verify_authorization_header(authorization)
+
+    # Fetch user from database
+    user = crud.get_user_by_id(session, token_data.user_id)
+    return _remember_user(authorization, user)
+
+
+async def get_current_user_async(
+    authorization: str = Header(...),
+    session: AsyncSession = Depends(get_async_session)
+) -> User:
+    """
+    Async-database variant of get_current_user, used when USE_ASYNC_DB is enabled.
+    """
+    user = _cached_user(authorization)
+    if user is not None:
+        return user
+
+    token_data = _verify_authorization_header(authorization)
+
+    user = await async_crud.get_user_by_id(session, token_data.user_id)
+    return _remember_user(authorization, user)
+
+
 # Better Auth endpoint handlers
-def register_better_auth_user(email: str, password: str, session: Session) -> dict:
+async def register_better_auth_user(email: str, password: str, session: Session) -> dict:
     """
     Register a new user using Better Auth protocol
     Returns user ID and session token
+    Password hashing is awaited on the bounded bcrypt pool; DB calls run in the threadpool.
     """
     # Check if user already exists
-    existing_user = crud.get_user_by_email(session, email)
+    existing_user = await run_in_threadpool(crud.get_user_by_email, session, email)
     if existing_user:
         raise HTTPException(
             status_code=400,
@@ -128,7 +223,8 @@ def register_better_auth_user(email: str, password: str, session: Session) -> di
         )
 
     # Create new user with hashed password
-    user = crud.create_user(session, email, password)
+    password_hash = await passwords.hash_password_async(password)
+    user = await run_in_threadpool(crud.create_user_with_hash, session, email, password_hash)
     token = better_auth.create_token(str(user.id), email)
 
     return {
@@ -141,13 +237,14 @@ def register_better_auth_user(email: str, password: str, session: Session) -> di
     }
 
 
-def login_better_auth_user(email: str, password: str, session: Session) -> dict:
+async def login_better_auth_user(email: str, password: str, session: Session) -> dict:
     """
     Login a user using Better Auth protocol
     Returns user ID and session token
+    Password verification is awaited on the bounded bcrypt pool; DB calls run in the threadpool.
     """
-    user = crud.get_user_by_email(session, email)
-    if not user or not verify_password(password, user.password_hash):
+    user = await run_in_threadpool(crud.get_user_by_email, session, email)
+    if not user or not await passwords.verify_password_async(password, user.password_hash):
         raise HTTPException(
             status_code=401,
             detail="Incorrect email or password"
@@ -0,0 +1,68 @@
+"""
+Per-request chat context for the agent.
+
+Everything a chat turn reads is loaded once, up front, and passed through the
+orchestrator and MCP handlers instead of being re-queried at each step:
+- the conversation, its pending action and the bounded history (one query), and
+- the user's task snapshot (one query).
+"""
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from sqlmodel import Session
+
+from . import context_window, crud, tracing
+from .models import Conversation, PendingAction, Task
+
+
+@dataclass
+class ChatContext:
+    """
+    Snapshot of the state a chat turn works on.
+    """
+    conversation: Conversation
+    pending_action: Optional[PendingAction]
+    # Rolling summary (as a system message) plus the unsummarized tail, within the token budget
+    history: List[Dict[str, str]]
+    # Unsummarized messages stored for the conversation (before this turn)
+    unsummarized_count: int
+    tasks: List[Task]
+    # User-friendly (1-based) task numbers <-> database IDs
+    id_mapping: Dict[int, int] = field(init=False)
+    db_to_user_id: Dict[int, int] = field(init=False)
+
+    def __post_init__(self):
+        self.id_mapping = {i + 1: t.id for i, t in enumerate(self.tasks)}
+        self.db_to_user_id = {t.id: i + 1 for i, t in enumerate(self.tasks)}
+
+
+def load_chat_context(session: Session, conversation_id: int, user_id: str, message_text: str = "") -> Optional[ChatContext]:
+    """
+    Load the chat context for a conversation in two queries (the FETCH stage of a turn).
+    Returns None if the conversation does not exist or belongs to another user.
+    """
+    with tracing.span("chat.fetch", conversation_id=conversation_id) as span:
+        loaded = crud.get_conversation_with_history(
+            session, conversation_id, user_id,
+            limit=context_window.CHAT_HISTORY_WINDOW + context_window.CHAT_SUMMARY_BATCH - 1
+        )
+        if loaded is None:
+            return None
+        conversation, pending_action, messages = loaded
+
+        history = context_window.fit_to_budget(
+            conversation.summary,
+            [{"role": m.role, "content": m.content} for m in messages],
+            message_text
+        )
+        context = ChatContext(
+            conversation=conversation,
+            pending_action=pending_action,
+            history=history,
+            unsummarized_count=len(messages),
+            tasks=crud.get_tasks_by_user(session, user_id),
+        )
+        span.set_attribute("history_length", len(history))
+        span.set_attribute("task_count", len(context.tasks))
+        span.set_attribute("pending_action", pending_action is not None)
+        return context
@@ -0,0 +1,155 @@
+"""
+Circuit breaker for calls to an unreliable dependency (the LLM provider).
+
+The breaker keeps the outcome of the last `window_size` calls. Once at least
+`min_calls` are recorded and the share of failures reaches `error_rate`, or the share of
+calls slower than `slow_call_seconds` reaches `slow_call_rate`, it opens: calls are
+refused immediately with CircuitOpenError for `open_seconds`. It then goes half-open and
+lets `half_open_calls` trial calls through; if they succeed it closes again, otherwise
+it re-opens.
+
+CircuitOpenError is a RuntimeError, so callers that already fall back on RuntimeError
+degrade without a network attempt while the breaker is open.
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of making a call while the breaker is open."""
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        name: str,
+        error_rate: float = 0.5,
+        slow_call_seconds: float = 10.0,
+        slow_call_rate: float = 0.5,
+        window_size: int = 20,
+        min_calls: int = 5,
+        open_seconds: float = 30.0,
+        half_open_calls: int = 1,
+        is_failure: Optional[Callable[[BaseException], bool]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.min_calls = min_calls
+        self.open_seconds = open_seconds
+        self.half_open_calls = half_open_calls
+        # Exceptions that do not say anything about the dependency's health (e.g. a bad request) pass through
+        self.is_failure = is_failure or (lambda exc: True)
+        self._clock = clock
+        self._lock = threading.Lock()
+        # (failed, slow) per recorded call
+        self._outcomes: deque = deque(maxlen=window_size)
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self.rejected = 0
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._current_state()
+
+    def _current_state(self) -> str:
+        # Called with the lock held; an open breaker turns half-open once its cool-down has passed
+        if self._state == OPEN and self._clock() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_calls = 0
+            logger.info(f"Circuit breaker '{self.name}' half-open")
+        return self._state
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError if the call must not be made."""
+        with self._lock:
+            state = self._current_state()
+            if state == CLOSED:
+                return
+            if state == HALF_OPEN and self._trial_calls < self.half_open_calls:
+                self._trial_calls += 1
+                return
+            self.rejected += 1
+        raise CircuitOpenError(f"Circuit breaker '{self.name}' is open; not calling the service")
+
+    def record(self, success: bool, duration: float) -> None:
+        """Record the outcome of a call that before_call() let through."""
+        slow = duration >= self.slow_call_seconds
+        with self._lock:
+            state = self._current_state()
+            if state == HALF_OPEN:
+                if success and not slow:
+                    self._close()
+                else:
+                    self._open()
+                return
+            self._outcomes.append((not success, slow))
+            if state == CLOSED and len(self._outcomes) >= self.min_calls:
+                failures = sum(1 for failed, _ in self._outcomes if failed)
+                slow_calls = sum(1 for _, was_slow in self._outcomes if was_slow)
+                if (failures / len(self._outcomes) >= self.error_rate
+                        or slow_calls / len(self._outcomes) >= self.slow_call_rate):
+                    self._open()
+
+    def _open(self) -> None:
+        self._state = OPEN
+        self._opened_at = self._clock()
+        self.times_opened += 1
+        logger.warning(f"Circuit breaker '{self.name}' opened for {self.open_seconds}s")
+
+    def _close(self) -> None:
+        self._state = CLOSED
+        self._outcomes.clear()
+        logger.info(f"Circuit breaker '{self.name}' closed")
+
+    @contextmanager
+    def guard(self) -> Iterator[None]:
+        """
+        Run the block as one call: refused with CircuitOpenError while open, and its
+        duration and outcome (an exception counts as a failure, see is_failure) recorded.
+        """
+        self.before_call()
+        start = self._clock()
+        try:
+            yield
+        except BaseException as exc:
+            # Cancellation (or a consumer closing a stream early) is not the service failing
+            failed = isinstance(exc, Exception) and self.is_failure(exc)
+            self.record(not failed, self._clock() - start)
+            raise
+        self.record(True, self._clock() - start)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._close()
+            self.rejected = 0
+            self.times_opened = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            state = self._current_state()
+            calls = len(self._outcomes)
+            return {
+                "state": state,
+                "window_calls": calls,
+                "error_rate": sum(1 for failed, _ in self._outcomes if failed) / calls if calls else 0.0,
+                "slow_call_rate": sum(1 for _, slow in self._outcomes if slow) / calls if calls else 0.0,
+                "rejected": self.rejected,
+                "times_opened": self.times_opened,
+                "retry_in_seconds": max(0.0, self.open_seconds - (self._clock() - self._opened_at)) if state == OPEN else 0.0,
+            }
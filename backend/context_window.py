@@ -0,0 +1,120 @@
+"""
+Bounded conversation context for the chat agent.
+
+Instead of loading every message of a conversation, the agent sees:
+- the conversation's rolling summary (persisted on Conversation.summary), and
+- the unsummarized tail: at most CHAT_HISTORY_WINDOW + CHAT_SUMMARY_BATCH - 1 of the
+  newest messages, fetched with a LIMIT query (see chat_context.load_chat_context),
+trimmed oldest-first to fit CHAT_CONTEXT_TOKEN_BUDGET.
+
+Once the tail reaches CHAT_HISTORY_WINDOW + CHAT_SUMMARY_BATCH messages, everything but the
+newest CHAT_HISTORY_WINDOW is folded into the summary. Folding only sends the previous
+summary plus the new turns to the summarizer, so the summary is never rebuilt from scratch
+and the LLM is called at most once every CHAT_SUMMARY_BATCH messages.
+"""
+from typing import Callable, Dict, List, Optional
+import os
+
+from sqlmodel import Session
+
+from . import crud
+
+# Newest messages always sent verbatim
+CHAT_HISTORY_WINDOW = int(os.getenv("CHAT_HISTORY_WINDOW", "20"))
+# Messages folded into the summary at a time (amortizes the summarizer call)
+CHAT_SUMMARY_BATCH = int(os.getenv("CHAT_SUMMARY_BATCH", "10"))
+# Approximate token budget for summary + history + the current message
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", "3000"))
+CHAT_SUMMARY_MAX_CHARS = int(os.getenv("CHAT_SUMMARY_MAX_CHARS", "2000"))
+
+# Per-message overhead of the chat format (role, separators)
+_MESSAGE_OVERHEAD_TOKENS = 4
+
+Summarizer = Callable[[Optional[str], List[Dict[str, str]]], str]
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Cheap token estimate (about 4 characters per token for English text).
+    """
+    return len(text) // 4 + 1
+
+
+def _message_tokens(message: Dict[str, str]) -> int:
+    return estimate_tokens(message.get("content", "")) + _MESSAGE_OVERHEAD_TOKENS
+
+
+def summary_message(summary: str) -> Dict[str, str]:
+    return {"role": "system", "content": f"Summary of the earlier conversation: {summary}"}
+
+
+def fit_to_budget(
+    summary: Optional[str],
+    history: List[Dict[str, str]],
+    message_text: str,
+    budget: int = CHAT_CONTEXT_TOKEN_BUDGET
+) -> List[Dict[str, str]]:
+    """
+    Build the context (summary first, then history) and drop the oldest history
+    messages until it fits the token budget together with the current message.
+    """
+    context = [summary_message(summary)] if summary else []
+    remaining = budget - estimate_tokens(message_text) - _MESSAGE_OVERHEAD_TOKENS
+    remaining -= sum(_message_tokens(m) for m in context)
+
+    kept = []
+    for message in reversed(history):
+        cost = _message_tokens(message)
+        if cost > remaining:
+            break
+        kept.append(message)
+        remaining -= cost
+    return context + list(reversed(kept))
+
+
+def extractive_summary(previous_summary: Optional[str], messages: List[Dict[str, str]]) -> str:
+    """
+    LLM-free summary: append a shortened line per turn and keep the most recent
+    CHAT_SUMMARY_MAX_CHARS characters. Used when the summarizer is unavailable.
+    """
+    lines = [previous_summary] if previous_summary else []
+    lines += [f"{m['role']}: {m['content'][:200]}" for m in messages]
+    return "\n".join(lines)[-CHAT_SUMMARY_MAX_CHARS:]
+
+
+def roll_summary(
+    session: Session,
+    conversation_id: int,
+    user_id: str,
+    summarize: Optional[Summarizer] = None,
+    unsummarized_count: Optional[int] = None
+) -> bool:
+    """
+    Fold the messages that fell out of the window into the persisted summary,
+    once at least CHAT_SUMMARY_BATCH of them have accumulated.
+    When the caller knows how many unsummarized messages exist, turns that cannot
+    trigger a fold return without querying.
+    Returns True if the summary was updated.
+    """
+    if unsummarized_count is not None and unsummarized_count < CHAT_HISTORY_WINDOW + CHAT_SUMMARY_BATCH:
+        return False
+
+    conversation = crud.get_conversation(session, conversation_id, user_id)
+    if conversation is None:
+        return False
+
+    # Newest unsummarized messages; anything older than this bound (only possible for
+    # conversations that predate summaries) is skipped rather than folded
+    tail = crud.get_recent_messages(
+        session, conversation_id, user_id,
+        limit=CHAT_HISTORY_WINDOW + CHAT_SUMMARY_BATCH * 5,
+        after_id=conversation.summarized_until_id
+    )
+    if len(tail) < CHAT_HISTORY_WINDOW + CHAT_SUMMARY_BATCH:
+        return False
+
+    folded = tail[:len(tail) - CHAT_HISTORY_WINDOW]
+    turns = [{"role": m.role, "content": m.content} for m in folded]
+    summary = (summarize or extractive_summary)(conversation.summary, turns)
+    crud.update_conversation_summary(session, conversation, summary, folded[-1].id)
+    return True
@@ -1,9 +1,66 @@
-from sqlmodel import Session, select
-from typing import List, Optional
-from .models import Task, User, Message, Conversation
-import bcrypt
+from sqlmodel import Session, select, or_, and_
+from sqlalchemy import insert, update, delete, func, inspect
+from sqlalchemy.orm.attributes import set_committed_value
+from typing import List, Optional, Tuple, Dict, Any, Callable, TypeVar
+from datetime import datetime, timezone, timedelta
+from .models import Task, User, Message, Conversation, TaskBatchOperation, PendingAction
+from . import passwords
+from .tracing import traced
+import base64
+import json
+import os
 
+# Task listing page sizes (keyset pagination)
+TASKS_DEFAULT_PAGE_SIZE = int(os.getenv("TASKS_DEFAULT_PAGE_SIZE", "50"))
+TASKS_MAX_PAGE_SIZE = int(os.getenv("TASKS_MAX_PAGE_SIZE", "200"))
 
+TASK_STATUS_FILTERS = ("all", "pending", "completed")
+
+# Maximum number of operations accepted by apply_task_batch
+TASKS_MAX_BATCH_SIZE = int(os.getenv("TASKS_MAX_BATCH_SIZE", "1000"))
+
+# How long a destructive chat operation waits for the user's confirmation
+PENDING_ACTION_TTL_SECONDS = int(os.getenv("PENDING_ACTION_TTL_SECONDS", "600"))
+
+T = TypeVar("T")
+
+
+def _write(session: Session, write: Callable[[Session], T], commit: bool = True, merge: bool = True) -> T:
+    """
+    Run write(session) and commit it. When the session carries the SQLite writer
+    (database.get_session, see sqlite_profile.py) the write runs on the writer's session
+    instead and is group-committed with other requests' writes. A row it returns is then
+    merged into this session (unless merge=False), so a copy the request already loaded
+    shows the new values, as it does when the write runs here. With commit=False (and no
+    writer) the commit is left to the caller.
+    """
+    writer = session.info.get("sqlite_writer")
+    if writer is not None:
+        result = writer.submit(write)
+        if merge and inspect(result, raiseerr=False) is not None:
+            result = session.merge(result, load=False)
+        return result
+    result = write(session)
+    if commit:
+        session.commit()
+    return result
+
+
+def _forget(session: Session, model, ids, deleted: bool = False) -> None:
+    """
+    Drop this session's loaded copies of rows written without it: expired (reloaded on
+    next access), or expunged when the rows were deleted.
+    """
+    for row_id in ids:
+        row = session.identity_map.get(session.identity_key(model, row_id))
+        if row is not None:
+            if deleted:
+                session.expunge(row)
+            else:
+                session.expire(row)
+
+
+@traced
 def get_tasks(session: Session) -> List[Task]:
     """
     Retrieve all tasks from the database.
@@ -12,6 +69,7 @@ def get_tasks(session: Session) -> List[Task]:
     return tasks
 
 
+@traced
 def get_task(session: Session, task_id: int) -> Optional[Task]:
     """
     Retrieve a specific task by ID from the database.
@@ -20,79 +78,346 @@ def get_task(session: Session, task_id: int) -> Optional[Task]:
     return task
 
 
+@traced
 def create_task(session: Session, title: str, description: Optional[str], user_id: str) -> Task:
     """
-    Create a new task in the database.
+    Create a new task in the database (one INSERT; the id comes back with it, so there is
+    no refresh, and expire_on_commit=False sessions keep the object loaded).
     """
     task = Task(title=title, description=description, completed=False, user_id=user_id)
-    session.add(task)
-    session.commit()
-    session.refresh(task)
+    _write(session, lambda s: s.add(task))
     return task
 
 
+@traced
 def update_task(session: Session, task_id: int, user_id: str, title: Optional[str] = None, description: Optional[str] = None, completed: Optional[bool] = None) -> Optional[Task]:
-    task = get_task_by_user(session, task_id, user_id)
-    if task:
-        if title is not None:
-            task.title = title
-        if description is not None:
-            task.description = description
-        if completed is not None:
-            # Apply completion constraint: can only go false→true
-            if task.completed == True and completed == False:
-                # Cannot revert a completed task to incomplete
-                pass  # Don't update the completion status
-            else:
-                task.completed = completed
-        session.add(task)
-        session.commit()
-        session.refresh(task)
-    return task
+    """
+    Update a user's task with a single UPDATE ... RETURNING.
+    Returns the updated task, or None if the user has no task with this id.
+    """
+    statement = _task_update_statement(task_id, user_id, title, description, completed)
+    return _write(session, lambda s: s.scalars(statement).first())
 
 
+@traced
 def delete_task(session: Session, task_id: int, user_id: str) -> bool:
     """
     Delete a task from the database by ID.
     """
-    task = get_task_by_user(session, task_id, user_id)
-    if task:
-        session.delete(task)
-        session.commit()
-        return True
-    return False
+    return pop_task(session, task_id, user_id) is not None
 
 
+@traced
+def pop_task(session: Session, task_id: int, user_id: str) -> Optional[Task]:
+    """
+    Delete a user's task with a single DELETE ... RETURNING and return it as it was
+    (detached from the session). Returns None if the user has no task with this id.
+    """
+    def write(s: Session) -> Optional[Task]:
+        task = s.scalars(_task_delete_statement(task_id, user_id)).first()
+        if task is not None:
+            # Loading the returned row put it back in the identity map
+            s.expunge(task)
+        return task
+
+    task = _write(session, write, merge=False)
+    # The writer deleted the row: a copy this session loaded is gone too
+    _forget(session, Task, [task_id], deleted=True)
+    return task
+
+
+@traced
 def toggle_task_completion(session: Session, task_id: int, user_id: str) -> Optional[Task]:
     """
     Toggle the completion status of a task in the database.
     NOTE: This function is being kept for backwards compatibility with Phase II,
     but for Phase III compliance, use update_task with completed=True only.
     """
-    task = get_task_by_user(session, task_id, user_id)
-    if task:
-        # Apply completion constraint: can only go false→true
-        if task.completed == True:
-            # Task is already completed, can't toggle back to incomplete
-            return task
-        else:
-            # Task is incomplete, can toggle to completed
-            task.completed = True
-            session.add(task)
-            session.commit()
-            session.refresh(task)
+    statement = _task_complete_statement(task_id, user_id)
+    task = _write(session, lambda s: s.scalars(statement).first())
+    if task is None:
+        # Already completed (returned unchanged), or not the user's task
+        return get_task_by_user(session, task_id, user_id)
     return task
 
 
-def get_tasks_by_user(session: Session, user_id: str) -> List[Task]:
+def _task_update_statement(task_id: int, user_id: str, title: Optional[str], description: Optional[str], completed: Optional[bool]):
     """
-    Retrieve all tasks for a specific user from the database.
+    UPDATE ... RETURNING for update_task, scoped to the owner. Completion can only go
+    false→true, so completed=False never changes a row and is left out of the SET.
     """
-    statement = select(Task).where(Task.user_id == user_id)
+    values: Dict[str, Any] = {"updated_at": datetime.utcnow()}
+    if title is not None:
+        values["title"] = title
+    if description is not None:
+        values["description"] = description
+    if completed:
+        values["completed"] = True
+    return update(Task).where(Task.id == task_id, Task.user_id == user_id).values(**values).returning(Task)
+
+
+def _task_complete_statement(task_id: int, user_id: str):
+    """
+    UPDATE ... RETURNING that completes a user's task. The false→true rule is part of the
+    WHERE clause, so an already completed task matches no row and is left untouched.
+    """
+    return (
+        update(Task)
+        .where(Task.id == task_id, Task.user_id == user_id, Task.completed == False)  # noqa: E712
+        .values(completed=True, updated_at=datetime.utcnow())
+        .returning(Task)
+    )
+
+
+def _task_delete_statement(task_id: int, user_id: str):
+    """
+    DELETE ... RETURNING for a user's task.
+    """
+    return delete(Task).where(Task.id == task_id, Task.user_id == user_id).returning(Task)
+
+
+@traced
+def apply_task_batch(session: Session, user_id: str, operations: List[TaskBatchOperation]) -> List[Dict[str, Any]]:
+    """
+    Apply a mixed list of create/update/complete/delete operations for a user in a single transaction.
+
+    Referenced tasks are loaded with one SELECT, the operations are applied in order in memory,
+    and the outcome is written with at most one bulk INSERT, one bulk UPDATE and one DELETE,
+    followed by a single commit. Returns one result dict per operation (see TaskBatchResult).
+    Raises ValueError if the batch exceeds TASKS_MAX_BATCH_SIZE.
+    """
+    if len(operations) > TASKS_MAX_BATCH_SIZE:
+        raise ValueError(f"A batch may contain at most {TASKS_MAX_BATCH_SIZE} operations")
+
+    def write(s: Session) -> List[Dict[str, Any]]:
+        # The lookup is part of the write, so the plan cannot act on stale rows
+        existing = {}
+        select_statement = _task_batch_select(user_id, operations)
+        if select_statement is not None:
+            existing = {task.id: _task_state(task) for task in s.exec(select_statement).all()}
+
+        plan = _plan_task_batch(user_id, operations, existing)
+
+        if plan["inserts"]:
+            created = s.scalars(insert(Task).returning(Task), plan["inserts"]).all()
+            _apply_created_tasks(plan, created)
+        if plan["updates"]:
+            s.execute(update(Task), plan["updates"])
+        if plan["deleted_ids"]:
+            s.execute(delete(Task).where(Task.user_id == user_id, Task.id.in_(plan["deleted_ids"])))
+        return plan
+
+    plan = _write(session, write)
+    # Bulk UPDATE by primary key (and the writer) leave loaded copies as they were
+    _forget(session, Task, [row["id"] for row in plan["updates"]])
+    _forget(session, Task, plan["deleted_ids"], deleted=True)
+    return plan["results"]
+
+
+def _task_batch_select(user_id: str, operations: List[TaskBatchOperation]):
+    """
+    SELECT for the existing tasks referenced by a batch, or None if it references none.
+    """
+    referenced_ids = {op.task_id for op in operations if op.op != "create" and op.task_id is not None}
+    if not referenced_ids:
+        return None
+    return select(Task).where(Task.user_id == user_id, Task.id.in_(referenced_ids))
+
+
+def _plan_task_batch(user_id: str, operations: List[TaskBatchOperation], existing: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Apply batch operations in order to the in-memory task states and work out the writes.
+    Returns the per-item results plus the rows to INSERT, the rows to UPDATE and the ids to DELETE.
+    """
+    now = datetime.utcnow()
+    results = []
+    pending_inserts = []  # (result, row) pairs, in operation order
+    dirty_ids = set()
+    deleted_ids = set()
+
+    for index, op in enumerate(operations):
+        result = {"index": index, "op": op.op, "status": None, "task_id": op.task_id, "task": None, "error": None}
+        results.append(result)
+
+        if op.op == "create":
+            title = (op.title or "").strip()
+            if not title:
+                result.update(status="invalid", error="Title must be non-empty")
+                continue
+            pending_inserts.append((result, {
+                "user_id": user_id, "title": title, "description": op.description,
+                "completed": False, "created_at": now, "updated_at": now,
+            }))
+            result["status"] = "created"
+            continue
+
+        if op.task_id is None:
+            result.update(status="invalid", error="task_id is required")
+            continue
+        state = existing.get(op.task_id)
+        if state is None or op.task_id in deleted_ids:
+            result.update(status="not_found", error="Task not found")
+            continue
+
+        if op.op == "delete":
+            deleted_ids.add(op.task_id)
+            dirty_ids.discard(op.task_id)
+            result.update(status="deleted", task=dict(state))
+            continue
+
+        if op.op == "complete":
+            changed = not state["completed"]
+            state["completed"] = True
+            result["status"] = "completed"
+        else:
+            if op.title is not None and op.title.strip():
+                state["title"] = op.title.strip()
+            if op.description is not None:
+                state["description"] = op.description
+            # Apply completion constraint: can only go false→true
+            if op.completed is not None and not (state["completed"] and op.completed is False):
+                state["completed"] = op.completed
+            changed = True
+            result["status"] = "updated"
+
+        if changed:
+            state["updated_at"] = now
+            dirty_ids.add(op.task_id)
+        result["task"] = dict(state)
+
+    return {
+        "results": results,
+        "pending_inserts": pending_inserts,
+        "inserts": [row for _, row in pending_inserts],
+        "updates": [
+            {key: existing[task_id][key] for key in ("id", "title", "description", "completed", "updated_at")}
+            for task_id in sorted(dirty_ids)
+        ],
+        "deleted_ids": deleted_ids,
+    }
+
+
+def _apply_created_tasks(plan: Dict[str, Any], created: List[Task]) -> None:
+    """
+    Fill the results of create operations from the rows returned by the bulk INSERT.
+    """
+    # Ids are assigned in VALUES order, so sorting by id restores operation order
+    # (sort_by_parameter_order would fall back to one INSERT per row on SQLite)
+    for (result, _), task in zip(plan["pending_inserts"], sorted(created, key=lambda t: t.id)):
+        result.update(task_id=task.id, task=_task_state(task))
+
+
+def _task_state(task: Task) -> Dict[str, Any]:
+    return {
+        "id": task.id,
+        "user_id": task.user_id,
+        "title": task.title,
+        "description": task.description,
+        "completed": task.completed,
+        "created_at": task.created_at,
+        "updated_at": task.updated_at,
+    }
+
+
+@traced
+def get_tasks_by_user(session: Session, user_id: str, status: Optional[str] = None, updated_since: Optional[datetime] = None) -> List[Task]:
+    """
+    Retrieve all tasks for a specific user from the database, oldest first.
+    Optional status ("all", "pending", "completed") and updated_since filters are applied in SQL.
+    """
+    statement = _filter_user_tasks(select(Task), user_id, status, updated_since)
+    statement = statement.order_by(Task.created_at, Task.id)
     tasks = session.exec(statement).all()
     return tasks
 
 
+@traced
+def get_tasks_page(
+    session: Session,
+    user_id: str,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    updated_since: Optional[datetime] = None
+) -> Tuple[List[Task], Optional[str]]:
+    """
+    Retrieve one page of a user's tasks using keyset pagination on (created_at, id).
+    Returns the tasks and an opaque cursor for the next page (None on the last page).
+    Raises ValueError for an invalid cursor or status filter.
+    """
+    statement, limit = _task_page_statement(user_id, limit, cursor, status, updated_since)
+    tasks = session.exec(statement).all()
+    return _split_task_page(tasks, limit)
+
+
+def _task_page_statement(user_id: str, limit: Optional[int], cursor: Optional[str], status: Optional[str], updated_since: Optional[datetime]):
+    """
+    Build the keyset page query. Returns the statement and the effective page size.
+    """
+    limit = min(limit or TASKS_DEFAULT_PAGE_SIZE, TASKS_MAX_PAGE_SIZE)
+    statement = _filter_user_tasks(select(Task), user_id, status, updated_since)
+
+    if cursor:
+        after_created_at, after_id = decode_task_cursor(cursor)
+        statement = statement.where(or_(
+            Task.created_at > after_created_at,
+            and_(Task.created_at == after_created_at, Task.id > after_id)
+        ))
+
+    # Fetch one extra row to know whether another page exists
+    statement = statement.order_by(Task.created_at, Task.id).limit(limit + 1)
+    return statement, limit
+
+
+def _split_task_page(tasks: List[Task], limit: int) -> Tuple[List[Task], Optional[str]]:
+    next_cursor = None
+    if len(tasks) > limit:
+        tasks = tasks[:limit]
+        next_cursor = encode_task_cursor(tasks[-1])
+    return tasks, next_cursor
+
+
+def encode_task_cursor(task: Task) -> str:
+    """
+    Encode the (created_at, id) keyset position of a task as an opaque URL-safe cursor.
+    """
+    payload = json.dumps({"c": task.created_at.isoformat(), "i": task.id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_task_cursor(cursor: str) -> Tuple[datetime, int]:
+    """
+    Decode a cursor produced by encode_task_cursor. Raises ValueError if it is malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["c"]), int(payload["i"])
+    except (ValueError, TypeError, KeyError, UnicodeError):
+        raise ValueError("Invalid cursor")
+
+
+def _filter_user_tasks(statement, user_id: str, status: Optional[str], updated_since: Optional[datetime]):
+    """
+    Apply the per-user scope and the optional status / updated_since filters to a task query.
+    """
+    if status not in (None, *TASK_STATUS_FILTERS):
+        raise ValueError(f"Invalid status filter '{status}'. Use one of: {', '.join(TASK_STATUS_FILTERS)}")
+
+    statement = statement.where(Task.user_id == user_id)
+    if status == "pending":
+        statement = statement.where(Task.completed == False)  # noqa: E712
+    elif status == "completed":
+        statement = statement.where(Task.completed == True)  # noqa: E712
+    if updated_since is not None:
+        # Timestamps are stored as naive UTC
+        if updated_since.tzinfo is not None:
+            updated_since = updated_since.astimezone(timezone.utc).replace(tzinfo=None)
+        statement = statement.where(Task.updated_at >= updated_since)
+    return statement
+
+
+@traced
 def get_task_by_user(session: Session, task_id: int, user_id: str) -> Optional[Task]:
     """
     Retrieve a specific task by ID for a specific user from the database.
@@ -102,6 +427,7 @@ def get_task_by_user(session: Session, task_id: int, user_id: str) -> Optional[T
     return task
 
 
+@traced
 def get_user_by_email(session: Session, email: str) -> Optional[User]:
     """
     Retrieve a user by their email from the database.
@@ -111,6 +437,7 @@ def get_user_by_email(session: Session, email: str) -> Optional[User]:
     return user
 
 
+@traced
 def get_user_by_id(session: Session, user_id: str) -> Optional[User]:
     """
     Retrieve a user by their ID from the database.
@@ -120,35 +447,40 @@ def get_user_by_id(session: Session, user_id: str) -> Optional[User]:
     return user
 
 
+@traced
 def create_user(session: Session, email: str, password: str) -> User:
     """
     Create a new user in the database with hashed password.
     """
-    # Hash the password
-    hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    # Hash the password (on the bounded bcrypt pool, see passwords.py)
+    return create_user_with_hash(session, email, passwords.hash_password(password))
+
 
+@traced
+def create_user_with_hash(session: Session, email: str, password_hash: str) -> User:
+    """
+    Create a new user in the database from an already hashed password.
+    """
     # Create new user instance
-    user = User(email=email, password_hash=hashed_password)
+    user = User(email=email, password_hash=password_hash)
 
-    # Add to session and commit
-    session.add(user)
-    session.commit()
-    session.refresh(user)
+    # Add to session and commit (no refresh: every column is set client-side)
+    _write(session, lambda s: s.add(user))
 
     return user
 
 
+@traced
 def create_conversation(session: Session, user_id: str) -> Conversation:
     """
     Create a new conversation in the database.
     """
     conversation = Conversation(user_id=user_id)
-    session.add(conversation)
-    session.commit()
-    session.refresh(conversation)
+    _write(session, lambda s: s.add(conversation))
     return conversation
 
 
+@traced
 def get_conversation(session: Session, conversation_id: int, user_id: str) -> Optional[Conversation]:
     """
     Retrieve a specific conversation by ID for a specific user from the database.
@@ -158,6 +490,7 @@ def get_conversation(session: Session, conversation_id: int, user_id: str) -> Op
     return conversation
 
 
+@traced
 def get_messages(session: Session, conversation_id: int, user_id: str) -> List[Message]:
     """
     Retrieve conversation history for a specific conversation and user.
@@ -170,6 +503,107 @@ def get_messages(session: Session, conversation_id: int, user_id: str) -> List[M
     return session.exec(statement).all()
 
 
+@traced
+def get_recent_messages(
+    session: Session,
+    conversation_id: int,
+    user_id: str,
+    limit: int,
+    after_id: Optional[int] = None
+) -> List[Message]:
+    """
+    Retrieve the newest `limit` messages of a conversation (optionally only those with
+    id > after_id), returned oldest first. Uses a LIMIT query on the
+    (conversation_id, user_id, created_at) index instead of loading the whole history.
+    """
+    statement = select(Message).where(
+        Message.conversation_id == conversation_id,
+        Message.user_id == user_id
+    )
+    if after_id is not None:
+        statement = statement.where(Message.id > after_id)
+    statement = statement.order_by(Message.created_at.desc(), Message.id.desc()).limit(limit)
+    return list(reversed(session.exec(statement).all()))
+
+
+@traced
+def get_conversation_with_history(
+    session: Session,
+    conversation_id: int,
+    user_id: str,
+    limit: int
+) -> Optional[Tuple[Conversation, Optional[PendingAction], List[Message]]]:
+    """
+    Load a conversation, its pending action and its newest `limit` unsummarized messages
+    (id > summarized_until_id, returned oldest first) in a single query.
+    Returns None if the conversation does not exist or belongs to another user.
+    """
+    statement = (
+        select(Conversation, PendingAction, Message)
+        .outerjoin(PendingAction, and_(
+            PendingAction.conversation_id == Conversation.id,
+            PendingAction.user_id == Conversation.user_id
+        ))
+        .outerjoin(Message, and_(
+            Message.conversation_id == Conversation.id,
+            Message.user_id == Conversation.user_id,
+            Message.id > func.coalesce(Conversation.summarized_until_id, 0)
+        ))
+        .where(Conversation.id == conversation_id, Conversation.user_id == user_id)
+        .order_by(Message.created_at.desc(), Message.id.desc())
+        .limit(limit)
+    )
+    rows = session.exec(statement).all()
+    if not rows:
+        return None
+    conversation, pending, _ = rows[0]
+    messages = [message for _, _, message in reversed(rows) if message is not None]
+    return conversation, pending, messages
+
+
+@traced
+def update_conversation_summary(session: Session, conversation: Conversation, summary: str, summarized_until_id: int) -> Conversation:
+    """
+    Store a conversation's rolling summary and the last message id it covers.
+    """
+    return _update_conversation(session, conversation, summary=summary, summarized_until_id=summarized_until_id,
+                                updated_at=datetime.utcnow())
+
+
+@traced
+def set_conversation_thread(session: Session, conversation: Conversation, thread_id: str) -> Conversation:
+    """
+    Remember the Assistants API thread that holds a conversation.
+    """
+    return _update_conversation(session, conversation, assistant_thread_id=thread_id)
+
+
+def _update_conversation(session: Session, conversation: Conversation, **values: Any) -> Conversation:
+    """
+    Write columns of a loaded conversation with one UPDATE by primary key and mirror them on
+    the object as committed state (it is not dirtied, whichever session writes the row).
+    """
+    statement = update(Conversation).where(Conversation.id == conversation.id).values(**values)
+    _write(session, lambda s: s.execute(statement))
+    for key, value in values.items():
+        set_committed_value(conversation, key, value)
+    return conversation
+
+
+@traced
+def save_messages(session: Session, conversation_id: int, user_id: str, messages: List[Tuple[str, str]]) -> List[Message]:
+    """
+    Persist several (role, content) messages in one transaction, e.g. a chat turn.
+    """
+    rows = [
+        Message(conversation_id=conversation_id, user_id=user_id, role=role, content=content)
+        for role, content in messages
+    ]
+    _write(session, lambda s: s.add_all(rows))
+    return rows
+
+
+@traced
 def save_message(session: Session, conversation_id: int, user_id: str, role: str, content: str) -> Message:
     """
     Persist a message to the database.
@@ -180,7 +614,56 @@ def save_message(session: Session, conversation_id: int, user_id: str, role: str
         role=role,
         content=content
     )
-    session.add(message)
-    session.commit()
-    session.refresh(message)
+    _write(session, lambda s: s.add(message))
     return message
+
+
+@traced
+def set_pending_action(
+    session: Session,
+    conversation_id: int,
+    user_id: str,
+    operation: str,
+    task_id: int,
+    new_title: Optional[str] = None
+) -> PendingAction:
+    """
+    Record the destructive operation awaiting confirmation in a conversation,
+    replacing any previous one.
+    """
+    now = datetime.utcnow()
+
+    def write(s: Session) -> PendingAction:
+        pending = s.get(PendingAction, conversation_id)
+        if pending is None:
+            pending = PendingAction(conversation_id=conversation_id, user_id=user_id, operation=operation,
+                                    task_id=task_id, expires_at=now)
+        pending.user_id = user_id
+        pending.operation = operation
+        pending.task_id = task_id
+        pending.new_title = new_title
+        pending.created_at = now
+        pending.expires_at = now + timedelta(seconds=PENDING_ACTION_TTL_SECONDS)
+        s.add(pending)
+        return pending
+
+    return _write(session, write)
+
+
+@traced
+def pop_pending_action(session: Session, conversation_id: int, user_id: str, commit: bool = True) -> Optional[PendingAction]:
+    """
+    Remove and return the conversation's pending action (primary-key lookup).
+    Returns None if there is none, it belongs to another user, or it has expired.
+    With commit=False the delete is left to the caller's next commit (the SQLite writer
+    always commits it right away).
+    """
+    pending = session.get(PendingAction, conversation_id)
+    if pending is None or pending.user_id != user_id:
+        return None
+    expired = pending.expires_at <= datetime.utcnow()
+    if session.info.get("sqlite_writer") is not None:
+        # The writer deletes the row; the loaded object is detached from the request's session
+        session.expunge(pending)
+    _write(session, lambda s: s.delete(s.merge(pending, load=False)), commit=commit)
+    return None if expired else pending
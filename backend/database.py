@@ -1,8 +1,19 @@
 from sqlmodel import create_engine, Session, SQLModel
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.engine import make_url
+from typing import Generator, AsyncGenerator
 import os
 from dotenv import load_dotenv
 
+try:
+    from .metrics import instrument_engine
+    from . import query_profiler
+    from .sqlite_profile import SQLiteWriter, SQLITE_WRITE_QUEUE, apply_pragmas, is_file_database
+except ImportError:
+    from metrics import instrument_engine
+    import query_profiler
+    from sqlite_profile import SQLiteWriter, SQLITE_WRITE_QUEUE, apply_pragmas, is_file_database
+
 # Load .env from the backend folder
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
@@ -41,14 +52,93 @@ if DATABASE_URL.startswith("postgresql"):
         }
     )
 else:
-    # SQLite configuration
-    engine = create_engine(DATABASE_URL, echo=False)
+    # SQLite configuration; the chat endpoint hands its session to worker threads
+    engine = create_engine(DATABASE_URL, echo=False, connect_args={"check_same_thread": False})
+
+# Query counts/durations and pool checkout waits for GET /metrics
+instrument_engine(engine)
+# Per-request query profile, slow-query log and N+1 warnings
+query_profiler.install(engine)
+
+# Production SQLite profile (see sqlite_profile.py): WAL and tuned pragmas on every
+# connection, and writes funnelled through one group-committing writer thread
+sqlite_writer = None
+if is_file_database(DATABASE_URL):
+    apply_pragmas(engine)
+    if SQLITE_WRITE_QUEUE:
+        sqlite_writer = SQLiteWriter(DATABASE_URL)
+        instrument_engine(sqlite_writer.engine)
+        query_profiler.install(sqlite_writer.engine)
+
+# Async database mode (asyncpg for PostgreSQL, aiosqlite for SQLite).
+# When enabled, the task API is served by async handlers using AsyncSession;
+# the sync engine stays available so both paths can be benchmarked side by side.
+USE_ASYNC_DB = os.getenv("USE_ASYNC_DB", "false").lower() in ("1", "true", "yes")
+
+_async_engine = None
+
+
+def get_async_database_url(database_url: str = DATABASE_URL) -> str:
+    """
+    Map a sync database URL to its async driver equivalent.
+    """
+    url = make_url(database_url)
+    if url.get_backend_name() == "postgresql":
+        # asyncpg takes ssl as a connect argument instead of the libpq sslmode parameter
+        url = url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+    return url.render_as_string(hide_password=False)
+
+
+def create_async_db_engine(database_url: str = DATABASE_URL):
+    """
+    Create an async engine for the given (sync-style) database URL.
+    """
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    async_url = get_async_database_url(database_url)
+    if async_url.startswith("postgresql"):
+        return create_async_engine(
+            async_url,
+            echo=False,
+            pool_size=5,
+            max_overflow=10,
+            pool_pre_ping=True,
+            connect_args={"ssl": "require"},  # Required for Neon
+        )
+    return create_async_engine(async_url, echo=False)
+
+
+def get_async_engine():
+    """
+    Return the process-wide async engine, creating it on first use.
+    """
+    global _async_engine
+    if _async_engine is None:
+        _async_engine = create_async_db_engine()
+        instrument_engine(_async_engine.sync_engine)
+        query_profiler.install(_async_engine.sync_engine)
+    return _async_engine
+
 
 def get_session() -> Generator[Session, None, None]:
     """
     Dependency function to get a database session for FastAPI.
+    Objects stay loaded after commit, so a crud mutation is a single round-trip.
+    With the SQLite writer enabled, crud sends its writes through it (see crud._write).
     """
-    with Session(engine) as session:
+    with Session(engine, expire_on_commit=False) as session:
+        if sqlite_writer is not None:
+            session.info["sqlite_writer"] = sqlite_writer
+        yield session
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Dependency function to get an async database session for FastAPI.
+    Objects stay usable after commit, so handlers can serialize them without a refresh.
+    """
+    async with AsyncSession(get_async_engine(), expire_on_commit=False) as session:
         yield session
 
 def init_db():
@@ -57,8 +147,16 @@ def init_db():
     """
     try:
         # Try relative import first (for when running as module)
-        from .models import User, Task, Conversation, Message  # Import models here to register them with SQLModel
+        from .models import User, Task, Conversation, Message, PendingAction  # Import models here to register them with SQLModel
     except ImportError:
         # Fallback to absolute import (for when running as script)
-        from models import User, Task, Conversation, Message  # Import models here to register them with SQLModel
+        from models import User, Task, Conversation, Message, PendingAction  # Import models here to register them with SQLModel
     SQLModel.metadata.create_all(engine)
+
+
+def close_db():
+    """
+    Commit the writes still queued for the SQLite writer and stop it.
+    """
+    if sqlite_writer is not None:
+        sqlite_writer.close()
@@ -0,0 +1,166 @@
+"""
+Rule-based fast path for unambiguous chat commands.
+
+Commands such as "list my tasks" or "complete task 3" do not need an LLM round-trip
+to be understood. route() matches the message against a small set of precompiled,
+anchored patterns and returns an intent in the same shape as
+OpenAIClient.classify_intent, together with a confidence score. The orchestrator acts
+on it directly when the confidence reaches INTENT_ROUTER_MIN_CONFIDENCE and otherwise
+falls through to the LLM classifier, so anything the rules are unsure about (free-form
+phrasing, compound requests, titles that match several tasks) still goes to the model.
+
+Task numbers in messages are the user-friendly 1-based positions shown by "list my
+tasks"; they are resolved to database IDs against the request's task snapshot.
+"""
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+import os
+import re
+
+# Minimum confidence for acting on a routed intent without the LLM (set above 1 to disable)
+INTENT_ROUTER_MIN_CONFIDENCE = float(os.getenv("INTENT_ROUTER_MIN_CONFIDENCE", "0.9"))
+
+_POLITE = r"(?:(?:please|pls|can you|could you)\s+)?"
+_TASK_NUMBER = r"(?:task\s+)?(?:number\s+|no\.?\s*|#)?(?P<number>\d+)"
+_END = r"\s*[.!]*\s*$"
+
+_READ = re.compile(
+    rf"^{_POLITE}(?:(?:list|show|display|view|see|get)(?:\s+me)?(?:\s+(?:all(?:\s+of)?|my|all\s+my|the|all\s+the))?"
+    rf"\s+(?:tasks|todos|to-dos|todo\s+list|to-do\s+list|list)"
+    rf"|(?:what\s+are\s+)?my\s+(?:tasks|todos)\??"
+    rf"|what(?:'s|\s+is)\s+on\s+my\s+(?:todo\s+|to-do\s+)?list\??){_END}",
+    re.IGNORECASE,
+)
+_COMPLETE_NUMBER = re.compile(
+    rf"^{_POLITE}(?:complete|finish|check\s+off|mark)\s+{_TASK_NUMBER}(?:\s+as)?(?:\s+(?:done|complete|completed|finished))?{_END}",
+    re.IGNORECASE,
+)
+_NUMBER_DONE = re.compile(rf"^{_TASK_NUMBER}\s+(?:is\s+)?(?:done|completed|finished){_END}", re.IGNORECASE)
+_COMPLETE_TITLE = re.compile(
+    rf"^{_POLITE}(?:complete|finish|check\s+off|mark)\s+(?P<title>.+?)(?:\s+as\s+(?:done|complete|completed|finished))?{_END}",
+    re.IGNORECASE,
+)
+_DELETE_NUMBER = re.compile(rf"^{_POLITE}(?:delete|remove|drop)\s+{_TASK_NUMBER}{_END}", re.IGNORECASE)
+_DELETE_TITLE = re.compile(rf"^{_POLITE}(?:delete|remove|drop)\s+(?P<title>.+?){_END}", re.IGNORECASE)
+_RENAME_NUMBER = re.compile(
+    rf"^{_POLITE}(?:rename|update|change|edit)\s+{_TASK_NUMBER}\s+to\s+(?P<new_title>.+?){_END}",
+    re.IGNORECASE,
+)
+_CREATE = re.compile(
+    rf"^{_POLITE}(?:add|create|new\s+task:?|remind\s+me\s+to)\s+(?:(?:a\s+)?(?:new\s+)?task\s*:?\s+)?"
+    rf"(?P<title>.+?)(?:\s+to\s+my\s+(?:todo\s+|to-do\s+)?list)?{_END}",
+    re.IGNORECASE,
+)
+
+# Phrases that make a command compound or conditional; those go to the LLM
+_AMBIGUOUS = re.compile(r"\?|\b(?:and then|and also|also|then|but|unless|if|instead|or)\b", re.IGNORECASE)
+_QUOTES = "'\"“”‘’"
+_PLACEHOLDER_TITLES = frozenset(["task", "a task", "new task", "a new task", "something", "it", "this", "that"])
+
+
+@dataclass
+class RoutedIntent:
+    """
+    Result of the fast-path classifier. `data` uses the classify_intent format.
+    """
+    intent: str
+    confidence: float
+    rule: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def is_confident(self) -> bool:
+        return self.confidence >= INTENT_ROUTER_MIN_CONFIDENCE
+
+
+_NO_MATCH = RoutedIntent(intent="unknown", confidence=0.0)
+
+
+def _intent(intent: str, confidence: float, rule: str, **data: Any) -> RoutedIntent:
+    data = {"intent": intent, "needs_confirmation": False, **data}
+    return RoutedIntent(intent=intent, confidence=confidence, rule=rule, data=data)
+
+
+def _clean_title(title: str) -> str:
+    return title.strip().strip(_QUOTES).strip()
+
+
+def _task_for_number(number: str, tasks: List) -> Optional[Any]:
+    index = int(number) - 1
+    return tasks[index] if 0 <= index < len(tasks) else None
+
+
+def _task_for_title(title: str, tasks: List) -> Optional[Any]:
+    """
+    The task whose title matches exactly (case-insensitive), if exactly one does.
+    """
+    matches = [t for t in tasks if t.title.lower() == title.lower()]
+    return matches[0] if len(matches) == 1 else None
+
+
+def route(message_text: str, tasks: List) -> RoutedIntent:
+    """
+    Classify a chat message without the LLM.
+    `tasks` is the user's task list in display order (the chat context's snapshot).
+    Returns a RoutedIntent with confidence 0.0 when no rule applies.
+    """
+    message = " ".join(message_text.split())
+    if not message or len(message) > 200:
+        return _NO_MATCH
+
+    if _READ.match(message):
+        return _intent("read", 0.99, "read")
+
+    # Everything below mutates tasks; compound or conditional phrasing is left to the LLM
+    ambiguous = bool(_AMBIGUOUS.search(message))
+
+    match = _RENAME_NUMBER.match(message)
+    if match:
+        task = _task_for_number(match.group("number"), tasks)
+        new_title = _clean_title(match.group("new_title"))
+        if task is None or not new_title:
+            return _intent("update_rename", 0.5, "rename_number")
+        return _intent(
+            "update_rename", 0.6 if ambiguous else 0.97, "rename_number",
+            task_id=task.id, new_title=new_title, needs_confirmation=True
+        )
+
+    match = _COMPLETE_NUMBER.match(message) or _NUMBER_DONE.match(message)
+    if match:
+        task = _task_for_number(match.group("number"), tasks)
+        if task is None:
+            return _intent("update_complete", 0.5, "complete_number")
+        return _intent("update_complete", 0.6 if ambiguous else 0.98, "complete_number", task_id=task.id)
+
+    match = _DELETE_NUMBER.match(message)
+    if match:
+        task = _task_for_number(match.group("number"), tasks)
+        if task is None:
+            return _intent("delete", 0.5, "delete_number")
+        # Two-Step Mutation Rule: deletes are always confirmed
+        return _intent("delete", 0.6 if ambiguous else 0.98, "delete_number", task_id=task.id, needs_confirmation=True)
+
+    match = _COMPLETE_TITLE.match(message)
+    if match:
+        task = _task_for_title(_clean_title(match.group("title")), tasks)
+        if task is None:
+            return _intent("update_complete", 0.4, "complete_title")
+        return _intent("update_complete", 0.6 if ambiguous else 0.95, "complete_title", task_id=task.id)
+
+    match = _DELETE_TITLE.match(message)
+    if match:
+        task = _task_for_title(_clean_title(match.group("title")), tasks)
+        if task is None:
+            return _intent("delete", 0.4, "delete_title")
+        return _intent("delete", 0.6 if ambiguous else 0.95, "delete_title", task_id=task.id, needs_confirmation=True)
+
+    match = _CREATE.match(message)
+    if match:
+        title = _clean_title(match.group("title"))
+        # " to " in a title is usually fine ("remind me to talk to Sam"), but very long
+        # titles are more likely free-form requests than task names
+        if not title or ambiguous or title.lower() in _PLACEHOLDER_TITLES or len(title.split()) > 12:
+            return _intent("create", 0.5, "create")
+        return _intent("create", 0.95, "create", task_title=title)
+
+    return _NO_MATCH
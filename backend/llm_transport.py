@@ -0,0 +1,386 @@
+"""
+Process-wide HTTP transport for LLM calls.
+
+openai_client.py and agents_sdk.py get their OpenAI / AsyncOpenAI clients from here, so
+every LLM request in the process goes through one sync httpx client, and one async httpx
+client per event loop (pooled connections belong to the loop that opened them):
+keep-alive connection pooling, HTTP/2 when the h2 package is installed, explicit
+connect/read timeouts, and a limit on requests in flight (sync and async together).
+Retries are the OpenAI SDK's own: up to LLM_MAX_RETRIES for connection errors, 408,
+409, 429 and 5xx responses, with exponential backoff and jitter.
+
+utilization() reports pool and limiter metrics. `breaker` is the circuit breaker the
+LLM calls go through (see circuit_breaker.py): while the provider is failing or slow,
+calls are refused immediately and the chat falls back to the rule-based engine.
+call(operation) wraps each LLM request with the breaker, metrics and a trace span.
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+import asyncio
+import importlib.util
+import os
+import threading
+import time
+import weakref
+
+import httpx
+from openai import APIStatusError, AsyncOpenAI, OpenAI
+
+from . import metrics, tracing
+from .circuit_breaker import OPEN, CircuitBreaker
+
+LLM_CONNECT_TIMEOUT_SECONDS = float(os.getenv("LLM_CONNECT_TIMEOUT_SECONDS", "5"))
+LLM_READ_TIMEOUT_SECONDS = float(os.getenv("LLM_READ_TIMEOUT_SECONDS", "60"))
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "2"))
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "20"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "10"))
+LLM_KEEPALIVE_EXPIRY_SECONDS = float(os.getenv("LLM_KEEPALIVE_EXPIRY_SECONDS", "30"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "32"))
+LLM_BREAKER_ERROR_RATE = float(os.getenv("LLM_BREAKER_ERROR_RATE", "0.5"))
+LLM_BREAKER_SLOW_CALL_SECONDS = float(os.getenv("LLM_BREAKER_SLOW_CALL_SECONDS", "10"))
+LLM_BREAKER_SLOW_CALL_RATE = float(os.getenv("LLM_BREAKER_SLOW_CALL_RATE", "0.5"))
+LLM_BREAKER_WINDOW = int(os.getenv("LLM_BREAKER_WINDOW", "20"))
+LLM_BREAKER_MIN_CALLS = int(os.getenv("LLM_BREAKER_MIN_CALLS", "5"))
+LLM_BREAKER_OPEN_SECONDS = float(os.getenv("LLM_BREAKER_OPEN_SECONDS", "30"))
+# HTTP/2 needs the optional h2 package (httpx[http2])
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "true").lower() == "true" and importlib.util.find_spec("h2") is not None
+
+
+class InFlightLimiter:
+    """
+    Caps concurrent requests across threads and event loops. Sync callers block on a
+    condition; async callers await a future that release() wakes, then try again.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.queued = 0
+        self.queue_wait_seconds = 0.0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._async_waiters: deque = deque()
+
+    def _try_acquire(self) -> bool:
+        # Called with the lock held
+        if self.in_flight >= self.limit:
+            return False
+        self.in_flight += 1
+        self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        return True
+
+    def acquire(self) -> None:
+        with self._available:
+            if self._try_acquire():
+                return
+            start = time.perf_counter()
+            self.queued += 1
+            while not self._try_acquire():
+                self._available.wait()
+            self.queue_wait_seconds += time.perf_counter() - start
+
+    async def acquire_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        start = None
+        while True:
+            with self._lock:
+                if self._try_acquire():
+                    if start is not None:
+                        self.queue_wait_seconds += time.perf_counter() - start
+                    return
+                if start is None:
+                    start = time.perf_counter()
+                    self.queued += 1
+                waiter = loop.create_future()
+                self._async_waiters.append((loop, waiter))
+            await waiter
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            self._available.notify()
+            waiters, self._async_waiters = self._async_waiters, deque()
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, waiter)
+            except RuntimeError:
+                # The waiter's event loop has been closed
+                pass
+
+
+def _wake(waiter: asyncio.Future) -> None:
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+class _ReleasingStream(httpx.SyncByteStream):
+    """Response body that gives the in-flight slot back when it is closed (streamed responses included)."""
+
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    def __iter__(self):
+        yield from self._stream
+
+    def close(self) -> None:
+        try:
+            self._stream.close()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class _AsyncReleasingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, release):
+        self._stream = stream
+        self._release = release
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            release, self._release = self._release, None
+            if release is not None:
+                release()
+
+
+class TransportStats:
+    def __init__(self):
+        self.requests = 0
+        self.retries = 0
+        self.errors = 0
+
+    def record(self, request: httpx.Request) -> None:
+        self.requests += 1
+        # The OpenAI SDK numbers its attempts in this header
+        if request.headers.get("x-stainless-retry-count", "0") != "0":
+            self.retries += 1
+
+
+class LimitedTransport(httpx.BaseTransport):
+    """Sync transport that holds an in-flight slot from request until the response is closed."""
+
+    def __init__(self, transport: httpx.BaseTransport, limiter: InFlightLimiter, stats: TransportStats):
+        self.transport = transport
+        self._limiter = limiter
+        self._stats = stats
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        self._limiter.acquire()
+        self._stats.record(request)
+        try:
+            response = self.transport.handle_request(request)
+        except BaseException:
+            self._stats.errors += 1
+            self._limiter.release()
+            raise
+        response.stream = _ReleasingStream(response.stream, self._limiter.release)
+        return response
+
+    def close(self) -> None:
+        self.transport.close()
+
+
+class AsyncLimitedTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of LimitedTransport; shares the limiter with it."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, limiter: InFlightLimiter, stats: TransportStats):
+        self.transport = transport
+        self._limiter = limiter
+        self._stats = stats
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await self._limiter.acquire_async()
+        self._stats.record(request)
+        try:
+            response = await self.transport.handle_async_request(request)
+        except BaseException:
+            self._stats.errors += 1
+            self._limiter.release()
+            raise
+        response.stream = _AsyncReleasingStream(response.stream, self._limiter.release)
+        return response
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+def _provider_failure(exc: BaseException) -> bool:
+    # Rejected requests (bad input, auth) say nothing about the provider's health
+    if isinstance(exc, APIStatusError):
+        return exc.status_code >= 500 or exc.status_code in (408, 409, 429)
+    return True
+
+
+limiter = InFlightLimiter(LLM_MAX_IN_FLIGHT)
+stats = TransportStats()
+breaker = CircuitBreaker(
+    "llm",
+    error_rate=LLM_BREAKER_ERROR_RATE,
+    slow_call_seconds=LLM_BREAKER_SLOW_CALL_SECONDS,
+    slow_call_rate=LLM_BREAKER_SLOW_CALL_RATE,
+    window_size=LLM_BREAKER_WINDOW,
+    min_calls=LLM_BREAKER_MIN_CALLS,
+    open_seconds=LLM_BREAKER_OPEN_SECONDS,
+    is_failure=_provider_failure,
+)
+
+metrics.Gauge(
+    "todo_llm_requests_in_flight", "LLM requests holding an in-flight slot", function=lambda: limiter.in_flight
+)
+metrics.Gauge("todo_llm_breaker_open", "1 while the LLM circuit breaker refuses calls",
+              function=lambda: float(breaker.state == OPEN))
+
+_lock = threading.Lock()
+_http_client: Optional[httpx.Client] = None
+# OpenAI per (api_key, base_url); they all share the http client above
+_clients: Dict[Tuple[str, str], OpenAI] = {}
+
+
+class _LoopClients:
+    """An event loop's async httpx client and the AsyncOpenAI clients built on it."""
+
+    def __init__(self, http: httpx.AsyncClient):
+        self.http = http
+        self.openai: Dict[Tuple[str, str], AsyncOpenAI] = {}
+
+
+# Per event loop; entries go away with their loop
+_loop_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, _LoopClients]" = weakref.WeakKeyDictionary()
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=LLM_MAX_CONNECTIONS,
+        max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=LLM_KEEPALIVE_EXPIRY_SECONDS,
+    )
+
+
+def _timeout() -> httpx.Timeout:
+    return httpx.Timeout(LLM_READ_TIMEOUT_SECONDS, connect=LLM_CONNECT_TIMEOUT_SECONDS)
+
+
+def http_client() -> httpx.Client:
+    """The process-wide sync httpx client for LLM requests."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            transport = httpx.HTTPTransport(limits=_limits(), http2=LLM_HTTP2)
+            _http_client = httpx.Client(
+                transport=LimitedTransport(transport, limiter, stats), timeout=_timeout(), follow_redirects=True
+            )
+        return _http_client
+
+
+def _running_loop_clients() -> _LoopClients:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        clients = _loop_clients.get(loop)
+        if clients is None:
+            # Connections of a closed loop cannot be reused (or closed): drop its clients
+            for closed in [other for other in _loop_clients if other.is_closed()]:
+                del _loop_clients[closed]
+            transport = httpx.AsyncHTTPTransport(limits=_limits(), http2=LLM_HTTP2)
+            clients = _LoopClients(httpx.AsyncClient(
+                transport=AsyncLimitedTransport(transport, limiter, stats), timeout=_timeout(), follow_redirects=True
+            ))
+            _loop_clients[loop] = clients
+        return clients
+
+
+def async_http_client() -> httpx.AsyncClient:
+    """The running event loop's async httpx client for LLM requests (call it from a coroutine)."""
+    return _running_loop_clients().http
+
+
+async def aclose() -> None:
+    """Close the running event loop's async LLM clients (e.g. on application shutdown)."""
+    with _lock:
+        clients = _loop_clients.pop(asyncio.get_running_loop(), None)
+    if clients is not None:
+        await clients.http.aclose()
+
+
+def get_openai(api_key: str, base_url: Optional[str] = None) -> OpenAI:
+    """Shared OpenAI client for this key and base URL (OPENAI_BASE_URL when not given)."""
+    base_url = base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    key = (api_key, base_url)
+    client = _clients.get(key)
+    if client is None:
+        client = OpenAI(
+            api_key=api_key, base_url=base_url, http_client=http_client(),
+            timeout=_timeout(), max_retries=LLM_MAX_RETRIES
+        )
+        _clients[key] = client
+    return client
+
+
+def get_async_openai(api_key: str, base_url: Optional[str] = None) -> AsyncOpenAI:
+    """
+    Shared AsyncOpenAI client for this key and base URL (OPENAI_BASE_URL when not given)
+    on the running event loop (call it from a coroutine).
+    """
+    base_url = base_url or os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
+    clients = _running_loop_clients()
+    key = (api_key, base_url)
+    client = clients.openai.get(key)
+    if client is None:
+        client = AsyncOpenAI(
+            api_key=api_key, base_url=base_url, http_client=clients.http,
+            timeout=_timeout(), max_retries=LLM_MAX_RETRIES
+        )
+        clients.openai[key] = client
+    return client
+
+
+@contextmanager
+def call(operation: str) -> Iterator[tracing.Span]:
+    """
+    One LLM request: traced (span llm.<operation>), measured per operation (see metrics.py)
+    and guarded by the circuit breaker, which refuses it with CircuitOpenError while open.
+    """
+    with tracing.span(f"llm.{operation}") as span, metrics.llm_call(operation), breaker.guard():
+        yield span
+
+
+def _pool_connections(transport) -> Tuple[int, int]:
+    # httpcore's pool: (open connections, idle ones)
+    pool = getattr(getattr(transport, "transport", None), "_pool", None)
+    connections = list(getattr(pool, "connections", []))
+    return len(connections), sum(1 for c in connections if c.is_idle())
+
+
+def utilization() -> Dict[str, Any]:
+    """Pool and in-flight metrics for the shared LLM transport."""
+    connections, idle = 0, 0
+    with _lock:
+        async_clients = [clients.http for clients in _loop_clients.values()]
+    for client in [_http_client] + async_clients:
+        if client is not None:
+            open_count, idle_count = _pool_connections(client._transport)
+            connections += open_count
+            idle += idle_count
+    return {
+        "http2": LLM_HTTP2,
+        "in_flight": limiter.in_flight,
+        "max_in_flight": limiter.limit,
+        "peak_in_flight": limiter.peak_in_flight,
+        "in_flight_utilization": limiter.in_flight / limiter.limit if limiter.limit else 0.0,
+        "queued_requests": limiter.queued,
+        "queue_wait_seconds": round(limiter.queue_wait_seconds, 6),
+        "connections": connections,
+        "idle_connections": idle,
+        "max_connections": LLM_MAX_CONNECTIONS,
+        "requests": stats.requests,
+        "retries": stats.retries,
+        "transport_errors": stats.errors,
+    }
@@ -8,13 +8,18 @@ _project_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 if _project_root not in sys.path:
     sys.path.insert(0, _project_root)
 
-from fastapi import FastAPI, Depends, HTTPException, Body
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Body, Header, Query, Response
 from sqlmodel import Session
 from typing import List, Optional
+from contextlib import nullcontext
+from datetime import datetime
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from fastapi.security import HTTPBearer
 from fastapi import Body
 from dotenv import load_dotenv
+import json
 import logging
 import uuid
 
@@ -29,15 +34,16 @@ logging.basicConfig(
 load_dotenv()
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), ".env"))
 
-from backend.database import get_session, init_db
+from backend.database import get_session, init_db, close_db, USE_ASYNC_DB
 from backend.models import (
     TaskResponse, TaskCreate, TaskUpdate,
+    TaskBatchRequest, TaskBatchResponse,
     UserCreate, UserLogin, UserResponse,
     Token, TokenData,
     MessageResponse,
     ChatRequest, ChatResponse,
 )
-from backend import crud
+from backend import crud, llm_transport, metrics, tracing
 from backend.auth import (
     get_current_user, authenticate_user,
     create_access_token
@@ -46,17 +52,24 @@ from backend.better_auth import (
     better_auth,
     get_current_user as get_current_better_auth_user,
     register_better_auth_user,
-    login_better_auth_user
+    login_better_auth_user,
+    token_user_cache,
 )
+from backend.passwords import PasswordHashingBusy, password_hasher
 from backend.mcp_official_wrapper import mcp_official_wrapper as mcp_server
 from backend.agents_sdk import create_todo_agent, run_todo_agent, run_todo_agent_with_mcp_tools
 from backend.agent import AgentOrchestrator
+from backend.openai_client import intent_cache
+from backend.chat_context import load_chat_context
+from backend.query_profiler import QueryProfilerMiddleware
 
 app = FastAPI(
     title="Evolution of Todo - Phase 2 Backend",
     version="1.0.0",
     description="A FastAPI backend for the Evolution of Todo application"
 )
+# Per-route latency, status and in-flight metrics (GET /metrics); routers below do the same
+app.router.route_class = metrics.InstrumentedRoute
 
 
 # Add CORS middleware to allow requests from localhost:3000 and localhost:3001
@@ -66,7 +79,13 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    # Keyset pagination cursor for task listings
+    expose_headers=["X-Next-Cursor", "Server-Timing"],
 )
+# Per-request query counts and DB time (Server-Timing header), N+1 warnings
+app.add_middleware(QueryProfilerMiddleware)
+# Requests by route and final status, after exception handlers (GET /metrics)
+app.add_middleware(metrics.HTTPMetricsMiddleware)
 
 
 @app.on_event("startup")
@@ -77,6 +96,23 @@ def on_startup():
     init_db()
 
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    """
+    Flush the SQLite writer queue and close the event loop's LLM connections on application shutdown.
+    """
+    await run_in_threadpool(close_db)
+    await llm_transport.aclose()
+
+
+@app.exception_handler(PasswordHashingBusy)
+async def password_hashing_busy_handler(request, exc: PasswordHashingBusy):
+    """
+    Backpressure for login/register bursts: the bcrypt queue is full, ask the client to retry.
+    """
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+
 # Authentication endpoints
 @app.post("/auth/register", response_model=UserResponse)
 def register_user(user_create: UserCreate, session: Session = Depends(get_session)):
@@ -127,7 +163,7 @@ def read_users_me(current_user: TokenData = Depends(get_current_user)):
 
 # Better Auth endpoints (unified authentication)
 @app.post("/api/auth/register")
-def register_user_better_auth(
+async def register_user_better_auth(
     email: str = Body(...),
     password: str = Body(...),
     session: Session = Depends(get_session)
@@ -136,12 +172,12 @@ def register_user_better_auth(
     Register a new user using Better Auth protocol.
     Compatible with Better Auth frontend authentication.
     """
-    result = register_better_auth_user(email, password, session)
+    result = await register_better_auth_user(email, password, session)
     return result
 
 
 @app.post("/api/auth/login")
-def login_user_better_auth(
+async def login_user_better_auth(
     email: str = Body(...),
     password: str = Body(...),
     session: Session = Depends(get_session)
@@ -150,7 +186,7 @@ def login_user_better_auth(
     Login a user using Better Auth protocol.
     Compatible with Better Auth frontend authentication.
     """
-    result = login_better_auth_user(email, password, session)
+    result = await login_better_auth_user(email, password, session)
     return result
 
 
@@ -171,23 +207,41 @@ def read_users_me_better_auth(
 
 
 # Task endpoints with user_id in path (required pattern: /api/{user_id}/tasks/{id})
-@app.get("/api/{user_id}/tasks", response_model=List[TaskResponse])
+# Served by the sync handlers below, or by their AsyncSession equivalents when USE_ASYNC_DB is set
+tasks_router = APIRouter(route_class=metrics.InstrumentedRoute)
+
+
+@tasks_router.get("/api/{user_id}/tasks", response_model=List[TaskResponse])
 def read_tasks(
     user_id: str,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    updated_since: Optional[datetime] = None,
     session: Session = Depends(get_session),
     current_user = Depends(get_current_better_auth_user)
 ):
     """
-    Retrieve all tasks for a user from the database.
+    Retrieve one page of tasks for a user from the database, oldest first.
+    Optional filters: status ("all", "pending", "completed") and updated_since.
+    When more tasks exist, the X-Next-Cursor response header carries the cursor for the next page.
     """
     # Verify the requesting user matches the user_id in the path
     if str(current_user.id) != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
-    tasks = crud.get_tasks_by_user(session, current_user.id)
+    try:
+        tasks, next_cursor = crud.get_tasks_page(
+            session, current_user.id, limit=limit, cursor=cursor, status=status, updated_since=updated_since
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return tasks
 
 
-@app.post("/api/{user_id}/tasks", response_model=TaskResponse, status_code=201)
+@tasks_router.post("/api/{user_id}/tasks", response_model=TaskResponse, status_code=201)
 def create_task(
     user_id: str,
     task_create: TaskCreate,
@@ -204,7 +258,28 @@ def create_task(
     return task
 
 
-@app.get("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
+@tasks_router.post("/api/{user_id}/tasks:batch", response_model=TaskBatchResponse)
+def batch_tasks(
+    user_id: str,
+    batch: TaskBatchRequest,
+    session: Session = Depends(get_session),
+    current_user = Depends(get_current_better_auth_user)
+):
+    """
+    Apply a mixed list of create/update/complete/delete operations in a single transaction.
+    Returns one result per operation, in request order.
+    """
+    # Verify the requesting user matches the user_id in the path
+    if str(current_user.id) != user_id:
+        raise HTTPException(status_code=403, detail="Access denied")
+    try:
+        results = crud.apply_task_batch(session, current_user.id, batch.operations)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return TaskBatchResponse(results=results)
+
+
+@tasks_router.get("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
 def read_task(
     user_id: str,
     task_id: int,
@@ -223,7 +298,7 @@ def read_task(
     return task
 
 
-@app.put("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
+@tasks_router.put("/api/{user_id}/tasks/{task_id}", response_model=TaskResponse)
 def update_task(
     user_id: str,
     task_id: int,
@@ -249,7 +324,7 @@ def update_task(
     return task
 
 
-@app.delete("/api/{user_id}/tasks/{task_id}", status_code=204)
+@tasks_router.delete("/api/{user_id}/tasks/{task_id}", status_code=204)
 def delete_task(
     user_id: str,
     task_id: int,
@@ -268,7 +343,7 @@ def delete_task(
     return  # Return empty response for 204 status
 
 
-@app.patch("/api/{user_id}/tasks/{task_id}/complete", response_model=TaskResponse)
+@tasks_router.patch("/api/{user_id}/tasks/{task_id}/complete", response_model=TaskResponse)
 def toggle_task_completion(
     user_id: str,
     task_id: int,
@@ -287,6 +362,13 @@ def toggle_task_completion(
     return task
 
 
+if USE_ASYNC_DB:
+    from backend.async_task_routes import router as async_tasks_router
+    app.include_router(async_tasks_router)
+else:
+    app.include_router(tasks_router)
+
+
 @app.get("/")
 def read_root():
     """
@@ -295,13 +377,45 @@ def read_root():
     return {"message": "Evolution of Todo - Phase 2 Backend with Authentication is running!"}
 
 
+async def _load_chat_turn(user_id: str, chat_request: ChatRequest, current_user, session: Session):
+    """
+    Shared start of a chat turn: check access, create the conversation if none is given
+    and load the turn's ChatContext. Raises HTTPException (403/404).
+    """
+    # Verify the requesting user matches the user_id in the path
+    if str(current_user.id) != user_id:
+        logger.warning(f"Access denied - current_user: {current_user.id}, requested_user: {user_id}")
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    logger.debug(f"User verified, processing conversation")
+    # Get or create conversation
+    conversation_id = chat_request.conversation_id
+    logger.debug(f"Conversation ID from request: {conversation_id}")
+    # Database work uses the sync Session; run it in the threadpool so the event loop
+    # keeps serving other requests (e.g. /tasks) while this chat is in flight
+    if conversation_id is None:
+        # Create new conversation
+        logger.info(f"Creating new conversation for user {user_id}")
+        conversation = await run_in_threadpool(crud.create_conversation, session, user_id)
+        conversation_id = conversation.id
+        logger.info(f"Created conversation with ID: {conversation_id}")
+
+    # Load everything the turn reads once (conversation, pending action, bounded history,
+    # task snapshot); this also verifies the conversation belongs to the user
+    context = await run_in_threadpool(load_chat_context, session, conversation_id, user_id, chat_request.message)
+    if context is None:
+        raise HTTPException(status_code=404, detail="Conversation not found or access denied")
+    return conversation_id, context
+
+
 # Chat API Endpoint according to specification
-@app.post("/api/{user_id}/chat")
+@app.post("/api/{user_id}/chat", response_model=ChatResponse, response_model_exclude_none=True)
 async def chat_endpoint(
     user_id: str,
     chat_request: ChatRequest,
     current_user = Depends(get_current_better_auth_user),
-    session: Session = Depends(get_session)
+    session: Session = Depends(get_session),
+    x_debug_timing: Optional[str] = Header(None)
 ):
     """
     Chat API Endpoint
@@ -312,45 +426,28 @@ async def chat_endpoint(
     Request:
     - conversation_id (integer, optional): Existing conversation ID (creates new if not provided)
     - message (string, required): User's natural language message
+    - X-Debug-Timing header (optional): "1" to include the timing breakdown
 
     Response:
     - conversation_id (integer): The conversation ID
     - response (string): AI assistant's response
     - tool_calls (array): List of MCP tools invoked
+    - timings (array, with X-Debug-Timing only): The turn's spans in start order
+      (name, parent, duration_ms, attributes such as history_length, task_count and intent)
     """
+    debug_timing = (x_debug_timing or "").lower() in ("1", "true")
+    with tracing.collect_timings() if debug_timing else nullcontext() as timings:
+        with tracing.span("chat", user_id=user_id, conversation_id=chat_request.conversation_id):
+            chat_response = await _chat_turn(user_id, chat_request, current_user, session)
+    if timings is not None:
+        chat_response.timings = timings
+    return chat_response
+
+
+async def _chat_turn(user_id: str, chat_request: ChatRequest, current_user, session: Session) -> ChatResponse:
     logger.info(f"Chat endpoint called - user_id: {user_id}, message: {chat_request.message[:50]}...")
     try:
-        # Verify the requesting user matches the user_id in the path
-        if str(current_user.id) != user_id:
-            logger.warning(f"Access denied - current_user: {current_user.id}, requested_user: {user_id}")
-            raise HTTPException(status_code=403, detail="Access denied")
-
-        logger.debug(f"User verified, processing conversation")
-        # Get or create conversation
-        conversation_id = chat_request.conversation_id
-        logger.debug(f"Conversation ID from request: {conversation_id}")
-        if conversation_id is None:
-            # Create new conversation
-            logger.info(f"Creating new conversation for user {user_id}")
-            conversation = crud.create_conversation(session, user_id)
-            conversation_id = conversation.id
-            logger.info(f"Created conversation with ID: {conversation_id}")
-        else:
-            # Verify conversation belongs to user
-            existing_conversation = crud.get_conversation(session, conversation_id, user_id)
-            if not existing_conversation:
-                raise HTTPException(status_code=404, detail="Conversation not found or access denied")
-
-        # Fetch conversation history from database (for agent context)
-        conversation_history = crud.get_messages(session, conversation_id, user_id)
-
-        # Build message array for agent (history + new message)
-        messages = []
-        for msg in conversation_history:
-            messages.append({
-                "role": msg.role,
-                "content": msg.content
-            })
+        conversation_id, context = await _load_chat_turn(user_id, chat_request, current_user, session)
 
         # Use Agent Orchestrator to process the message with MCP tools
         try:
@@ -363,12 +460,15 @@ async def chat_endpoint(
                 # This shouldn't happen since we create conversation_id above if it's None
                 response = "Error: Conversation ID is required for agent operations."
             else:
-                response = agent_orchestrator.handle_message(
+                # LLM calls are awaited on the async OpenAI client; DB steps run in worker threads
+                response = await agent_orchestrator.handle_message_async(
                     user_id=user_id,
                     conversation_id=str(conversation_id),  # Pass as string since agent will convert internally
-                    message_text=chat_request.message
+                    message_text=chat_request.message,
+                    context=context
                 )
-            tool_calls = []  # Tool calls are handled internally by the orchestrator
+            # MCP tools the orchestrator invoked for this message
+            tool_calls = agent_orchestrator.tool_calls
 
             logger.info(f"Agent response received: {response[:100]}...")
         except Exception as e:
@@ -393,6 +493,56 @@ async def chat_endpoint(
         raise HTTPException(status_code=500, detail="Internal server error occurred while processing your request")
 
 
+def _sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+
+@app.post("/api/{user_id}/chat/stream")
+async def chat_stream_endpoint(
+    user_id: str,
+    chat_request: ChatRequest,
+    current_user = Depends(get_current_better_auth_user),
+    session: Session = Depends(get_session)
+):
+    """
+    Streaming Chat API Endpoint
+    Method: POST
+    Endpoint: /api/{user_id}/chat/stream
+    Description: Send message & stream the AI response as Server-Sent Events
+
+    Request: same as /api/{user_id}/chat
+
+    Events (the data line is the JSON event, including its type):
+    - tool_call: an MCP tool completed (name, arguments, result)
+    - token: a chunk of the response text (content)
+    - done: the turn has been persisted (conversation_id, response with the complete text)
+    - error: processing failed (detail); no done event follows
+    """
+    logger.info(f"Chat stream endpoint called - user_id: {user_id}, message: {chat_request.message[:50]}...")
+    # Access and conversation errors are returned as regular HTTP errors, before the stream starts
+    conversation_id, context = await _load_chat_turn(user_id, chat_request, current_user, session)
+    agent_orchestrator = AgentOrchestrator(session)
+
+    async def events():
+        try:
+            async for event in agent_orchestrator.handle_message_stream(
+                user_id=user_id,
+                conversation_id=str(conversation_id),
+                message_text=chat_request.message,
+                context=context
+            ):
+                yield _sse(event)
+        except Exception as e:
+            logger.error(f"Agent processing failed: {e}", exc_info=True)
+            yield _sse({"type": "error", "detail": "Unable to process your message right now. Please try again."})
+
+    # No buffering by proxies, so tokens reach the client as they are produced
+    return StreamingResponse(
+        events(), media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 # MCP (Model Context Protocol) endpoints for Phase 3 AI Chatbot (Updated to match specification)
 @app.post("/mcp/add_task")
 def mcp_add_task(
@@ -417,22 +567,30 @@ def mcp_add_task(
 
 @app.post("/mcp/list_tasks")
 def mcp_list_tasks(
+    response: Response,
     user_id: str = Body(..., embed=True),
     status: Optional[str] = Body(None, embed=True),
+    limit: Optional[int] = Body(None, embed=True, ge=1),
+    cursor: Optional[str] = Body(None, embed=True),
+    updated_since: Optional[datetime] = Body(None, embed=True),
     current_user = Depends(get_current_better_auth_user),
     session: Session = Depends(get_session)
 ):
     """
     MCP Tool: list_tasks
     Purpose: Retrieve tasks from the list
-    Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed")
-    Returns: Array of task objects
+    Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed"),
+                limit (integer, optional), cursor (string, optional), updated_since (datetime, optional)
+    Returns: Array of task objects (one page; X-Next-Cursor header carries the next page cursor)
     """
     # Verify the requesting user matches the authenticated user
     if str(current_user.id) != user_id:
         raise HTTPException(status_code=403, detail="Access denied")
 
-    return mcp_server.handle_list_tasks(session, user_id, status)
+    page = mcp_server.handle_list_tasks_page(session, user_id, status, limit, cursor, updated_since)
+    if page["next_cursor"]:
+        response.headers["X-Next-Cursor"] = page["next_cursor"]
+    return page["tasks"]
 
 
 @app.post("/mcp/complete_task")
@@ -498,6 +656,21 @@ def mcp_update_task(
 
 @app.get("/healthz")
 def healthz():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "auth_cache": token_user_cache.stats(),
+        "password_hasher": password_hasher.stats(),
+        "llm_transport": llm_transport.utilization(),
+        "llm_breaker": llm_transport.breaker.stats(),
+        "intent_cache": intent_cache.stats(),
+    }
+
+
+@app.get("/metrics", include_in_schema=False)
+def metrics_endpoint():
+    """
+    Prometheus scrape endpoint: HTTP, database and LLM metrics (see metrics.py).
+    """
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
 
 
@@ -4,6 +4,7 @@ Provides the same interface as the old mcp_server but uses the new official MCP
 """
 import json
 from typing import Dict, Any, Optional
+from datetime import datetime
 from fastapi import Depends, HTTPException
 from sqlmodel import Session
 from .database import get_session
@@ -34,15 +35,40 @@ class MCPOfficialWrapper:
         except Exception as e:
             raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
 
-    def handle_list_tasks(self, session: Session, user_id: str, status: Optional[str] = None) -> Any:
+    def handle_list_tasks(self, session: Session, user_id: str, status: Optional[str] = None, updated_since: Optional[datetime] = None) -> Any:
         """
         MCP Tool: list_tasks
         Purpose: Retrieve tasks from the list
-        Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed")
+        Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed"),
+                    updated_since (datetime, optional)
         Returns: Array of task objects
         """
         try:
-            result = self.tools.list_tasks(session, user_id, status)
+            result = self.tools.list_tasks(session, user_id, status, updated_since)
+            return result
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Internal server error: {str(e)}")
+
+    def handle_list_tasks_page(
+        self,
+        session: Session,
+        user_id: str,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        updated_since: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        MCP Tool: list_tasks (paginated)
+        Purpose: Retrieve one page of tasks, oldest first
+        Parameters: user_id (string, required), status (string, optional), limit (integer, optional),
+                    cursor (string, optional), updated_since (datetime, optional)
+        Returns: tasks, next_cursor
+        """
+        try:
+            result = self.tools.list_tasks_page(session, user_id, status, limit, cursor, updated_since)
             return result
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
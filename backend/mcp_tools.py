@@ -3,12 +3,13 @@ MCP Tools for Phase 3 Todo AI Chatbot
 Implements the locked CRUD operations spec
 """
 from typing import Optional, Dict, Any, List
+from datetime import datetime
 from .models import Task, TaskResponse
 from .crud import create_task as crud_create_task
-from .crud import get_task_by_user as crud_get_task_by_user
 from .crud import update_task as crud_update_task
-from .crud import delete_task as crud_delete_task
+from .crud import pop_task as crud_pop_task
 from .crud import get_tasks_by_user as crud_get_tasks_by_user
+from .crud import get_tasks_page as crud_get_tasks_page
 from sqlmodel import Session
 
 
@@ -42,35 +43,55 @@ class TaskMCPTools:
         }
 
     @staticmethod
-    def list_tasks(session: Session, user_id: str, status: Optional[str] = None) -> List[Dict[str, Any]]:
+    def list_tasks(session: Session, user_id: str, status: Optional[str] = None, updated_since: Optional[datetime] = None) -> List[Dict[str, Any]]:
         """
         MCP Tool: list_tasks
         Purpose: Retrieve tasks from the list
-        Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed")
+        Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed"),
+                    updated_since (datetime, optional)
         Returns: Array of task objects
         Example Input: {"user_id": "ziakhan", "status": "pending"}
         Example Output: [{"id": 1, "title": "Buy groceries", "completed": false}, ...]
         """
-        # Get all tasks for the user
-        tasks = crud_get_tasks_by_user(session, user_id)
-
-        # Filter based on status if provided
-        if status == "pending":
-            tasks = [task for task in tasks if not task.completed]
-        elif status == "completed":
-            tasks = [task for task in tasks if task.completed]
-        # If status is "all" or None, return all tasks
+        # Status and updated_since filters are applied in SQL
+        tasks = crud_get_tasks_by_user(session, user_id, status=status, updated_since=updated_since)
 
         # Format the tasks as specified
-        result = []
-        for task in tasks:
-            result.append({
-                "id": task.id,
-                "title": task.title,
-                "completed": task.completed
-            })
+        return [TaskMCPTools._format_task(task) for task in tasks]
 
-        return result
+    @staticmethod
+    def list_tasks_page(
+        session: Session,
+        user_id: str,
+        status: Optional[str] = None,
+        limit: Optional[int] = None,
+        cursor: Optional[str] = None,
+        updated_since: Optional[datetime] = None
+    ) -> Dict[str, Any]:
+        """
+        MCP Tool: list_tasks (paginated)
+        Purpose: Retrieve one page of tasks, oldest first
+        Parameters: user_id (string, required), status (string, optional: "all", "pending", "completed"),
+                    limit (integer, optional), cursor (string, optional), updated_since (datetime, optional)
+        Returns: tasks, next_cursor
+        Example Input: {"user_id": "ziakhan", "status": "pending", "limit": 2}
+        Example Output: {"tasks": [{"id": 1, "title": "Buy groceries", "completed": false}, ...], "next_cursor": "eyJj..."}
+        """
+        tasks, next_cursor = crud_get_tasks_page(
+            session, user_id, limit=limit, cursor=cursor, status=status, updated_since=updated_since
+        )
+        return {
+            "tasks": [TaskMCPTools._format_task(task) for task in tasks],
+            "next_cursor": next_cursor
+        }
+
+    @staticmethod
+    def _format_task(task: Task) -> Dict[str, Any]:
+        return {
+            "id": task.id,
+            "title": task.title,
+            "completed": task.completed
+        }
 
     @staticmethod
     def complete_task(session: Session, user_id: str, task_id: int) -> Dict[str, Any]:
@@ -105,21 +126,15 @@ class TaskMCPTools:
         Example Input: {"user_id": "ziakhan", "task_id": 2}
         Example Output: {"task_id": 2, "status": "deleted", "title": "Old task"}
         """
-        # Get the task first to return its title in the response
-        task = crud_get_task_by_user(session, task_id, user_id)
+        # One DELETE ... RETURNING: the deleted row carries the title for the response
+        task = crud_pop_task(session, task_id, user_id)
 
         if task is None:
             raise ValueError(f"Task with id {task_id} not found or access denied")
 
-        # Delete the task
-        success = crud_delete_task(session, task_id, user_id)
-
-        if not success:
-            raise ValueError(f"Failed to delete task with id {task_id}")
-
         # Return in the specified format
         return {
-            "task_id": task.id,
+            "task_id": task_id,
             "status": "deleted",
             "title": task.title
         }
@@ -0,0 +1,458 @@
+"""
+Prometheus metrics for the HTTP, database and LLM hot paths, served by GET /metrics.
+
+Counters, gauges and histograms are written without locks: every thread updates its
+own slot of a metric and a scrape sums the slots. Label sets are resolved once (routes
+bind their children when they are created) or looked up in a dict, so recording a
+value does not allocate. Values that already live elsewhere (pool checkouts, LLM
+requests in flight) are read when scraped instead of being tracked twice.
+
+Families:
+- todo_http_request_duration_seconds / todo_http_requests_total / todo_http_requests_in_flight,
+  per route template (see InstrumentedRoute; a streamed response is timed until its headers)
+  and final status (see HTTPMetricsMiddleware)
+- todo_db_queries_total / todo_db_query_duration_seconds / todo_db_query_errors_total and
+  todo_db_pool_checkout_wait_seconds / todo_db_pool_checked_out (see instrument_engine)
+- todo_llm_call_duration_seconds / todo_llm_errors_total / todo_llm_tokens_total, per
+  operation (classify_intent, chat, chat_stream, tools, summarize, assistants_run)
+- todo_chat_fallback_total: turns answered by the rule-based engine, by reason
+"""
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+import math
+import threading
+import time
+import weakref
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+
+# Prometheus' default buckets, for request and query latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1.0, 2.5, 5.0, 7.5, 10.0)
+LLM_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 20.0, 30.0, 60.0)
+
+
+class _Slots:
+    """
+    One list of values per thread. A thread only ever writes its own list, so updates
+    need no lock; the lock is taken when a thread writes for the first time and on reads.
+    """
+
+    def __init__(self, size: int):
+        self._size = size
+        self._local = threading.local()
+        self._all: List[List[float]] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> List[float]:
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = [0.0] * self._size
+            with self._lock:
+                self._all.append(values)
+            self._local.values = values
+        return values
+
+    def totals(self) -> List[float]:
+        with self._lock:
+            slots = list(self._all)
+        totals = [0.0] * self._size
+        for values in slots:
+            for i, value in enumerate(values):
+                totals[i] += value
+        return totals
+
+
+class _CounterChild:
+    def __init__(self):
+        self._slots = _Slots(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._slots.mine()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._slots.totals()[0]
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1.0) -> None:
+        self._slots.mine()[0] -= amount
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Sequence[float]):
+        self._buckets = buckets
+        # Per bucket (the last one is +Inf), then the sum of observed values
+        self._slots = _Slots(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        values = self._slots.mine()
+        values[bisect_left(self._buckets, value)] += 1
+        values[-1] += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def snapshot(self) -> Tuple[List[float], float]:
+        """Cumulative bucket counts (ending with +Inf, the total count) and the sum."""
+        totals = self._slots.totals()
+        cumulative, running = [], 0.0
+        for count in totals[:-1]:
+            running += count
+            cumulative.append(running)
+        return cumulative, totals[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 registry: Optional["Registry"] = None):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+        (registry or REGISTRY).register(self)
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for these label values; bind it once where the labels are fixed."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _samples(self) -> Iterator[Tuple[str, Tuple[str, ...], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, labels, value in self._samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def _samples(self):
+        for values, child in list(self._children.items()):
+            yield "_total", tuple(zip(self.labelnames, values)), child.value
+
+
+class Gauge(_Metric):
+    """A gauge that is either moved with inc()/dec() or, with `function`, read at scrape time."""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None, registry: Optional["Registry"] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.function = function
+
+    def _new_child(self):
+        return _GaugeChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1.0) -> None:
+        self.labels().dec(amount)
+
+    def _samples(self):
+        if self.function is not None:
+            yield "", (), self.function()
+            return
+        for values, child in list(self._children.items()):
+            yield "", tuple(zip(self.labelnames, values)), child.value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS, registry: Optional["Registry"] = None):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _samples(self):
+        bounds = [_format_value(b) for b in self.buckets] + ["+Inf"]
+        for values, child in list(self._children.items()):
+            labels = tuple(zip(self.labelnames, values))
+            cumulative, total = child.snapshot()
+            for bound, count in zip(bounds, cumulative):
+                yield "_bucket", labels + (("le", bound),), count
+            yield "_sum", labels, total
+            yield "_count", labels, cumulative[-1]
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> None:
+        self._metrics.append(metric)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in labels) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+http_request_duration = Histogram(
+    "todo_http_request_duration_seconds", "Time to produce the response, by route", ("method", "route")
+)
+http_requests = Counter(
+    "todo_http_requests", "Requests served, by route and status code", ("method", "route", "status")
+)
+http_requests_in_flight = Gauge(
+    "todo_http_requests_in_flight", "Requests being handled, by route", ("method", "route")
+)
+db_queries = Counter("todo_db_queries", "SQL statements executed, by operation", ("operation",))
+db_query_duration = Histogram(
+    "todo_db_query_duration_seconds", "SQL statement execution time, by operation", ("operation",)
+)
+db_query_errors = Counter("todo_db_query_errors", "SQL statements that raised, by operation", ("operation",))
+db_pool_checkout_wait = Histogram(
+    "todo_db_pool_checkout_wait_seconds", "Time spent waiting for a pooled connection"
+)
+db_write_batch_size = Histogram(
+    "todo_db_write_batch_size", "Writes committed together by the SQLite writer",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+# Engines passed to instrument_engine()
+_engines: "weakref.WeakSet" = weakref.WeakSet()
+
+
+def _checked_out() -> float:
+    total = 0
+    for engine in list(_engines):
+        checkedout = getattr(engine.pool, "checkedout", None)
+        if checkedout is not None:
+            total += checkedout()
+    return float(total)
+
+
+db_pool_checked_out = Gauge(
+    "todo_db_pool_checked_out", "Pooled connections currently handed out", function=_checked_out
+)
+llm_call_duration = Histogram(
+    "todo_llm_call_duration_seconds", "LLM call latency, by operation", ("operation",), buckets=LLM_BUCKETS
+)
+llm_errors = Counter("todo_llm_errors", "Failed LLM calls, by operation and error type", ("operation", "error"))
+llm_tokens = Counter("todo_llm_tokens", "Tokens reported by the LLM, by operation and kind", ("operation", "kind"))
+chat_fallbacks = Counter(
+    "todo_chat_fallback", "Chat turns answered by the rule-based engine, by reason", ("reason",)
+)
+
+
+# Scope key under which InstrumentedRoute leaves the request's counter for HTTPMetricsMiddleware
+_ROUTE_REQUESTS = "todo.http_requests"
+
+
+class InstrumentedRoute(APIRoute):
+    """
+    APIRoute that records latency and in-flight requests under its path template.
+    Use it as the route_class of the app's routers; HTTPMetricsMiddleware counts the
+    responses by status.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        # Bound once per route, so a request only touches its own slots
+        method = ",".join(sorted(self.methods or ()))
+        duration = http_request_duration.labels(method, self.path)
+        in_flight = http_requests_in_flight.labels(method, self.path)
+        route = self.path
+        by_status: Dict[int, _CounterChild] = {}
+
+        def requests_for(status: int) -> _CounterChild:
+            requests = by_status.get(status)
+            if requests is None:
+                requests = by_status[status] = http_requests.labels(method, route, str(status))
+            return requests
+
+        async def instrumented_handler(request):
+            request.scope[_ROUTE_REQUESTS] = requests_for
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                return await handler(request)
+            finally:
+                duration.observe(time.perf_counter() - start)
+                in_flight.dec()
+
+        return instrumented_handler
+
+
+class HTTPMetricsMiddleware:
+    """
+    ASGI middleware: counts each request served by an InstrumentedRoute under the status
+    of the response actually sent, i.e. after exception handlers have turned errors such
+    as validation failures (422) into responses. A request that raises through it is a 500.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            requests_for = scope.get(_ROUTE_REQUESTS)
+            if requests_for is not None:
+                requests_for(status).inc()
+
+
+def _operation(statement: str) -> str:
+    keyword = statement.lstrip()[:6].upper()
+    return keyword if keyword in ("SELECT", "INSERT", "UPDATE", "DELETE") else "OTHER"
+
+
+def instrument_engine(engine) -> None:
+    """
+    Record query counts, durations and errors for an engine, and the time its pool makes
+    callers wait for a connection. Safe to call once per engine.
+    """
+    if engine in _engines:
+        return
+    _engines.add(engine)
+    # Statement text -> child metrics; SQLAlchemy reuses the compiled strings
+    children: Dict[str, Tuple[Any, Any, Any]] = {}
+
+    def _children(statement: str):
+        entry = children.get(statement)
+        if entry is None:
+            operation = _operation(statement)
+            entry = (db_queries.labels(operation), db_query_duration.labels(operation), db_query_errors.labels(operation))
+            if len(children) < 10000:
+                children[statement] = entry
+        return entry
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        count, duration, _ = _children(statement)
+        count.inc()
+        duration.observe(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+        if context.statement is not None:
+            _children(context.statement)[2].inc()
+
+    # The pool has no "before checkout" event: time Pool.connect, which the engine calls
+    # for every checkout, and wrap the new pool again when the engine is disposed
+    @event.listens_for(engine, "engine_disposed")
+    def _disposed(engine):
+        _time_checkouts(engine.pool)
+
+    _time_checkouts(engine.pool)
+
+
+def _time_checkouts(pool) -> None:
+    connect = pool.connect
+    wait = db_pool_checkout_wait.labels()
+
+    def timed_connect():
+        start = time.perf_counter()
+        connection = connect()
+        wait.observe(time.perf_counter() - start)
+        return connection
+
+    pool.connect = timed_connect
+
+
+@contextmanager
+def llm_call(operation: str) -> Iterator[None]:
+    """Time an LLM call and count it as an error (by exception type) if the block raises."""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception as exc:
+        llm_errors.labels(operation, type(exc).__name__).inc()
+        raise
+    finally:
+        llm_call_duration.labels(operation).observe(time.perf_counter() - start)
+
+
+def record_llm_usage(operation: str, usage: Any) -> None:
+    """Count the prompt and completion tokens of a response's `usage`, when the provider reports it."""
+    if usage is None:
+        return
+    for kind in ("prompt", "completion"):
+        tokens = getattr(usage, f"{kind}_tokens", None)
+        if isinstance(tokens, int) and tokens:
+            llm_tokens.labels(operation, kind).inc(tokens)
+
+
+def render() -> str:
+    return REGISTRY.render()
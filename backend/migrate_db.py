@@ -1,6 +1,8 @@
 #!/usr/bin/env python3
 """
-Database migration script to add User table and user_id column to Task table
+Database migration script to add User table and user_id column to Task table,
+to add nullable columns introduced later (e.g. Conversation.summary), and to create
+the per-user composite indexes on existing databases.
 """
 import sqlite3
 import sys
@@ -10,8 +12,75 @@ from sqlmodel import SQLModel
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import models directly to get table definitions
-from models import User, Task
+try:
+    # Relative import when imported as part of the backend package
+    from .models import User, Task, Conversation, Message
+except ImportError:
+    # Fallback to absolute import when run as a script
+    from models import User, Task, Conversation, Message
 from sqlmodel import create_engine
+from sqlalchemy import inspect, text
+
+
+def add_missing_columns(engine):
+    """
+    Add nullable model columns that are missing from existing tables.
+
+    create_all() never alters existing tables, so columns added to a model later
+    (such as the Conversation rolling-summary fields) need this step.
+    Works for both SQLite and PostgreSQL.
+    """
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as conn:
+        for model in (Task, Conversation, Message):
+            table = model.__table__
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def create_missing_indexes(engine):
+    """
+    Create any index declared on the models that does not exist yet.
+
+    SQLModel.metadata.create_all() only creates indexes together with new tables,
+    so databases created before the composite indexes were declared need this step.
+    Works for both SQLite and PostgreSQL.
+    """
+    index_names = []
+    for model in (Task, Conversation, Message):
+        for index in model.__table__.indexes:
+            # checkfirst skips indexes that are already present
+            index.create(bind=engine, checkfirst=True)
+            index_names.append(index.name)
+    return index_names
+
+
+def migrate_indexes(database_url=None):
+    """
+    Apply the composite index migration (and any missing nullable columns) to the
+    configured database (DATABASE_URL / NEON_DATABASE_URL), or to the given URL.
+    """
+    database_url = database_url or os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if not database_url:
+        return []
+    engine = create_engine(database_url)
+    try:
+        print(f"Adding missing columns on {engine.url.render_as_string(hide_password=True)}...")
+        add_missing_columns(engine)
+        print(f"Creating missing indexes on {engine.url.render_as_string(hide_password=True)}...")
+        return create_missing_indexes(engine)
+    finally:
+        engine.dispose()
+
 
 def migrate_database():
     # Connect to SQLite database directly
@@ -25,6 +94,14 @@ def migrate_database():
     print("Creating all tables based on models...")
     SQLModel.metadata.create_all(engine)
 
+    # Add columns introduced after the tables were created
+    print("Adding missing columns...")
+    add_missing_columns(engine)
+
+    # Create composite indexes on tables that already existed
+    print("Creating missing indexes...")
+    create_missing_indexes(engine)
+
     # Connect to SQLite database for manual operations
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
@@ -69,4 +146,8 @@ def migrate_database():
         conn.close()
 
 if __name__ == "__main__":
-    migrate_database()
\ No newline at end of file
+    migrate_database()
+    # Also migrate a non-SQLite DATABASE_URL (e.g. Neon PostgreSQL) if configured
+    url = os.getenv("NEON_DATABASE_URL") or os.getenv("DATABASE_URL")
+    if url and not url.startswith("sqlite"):
+        migrate_indexes(url)
\ No newline at end of file
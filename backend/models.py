@@ -1,5 +1,6 @@
 from sqlmodel import SQLModel, Field
-from typing import Optional
+from sqlalchemy import Index
+from typing import Optional, Literal
 from pydantic import ConfigDict, field_validator
 import uuid
 from datetime import datetime
@@ -20,10 +21,20 @@ class User(SQLModel, table=True):
 
 
 class Conversation(SQLModel, table=True):
+    # Ownership checks in crud.get_conversation filter on (user_id, id)
+    __table_args__ = (
+        Index("ix_conversation_user_id_id", "user_id", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(foreign_key="user.id", nullable=False)
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Rolling summary of the turns that fell out of the chat context window (see context_window.py)
+    summary: Optional[str] = None
+    summarized_until_id: Optional[int] = None  # Last Message.id folded into the summary
+    # Assistants API thread holding this conversation (see agents_sdk.py)
+    assistant_thread_id: Optional[str] = None
 
     # Relationship to user and messages
     user: Optional["User"] = Relationship(back_populates="conversations")
@@ -31,6 +42,13 @@ class Conversation(SQLModel, table=True):
 
 
 class Task(SQLModel, table=True):
+    # Per-user lookups (crud.get_tasks_by_user / get_task_by_user) filter on (user_id, id);
+    # keyset pagination (crud.get_tasks_page) walks (user_id, created_at, id)
+    __table_args__ = (
+        Index("ix_task_user_id_id", "user_id", "id"),
+        Index("ix_task_user_id_created_at_id", "user_id", "created_at", "id"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(foreign_key="user.id", nullable=False)
     title: str
@@ -44,6 +62,11 @@ class Task(SQLModel, table=True):
 
 
 class Message(SQLModel, table=True):
+    # crud.get_messages filters on conversation_id + user_id and orders by created_at
+    __table_args__ = (
+        Index("ix_message_conversation_id_user_id_created_at", "conversation_id", "user_id", "created_at"),
+    )
+
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: str = Field(foreign_key="user.id", nullable=False)
     conversation_id: int = Field(foreign_key="conversation.id", nullable=False)
@@ -56,6 +79,20 @@ class Message(SQLModel, table=True):
     conversation: Optional["Conversation"] = Relationship(back_populates="messages")
 
 
+class PendingAction(SQLModel, table=True):
+    """
+    A destructive operation awaiting the user's confirmation (Two-Step Mutation Rule).
+    At most one per conversation; it only applies to the next user message.
+    """
+    conversation_id: int = Field(foreign_key="conversation.id", primary_key=True)
+    user_id: str = Field(foreign_key="user.id", nullable=False)
+    operation: str  # "delete" or "rename"
+    task_id: int  # Database ID of the target task
+    new_title: Optional[str] = None  # For renames
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    expires_at: datetime
+
+
 # Request models for API
 class UserCreate(SQLModel):
     email: str
@@ -120,6 +157,31 @@ class TaskResponse(SQLModel):
     model_config = ConfigDict(from_attributes=True, extra='ignore')
 
 
+class TaskBatchOperation(SQLModel):
+    op: Literal["create", "update", "complete", "delete"]
+    task_id: Optional[int] = None  # Required for update/complete/delete
+    title: Optional[str] = None
+    description: Optional[str] = None
+    completed: Optional[bool] = None
+
+
+class TaskBatchRequest(SQLModel):
+    operations: list[TaskBatchOperation]
+
+
+class TaskBatchResult(SQLModel):
+    index: int
+    op: str
+    status: str  # "created", "updated", "completed", "deleted", "not_found" or "invalid"
+    task_id: Optional[int] = None
+    task: Optional[TaskResponse] = None
+    error: Optional[str] = None
+
+
+class TaskBatchResponse(SQLModel):
+    results: list[TaskBatchResult]
+
+
 class ConversationCreate(SQLModel):
     pass  # Empty for now, as conversation_id is optional in chat endpoint
 
@@ -159,6 +221,8 @@ class ChatResponse(SQLModel):
     conversation_id: int
     response: str
     tool_calls: Optional[list] = []
+    # Per-span timing breakdown, only when requested with the X-Debug-Timing header
+    timings: Optional[list] = None
 
     model_config = ConfigDict(from_attributes=True)
 
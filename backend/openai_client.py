@@ -2,13 +2,38 @@
 OpenAI Client for Phase 3 Todo AI Chatbot.
 Provides LLM-powered intent recognition and response generation.
 """
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 from dotenv import load_dotenv
+import hashlib
+import json
 import os
+import re
+
+from . import llm_transport, metrics
+from .cache import TTLCache
 
 # Load environment variables
 load_dotenv()
 
+# Messages of history the intent classifier sees
+CLASSIFY_HISTORY_MESSAGES = 5
+
+# Intent classification cache, keyed by the normalized message and the history the classifier
+# sees. Set either value to 0 to disable.
+INTENT_CACHE_MAX_SIZE = int(os.getenv("INTENT_CACHE_MAX_SIZE", "1000"))
+INTENT_CACHE_TTL_SECONDS = float(os.getenv("INTENT_CACHE_TTL_SECONDS", "300"))
+
+# Cached classifications are the model's raw output: task numbers and titles are resolved
+# against the current task list by the orchestrator on every turn, never served from here
+intent_cache = TTLCache(INTENT_CACHE_MAX_SIZE, INTENT_CACHE_TTL_SECONDS)
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_message(message: str) -> str:
+    """Case, surrounding whitespace and trailing punctuation do not change a message's intent."""
+    return _WHITESPACE.sub(" ", message).strip().rstrip(".!?").strip().lower()
+
 
 class OpenAIClient:
     """
@@ -18,6 +43,8 @@ class OpenAIClient:
 
     def __init__(self):
         self._client = None
+        # Set to inject an async client; otherwise llm_transport's client for the running loop is used
+        self._async_client = None
         # Load from project root (one level up from backend directory) if not already set by system env
         import os
         from dotenv import load_dotenv
@@ -52,18 +79,29 @@ Always be helpful, friendly, and concise in your responses."""
         """Lazy initialization of OpenAI client."""
         if self._client is None:
             if not self._api_key:
-                from dotenv import load_dotenv
-                import os
                 # Load from project root (one level up from backend directory)
                 load_dotenv(os.path.join(os.path.dirname(os.path.dirname(__file__)), '.env'))
                 self._api_key = os.getenv("OPENAI_API_KEY")
             if not self._api_key:
                 raise ValueError("OPENAI_API_KEY environment variable is not set")
             self._base_url = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1")
-            from openai import OpenAI
-            self._client = OpenAI(api_key=self._api_key, base_url=self._base_url)
+            # Pooled connections, timeouts, retries and in-flight limit shared with agents_sdk
+            self._client = llm_transport.get_openai(self._api_key, self._base_url)
         return self._client
 
+    @property
+    def async_client(self):
+        """
+        The async OpenAI client for the running event loop (used by the non-blocking chat path).
+        Not cached here: its pooled connections belong to the loop, see llm_transport.
+        """
+        if self._async_client is not None:
+            # Injected client
+            return self._async_client
+        # Reuse the sync property for key loading and validation
+        self.client
+        return llm_transport.get_async_openai(self._api_key, self._base_url)
+
     def is_configured(self) -> bool:
         """Check if OpenAI is properly configured."""
         return bool(self._api_key)
@@ -88,6 +126,153 @@ Always be helpful, friendly, and concise in your responses."""
         if not self.is_configured():
             raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
 
+        messages = self._chat_messages(message, history, tools_description)
+
+        try:
+            with llm_transport.call("chat"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500
+                )
+            metrics.record_llm_usage("chat", getattr(response, "usage", None))
+            return response.choices[0].message.content or ""
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    async def chat_async(
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        tools_description: str = ""
+    ) -> str:
+        """
+        Async version of chat(); awaits the completion instead of blocking the event loop.
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        messages = self._chat_messages(message, history, tools_description)
+
+        try:
+            with llm_transport.call("chat"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500
+                )
+            metrics.record_llm_usage("chat", getattr(response, "usage", None))
+            return response.choices[0].message.content or ""
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    async def chat_stream_async(
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        tools_description: str = ""
+    ) -> AsyncIterator[str]:
+        """
+        Streaming version of chat_async(): yields the response text in chunks as the model produces them.
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        messages = self._chat_messages(message, history, tools_description)
+
+        try:
+            # Guarded and timed up to the first chunk: the time spent suspended at `yield`
+            # belongs to the consumer (e.g. a slow SSE client), not to the provider
+            with llm_transport.call("chat_stream"):
+                stream = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    temperature=0.3,
+                    max_tokens=500,
+                    stream=True
+                )
+                chunks = stream.__aiter__()
+                chunk = await anext(chunks, None)
+            while chunk is not None:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                chunk = await anext(chunks, None)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    def complete_with_tools(
+        self,
+        messages: List[Dict[str, str]],
+        tools: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Single chat completion with function tools declared.
+
+        Args:
+            messages: The full message list (see tool_calling.build_messages)
+            tools: Function tool definitions
+
+        Returns:
+            The text content and the tool calls as {"name": ..., "arguments": "<json>"} dicts
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        try:
+            with llm_transport.call("tools"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    tools=tools,
+                    temperature=0.1,
+                    max_tokens=500
+                )
+            metrics.record_llm_usage("tools", getattr(response, "usage", None))
+            return self._tool_response(response.choices[0].message)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    async def complete_with_tools_async(
+        self,
+        messages: List[Dict[str, str]],
+        tools: List[Dict[str, Any]]
+    ) -> Tuple[str, List[Dict[str, str]]]:
+        """
+        Async version of complete_with_tools().
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        try:
+            with llm_transport.call("tools"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=messages,
+                    tools=tools,
+                    temperature=0.1,
+                    max_tokens=500
+                )
+            metrics.record_llm_usage("tools", getattr(response, "usage", None))
+            return self._tool_response(response.choices[0].message)
+        except Exception as e:
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    @staticmethod
+    def _tool_response(message) -> Tuple[str, List[Dict[str, str]]]:
+        tool_calls = [
+            {"name": call.function.name, "arguments": call.function.arguments}
+            for call in (message.tool_calls or [])
+        ]
+        return message.content or "", tool_calls
+
+    def _chat_messages(
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        tools_description: str = ""
+    ) -> List[Dict[str, str]]:
         # Build messages list
         messages = [{"role": "system", "content": self.system_prompt}]
 
@@ -102,21 +287,13 @@ Always be helpful, friendly, and concise in your responses."""
         if tools_description:
             messages.append({"role": "system", "content": f"Available tools:\n{tools_description}"})
 
-        try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.3,
-                max_tokens=500
-            )
-            return response.choices[0].message.content or ""
-        except Exception as e:
-            raise RuntimeError(f"OpenAI API error: {str(e)}")
+        return messages
 
     def classify_intent(
         self,
         message: str,
-        history: List[Dict[str, str]]
+        history: List[Dict[str, str]],
+        use_cache: bool = True
     ) -> Dict[str, Any]:
         """
         Classify the user's intent and extract entities.
@@ -124,19 +301,114 @@ Always be helpful, friendly, and concise in your responses."""
         Args:
             message: The user's current message
             history: List of previous messages in the conversation
+            use_cache: Serve repeated classifications from intent_cache (and store new ones)
 
         Returns:
             Dictionary with intent and extracted entities
+
+        Raises:
+            RuntimeError: If the API call fails or the LLM circuit breaker is open
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        cache_key = self._intent_cache_key(message, history) if use_cache else None
+        if cache_key is not None:
+            cached = self._cached_intent(cache_key, message)
+            if cached is not None:
+                return cached
+
+        try:
+            with llm_transport.call("classify_intent"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=self._classify_messages(message, history),
+                    temperature=0.1,
+                    max_tokens=200
+                )
+        except Exception as e:
+            # The provider failed (or the circuit breaker is open): the caller falls back
+            # to rule-based processing instead of waiting on a second completion
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+        metrics.record_llm_usage("classify_intent", getattr(response, "usage", None))
+        try:
+            intent_data = self._parse_intent(response.choices[0].message.content)
+        except ValueError as e:
+            # Unparseable classification: handled as a general query (and not cached)
+            return {"intent": "unknown", "error": str(e)}
+        if cache_key is not None and isinstance(intent_data, dict):
+            intent_cache.set(cache_key, dict(intent_data))
+        return intent_data
+
+    async def classify_intent_async(
+        self,
+        message: str,
+        history: List[Dict[str, str]],
+        use_cache: bool = True
+    ) -> Dict[str, Any]:
+        """
+        Async version of classify_intent(); awaits the completion instead of blocking the event loop.
         """
         if not self.is_configured():
             raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
 
+        cache_key = self._intent_cache_key(message, history) if use_cache else None
+        if cache_key is not None:
+            cached = self._cached_intent(cache_key, message)
+            if cached is not None:
+                return cached
+
+        try:
+            with llm_transport.call("classify_intent"):
+                response = await self.async_client.chat.completions.create(
+                    model=self.model,
+                    messages=self._classify_messages(message, history),
+                    temperature=0.1,
+                    max_tokens=200
+                )
+        except Exception as e:
+            # The provider failed (or the circuit breaker is open): the caller falls back
+            # to rule-based processing instead of waiting on a second completion
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+        metrics.record_llm_usage("classify_intent", getattr(response, "usage", None))
+        try:
+            intent_data = self._parse_intent(response.choices[0].message.content)
+        except ValueError as e:
+            # Unparseable classification: handled as a general query (and not cached)
+            return {"intent": "unknown", "error": str(e)}
+        if cache_key is not None and isinstance(intent_data, dict):
+            intent_cache.set(cache_key, dict(intent_data))
+        return intent_data
+
+    def _intent_cache_key(self, message: str, history: List[Dict[str, str]]) -> Optional[Tuple[str, str, str]]:
+        if not intent_cache.enabled:
+            return None
+        recent = [[m.get("role"), m.get("content", "")] for m in history[-CLASSIFY_HISTORY_MESSAGES:]]
+        history_hash = hashlib.sha256(json.dumps(recent).encode()).hexdigest()
+        return self.model, normalize_message(message), history_hash
+
+    @staticmethod
+    def _cached_intent(cache_key: Tuple[str, str, str], message: str) -> Optional[Dict[str, Any]]:
+        cached = intent_cache.get(cache_key)
+        if cached is None:
+            return None
+        intent_data = dict(cached)
+        # Titles were extracted from a message that may differ in case; use this message's spelling
+        for field in ("task_title", "new_title"):
+            value = intent_data.get(field)
+            if isinstance(value, str) and value:
+                start = message.lower().find(value.lower())
+                if start >= 0:
+                    intent_data[field] = message[start:start + len(value)]
+        return intent_data
+
+    def _classify_messages(self, message: str, history: List[Dict[str, str]]) -> List[Dict[str, str]]:
         prompt = f"""Analyze this todo assistant conversation and classify the intent.
 
 Current message: "{message}"
 
 History:
-{chr(10).join([f"{m.get('role')}: {m.get('content', '')}" for m in history[-5:]])}
+{chr(10).join([f"{m.get('role')}: {m.get('content', '')}" for m in history[-CLASSIFY_HISTORY_MESSAGES:]])}
 
 Intent classification guide:
 - create: Adding a new task (keywords: add, create, new, remind me to)
@@ -156,26 +428,62 @@ Respond with JSON (no markdown):
     "confirmation_message": null or string
 }}"""
 
-        messages = [
+        return [
             {"role": "system", "content": "You are a todo assistant intent classifier. Always respond with valid JSON only."},
             {"role": "user", "content": prompt}
         ]
 
+    def summarize(
+        self,
+        previous_summary: Optional[str],
+        messages: List[Dict[str, str]],
+        max_chars: int = 2000
+    ) -> str:
+        """
+        Fold older conversation turns into the conversation's rolling summary.
+        Only the new turns are sent, together with the previous summary, so the summary
+        is extended incrementally rather than recomputed from the full history.
+
+        Returns:
+            The updated summary (at most max_chars characters)
+        """
+        if not self.is_configured():
+            raise RuntimeError("OpenAI is not configured. Set OPENAI_API_KEY in .env file.")
+
+        turns = chr(10).join(f"{m.get('role')}: {m.get('content', '')}" for m in messages)
+        prompt = f"""Update the summary of this todo assistant conversation with the new turns.
+Keep facts that matter for later turns (tasks mentioned, decisions, user preferences). Be concise.
+
+Current summary:
+{previous_summary or "(none)"}
+
+New turns:
+{turns}
+
+Respond with the updated summary only."""
+
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=0.1,
-                max_tokens=200
-            )
-            import json
-            content = response.choices[0].message.content or "{}"
-            # Clean up any markdown formatting
-            content = content.replace("```json", "").replace("```", "").strip()
-            return json.loads(content)
+            with llm_transport.call("summarize"):
+                response = self.client.chat.completions.create(
+                    model=self.model,
+                    messages=[
+                        {"role": "system", "content": "You summarize conversations for a todo assistant."},
+                        {"role": "user", "content": prompt}
+                    ],
+                    temperature=0.1,
+                    max_tokens=300
+                )
+            metrics.record_llm_usage("summarize", getattr(response, "usage", None))
+            return (response.choices[0].message.content or "").strip()[:max_chars]
         except Exception as e:
-            # Fallback to rule-based classification
-            return {"intent": "unknown", "error": str(e)}
+            raise RuntimeError(f"OpenAI API error: {str(e)}")
+
+    @staticmethod
+    def _parse_intent(content: Optional[str]) -> Dict[str, Any]:
+        content = content or "{}"
+        # Clean up any markdown formatting
+        content = content.replace("```json", "").replace("```", "").strip()
+        return json.loads(content)
 
 
 # Create client instance (lazy initialization)
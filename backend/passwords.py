@@ -0,0 +1,134 @@
+"""
+Password hashing for the Evolution of Todo backend.
+
+bcrypt is deliberately slow (about 250 ms per call at cost 12), so hashing and
+verification run in a dedicated, size-limited thread pool instead of inline on the
+request workers (bcrypt releases the GIL, so threads run in parallel). At most
+PASSWORD_HASH_WORKERS calls run at once and at most PASSWORD_HASH_MAX_QUEUE more may
+wait; beyond that PasswordHashingBusy is raised and the API answers 503, so a login
+burst cannot starve the rest of the server.
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+import asyncio
+import os
+import threading
+
+import bcrypt
+
+# bcrypt cost factor for new hashes (existing hashes keep the cost they were created with)
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+PASSWORD_HASH_MAX_QUEUE = int(os.getenv("PASSWORD_HASH_MAX_QUEUE", "32"))
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the password hashing queue is full."""
+
+
+class PasswordHasher:
+    """
+    Bounded bcrypt worker pool with a queue-depth limit.
+    """
+
+    def __init__(self, workers: int = PASSWORD_HASH_WORKERS, max_queue: int = PASSWORD_HASH_MAX_QUEUE, rounds: int = BCRYPT_ROUNDS):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.rounds = rounds
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self._slots = threading.BoundedSemaphore(workers + max_queue)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    def _submit(self, fn: Callable[..., Any], *args) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordHashingBusy("Too many concurrent password operations, please retry")
+        with self._lock:
+            self._in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except BaseException:
+            self._release()
+            raise
+        future.add_done_callback(self._finished)
+        return future
+
+    def _finished(self, future: Future) -> None:
+        # A call that raised (e.g. a malformed stored hash) is not completed work
+        failed = future.cancelled() or future.exception() is not None
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def _hash(self, password: str) -> str:
+        return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=self.rounds)).decode('utf-8')
+
+    @staticmethod
+    def _check(password: str, hashed_password: str) -> bool:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+    def hash(self, password: str) -> str:
+        return self._submit(self._hash, password).result()
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return self._submit(self._check, password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        return await asyncio.wrap_future(self._submit(self._hash, password))
+
+    async def verify_async(self, password: str, hashed_password: str) -> bool:
+        return await asyncio.wrap_future(self._submit(self._check, password, hashed_password))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queued": max(0, self._in_flight - self.workers),
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+            }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
+
+
+def hash_password(password: str) -> str:
+    """
+    Hash a password with bcrypt on the password worker pool.
+    """
+    return password_hasher.hash(password)
+
+
+def verify_password(plain_password: str, hashed_password: str) -> bool:
+    """
+    Verify a plain password against a bcrypt hash on the password worker pool.
+    """
+    return password_hasher.verify(plain_password, hashed_password)
+
+
+async def hash_password_async(password: str) -> str:
+    return await password_hasher.hash_async(password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await password_hasher.verify_async(plain_password, hashed_password)
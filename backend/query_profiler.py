@@ -0,0 +1,210 @@
+"""
+SQL query profiler: per-request query counts, DB time and statement fingerprints.
+
+install(engine) hooks the engine's cursor events (database.py installs it on the app's
+engines). Every statement is timed:
+- statements slower than SLOW_QUERY_MS are logged with the code that issued them;
+- inside profile() (QueryProfilerMiddleware opens one per request), the statement is
+  counted under its fingerprint: the SQL with literals replaced by ? and IN lists
+  collapsed, so the same query with different parameters has one fingerprint;
+- a fingerprint executed N_PLUS_ONE_THRESHOLD times in one profile is flagged as a
+  likely N+1 (logged once per request, with its call site).
+
+Tests use assert_max_queries(n, engine) to pin the number of queries an endpoint issues;
+it counts statements from every thread, so TestClient requests are included.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+import os
+import re
+import sys
+import time
+import weakref
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+QUERY_PROFILER_ENABLED = os.getenv("QUERY_PROFILER_ENABLED", "true").lower() == "true"
+# 0 disables the slow-query log
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+N_PLUS_ONE_THRESHOLD = int(os.getenv("N_PLUS_ONE_THRESHOLD", "5"))
+
+_BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+_SKIP_FILES = (os.path.abspath(__file__), os.path.join(_BACKEND_DIR, "tracing.py"))
+
+_WHITESPACE = re.compile(r"\s+")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|:\w+|\$\d+|%s|\?")
+_IN_LIST = re.compile(r"\bIN \((?:\?(?:, )?)+\)", re.IGNORECASE)
+_REPEATED_VALUES = re.compile(r"(VALUES \([^)]*\))(?:, \([^)]*\))+", re.IGNORECASE)
+
+# Statement text -> fingerprint; SQLAlchemy reuses its compiled statement strings
+_fingerprints: Dict[str, str] = {}
+_FINGERPRINT_CACHE_SIZE = 10000
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize a statement so that executions differing only in parameters compare equal."""
+    cached = _fingerprints.get(statement)
+    if cached is not None:
+        return cached
+    normalized = _WHITESPACE.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _IN_LIST.sub("IN (...)", normalized)
+    normalized = _REPEATED_VALUES.sub(r"\1, ...", normalized)
+    if len(_fingerprints) < _FINGERPRINT_CACHE_SIZE:
+        _fingerprints[statement] = normalized
+    return normalized
+
+
+def call_site() -> str:
+    """The innermost backend frame outside the profiler (e.g. "crud.py:251 in get_tasks_by_user")."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(_BACKEND_DIR) and filename not in _SKIP_FILES:
+            return f"{os.path.relpath(filename, _BACKEND_DIR)}:{frame.f_lineno} in {frame.f_code.co_name}"
+        frame = frame.f_back
+    return "unknown"
+
+
+@dataclass
+class QueryProfile:
+    """Queries issued inside one profile() block."""
+    count: int = 0
+    seconds: float = 0.0
+    # Fingerprint -> executions
+    fingerprints: Dict[str, int] = field(default_factory=dict)
+    # Fingerprints executed N_PLUS_ONE_THRESHOLD times or more -> where the threshold was reached
+    repeated: Dict[str, str] = field(default_factory=dict)
+    # (milliseconds, fingerprint, call site) of statements over SLOW_QUERY_MS
+    slow: List[Tuple[float, str, str]] = field(default_factory=list)
+
+    def record(self, statement: str, seconds: float) -> None:
+        key = fingerprint(statement)
+        self.count += 1
+        self.seconds += seconds
+        executions = self.fingerprints.get(key, 0) + 1
+        self.fingerprints[key] = executions
+        if executions == N_PLUS_ONE_THRESHOLD:
+            self.repeated[key] = call_site()
+
+    def summary(self, top: int = 5) -> str:
+        lines = [f"{self.count} queries in {self.seconds * 1000.0:.1f}ms"]
+        for key, executions in sorted(self.fingerprints.items(), key=lambda item: -item[1])[:top]:
+            lines.append(f"  {executions}x {key}")
+        return "\n".join(lines)
+
+
+_profile: ContextVar[Optional[QueryProfile]] = ContextVar("query_profile", default=None)
+# Profiles of assert_max_queries blocks: they see statements from every thread (TestClient
+# runs the app in its own thread, outside the test's context)
+_captures: List[QueryProfile] = []
+_installed: "weakref.WeakSet" = weakref.WeakSet()
+
+
+@contextmanager
+def profile() -> Iterator[QueryProfile]:
+    """
+    Count the queries issued in the block, including in worker threads started with
+    asyncio.to_thread / run_in_threadpool (they copy the context).
+    """
+    query_profile = QueryProfile()
+    token = _profile.set(query_profile)
+    try:
+        yield query_profile
+    finally:
+        _profile.reset(token)
+
+
+def install(engine) -> None:
+    """Time the engine's statements for the active profile and the slow-query log (once per engine)."""
+    if engine in _installed:
+        return
+    _installed.add(engine)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("profiler_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("profiler_start")
+        if not starts:
+            # Installed while this statement was running
+            return
+        seconds = time.perf_counter() - starts.pop()
+        query_profile = _profile.get()
+        if query_profile is not None:
+            query_profile.record(statement, seconds)
+        for capture in _captures:
+            capture.record(statement, seconds)
+        if SLOW_QUERY_MS and seconds * 1000.0 >= SLOW_QUERY_MS:
+            site = call_site()
+            logger.warning(f"Slow query ({seconds * 1000.0:.1f}ms) from {site}: {fingerprint(statement)}")
+            if query_profile is not None:
+                query_profile.slow.append((seconds * 1000.0, fingerprint(statement), site))
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("profiler_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+class QueryProfilerMiddleware:
+    """
+    ASGI middleware: profiles each HTTP request, adds a Server-Timing header with the
+    query count and DB time (as of the response start) and warns about repeated statements.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not QUERY_PROFILER_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        with profile() as query_profile:
+            async def send_with_timing(message):
+                if message["type"] == "http.response.start":
+                    header = f'db;dur={query_profile.seconds * 1000.0:.1f};desc="{query_profile.count} queries"'
+                    message["headers"] = list(message.get("headers", [])) + [(b"server-timing", header.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_timing)
+
+        request = f"{scope.get('method')} {scope.get('path')}"
+        for key, site in query_profile.repeated.items():
+            logger.warning(
+                f"Possible N+1 in {request}: {query_profile.fingerprints[key]}x from {site}: {key}"
+            )
+        if query_profile.count:
+            logger.debug(f"{request}: {query_profile.summary()}")
+
+
+@contextmanager
+def assert_max_queries(max_queries: int, engine=None) -> Iterator[QueryProfile]:
+    """
+    Test helper: fail if the block issues more than max_queries statements. Pass the
+    engine the test uses (it is instrumented on first use).
+    """
+    if engine is not None:
+        install(engine)
+    query_profile = QueryProfile()
+    _captures.append(query_profile)
+    try:
+        yield query_profile
+    finally:
+        _captures.remove(query_profile)
+    assert query_profile.count <= max_queries, (
+        f"Expected at most {max_queries} queries, got {query_profile.summary(top=20)}"
+    )
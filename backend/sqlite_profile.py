@@ -0,0 +1,181 @@
+"""
+Production profile for file-backed SQLite: tuned pragmas and a single-writer queue.
+
+apply_pragmas(engine) sets, on every new connection:
+- journal_mode=WAL, so readers no longer block on (or block) the writer;
+- synchronous=NORMAL, which is durable in WAL mode except for the last commits
+  before a power loss (never corruption);
+- busy_timeout, so a writer in another process (e.g. another uvicorn worker) is waited
+  for instead of failing with "database is locked";
+- mmap_size and cache_size, to serve reads from memory.
+
+SQLiteWriter runs every write on one dedicated thread and connection. Request threads
+submit a write (a function of a Session) and block until it is committed. The writer
+takes everything queued while the previous commit was running and commits it as one
+transaction (group commit), each write in its own SAVEPOINT so a failing write is rolled
+back alone. Reads stay on the request's own session and run in parallel.
+
+database.get_session hands the writer to crud through session.info["sqlite_writer"]
+(see crud._write). Sessions without it commit their own writes.
+"""
+from concurrent.futures import Future
+from contextvars import copy_context
+from typing import Any, Callable, List, Optional, Tuple
+import logging
+import os
+import queue
+import threading
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlmodel import Session
+
+try:
+    from . import metrics
+except ImportError:
+    import metrics
+
+logger = logging.getLogger(__name__)
+
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Negative values are KiB: 64 MiB of page cache per connection
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_WRITE_QUEUE = os.getenv("SQLITE_WRITE_QUEUE", "true").lower() == "true"
+# Most writes committed together; how long the writer waits for more before committing
+SQLITE_WRITE_BATCH_MAX = int(os.getenv("SQLITE_WRITE_BATCH_MAX", "64"))
+SQLITE_WRITE_BATCH_WINDOW_MS = float(os.getenv("SQLITE_WRITE_BATCH_WINDOW_MS", "0"))
+
+
+def is_file_database(database_url: str) -> bool:
+    """True for SQLite URLs that point at a file (in-memory databases cannot use WAL or a second connection)."""
+    url = make_url(database_url)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def apply_pragmas(engine) -> None:
+    """Apply the production pragmas to every connection the engine opens."""
+
+    @event.listens_for(engine, "connect")
+    def _set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size={SQLITE_CACHE_SIZE}")
+        cursor.close()
+
+
+_STOP = object()
+
+
+class SQLiteWriter:
+    """Single writer thread that group-commits the writes submitted from request threads."""
+
+    def __init__(self, database_url: str, max_batch: int = SQLITE_WRITE_BATCH_MAX,
+                 window_ms: float = SQLITE_WRITE_BATCH_WINDOW_MS):
+        self.engine = create_engine(database_url, echo=False, connect_args={"check_same_thread": False})
+        apply_pragmas(self.engine)
+        self._use_explicit_transactions(self.engine)
+        self.max_batch = max_batch
+        self.window = window_ms / 1000.0
+        self.batches = 0
+        self.writes = 0
+        self._queue: "queue.Queue" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _use_explicit_transactions(engine) -> None:
+        # pysqlite only opens a transaction before DML, so a leading SAVEPOINT would start
+        # (and its RELEASE commit) a transaction of its own. Open it explicitly instead;
+        # IMMEDIATE takes the write lock up front, waiting out other processes' writers.
+        @event.listens_for(engine, "connect")
+        def _autocommit_driver(dbapi_connection, connection_record):
+            dbapi_connection.isolation_level = None
+
+        @event.listens_for(engine, "begin")
+        def _begin_immediate(conn):
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+
+    def submit(self, write: Callable[[Session], Any]) -> Any:
+        """
+        Run write(session) on the writer and return its result once it is committed
+        (objects come back detached and loaded). Exceptions raised by the write, or by the
+        commit, are raised here.
+        """
+        self._start()
+        future: Future = Future()
+        # The write runs in the caller's context: tracing spans and the query profile see it
+        self._queue.put((write, future, copy_context()))
+        return future.result()
+
+    def close(self) -> None:
+        """Commit what is queued and stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
+        self.engine.dispose()
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=self.window) if self.window else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stop = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+            if stop:
+                return
+
+    def _commit(self, batch: List[Tuple[Callable[[Session], Any], Future, Any]]) -> None:
+        outcomes = []
+        try:
+            with Session(self.engine, expire_on_commit=False) as session:
+                for write, future, context in batch:
+                    try:
+                        with session.begin_nested():
+                            result = context.run(write, session)
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+                    else:
+                        outcomes.append((future, result, None))
+                session.commit()
+                session.expunge_all()
+        except Exception as exc:
+            logger.error(f"SQLite writer failed to commit {len(batch)} writes: {exc}")
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.writes += len(batch)
+        metrics.db_write_batch_size.observe(len(batch))
+        for future, result, exc in outcomes:
+            if exc is not None:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
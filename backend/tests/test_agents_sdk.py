@@ -0,0 +1,244 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Conversation, Task
+from .. import agents_sdk, crud, llm_transport
+from ..circuit_breaker import CircuitBreaker
+
+
+class FakeStream(list):
+    """A finished run stream: the events, usable as a context manager like the SDK's Stream."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+def _reply(text):
+    return SimpleNamespace(role="assistant", content=[SimpleNamespace(type="text", text=SimpleNamespace(value=text))])
+
+
+def _run(status, tool_calls=None):
+    required_action = None
+    if tool_calls:
+        required_action = SimpleNamespace(type="submit_tool_outputs",
+                                          submit_tool_outputs=SimpleNamespace(tool_calls=tool_calls))
+    return SimpleNamespace(id="run_1", status=status, required_action=required_action)
+
+
+class FakeAssistantsClient:
+    """
+    Records Assistants API calls. Streamed runs complete immediately with a text reply,
+    after asking for tool_calls if any are given; polled runs report run_statuses in turn
+    (asking for tool_calls at requires_action).
+    """
+
+    def __init__(self, existing_assistants=(), tool_calls=None, run_statuses=("completed",)):
+        self.calls = []
+        self.assistants = list(existing_assistants)
+        self.threads = {}
+        self.tool_calls = tool_calls
+        self.run_statuses = list(run_statuses)
+        self.tool_outputs = []
+        self.beta = SimpleNamespace(
+            assistants=SimpleNamespace(create=self._create_assistant, list=self._list_assistants),
+            threads=SimpleNamespace(
+                create=self._create_thread,
+                messages=SimpleNamespace(create=self._create_message, list=self._list_messages),
+                runs=SimpleNamespace(create=self._create_run, retrieve=self._retrieve_run,
+                                     submit_tool_outputs=self._submit_tool_outputs, cancel=self._cancel_run),
+            ),
+        )
+
+    def _create_assistant(self, **kwargs):
+        self.calls.append("assistants.create")
+        assistant = SimpleNamespace(id=f"asst_{len(self.assistants)}", metadata=kwargs.get("metadata"))
+        self.assistants.append(assistant)
+        return assistant
+
+    def _list_assistants(self, **kwargs):
+        self.calls.append("assistants.list")
+        return SimpleNamespace(data=list(self.assistants))
+
+    def _create_thread(self):
+        self.calls.append("threads.create")
+        thread = SimpleNamespace(id=f"thread_{len(self.threads)}")
+        self.threads[thread.id] = []
+        return thread
+
+    def _create_message(self, thread_id, role, content):
+        self.calls.append("messages.create")
+        self.threads[thread_id].append(content)
+
+    def _run_events(self, thread_id, tool_calls=None):
+        if tool_calls:
+            return FakeStream([SimpleNamespace(event="thread.run.requires_action", data=_run("requires_action", tool_calls))])
+        return FakeStream([
+            SimpleNamespace(event="thread.message.completed", data=_reply(f"{len(self.threads[thread_id])} messages so far")),
+            SimpleNamespace(event="thread.run.completed", data=_run("completed")),
+        ])
+
+    def _create_run(self, thread_id, assistant_id, instructions, stream=False, timeout=None):
+        self.calls.append("runs.create")
+        if stream:
+            return self._run_events(thread_id, self.tool_calls)
+        return self._next_run()
+
+    def _retrieve_run(self, thread_id, run_id):
+        self.calls.append("runs.retrieve")
+        return self._next_run()
+
+    def _next_run(self):
+        # The last status repeats
+        status = self.run_statuses.pop(0) if len(self.run_statuses) > 1 else self.run_statuses[0]
+        return _run(status, self.tool_calls if status == "requires_action" else None)
+
+    def _submit_tool_outputs(self, thread_id, run_id, tool_outputs, stream=False, timeout=None):
+        self.calls.append("runs.submit_tool_outputs")
+        self.tool_outputs.extend(tool_outputs)
+        if stream:
+            return self._run_events(thread_id)
+        return self._next_run()
+
+    def _cancel_run(self, thread_id, run_id):
+        self.calls.append("runs.cancel")
+
+    def _list_messages(self, thread_id, run_id=None):
+        self.calls.append("messages.list")
+        return SimpleNamespace(data=[_reply(f"{len(self.threads[thread_id])} messages so far")])
+
+
+class FakeClock:
+    """Stands in for the time module: sleeping advances the monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 4))
+        self.now += seconds
+
+
+@pytest.fixture(name="session")
+def session_fixture(monkeypatch):
+    monkeypatch.setattr(agents_sdk, "_assistant_ids", {})
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.commit()
+        yield session
+
+
+def test_assistant_and_thread_are_reused(session, monkeypatch):
+    client = FakeAssistantsClient()
+    monkeypatch.setattr(agents_sdk, "get_openai_client", lambda: client)
+    conversation = crud.create_conversation(session, "user-1")
+
+    assert agents_sdk.run_todo_agent(session, "user-1", "hi", conversation.id) == "1 messages so far"
+    # The reply arrives with the streamed run events
+    assert client.calls == ["assistants.list", "assistants.create", "threads.create", "messages.create", "runs.create"]
+    assert session.get(Conversation, conversation.id).assistant_thread_id == "thread_0"
+
+    client.calls.clear()
+    assert agents_sdk.run_todo_agent(session, "user-1", "again", conversation.id) == "2 messages so far"
+    # Later turns only append the message and start a run
+    assert client.calls == ["messages.create", "runs.create"]
+    assert len(client.assistants) == 1
+
+
+def test_assistant_is_found_after_restart(session, monkeypatch):
+    key = agents_sdk.assistant_cache_key("Todo Assistant", "gpt-4o-mini", agents_sdk.TODO_AGENT_TOOLS)
+    monkeypatch.delenv("OPENAI_MODEL", raising=False)
+    client = FakeAssistantsClient([SimpleNamespace(id="asst_old", metadata={"schema_hash": key})])
+    monkeypatch.setattr(agents_sdk, "get_openai_client", lambda: client)
+
+    assert agents_sdk.create_todo_agent(session, "user-1") == "asst_old"
+    assert agents_sdk.create_todo_agent(session, "user-1") == "asst_old"
+    assert client.calls == ["assistants.list"]
+
+
+def test_cache_key_changes_with_tool_schema():
+    key = agents_sdk.assistant_cache_key("Todo Assistant", "gpt-4o-mini", agents_sdk.TODO_AGENT_TOOLS)
+    assert key == agents_sdk.assistant_cache_key("Todo Assistant", "gpt-4o-mini", agents_sdk.TODO_AGENT_TOOLS)
+    assert key != agents_sdk.assistant_cache_key("Todo Assistant", "gpt-4o", agents_sdk.TODO_AGENT_TOOLS)
+    assert key != agents_sdk.assistant_cache_key("Todo Assistant", "gpt-4o-mini", agents_sdk.MCP_AGENT_TOOLS)
+
+
+def test_streamed_tool_calls_are_executed_as_they_arrive(session, monkeypatch):
+    tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(
+        name="add_task", arguments=json.dumps({"user_id": "someone-else", "title": "Buy milk"})
+    ))
+    client = FakeAssistantsClient(tool_calls=[tool_call])
+    monkeypatch.setattr(agents_sdk, "get_openai_client", lambda: client)
+
+    response, tool_calls_made = agents_sdk.run_todo_agent_with_mcp_tools(session, "user-1", "add buy milk", [])
+    assert response == "1 messages so far"
+    assert [call["name"] for call in tool_calls_made] == ["add_task"]
+    assert client.tool_outputs[0]["tool_call_id"] == "call_1"
+    assert client.calls[-2:] == ["runs.create", "runs.submit_tool_outputs"]
+    assert session.get(Task, 1).user_id == "user-1"
+
+
+def test_polling_backs_off_until_completed(session, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(agents_sdk, "time", clock)
+    monkeypatch.setattr(agents_sdk, "ASSISTANT_RUN_STREAMING", False)
+    monkeypatch.setattr(agents_sdk, "ASSISTANT_POLL_INITIAL_SECONDS", 0.05)
+    monkeypatch.setattr(agents_sdk, "ASSISTANT_POLL_MAX_SECONDS", 0.2)
+    client = FakeAssistantsClient(run_statuses=["queued"] + ["in_progress"] * 5 + ["completed"])
+    monkeypatch.setattr(agents_sdk, "get_openai_client", lambda: client)
+
+    assert agents_sdk.run_todo_agent(session, "user-1", "hi") == "1 messages so far"
+    assert clock.sleeps == [0.05, 0.075, 0.1125, 0.1688, 0.2, 0.2]
+    assert client.calls.count("runs.retrieve") == 6
+    assert client.calls[-1] == "messages.list"
+
+
+def test_run_past_its_budget_is_cancelled(session, monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(agents_sdk, "time", clock)
+    monkeypatch.setattr(agents_sdk, "ASSISTANT_RUN_STREAMING", False)
+    client = FakeAssistantsClient(run_statuses=["in_progress"])
+    monkeypatch.setattr(agents_sdk, "get_openai_client", lambda: client)
+
+    with pytest.raises(TimeoutError):
+        agents_sdk.run_todo_agent(session, "user-1", "hi", timeout=2.0)
+    assert clock.now == pytest.approx(2.0)
+    assert client.calls[-1] == "runs.cancel"
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+def test_slow_tool_calls_are_not_breaker_outcomes(monkeypatch, streaming):
+    clock = FakeClock()
+    monkeypatch.setattr(agents_sdk, "time", clock)
+    monkeypatch.setattr(agents_sdk, "ASSISTANT_RUN_STREAMING", streaming)
+    breaker = CircuitBreaker("llm", slow_call_seconds=10.0, min_calls=1, clock=clock.monotonic)
+    monkeypatch.setattr(llm_transport, "breaker", breaker)
+    tool_call = SimpleNamespace(id="call_1", function=SimpleNamespace(name="list_tasks", arguments="{}"))
+    client = FakeAssistantsClient(tool_calls=[tool_call], run_statuses=["requires_action", "completed"])
+    client.threads["thread_0"] = ["hi"]
+
+    def slow_tool(tool_calls):
+        clock.now += 30.0
+        return [{"tool_call_id": call.id, "output": "[]"} for call in tool_calls]
+
+    assert agents_sdk.execute_run(client, "thread_0", "asst_0", "", slow_tool) == "1 messages so far"
+    stats = breaker.stats()
+    assert stats["state"] == "closed"
+    assert stats["window_calls"] == (2 if streaming else 3)
+    assert stats["slow_call_rate"] == 0.0
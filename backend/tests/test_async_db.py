@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from ..async_task_routes import router
+from ..database import get_async_session, get_async_database_url
+from ..better_auth import get_current_user_async
+from ..models import User, Task, TaskBatchOperation
+from .. import async_crud
+
+
+@pytest.fixture(name="db_path")
+def db_path_fixture(tmp_path):
+    db_path = tmp_path / "async.db"
+    engine = create_engine(f"sqlite:///{db_path}")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(user_id="user-1", title="Existing"))
+        session.commit()
+    engine.dispose()
+    return db_path
+
+
+@pytest.fixture(name="async_engine")
+def async_engine_fixture(db_path):
+    # NullPool: every connection is opened on the event loop that uses it
+    return create_async_engine(f"sqlite+aiosqlite:///{db_path}", poolclass=NullPool)
+
+
+@pytest.fixture(name="client")
+def client_fixture(async_engine):
+    app = FastAPI()
+    app.include_router(router)
+
+    async def get_async_session_override():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides[get_async_session] = get_async_session_override
+    app.dependency_overrides[get_current_user_async] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+
+
+def test_async_database_url_mapping():
+    assert get_async_database_url("sqlite:////tmp/todo.db") == "sqlite+aiosqlite:////tmp/todo.db"
+    assert get_async_database_url(
+        "postgresql://u:p@host/db?sslmode=require"
+    ) == "postgresql+asyncpg://u:p@host/db"
+
+
+def test_async_crud_roundtrip(async_engine):
+    async def scenario():
+        async with AsyncSession(async_engine, expire_on_commit=False) as session:
+            task = await async_crud.create_task(session, "Async task", None, "user-1")
+            assert task.id is not None
+
+            updated = await async_crud.update_task(session, task.id, "user-1", completed=True)
+            assert updated.completed is True
+            # Completion cannot be reverted
+            updated = await async_crud.update_task(session, task.id, "user-1", completed=False)
+            assert updated.completed is True
+
+            tasks, cursor = await async_crud.get_tasks_page(session, "user-1", limit=1)
+            assert [t.title for t in tasks] == ["Existing"] and cursor
+            tasks, cursor = await async_crud.get_tasks_page(session, "user-1", limit=1, cursor=cursor)
+            assert [t.title for t in tasks] == ["Async task"] and cursor is None
+
+            results = await async_crud.apply_task_batch(session, "user-1", [
+                TaskBatchOperation(op="create", title="Batched"),
+                TaskBatchOperation(op="delete", task_id=task.id),
+            ])
+            assert [r["status"] for r in results] == ["created", "deleted"]
+            assert await async_crud.get_task_by_user(session, task.id, "user-1") is None
+
+    asyncio.run(scenario())
+
+
+def test_async_task_routes(client: TestClient):
+    response = client.post("/api/user-1/tasks", json={"title": "Via async route"})
+    assert response.status_code == 201
+    task_id = response.json()["id"]
+
+    response = client.patch(f"/api/user-1/tasks/{task_id}/complete")
+    assert response.status_code == 200
+    assert response.json()["completed"] is True
+
+    response = client.get("/api/user-1/tasks", params={"status": "completed"})
+    assert [t["title"] for t in response.json()] == ["Via async route"]
+
+    assert client.delete(f"/api/user-1/tasks/{task_id}").status_code == 204
+    assert client.get(f"/api/user-1/tasks/{task_id}").status_code == 404
+    assert client.get("/api/someone-else/tasks").status_code == 403
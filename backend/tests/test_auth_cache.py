@@ -0,0 +1,109 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import better_auth, token_user_cache, invalidate_user_tokens
+from ..cache import TTLCache
+from ..models import User
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="queries")
+def queries_fixture(engine):
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    return statements
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    token_user_cache.clear()
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+    token_user_cache.clear()
+
+
+def _auth(user_id="user-1"):
+    return {"Authorization": f"Bearer {better_auth.create_token(user_id, f'{user_id}@example.com')}"}
+
+
+def test_ttl_cache_expiry_and_lru_eviction():
+    now = [0.0]
+    cache = TTLCache(maxsize=2, ttl_seconds=10, clock=lambda: now[0])
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    now[0] = 11
+    assert cache.get("a") is None
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 2 and cache.stats()["evictions"] == 1
+
+
+def test_cache_hit_skips_user_lookup(client: TestClient, queries):
+    headers = _auth()
+    assert client.get("/api/user-1/tasks", headers=headers).status_code == 200
+    assert any("FROM user" in q for q in queries)
+    misses = token_user_cache.misses
+
+    queries.clear()
+    assert client.get("/api/user-1/tasks", headers=headers).status_code == 200
+    assert not any("FROM user" in q for q in queries)
+    assert token_user_cache.misses == misses
+    assert token_user_cache.hits >= 1
+
+
+def test_invalid_token_is_not_served_from_cache(client: TestClient):
+    headers = _auth()
+    assert client.get("/api/user-1/tasks", headers=headers).status_code == 200
+    assert client.get("/api/user-1/tasks", headers={"Authorization": "Bearer nope"}).status_code == 401
+
+
+def test_deactivation_invalidates_cached_user(client: TestClient, engine):
+    headers = _auth()
+    assert client.get("/api/user-1/tasks", headers=headers).status_code == 200
+    assert token_user_cache.stats()["size"] == 1
+
+    with Session(engine) as session:
+        user = session.get(User, "user-1")
+        user.is_active = False
+        session.add(user)
+        session.commit()
+
+    assert token_user_cache.stats()["size"] == 0
+    response = client.get("/api/user-1/tasks", headers=headers)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User is inactive"
+
+
+def test_invalidate_user_tokens(client: TestClient):
+    assert client.get("/api/user-1/tasks", headers=_auth()).status_code == 200
+    assert invalidate_user_tokens("user-1") == 1
+    assert invalidate_user_tokens("user-1") == 0
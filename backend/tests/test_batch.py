@@ -0,0 +1,123 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task, TaskBatchOperation
+from .. import crud
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture(name="user")
+def user_fixture(engine):
+    with Session(engine) as session:
+        user = User(id="user-1", email="user-1@example.com", password_hash="x")
+        session.add(user)
+        session.add(Task(id=1, user_id=user.id, title="Existing 1"))
+        session.add(Task(id=2, user_id=user.id, title="Existing 2", completed=True))
+        session.add(Task(id=3, user_id=user.id, title="Existing 3"))
+        session.add(Task(id=4, user_id="someone-else", title="Not mine"))
+        session.commit()
+        session.refresh(user)
+        session.expunge(user)
+        return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine, user):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: user
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+def test_apply_task_batch_mixed_operations(engine, user):
+    operations = [
+        TaskBatchOperation(op="create", title="New A"),
+        TaskBatchOperation(op="create", title="   "),
+        TaskBatchOperation(op="update", task_id=1, title="Renamed 1"),
+        TaskBatchOperation(op="complete", task_id=1),
+        TaskBatchOperation(op="update", task_id=2, completed=False),
+        TaskBatchOperation(op="delete", task_id=3),
+        TaskBatchOperation(op="complete", task_id=3),
+        TaskBatchOperation(op="delete", task_id=4),
+        TaskBatchOperation(op="create", title="New B"),
+    ]
+    with Session(engine) as session:
+        results = crud.apply_task_batch(session, user.id, operations)
+
+    assert [r["status"] for r in results] == [
+        "created", "invalid", "updated", "completed", "updated", "deleted", "not_found", "not_found", "created"
+    ]
+    assert results[0]["task"]["title"] == "New A"
+    assert results[8]["task_id"] > results[0]["task_id"]
+    # Completed tasks cannot be reverted to pending
+    assert results[4]["task"]["completed"] is True
+
+    with Session(engine) as session:
+        tasks = {t.id: t for t in session.exec(select(Task)).all()}
+    assert tasks[1].title == "Renamed 1" and tasks[1].completed is True
+    assert tasks[2].completed is True
+    assert 3 not in tasks
+    assert tasks[4].title == "Not mine"
+    assert {t.title for t in tasks.values() if t.user_id == user.id} == {"Renamed 1", "Existing 2", "New A", "New B"}
+
+
+def test_apply_task_batch_uses_one_commit_and_bulk_statements(engine, user):
+    statements = []
+    commits = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    event.listen(engine, "commit", lambda conn: commits.append(1))
+
+    operations = [TaskBatchOperation(op="create", title=f"Bulk {i}") for i in range(50)]
+    operations += [TaskBatchOperation(op="complete", task_id=1), TaskBatchOperation(op="delete", task_id=3)]
+    with Session(engine) as session:
+        crud.apply_task_batch(session, user.id, operations)
+
+    assert len(commits) == 1
+    # One SELECT, one multi-row INSERT, one UPDATE, one DELETE
+    assert len(statements) == 4
+
+
+def test_apply_task_batch_rejects_oversized_batch(engine, user, monkeypatch):
+    monkeypatch.setattr(crud, "TASKS_MAX_BATCH_SIZE", 2)
+    with Session(engine) as session:
+        with pytest.raises(ValueError):
+            crud.apply_task_batch(session, user.id, [TaskBatchOperation(op="create", title="x")] * 3)
+
+
+def test_batch_endpoint(client: TestClient, user):
+    response = client.post(f"/api/{user.id}/tasks:batch", json={"operations": [
+        {"op": "create", "title": "From batch"},
+        {"op": "complete", "task_id": 1},
+        {"op": "delete", "task_id": 99},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["status"] for r in results] == ["created", "completed", "not_found"]
+    assert results[0]["task"]["title"] == "From batch"
+    assert results[1]["task"]["completed"] is True
+
+
+def test_batch_endpoint_rejects_other_user(client: TestClient, user):
+    response = client.post("/api/someone-else/tasks:batch", json={"operations": []})
+    assert response.status_code == 403
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task, Message
+from .. import agent, crud
+from ..agent import AgentOrchestrator
+
+
+class StubOpenAIClient:
+    """Async-only stand-in for the OpenAI client; the sync methods must not be used."""
+
+    def __init__(self, intent):
+        self.intent = intent
+        self.calls = []
+
+    async def classify_intent_async(self, message, history):
+        self.calls.append("classify")
+        await asyncio.sleep(0)
+        return dict(self.intent)
+
+    async def chat_async(self, message, history, tools_description=""):
+        self.calls.append("chat")
+        await asyncio.sleep(0)
+        return "Hello from the assistant"
+
+    def classify_intent(self, message, history):
+        raise AssertionError("sync classify_intent called on the async path")
+
+    def chat(self, message, history, tools_description=""):
+        raise AssertionError("sync chat called on the async path")
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(user_id="user-1", title="Buy milk"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_handle_message_async_creates_task(engine, monkeypatch):
+    stub = StubOpenAIClient({"intent": "create", "task_title": "Walk the dog"})
+    monkeypatch.setattr(agent, "openai_client", stub)
+
+    with Session(engine) as session:
+        conversation = crud.create_conversation(session, "user-1")
+        orchestrator = AgentOrchestrator(session)
+        response = asyncio.run(orchestrator.handle_message_async("user-1", str(conversation.id), "I need to walk the dog later"))
+
+        assert "Walk the dog" in response
+        assert stub.calls == ["classify"]
+        titles = [t.title for t in session.exec(select(Task).where(Task.user_id == "user-1")).all()]
+        assert "Walk the dog" in titles
+        roles = [m.role for m in session.exec(select(Message).order_by(Message.id)).all()]
+        assert roles == ["user", "assistant"]
+
+
+def test_chat_endpoint_uses_async_llm_calls(client: TestClient, engine, monkeypatch):
+    stub = StubOpenAIClient({"intent": "unknown"})
+    monkeypatch.setattr(agent, "openai_client", stub)
+
+    response = client.post("/api/user-1/chat", json={"message": "hello there"})
+    assert response.status_code == 200
+    body = response.json()
+    assert body["response"] == "Hello from the assistant"
+    assert stub.calls == ["classify", "chat"]
+
+    # The follow-up turn sees the persisted history
+    response = client.post("/api/user-1/chat", json={"message": "hello again", "conversation_id": body["conversation_id"]})
+    assert response.status_code == 200
+    with Session(engine) as session:
+        messages = session.exec(select(Message).where(Message.conversation_id == body["conversation_id"])).all()
+        assert len(messages) == 4
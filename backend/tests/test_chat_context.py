@@ -0,0 +1,130 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task, Message
+from .. import agent, crud
+from ..chat_context import load_chat_context
+
+
+class StubOpenAIClient:
+    def __init__(self, intent):
+        self.intent = intent
+
+    async def classify_intent_async(self, message, history):
+        await asyncio.sleep(0)
+        return dict(self.intent)
+
+    async def chat_async(self, message, history, tools_description=""):
+        await asyncio.sleep(0)
+        return "Hello from the assistant"
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(User(id="user-2", email="user-2@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.add(Task(id=11, user_id="user-1", title="Walk dog"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="conversation_id")
+def conversation_id_fixture(engine):
+    with Session(engine) as session:
+        conversation = crud.create_conversation(session, "user-1")
+        for i in range(6):
+            crud.save_message(session, conversation.id, "user-1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+        return conversation.id
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture(name="statements")
+def statements_fixture(engine):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement.split(None, 1)[0].upper())
+
+    event.listen(engine, "before_cursor_execute", record)
+    yield statements
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_load_chat_context(engine, conversation_id):
+    with Session(engine) as session:
+        crud.set_pending_action(session, conversation_id, "user-1", "delete", 11)
+        context = load_chat_context(session, conversation_id, "user-1", "hello")
+
+        assert [m["content"] for m in context.history] == [f"m{i}" for i in range(6)]
+        assert context.unsummarized_count == 6
+        assert context.pending_action.task_id == 11
+        assert [t.title for t in context.tasks] == ["Buy milk", "Walk dog"]
+        assert context.id_mapping == {1: 10, 2: 11}
+        assert context.db_to_user_id == {10: 1, 11: 2}
+
+        assert load_chat_context(session, conversation_id, "user-2") is None
+        assert load_chat_context(session, 999, "user-1") is None
+
+
+def test_chat_turn_reads_context_in_two_queries(client, conversation_id, statements, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "unknown"}))
+
+    response = client.post("/api/user-1/chat", json={"message": "hello", "conversation_id": conversation_id})
+    assert response.status_code == 200
+    assert response.json()["response"] == "Hello from the assistant"
+
+    # Conversation + pending action + history in one query, the task snapshot in another
+    assert statements.count("SELECT") == 2
+    # Both messages are written in a single transaction
+    assert statements.count("INSERT") <= 2
+    assert len(statements) <= 4
+
+
+def test_confirmed_delete_uses_snapshot(client, engine, conversation_id, statements, monkeypatch):
+    with Session(engine) as session:
+        crud.set_pending_action(session, conversation_id, "user-1", "delete", 11)
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "unknown"}))
+    statements.clear()
+
+    response = client.post("/api/user-1/chat", json={"message": "yes", "conversation_id": conversation_id})
+    assert response.json()["response"] == "Task 'Walk dog' has been deleted."
+    # The pending action and the task come from the context; the delete does not re-read the task
+    assert statements.count("SELECT") == 2
+
+    with Session(engine) as session:
+        assert [t.title for t in session.exec(select(Task)).all()] == ["Buy milk"]
+        assert len(session.exec(select(Message).where(Message.conversation_id == conversation_id)).all()) == 8
+
+
+def test_unknown_conversation_is_not_found(client, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "unknown"}))
+    response = client.post("/api/user-1/chat", json={"message": "hello", "conversation_id": 999})
+    assert response.status_code == 404
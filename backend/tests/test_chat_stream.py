@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task, Message
+from .. import agent, crud
+
+
+class StubOpenAIClient:
+    """Classifies everything as general chat and streams a canned reply in chunks."""
+
+    chunks = ["Hello", " from", " the", " assistant"]
+
+    async def classify_intent_async(self, message, history):
+        await asyncio.sleep(0)
+        return {"intent": "unknown"}
+
+    async def chat_stream_async(self, message, history, tools_description=""):
+        for chunk in self.chunks:
+            await asyncio.sleep(0)
+            yield chunk
+
+    async def chat_async(self, message, history, tools_description=""):
+        raise AssertionError("chat_async called while streaming")
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient())
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(User(id="user-2", email="user-2@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _events(response):
+    assert response.headers["content-type"].startswith("text/event-stream")
+    return [json.loads(line[len("data: "):]) for line in response.text.splitlines() if line.startswith("data: ")]
+
+
+def test_stream_emits_tokens_then_done_and_persists(client, engine):
+    events = _events(client.post("/api/user-1/chat/stream", json={"message": "tell me something nice"}))
+
+    assert [e["content"] for e in events if e["type"] == "token"] == StubOpenAIClient.chunks
+    done = events[-1]
+    assert done["type"] == "done"
+    assert done["response"] == "Hello from the assistant"
+    with Session(engine) as session:
+        messages = session.exec(
+            select(Message).where(Message.conversation_id == done["conversation_id"]).order_by(Message.id)
+        ).all()
+        assert [(m.role, m.content) for m in messages] == [
+            ("user", "tell me something nice"), ("assistant", "Hello from the assistant")
+        ]
+
+
+def test_stream_reports_tool_calls(client, engine):
+    with Session(engine) as session:
+        conversation_id = crud.create_conversation(session, "user-1").id
+
+    # Handled by the fast-path router: the reply arrives as a single token after the tool call
+    events = _events(client.post(
+        "/api/user-1/chat/stream", json={"message": "add walk the dog", "conversation_id": conversation_id}
+    ))
+    assert [e["type"] for e in events] == ["tool_call", "token", "done"]
+    assert events[0]["name"] == "add_task"
+    assert events[0]["arguments"] == {"title": "walk the dog", "description": None}
+    assert events[0]["result"]["status"] == "created"
+    assert events[2]["conversation_id"] == conversation_id
+
+    # The buffered endpoint lists the same tool calls
+    response = client.post("/api/user-1/chat", json={"message": "add feed the cat", "conversation_id": conversation_id})
+    assert [call["name"] for call in response.json()["tool_calls"]] == ["add_task"]
+
+
+def test_stream_errors_before_streaming(client, engine):
+    with Session(engine) as session:
+        other_conversation_id = crud.create_conversation(session, "user-2").id
+
+    response = client.post("/api/user-1/chat/stream", json={"message": "hi", "conversation_id": other_conversation_id})
+    assert response.status_code == 404
+    assert client.post("/api/user-2/chat/stream", json={"message": "hi"}).status_code == 403
@@ -0,0 +1,154 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..models import User, Task
+from .. import agent, crud, intent_router, llm_transport
+from ..agent import AgentOrchestrator
+from ..circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, CircuitOpenError
+from ..openai_client import OpenAIClient
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _fail(breaker):
+    with pytest.raises(ConnectionError):
+        with breaker.guard():
+            raise ConnectionError("provider down")
+
+
+def test_opens_on_error_rate_and_recovers():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", error_rate=0.5, min_calls=4, open_seconds=30, clock=clock)
+    for _ in range(2):
+        with breaker.guard():
+            pass
+    _fail(breaker)
+    assert breaker.state == CLOSED
+    _fail(breaker)
+    assert breaker.state == OPEN
+
+    with pytest.raises(CircuitOpenError):
+        with breaker.guard():
+            raise AssertionError("the call must not be made")
+    assert breaker.stats()["rejected"] == 1
+
+    clock.now = 30
+    assert breaker.state == HALF_OPEN
+    with breaker.guard():
+        # Only one trial call is let through
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+    assert breaker.state == CLOSED
+    assert breaker.stats()["window_calls"] == 0
+
+
+def test_slow_calls_open_it_and_a_failed_trial_reopens():
+    clock = FakeClock()
+    breaker = CircuitBreaker("test", slow_call_seconds=5, slow_call_rate=0.5, min_calls=2, open_seconds=10, clock=clock)
+    for _ in range(2):
+        with breaker.guard():
+            clock.now += 6
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    _fail(breaker)
+    assert breaker.state == OPEN and breaker.stats()["times_opened"] == 2
+
+
+def test_rejected_requests_and_cancellation_are_not_failures():
+    breaker = CircuitBreaker("test", min_calls=1, is_failure=lambda exc: not isinstance(exc, ValueError))
+    with pytest.raises(ValueError):
+        with breaker.guard():
+            raise ValueError("bad request")
+
+    async def cancelled():
+        with breaker.guard():
+            raise asyncio.CancelledError()
+
+    with pytest.raises(asyncio.CancelledError):
+        asyncio.run(cancelled())
+    assert breaker.state == CLOSED and breaker.stats()["error_rate"] == 0.0
+
+
+def test_slow_stream_consumer_is_not_a_slow_call(monkeypatch):
+    breaker = CircuitBreaker("llm", slow_call_seconds=0.05, min_calls=1)
+    monkeypatch.setattr(llm_transport, "breaker", breaker)
+
+    async def create(**kwargs):
+        async def chunks():
+            for word in ("Hello", " there"):
+                yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=word))])
+        return chunks()
+
+    client = OpenAIClient()
+    client._api_key = "test-key"
+    client._async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+
+    async def read_slowly():
+        words = []
+        async for word in client.chat_stream_async("hi", []):
+            words.append(word)
+            await asyncio.sleep(0.1)
+        return "".join(words)
+
+    assert asyncio.run(read_slowly()) == "Hello there"
+    assert breaker.stats()["window_calls"] == 1 and breaker.stats()["slow_call_rate"] == 0.0
+
+
+class NoNetwork:
+    def __getattr__(self, name):
+        raise AssertionError("the LLM was called while the breaker is open")
+
+
+@pytest.fixture(name="open_breaker")
+def open_breaker_fixture(monkeypatch):
+    breaker = CircuitBreaker("llm", min_calls=1)
+    _fail(breaker)
+    monkeypatch.setattr(llm_transport, "breaker", breaker)
+    client = OpenAIClient()
+    client._api_key = "test-key"
+    client._client = client._async_client = NoNetwork()
+    monkeypatch.setattr(agent, "openai_client", client)
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    return breaker
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.commit()
+        yield session
+
+
+def test_open_breaker_degrades_to_rule_based_engine(open_breaker, session):
+    conversation_id = str(crud.create_conversation(session, "user-1").id)
+    orchestrator = AgentOrchestrator(session)
+
+    assert orchestrator.handle_message("user-1", conversation_id, "add water the plants") == \
+        "Task 'water the plants' has been added to your list."
+    response = asyncio.run(orchestrator.handle_message_async("user-1", conversation_id, "show me my tasks"))
+    assert "Buy milk" in response and "water the plants" in response
+    assert AgentOrchestrator(session, mode="tools").handle_message("user-1", conversation_id, "hello")
+    assert open_breaker.stats()["rejected"] >= 3
+
+    assert TestClient(app).get("/healthz").json()["llm_breaker"]["state"] == OPEN
@@ -0,0 +1,102 @@
+import pytest
+from sqlalchemy import event, text
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..models import User
+from .. import context_window, crud
+from ..chat_context import load_chat_context
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine, monkeypatch):
+    monkeypatch.setattr(context_window, "CHAT_HISTORY_WINDOW", 4)
+    monkeypatch.setattr(context_window, "CHAT_SUMMARY_BATCH", 2)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.commit()
+        yield session
+
+
+def _add_messages(session, conversation_id, start, count):
+    for i in range(start, start + count):
+        crud.save_message(session, conversation_id, "user-1", "user" if i % 2 == 0 else "assistant", f"m{i}")
+
+
+def test_recent_messages_use_limit(session, engine):
+    conversation = crud.create_conversation(session, "user-1")
+    _add_messages(session, conversation.id, 0, 10)
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *args: statements.append(statement))
+    messages = crud.get_recent_messages(session, conversation.id, "user-1", limit=3)
+    assert [m.content for m in messages] == ["m7", "m8", "m9"]
+    assert "LIMIT" in statements[-1]
+
+    after = crud.get_recent_messages(session, conversation.id, "user-1", limit=3, after_id=messages[1].id)
+    assert [m.content for m in after] == ["m9"]
+
+
+def test_summary_is_rolled_incrementally(session):
+    conversation = crud.create_conversation(session, "user-1")
+    calls = []
+
+    def summarize(previous, turns):
+        calls.append((previous, [t["content"] for t in turns]))
+        return f"{previous or ''}+{len(turns)}"
+
+    _add_messages(session, conversation.id, 0, 5)
+    assert context_window.roll_summary(session, conversation.id, "user-1", summarize) is False
+
+    _add_messages(session, conversation.id, 5, 1)  # window (4) + batch (2) reached
+    assert context_window.roll_summary(session, conversation.id, "user-1", summarize) is True
+    assert calls == [(None, ["m0", "m1"])]
+
+    _add_messages(session, conversation.id, 6, 2)
+    assert context_window.roll_summary(session, conversation.id, "user-1", summarize) is True
+    # Only the new turns are sent along with the stored summary
+    assert calls[-1] == ("+2", ["m2", "m3"])
+
+    context = load_chat_context(session, conversation.id, "user-1", "next")
+    assert context.history[0] == context_window.summary_message("+2+2")
+    assert [m["content"] for m in context.history[1:]] == ["m4", "m5", "m6", "m7"]
+    assert context.unsummarized_count == 4
+
+
+def test_context_respects_token_budget():
+    history = [{"role": "user", "content": "x" * 400} for _ in range(10)]
+    context = context_window.fit_to_budget("short summary", history, "hello", budget=500)
+    assert context[0]["role"] == "system"
+    assert len(context) - 1 == 4
+    total = sum(context_window.estimate_tokens(m["content"]) + 4 for m in context)
+    assert total <= 500
+
+
+def test_extractive_summary_is_bounded(monkeypatch):
+    monkeypatch.setattr(context_window, "CHAT_SUMMARY_MAX_CHARS", 50)
+    summary = context_window.extractive_summary("old", [{"role": "user", "content": "y" * 500}])
+    assert len(summary) == 50
+
+
+def test_add_missing_columns_on_existing_database():
+    from ..migrate_db import add_missing_columns
+
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE conversation (id INTEGER PRIMARY KEY, user_id VARCHAR NOT NULL, "
+                          "created_at DATETIME, updated_at DATETIME)"))
+    assert add_missing_columns(engine) == [
+        "conversation.summary", "conversation.summarized_until_id", "conversation.assistant_thread_id"
+    ]
+    assert add_missing_columns(engine) == []
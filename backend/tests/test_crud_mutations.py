@@ -0,0 +1,74 @@
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Task
+from .. import crud
+from ..mcp_tools import TaskMCPTools
+from ..query_profiler import assert_max_queries
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(User(id="user-2", email="user-2@example.com", password_hash="x"))
+        session.add(Task(id=1, user_id="user-1", title="Buy milk"))
+        session.add(Task(id=2, user_id="user-1", title="Walk dog", completed=True))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    # Like database.get_session
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+def test_mutations_are_one_statement(engine, session):
+    with assert_max_queries(1, engine):
+        task = crud.create_task(session, "Call mom", None, "user-1")
+        assert (task.id, task.title, task.completed) == (3, "Call mom", False)
+    with assert_max_queries(1, engine):
+        task = crud.update_task(session, 1, "user-1", title="Buy oat milk", completed=True)
+        assert (task.title, task.completed) == ("Buy oat milk", True)
+    with assert_max_queries(1, engine):
+        assert crud.toggle_task_completion(session, 3, "user-1").completed is True
+    with assert_max_queries(1, engine):
+        assert TaskMCPTools.delete_task(session, "user-1", 3)["title"] == "Call mom"
+    with assert_max_queries(2, engine):
+        conversation = crud.create_conversation(session, "user-1")
+        message = crud.save_message(session, conversation.id, "user-1", "user", "hi")
+        assert message.conversation_id == conversation.id
+    assert crud.get_task_by_user(session, 3, "user-1") is None
+
+
+def test_completion_only_goes_from_false_to_true(session):
+    done = crud.get_task_by_user(session, 2, "user-1")
+    completed_at = done.updated_at
+
+    task = crud.update_task(session, 2, "user-1", title="Walk the dog", completed=False)
+    assert (task.title, task.completed) == ("Walk the dog", True)
+    # An already completed task matches no row: returned as it is, not touched
+    task = crud.toggle_task_completion(session, 2, "user-1")
+    assert task.completed is True and task.updated_at > completed_at
+    assert crud.toggle_task_completion(session, 2, "user-1").updated_at == task.updated_at
+
+
+def test_mutations_are_scoped_to_the_owner(session):
+    assert crud.update_task(session, 1, "user-2", title="Stolen") is None
+    assert crud.toggle_task_completion(session, 1, "user-2") is None
+    assert crud.delete_task(session, 1, "user-2") is False
+    with pytest.raises(ValueError, match="not found or access denied"):
+        TaskMCPTools.delete_task(session, "user-2", 1)
+
+    session.expire_all()
+    task = crud.get_task_by_user(session, 1, "user-1")
+    assert (task.title, task.completed) == ("Buy milk", False)
@@ -0,0 +1,60 @@
+import pytest
+from sqlalchemy import inspect, text
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..models import Task, Conversation, Message
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+
+
+def test_composite_indexes_are_created(engine):
+    inspector = inspect(engine)
+    task_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes("task")}
+    conversation_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes("conversation")}
+    message_indexes = {ix["name"]: ix["column_names"] for ix in inspector.get_indexes("message")}
+
+    assert task_indexes["ix_task_user_id_id"] == ["user_id", "id"]
+    assert conversation_indexes["ix_conversation_user_id_id"] == ["user_id", "id"]
+    assert message_indexes["ix_message_conversation_id_user_id_created_at"] == [
+        "conversation_id", "user_id", "created_at"
+    ]
+
+
+def test_per_user_queries_use_indexes(engine):
+    with Session(engine) as session:
+        plans = {
+            "task": session.exec(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM task WHERE user_id = 'u' ORDER BY id"
+            )).all(),
+            "message": session.exec(text(
+                "EXPLAIN QUERY PLAN SELECT * FROM message "
+                "WHERE conversation_id = 1 AND user_id = 'u' ORDER BY created_at"
+            )).all(),
+        }
+
+    assert any("ix_task_user_id_id" in row[-1] for row in plans["task"])
+    assert any("ix_message_conversation_id_user_id_created_at" in row[-1] for row in plans["message"])
+    # The index provides the ordering, so no temp B-tree sort is needed
+    assert not any("TEMP B-TREE" in row[-1] for row in plans["message"])
+
+
+def test_create_missing_indexes_on_existing_database(engine):
+    from ..migrate_db import create_missing_indexes
+    for model in (Task, Conversation, Message):
+        for index in model.__table__.indexes:
+            index.drop(bind=engine)
+
+    create_missing_indexes(engine)
+
+    inspector = inspect(engine)
+    assert "ix_task_user_id_id" in {ix["name"] for ix in inspector.get_indexes("task")}
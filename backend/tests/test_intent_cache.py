@@ -0,0 +1,101 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Task
+from .. import agent, crud, intent_router, openai_client as openai_client_module
+from ..agent import AgentOrchestrator
+from ..cache import TTLCache
+from ..openai_client import OpenAIClient
+
+
+class FakeCompletions:
+    """Answers classifier prompts with a fixed classification and counts the calls."""
+
+    def __init__(self, classification):
+        self.classification = classification
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        content = json.dumps(self.classification)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=content))])
+
+    async def create_async(self, **kwargs):
+        await asyncio.sleep(0)
+        return self.create(**kwargs)
+
+
+def _client(classification):
+    completions = FakeCompletions(classification)
+    client = OpenAIClient()
+    client._api_key = "test-key"
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.create)))
+    client._async_client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=completions.create_async)))
+    return client, completions
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    cache = TTLCache(100, 60)
+    monkeypatch.setattr(openai_client_module, "intent_cache", cache)
+    return cache
+
+
+def test_repeats_are_served_from_the_cache(fresh_cache):
+    client, completions = _client({"intent": "read"})
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "Hello!"}]
+
+    assert client.classify_intent("List my tasks", history) == {"intent": "read"}
+    assert client.classify_intent("  list my   tasks! ", history) == {"intent": "read"}
+    assert asyncio.run(client.classify_intent_async("list my tasks.", history)) == {"intent": "read"}
+    assert completions.calls == 1
+
+    # A different conversation state is a different key; an opt-out skips the cache
+    client.classify_intent("list my tasks", history + [{"role": "user", "content": "add milk"}])
+    client.classify_intent("list my tasks", history, use_cache=False)
+    assert completions.calls == 3
+    assert fresh_cache.stats()["hits"] == 2
+
+
+def test_cached_titles_follow_the_current_message():
+    client, completions = _client({"intent": "create", "task_title": "Buy Milk"})
+    client.classify_intent("add Buy Milk", [])
+    cached = client.classify_intent("ADD BUY MILK", [])
+    assert cached["task_title"] == "BUY MILK"
+    assert completions.calls == 1
+
+    # Callers may modify the result without touching the cached copy
+    cached["intent"] = "delete"
+    assert client.classify_intent("add buy milk", [])["intent"] == "create"
+
+
+def test_cached_entities_resolve_against_current_tasks(monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    client, completions = _client({"intent": "update_complete", "task_title": "walk the dog"})
+    monkeypatch.setattr(agent, "openai_client", client)
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Walk the dog"))
+        session.commit()
+
+        orchestrator = AgentOrchestrator(session)
+        first = str(crud.create_conversation(session, "user-1").id)
+        assert orchestrator.handle_message("user-1", first, "walk the dog is done") == \
+            "Task 'Walk the dog' has been successfully marked as completed."
+
+        crud.delete_task(session, 10, "user-1")
+        session.add(Task(id=11, user_id="user-1", title="Walk the dog"))
+        session.commit()
+        second = str(crud.create_conversation(session, "user-1").id)
+        # Same message and (empty) history: a cache hit, matched to the task that exists now
+        assert orchestrator.handle_message("user-1", second, "walk the dog is done") == \
+            "Task 'Walk the dog' has been successfully marked as completed."
+        assert session.get(Task, 11).completed
+        assert completions.calls == 1
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Task, PendingAction
+from .. import agent, crud, intent_router
+from ..agent import AgentOrchestrator
+
+CORPUS = json.loads((Path(__file__).resolve().parents[1] / "benchmarks" / "intent_corpus.json").read_text())
+TASKS = [Task(id=100 + i, user_id="user-1", title=title) for i, title in enumerate(CORPUS["tasks"])]
+
+
+class StubOpenAIClient:
+    def __init__(self):
+        self.calls = []
+
+    def classify_intent(self, message, history):
+        self.calls.append("classify")
+        return {"intent": "unknown"}
+
+    def chat(self, message, history, tools_description=""):
+        self.calls.append("chat")
+        return "Hello from the assistant"
+
+
+@pytest.mark.parametrize("case", CORPUS["cases"], ids=lambda case: case["message"])
+def test_corpus(case):
+    routed = intent_router.route(case["message"], TASKS)
+    assert (routed.intent if routed.is_confident else "llm") == case["intent"]
+    if case.get("task"):
+        assert routed.data["task_id"] == TASKS[case["task"] - 1].id
+    for key in ("task_title", "new_title"):
+        if key in case:
+            assert routed.data[key] == case[key]
+
+
+def test_destructive_intents_need_confirmation():
+    assert intent_router.route("delete task 1", TASKS).data["needs_confirmation"] is True
+    assert intent_router.route("rename task 1 to Buy bread", TASKS).data["needs_confirmation"] is True
+    assert intent_router.route("complete task 1", TASKS).data["needs_confirmation"] is False
+
+
+def test_threshold_disables_fast_path(monkeypatch):
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    assert not intent_router.route("list my tasks", TASKS).is_confident
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.add(Task(id=11, user_id="user-1", title="Walk dog"))
+        session.commit()
+        yield session
+
+
+def test_fast_path_skips_the_llm(session, monkeypatch):
+    stub = StubOpenAIClient()
+    monkeypatch.setattr(agent, "openai_client", stub)
+    conversation = crud.create_conversation(session, "user-1")
+    orchestrator = AgentOrchestrator(session)
+
+    assert orchestrator.handle_message("user-1", str(conversation.id), "list my tasks").startswith("Here are your tasks:")
+    assert orchestrator.handle_message("user-1", str(conversation.id), "complete task 2") == \
+        "Task 'Walk dog' has been successfully marked as completed."
+    response = orchestrator.handle_message("user-1", str(conversation.id), "delete task 1")
+    assert response.startswith("Are you sure you want to delete task 1 ('Buy milk')")
+    assert session.get(PendingAction, conversation.id).task_id == 10
+    assert stub.calls == []
+
+    assert orchestrator.handle_message("user-1", str(conversation.id), "hello") == "Hello from the assistant"
+    assert stub.calls == ["classify", "chat"]
+    assert session.exec(select(Task).where(Task.id == 11)).one().completed is True
@@ -0,0 +1,113 @@
+import asyncio
+import threading
+import time
+
+import httpx
+
+from .. import llm_transport
+from ..llm_transport import AsyncLimitedTransport, InFlightLimiter, LimitedTransport, TransportStats
+
+
+def test_limiter_caps_threads():
+    limiter = InFlightLimiter(2)
+    running = []
+
+    def work():
+        limiter.acquire()
+        try:
+            running.append(limiter.in_flight)
+            time.sleep(0.02)
+        finally:
+            limiter.release()
+
+    threads = [threading.Thread(target=work) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert limiter.peak_in_flight == 2 and max(running) == 2
+    assert limiter.in_flight == 0
+    assert limiter.queued >= 1 and limiter.queue_wait_seconds > 0
+
+
+def test_limiter_caps_tasks():
+    limiter = InFlightLimiter(2)
+
+    async def work():
+        await limiter.acquire_async()
+        try:
+            await asyncio.sleep(0.01)
+        finally:
+            limiter.release()
+
+    async def main():
+        await asyncio.gather(*(work() for _ in range(5)))
+
+    asyncio.run(main())
+    assert limiter.peak_in_flight == 2
+    assert limiter.in_flight == 0 and limiter.queued == 3
+
+
+def test_streamed_response_holds_its_slot_until_closed():
+    limiter, stats = InFlightLimiter(4), TransportStats()
+    # An iterator body is streamed rather than read up front
+    transport = LimitedTransport(httpx.MockTransport(lambda request: httpx.Response(200, content=iter([b"ok"]))),
+                                 limiter, stats)
+    with httpx.Client(transport=transport, base_url="http://llm") as client:
+        with client.stream("GET", "/") as response:
+            assert limiter.in_flight == 1
+            response.read()
+        assert limiter.in_flight == 0
+
+        # Attempts after the first are counted as retries
+        client.get("/", headers={"x-stainless-retry-count": "1"})
+    assert (stats.requests, stats.retries, limiter.in_flight) == (2, 1, 0)
+
+
+def test_async_transport_releases_on_error():
+    def fail(request):
+        raise httpx.ConnectError("refused")
+
+    limiter, stats = InFlightLimiter(1), TransportStats()
+    transport = AsyncLimitedTransport(httpx.MockTransport(fail), limiter, stats)
+
+    async def main():
+        async with httpx.AsyncClient(transport=transport, base_url="http://llm") as client:
+            for _ in range(2):
+                try:
+                    await client.get("/")
+                except httpx.ConnectError:
+                    pass
+
+    asyncio.run(main())
+    assert (stats.errors, limiter.in_flight) == (2, 0)
+
+
+def test_clients_share_the_transport():
+    first = llm_transport.get_openai("key-1", "http://llm.test/v1")
+    assert llm_transport.get_openai("key-1", "http://llm.test/v1") is first
+    other = llm_transport.get_openai("key-2", "http://llm.test/v1")
+    assert other is not first and other._client is first._client is llm_transport.http_client()
+    assert first.max_retries == llm_transport.LLM_MAX_RETRIES
+    assert llm_transport.utilization()["max_in_flight"] == llm_transport.LLM_MAX_IN_FLIGHT
+
+
+def test_async_clients_are_per_event_loop():
+    async def fetch():
+        client = llm_transport.get_async_openai("key-1", "http://llm.test/v1")
+        assert llm_transport.get_async_openai("key-1", "http://llm.test/v1") is client
+        assert client._client is llm_transport.async_http_client()
+        return client
+
+    async def close_after(coroutine):
+        try:
+            return await coroutine
+        finally:
+            await llm_transport.aclose()
+
+    first = asyncio.run(fetch())
+    # A new loop cannot reuse the previous loop's pooled connections: it gets its own clients
+    second = asyncio.run(close_after(fetch()))
+    assert second is not first and second._client is not first._client
+    assert second._client.is_closed
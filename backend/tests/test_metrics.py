@@ -0,0 +1,148 @@
+import threading
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task
+from .. import agent, crud, intent_router, metrics
+from ..agent import AgentOrchestrator
+from ..openai_client import OpenAIClient
+
+
+def _sample(name, **labels):
+    """The value of one sample in the /metrics exposition, or 0 when it is not there yet."""
+    prefix = name + metrics._format_labels(tuple(labels.items())) + " "
+    for line in metrics.render().splitlines():
+        if line.startswith(prefix):
+            return float(line[len(prefix):])
+    return 0.0
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(user_id="user-1", title="Buy milk"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_exposition_format_and_thread_totals():
+    registry = metrics.Registry()
+    requests = metrics.Counter("demo_requests", "Requests", ("route",), registry=registry)
+    latency = metrics.Histogram("demo_latency_seconds", "Latency", buckets=(0.1, 1.0), registry=registry)
+
+    child = requests.labels("/a")
+    threads = [threading.Thread(target=lambda: [child.inc() for _ in range(1000)]) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP demo_requests Requests",
+        "# TYPE demo_requests counter",
+        'demo_requests_total{route="/a"} 4000',
+        "# HELP demo_latency_seconds Latency",
+        "# TYPE demo_latency_seconds histogram",
+        'demo_latency_seconds_bucket{le="0.1"} 2',
+        'demo_latency_seconds_bucket{le="1"} 3',
+        'demo_latency_seconds_bucket{le="+Inf"} 4',
+        "demo_latency_seconds_sum 3.65",
+        "demo_latency_seconds_count 4",
+    ]
+
+
+def test_routes_are_recorded_under_their_template(client):
+    route = "/api/{user_id}/tasks"
+    before = _sample("todo_http_requests_total", method="GET", route=route, status="200")
+    denied = _sample("todo_http_requests_total", method="GET", route=route, status="403")
+
+    assert client.get("/api/user-1/tasks").status_code == 200
+    assert client.get("/api/someone-else/tasks").status_code == 403
+
+    response = client.get("/metrics")
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert _sample("todo_http_requests_total", method="GET", route=route, status="200") == before + 1
+    assert _sample("todo_http_requests_total", method="GET", route=route, status="403") == denied + 1
+    assert _sample("todo_http_request_duration_seconds_count", method="GET", route=route) >= 2
+    assert _sample("todo_http_requests_in_flight", method="GET", route=route) == 0
+
+
+def test_handled_errors_are_recorded_with_their_status(client):
+    route = "/api/auth/register"
+    invalid = _sample("todo_http_requests_total", method="POST", route=route, status="422")
+    errors = _sample("todo_http_requests_total", method="POST", route=route, status="500")
+
+    assert client.post(route, json={}).status_code == 422
+
+    assert _sample("todo_http_requests_total", method="POST", route=route, status="422") == invalid + 1
+    assert _sample("todo_http_requests_total", method="POST", route=route, status="500") == errors
+
+
+def test_queries_and_checkouts_are_counted(engine):
+    metrics.instrument_engine(engine)
+    selects = _sample("todo_db_queries_total", operation="SELECT")
+    checkouts = _sample("todo_db_pool_checkout_wait_seconds_count")
+
+    with Session(engine) as session:
+        assert len(session.exec(select(Task)).all()) == 1
+        crud.create_task(session, "Walk dog", None, "user-1")
+
+    assert _sample("todo_db_queries_total", operation="SELECT") >= selects + 1
+    assert _sample("todo_db_query_duration_seconds_count", operation="INSERT") >= 1
+    assert _sample("todo_db_pool_checkout_wait_seconds_count") >= checkouts + 1
+
+
+def test_llm_calls_and_fallbacks_are_counted(engine, monkeypatch):
+    def create(**kwargs):
+        if "Buy milk" in str(kwargs["messages"]):
+            raise TimeoutError("provider timed out")
+        usage = SimpleNamespace(prompt_tokens=40, completion_tokens=6)
+        return SimpleNamespace(usage=usage, choices=[SimpleNamespace(message=SimpleNamespace(content='{"intent": "read"}'))])
+
+    client = OpenAIClient()
+    client._api_key = "test-key"
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    errors = _sample("todo_llm_errors_total", operation="classify_intent", error="TimeoutError")
+    prompt_tokens = _sample("todo_llm_tokens_total", operation="classify_intent", kind="prompt")
+    fallbacks = _sample("todo_chat_fallback_total", reason="classify_error")
+
+    client.classify_intent("show my list", [], use_cache=False)
+    assert _sample("todo_llm_tokens_total", operation="classify_intent", kind="prompt") == prompt_tokens + 40
+
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    monkeypatch.setattr(agent, "openai_client", client)
+    with Session(engine) as session:
+        conversation = crud.create_conversation(session, "user-1")
+        AgentOrchestrator(session).handle_message("user-1", str(conversation.id), "add Buy milk please")
+
+    assert _sample("todo_llm_errors_total", operation="classify_intent", error="TimeoutError") == errors + 1
+    assert _sample("todo_chat_fallback_total", reason="classify_error") == fallbacks + 1
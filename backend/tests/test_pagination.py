@@ -0,0 +1,123 @@
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task
+from .. import crud
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+
+
+@pytest.fixture(name="user")
+def user_fixture(engine):
+    with Session(engine) as session:
+        user = User(id="user-1", email="user-1@example.com", password_hash="x")
+        session.add(user)
+        base_time = datetime(2024, 1, 1)
+        for i in range(7):
+            session.add(Task(
+                user_id=user.id,
+                title=f"Task {i}",
+                completed=i % 2 == 1,
+                # Tasks 0-3 share a timestamp so the id tie-breaker is exercised
+                created_at=base_time + timedelta(minutes=max(i - 3, 0)),
+                updated_at=base_time + timedelta(minutes=i),
+            ))
+        session.add(Task(user_id="someone-else", title="Not mine"))
+        session.commit()
+        session.refresh(user)
+        session.expunge(user)
+        return user
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine, user):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: user
+    client = TestClient(app)
+    yield client
+    app.dependency_overrides.clear()
+
+
+def test_get_tasks_page_walks_all_tasks_in_order(engine, user):
+    seen = []
+    cursor = None
+    with Session(engine) as session:
+        while True:
+            tasks, cursor = crud.get_tasks_page(session, user.id, limit=3, cursor=cursor)
+            seen.extend(t.title for t in tasks)
+            if cursor is None:
+                break
+    assert seen == [f"Task {i}" for i in range(7)]
+
+
+def test_get_tasks_page_filters_in_sql(engine, user):
+    with Session(engine) as session:
+        pending, _ = crud.get_tasks_page(session, user.id, status="pending")
+        completed, _ = crud.get_tasks_page(session, user.id, status="completed")
+        recent, _ = crud.get_tasks_page(session, user.id, updated_since=datetime(2024, 1, 1, 0, 5))
+
+    assert [t.title for t in pending] == ["Task 0", "Task 2", "Task 4", "Task 6"]
+    assert [t.title for t in completed] == ["Task 1", "Task 3", "Task 5"]
+    assert [t.title for t in recent] == ["Task 5", "Task 6"]
+
+
+def test_get_tasks_page_clamps_limit(engine, user, monkeypatch):
+    monkeypatch.setattr(crud, "TASKS_MAX_PAGE_SIZE", 2)
+    with Session(engine) as session:
+        tasks, cursor = crud.get_tasks_page(session, user.id, limit=50)
+    assert len(tasks) == 2
+    assert cursor is not None
+
+
+def test_read_tasks_paginates_with_cursor_header(client: TestClient, user):
+    response = client.get(f"/api/{user.id}/tasks", params={"limit": 4})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Task 0", "Task 1", "Task 2", "Task 3"]
+    cursor = response.headers["X-Next-Cursor"]
+
+    response = client.get(f"/api/{user.id}/tasks", params={"limit": 4, "cursor": cursor})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Task 4", "Task 5", "Task 6"]
+    assert "X-Next-Cursor" not in response.headers
+
+
+def test_read_tasks_status_filter(client: TestClient, user):
+    response = client.get(f"/api/{user.id}/tasks", params={"status": "completed"})
+    assert response.status_code == 200
+    assert all(t["completed"] for t in response.json())
+    assert len(response.json()) == 3
+
+
+def test_read_tasks_rejects_bad_cursor_and_status(client: TestClient, user):
+    assert client.get(f"/api/{user.id}/tasks", params={"cursor": "not-a-cursor"}).status_code == 400
+    assert client.get(f"/api/{user.id}/tasks", params={"status": "archived"}).status_code == 400
+
+
+def test_mcp_list_tasks_paginates(client: TestClient, user):
+    response = client.post("/mcp/list_tasks", json={"user_id": user.id, "status": "pending", "limit": 3})
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["Task 0", "Task 2", "Task 4"]
+
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.post("/mcp/list_tasks", json={"user_id": user.id, "status": "pending", "cursor": cursor})
+    assert [t["title"] for t in response.json()] == ["Task 6"]
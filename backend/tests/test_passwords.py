@@ -0,0 +1,107 @@
+import threading
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from .. import passwords
+from ..passwords import PasswordHasher, PasswordHashingBusy
+
+
+@pytest.fixture(name="hasher")
+def hasher_fixture(monkeypatch):
+    # Minimum bcrypt cost keeps the tests fast
+    hasher = PasswordHasher(workers=1, max_queue=1, rounds=4)
+    monkeypatch.setattr(passwords, "password_hasher", hasher)
+    yield hasher
+    hasher.shutdown()
+
+
+@pytest.fixture(name="client")
+def client_fixture(hasher):
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def _occupy(hasher: PasswordHasher, count: int):
+    release = threading.Event()
+    futures = [hasher._submit(release.wait) for _ in range(count)]
+
+    def done():
+        release.set()
+        for future in futures:
+            future.result()
+        # Slots are returned by done-callbacks, which may trail result()
+        while hasher.stats()["in_flight"]:
+            time.sleep(0.001)
+
+    return done
+
+
+def test_hash_and_verify_use_configured_cost(hasher):
+    hashed = passwords.hash_password("s3cret")
+    assert hashed.startswith("$2b$04$")
+    assert passwords.verify_password("s3cret", hashed)
+    assert not passwords.verify_password("wrong", hashed)
+    assert hasher.stats()["completed"] == 3
+
+
+def test_failed_calls_are_not_counted_as_completed(hasher):
+    with pytest.raises(ValueError):
+        passwords.verify_password("s3cret", "not-a-bcrypt-hash")
+    # Counters are updated by done-callbacks, which may trail result()
+    while hasher.stats()["in_flight"]:
+        time.sleep(0.001)
+    assert (hasher.stats()["completed"], hasher.stats()["failed"]) == (0, 1)
+
+
+def test_full_queue_is_rejected(hasher):
+    release = _occupy(hasher, 2)  # one running, one queued
+    try:
+        with pytest.raises(PasswordHashingBusy):
+            passwords.hash_password("s3cret")
+        assert hasher.stats()["rejected"] == 1
+        assert hasher.stats()["queued"] == 1
+    finally:
+        release()
+    assert passwords.verify_password("s3cret", passwords.hash_password("s3cret"))
+
+
+def test_register_and_login_through_pool(client: TestClient, hasher):
+    credentials = {"email": "new@example.com", "password": "s3cret"}
+    assert client.post("/api/auth/register", json=credentials).status_code == 200
+    response = client.post("/api/auth/login", json=credentials)
+    assert response.status_code == 200
+    assert response.json()["token"]
+    assert client.post("/api/auth/login", json={**credentials, "password": "nope"}).status_code == 401
+    assert hasher.stats()["completed"] == 3
+
+
+def test_login_backpressure_returns_503(client: TestClient, hasher):
+    credentials = {"email": "new@example.com", "password": "s3cret"}
+    assert client.post("/api/auth/register", json=credentials).status_code == 200
+
+    release = _occupy(hasher, 2)
+    try:
+        response = client.post("/api/auth/login", json=credentials)
+    finally:
+        release()
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Task, PendingAction
+from .. import agent, crud
+from ..agent import AgentOrchestrator
+
+
+class StubOpenAIClient:
+    """Returns a fixed classification; confirmations must not reach the classifier."""
+
+    def __init__(self, intent):
+        self.intent = intent
+        self.classified = []
+
+    def classify_intent(self, message, history):
+        self.classified.append(message)
+        return dict(self.intent)
+
+    def chat(self, message, history, tools_description=""):
+        return "chat"
+
+    def summarize(self, previous_summary, messages, max_chars=2000):
+        return "Earlier turns"
+
+
+@pytest.fixture(name="session")
+def session_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.add(Task(id=11, user_id="user-1", title="Walk dog"))
+        session.commit()
+        yield session
+
+
+@pytest.fixture(name="conversation_id")
+def conversation_id_fixture(session):
+    conversation = crud.create_conversation(session, "user-1")
+    # A long history must not matter for confirmations
+    for i in range(50):
+        crud.save_message(session, conversation.id, "user-1", "assistant", f"Please confirm you want to delete task {i}")
+    return conversation.id
+
+
+def _titles(session):
+    return [t.title for t in session.exec(select(Task).order_by(Task.id)).all()]
+
+
+def test_delete_confirmation_uses_pending_action(session, conversation_id, monkeypatch):
+    stub = StubOpenAIClient({"intent": "delete", "task_id": 11, "needs_confirmation": True})
+    monkeypatch.setattr(agent, "openai_client", stub)
+    orchestrator = AgentOrchestrator(session)
+
+    # Phrased so the fast-path router leaves it to the classifier
+    response = orchestrator.handle_message("user-1", str(conversation_id), "get rid of walk dog")
+    assert response.startswith("Are you sure you want to delete task 2 ('Walk dog')")
+    pending = session.get(PendingAction, conversation_id)
+    assert (pending.operation, pending.task_id) == ("delete", 11)
+
+    response = orchestrator.handle_message("user-1", str(conversation_id), "yes")
+    assert response == "Task 'Walk dog' has been deleted."
+    assert stub.classified == ["get rid of walk dog"]
+    assert _titles(session) == ["Buy milk"]
+    assert session.get(PendingAction, conversation_id) is None
+
+
+def test_rename_confirmation_applies_recorded_title(session, conversation_id, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient(
+        {"intent": "update_rename", "task_id": 10, "new_title": "Buy oat milk", "needs_confirmation": True}
+    ))
+    orchestrator = AgentOrchestrator(session)
+
+    orchestrator.handle_message("user-1", str(conversation_id), "rename buy milk to Buy oat milk")
+    response = orchestrator.handle_message("user-1", str(conversation_id), "Yes")
+    assert response == "Task 'Buy milk' has been renamed to 'Buy oat milk'."
+    assert _titles(session) == ["Buy oat milk", "Walk dog"]
+
+
+def test_pending_action_only_applies_to_next_message(session, conversation_id, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "delete", "task_id": 11, "needs_confirmation": True}))
+    orchestrator = AgentOrchestrator(session)
+    orchestrator.handle_message("user-1", str(conversation_id), "delete walk dog")
+
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "read"}))
+    orchestrator.handle_message("user-1", str(conversation_id), "list my tasks")
+    orchestrator.handle_message("user-1", str(conversation_id), "yes")
+    assert _titles(session) == ["Buy milk", "Walk dog"]
+
+
+def test_expired_or_foreign_pending_action_is_ignored(session, conversation_id):
+    crud.set_pending_action(session, conversation_id, "user-1", "delete", 11)
+    assert crud.pop_pending_action(session, conversation_id, "someone-else") is None
+
+    pending = session.get(PendingAction, conversation_id)
+    pending.expires_at = datetime.utcnow() - timedelta(seconds=1)
+    session.add(pending)
+    session.commit()
+    assert crud.pop_pending_action(session, conversation_id, "user-1") is None
+    assert session.get(PendingAction, conversation_id) is None
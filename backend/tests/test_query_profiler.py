@@ -0,0 +1,116 @@
+import asyncio
+import logging
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task
+from .. import crud, query_profiler
+from ..query_profiler import assert_max_queries
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        for i in range(5):
+            session.add(Task(id=i + 1, user_id="user-1", title=f"Task {i + 1}"))
+        session.commit()
+    query_profiler.install(engine)
+    yield engine
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine):
+    def get_session_override():
+        with Session(engine, expire_on_commit=False) as session:
+            yield session
+
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_fingerprints_ignore_parameters():
+    assert query_profiler.fingerprint("SELECT * FROM task WHERE id = 5 AND title = 'it''s'") == \
+        "SELECT * FROM task WHERE id = ? AND title = ?"
+    assert query_profiler.fingerprint("SELECT * FROM task\n  WHERE id IN (?, ?, ?)") == \
+        query_profiler.fingerprint("SELECT * FROM task WHERE id IN (%(id_1)s)") == \
+        "SELECT * FROM task WHERE id IN (...)"
+    assert query_profiler.fingerprint("INSERT INTO t (a, b) VALUES (?, ?), (?, ?), (?, ?)") == \
+        "INSERT INTO t (a, b) VALUES (?, ?), ..."
+
+
+def test_endpoint_query_budgets(client, engine):
+    with assert_max_queries(1, engine):
+        assert client.get("/api/user-1/tasks").status_code == 200
+    # Fast-path turn: new conversation, context (2 queries), add_task, the two messages; no refreshes
+    with assert_max_queries(6, engine):
+        assert client.post("/api/user-1/chat", json={"message": "add buy bread"}).status_code == 200
+
+    with pytest.raises(AssertionError, match="Expected at most 0 queries, got 1 queries"):
+        with assert_max_queries(0, engine):
+            client.get("/api/user-1/tasks")
+
+
+def test_repeated_statements_are_flagged_with_their_call_site(engine, monkeypatch):
+    monkeypatch.setattr(query_profiler, "N_PLUS_ONE_THRESHOLD", 3)
+    with Session(engine) as session, query_profiler.profile() as profile:
+        for task in crud.get_tasks_by_user(session, "user-1"):
+            crud.get_task_by_user(session, task.id, "user-1")
+
+    assert profile.count == 6
+    (statement, site), = profile.repeated.items()
+    assert profile.fingerprints[statement] == 5
+    assert "WHERE task.id = ? AND task.user_id = ?" in statement
+    assert site.startswith("crud.py:") and site.endswith("in get_task_by_user")
+
+
+def test_slow_queries_are_logged(engine, monkeypatch, caplog):
+    monkeypatch.setattr(query_profiler, "SLOW_QUERY_MS", 1e-9)
+    with caplog.at_level(logging.WARNING, logger="backend.query_profiler"), Session(engine) as session:
+        crud.get_tasks_by_user(session, "user-1")
+    assert any("Slow query" in message and "in get_tasks_by_user" in message for message in caplog.messages)
+
+
+def test_requests_report_db_time(client):
+    response = client.get("/api/user-1/tasks")
+    assert response.headers["server-timing"].startswith("db;dur=")
+    assert response.headers["server-timing"].endswith('desc="1 queries"')
+
+
+def test_middleware_warns_on_n_plus_one(engine, monkeypatch, caplog):
+    monkeypatch.setattr(query_profiler, "N_PLUS_ONE_THRESHOLD", 3)
+
+    async def endpoint(scope, receive, send):
+        with Session(engine) as session:
+            for task_id in range(1, 4):
+                crud.get_task_by_user(session, task_id, "user-1")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    sent = []
+
+    async def send(message):
+        sent.append(message)
+
+    middleware = query_profiler.QueryProfilerMiddleware(endpoint)
+    with caplog.at_level(logging.WARNING, logger="backend.query_profiler"):
+        asyncio.run(middleware({"type": "http", "method": "GET", "path": "/tasks"}, None, send))
+
+    assert dict(sent[0]["headers"])[b"server-timing"].endswith(b'desc="3 queries"')
+    (warning,) = [message for message in caplog.messages if "N+1" in message]
+    assert warning.startswith("Possible N+1 in GET /tasks: 3x from crud.py:")
@@ -0,0 +1,178 @@
+import threading
+import time
+from concurrent.futures import Future
+from contextvars import copy_context
+
+import pytest
+from sqlalchemy import text
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from ..models import User, Task, Conversation, PendingAction, TaskBatchOperation
+from .. import crud
+from ..sqlite_profile import SQLiteWriter, apply_pragmas, is_file_database
+
+
+@pytest.fixture(name="database_url")
+def database_url_fixture(tmp_path):
+    database_url = f"sqlite:///{tmp_path / 'todo.db'}"
+    engine = create_engine(database_url)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=1, user_id="user-1", title="Buy milk"))
+        session.commit()
+    engine.dispose()
+    return database_url
+
+
+@pytest.fixture(name="engine")
+def engine_fixture(database_url):
+    engine = create_engine(database_url, connect_args={"check_same_thread": False})
+    apply_pragmas(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(name="writer")
+def writer_fixture(database_url):
+    writer = SQLiteWriter(database_url)
+    yield writer
+    writer.close()
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine, writer):
+    # Like database.get_session with the writer enabled
+    with Session(engine, expire_on_commit=False) as session:
+        session.info["sqlite_writer"] = writer
+        yield session
+
+
+def test_is_file_database():
+    assert is_file_database("sqlite:///todo.db")
+    assert not is_file_database("sqlite://")
+    assert not is_file_database("sqlite:///:memory:")
+    assert not is_file_database("postgresql://user@localhost/todo")
+
+
+def test_pragmas_applied_on_connect(engine):
+    with engine.connect() as connection:
+        assert connection.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        # NORMAL
+        assert connection.exec_driver_sql("PRAGMA synchronous").scalar() == 1
+        assert connection.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+        assert connection.exec_driver_sql("PRAGMA cache_size").scalar() == -65536
+
+
+def test_queued_writes_are_group_committed(engine, writer):
+    started, release = threading.Event(), threading.Event()
+
+    def blocking(session):
+        started.set()
+        release.wait(5)
+        session.add(Task(user_id="user-1", title="First"))
+
+    first = threading.Thread(target=writer.submit, args=(blocking,))
+    first.start()
+    started.wait(5)
+    # Queued while the writer is busy with the first write
+    others = [
+        threading.Thread(target=writer.submit, args=(lambda s, i=i: s.add(Task(user_id="user-1", title=f"Task {i}")),))
+        for i in range(8)
+    ]
+    for thread in others:
+        thread.start()
+    while writer._queue.qsize() < len(others):
+        time.sleep(0.001)
+    release.set()
+    for thread in [first] + others:
+        thread.join(5)
+
+    assert writer.writes == 9
+    assert writer.batches == 2
+    with Session(engine) as session:
+        assert len(session.exec(select(Task)).all()) == 10
+
+
+def test_failed_write_only_rolls_back_itself(engine, writer):
+    def failing(session):
+        session.add(Task(user_id="user-1", title="Rolled back"))
+        session.flush()
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        writer.submit(failing)
+    task = writer.submit(lambda s: s.get(Task, 1))
+    assert task.title == "Buy milk"
+
+    # In one batch: the failing write's rows are rolled back, its neighbours are committed
+    writer._queue.put((lambda s: s.add(Task(user_id="user-1", title="Kept")), *_pending()))
+    failed = _pending()
+    writer._queue.put((failing, *failed))
+    writer._queue.put((lambda s: s.add(Task(user_id="user-1", title="Also kept")), *_pending()))
+    writer.submit(lambda s: None)
+    assert isinstance(failed[0].exception(), ValueError)
+    with Session(engine) as session:
+        titles = {task.title for task in session.exec(select(Task)).all()}
+    assert titles == {"Buy milk", "Kept", "Also kept"}
+
+
+def _pending():
+    # A queued write's future and context, as SQLiteWriter.submit puts them
+    return Future(), copy_context()
+
+
+def test_crud_writes_through_the_writer(engine, writer, session):
+    task = crud.create_task(session, "Call mom", None, "user-1")
+    assert task.id == 2
+    assert crud.update_task(session, 2, "user-1", title="Call dad").title == "Call dad"
+    assert crud.toggle_task_completion(session, 2, "user-1").completed is True
+    # Already completed: read back on the request's session
+    assert crud.toggle_task_completion(session, 2, "user-1").completed is True
+    assert crud.pop_task(session, 2, "user-1").title == "Call dad"
+    assert crud.delete_task(session, 2, "user-1") is False
+
+    conversation = crud.create_conversation(session, "user-1")
+    messages = crud.save_messages(session, conversation.id, "user-1", [("user", "hi"), ("assistant", "hello")])
+    assert [message.id for message in messages] == [1, 2]
+    crud.update_conversation_summary(session, conversation, "Greetings", 2)
+    assert conversation.summary == "Greetings"
+
+    crud.set_pending_action(session, conversation.id, "user-1", "delete", 1)
+    crud.get_conversation_with_history(session, conversation.id, "user-1", 20)
+    pending = crud.pop_pending_action(session, conversation.id, "user-1", commit=False)
+    assert (pending.operation, pending.task_id) == ("delete", 1)
+    assert crud.pop_pending_action(session, conversation.id, "user-1") is None
+
+    assert writer.writes == 11
+    with Session(engine) as check:
+        assert check.get(Conversation, conversation.id).summarized_until_id == 2
+        assert check.get(PendingAction, conversation.id) is None
+        assert check.exec(text("SELECT count(*) FROM task")).scalar() == 1
+
+
+def test_request_session_reads_its_own_writes(session):
+    crud.create_task(session, "Old title", None, "user-1")
+    # Held like the agent's task list; the session keeps these copies while they are referenced
+    tasks = crud.get_tasks_by_user(session, "user-1")
+    assert [(t.title, t.completed) for t in tasks] == [("Buy milk", False), ("Old title", False)]
+
+    crud.update_task(session, 2, "user-1", title="New title")
+    crud.toggle_task_completion(session, 2, "user-1")
+
+    assert [(t.title, t.completed) for t in crud.get_tasks_by_user(session, "user-1")][-1] == ("New title", True)
+    assert crud.toggle_task_completion(session, 2, "user-1").completed is True
+
+    crud.apply_task_batch(session, "user-1", [
+        TaskBatchOperation(op="update", task_id=1, title="Buy oat milk"),
+        TaskBatchOperation(op="delete", task_id=2),
+    ])
+    assert [t.title for t in crud.get_tasks_by_user(session, "user-1")] == ["Buy oat milk"]
+    assert crud.get_task_by_user(session, 2, "user-1") is None
+
+    conversation = crud.create_conversation(session, "user-1")
+    crud.set_pending_action(session, conversation.id, "user-1", "delete", 1)
+    loaded = crud.get_conversation_with_history(session, conversation.id, "user-1", 20)
+    crud.set_pending_action(session, conversation.id, "user-1", "rename", 1, "Buy soy milk")
+    assert crud.pop_pending_action(session, conversation.id, "user-1").new_title == "Buy soy milk"
+    assert loaded[1].operation == "rename"
@@ -0,0 +1,135 @@
+import asyncio
+import json
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine, select
+from sqlmodel.pool import StaticPool
+
+from ..models import User, Task, PendingAction
+from .. import agent, crud, intent_router, tool_calling
+from ..agent import AgentOrchestrator
+
+
+class StubOpenAIClient:
+    """Answers tool-calling requests with canned tool calls; the classify pipeline must not be used."""
+
+    def __init__(self, tool_calls, content=""):
+        self.tool_calls = tool_calls
+        self.content = content
+        self.requests = []
+
+    def complete_with_tools(self, messages, tools):
+        self.requests.append((messages, tools))
+        return self.content, [{"name": name, "arguments": json.dumps(args)} for name, args in self.tool_calls]
+
+    async def complete_with_tools_async(self, messages, tools):
+        await asyncio.sleep(0)
+        return self.complete_with_tools(messages, tools)
+
+    def classify_intent(self, message, history):
+        raise AssertionError("classify_intent called in tools mode")
+
+    def chat(self, message, history, tools_description=""):
+        raise AssertionError("chat called in tools mode")
+
+
+@pytest.fixture(name="session")
+def session_fixture(monkeypatch):
+    # Every message in these tests must reach the LLM
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(id=10, user_id="user-1", title="Buy milk"))
+        session.add(Task(id=11, user_id="user-1", title="Walk dog", completed=True))
+        session.commit()
+        yield session
+
+
+@pytest.fixture(name="conversation_id")
+def conversation_id_fixture(session):
+    return crud.create_conversation(session, "user-1").id
+
+
+def _titles(session):
+    return [t.title for t in session.exec(select(Task).order_by(Task.id)).all()]
+
+
+def test_tool_schemas_are_strict():
+    names = {tool["function"]["name"] for tool in tool_calling.TOOL_SCHEMAS}
+    assert names == {"add_task", "list_tasks", "complete_task", "delete_task", "update_task"}
+    for tool in tool_calling.TOOL_SCHEMAS:
+        parameters = tool["function"]["parameters"]
+        assert tool["function"]["strict"] is True
+        assert parameters["additionalProperties"] is False
+        assert set(parameters["required"]) == set(parameters["properties"])
+        assert "user_id" not in parameters["properties"]
+
+
+def test_single_request_executes_tool_calls(session, conversation_id, monkeypatch):
+    stub = StubOpenAIClient([("add_task", {"title": "Call mom", "description": None}),
+                             ("complete_task", {"task_number": 1})])
+    monkeypatch.setattr(agent, "openai_client", stub)
+
+    response = AgentOrchestrator(session, mode="tools").handle_message("user-1", str(conversation_id), "call mom, and buy milk is done")
+    assert response == "Task 'Call mom' has been added to your list.\nTask 'Buy milk' has been successfully marked as completed."
+    assert len(stub.requests) == 1
+    # The task list is in the prompt, so the model can refer to tasks by number
+    assert "1. Buy milk [ ]" in stub.requests[0][0][0]["content"]
+    assert _titles(session) == ["Buy milk", "Walk dog", "Call mom"]
+
+
+def test_delete_and_rename_still_need_confirmation(session, conversation_id, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient([("delete_task", {"task_number": 2})]))
+    orchestrator = AgentOrchestrator(session, mode="tools")
+
+    response = orchestrator.handle_message("user-1", str(conversation_id), "get rid of the dog one")
+    assert response.startswith("Are you sure you want to delete task 2 ('Walk dog')")
+    assert session.get(PendingAction, conversation_id).task_id == 11
+    assert orchestrator.handle_message("user-1", str(conversation_id), "yes") == "Task 'Walk dog' has been deleted."
+
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient(
+        [("update_task", {"task_number": 1, "title": "Buy oat milk", "description": None})]
+    ))
+    response = orchestrator.handle_message("user-1", str(conversation_id), "actually make the milk oat milk")
+    assert response.startswith("Are you sure you want to rename task 1 ('Buy milk') to 'Buy oat milk'?")
+
+
+def test_text_reply_and_filtered_list(session, conversation_id, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient([], content="Hi! How can I help?"))
+    orchestrator = AgentOrchestrator(session, mode="tools")
+    assert asyncio.run(orchestrator.handle_message_async("user-1", str(conversation_id), "hello")) == "Hi! How can I help?"
+
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient([("list_tasks", {"status": "completed"})]))
+    response = asyncio.run(orchestrator.handle_message_async("user-1", str(conversation_id), "what have I finished"))
+    assert response == "Here are your completed tasks:\n2. Walk dog [x]"
+
+
+def test_unknown_task_number_and_tool(session, conversation_id, monkeypatch):
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient([("complete_task", {"task_number": 7})]))
+    orchestrator = AgentOrchestrator(session, mode="tools")
+    assert orchestrator.handle_message("user-1", str(conversation_id), "finish the seventh") == \
+        "Task 7 not found. Use 'list my tasks' to see available tasks."
+
+    with pytest.raises(ValueError):
+        tool_calling.parse_tool_calls([{"name": "drop_database", "arguments": "{}"}])
+    with pytest.raises(ValueError):
+        AgentOrchestrator(session, mode="telepathy")
+
+
+def test_prompt_task_list_is_capped_pending_first():
+    tasks = [Task(id=i, user_id="user-1", title=f"Task {i}", completed=i % 2 == 0) for i in range(1, 20001)]
+
+    prompt = tool_calling.build_messages("hi", [], tasks, max_tasks=50)[0]["content"]
+
+    lines = prompt.split("The user's tasks:\n")[1].splitlines()
+    assert len(lines) == 51
+    # The 50 oldest pending tasks, under their numbers in the full list
+    assert lines[0] == "1. Task 1 [ ]"
+    assert lines[49] == "99. Task 99 [ ]"
+    assert lines[50] == "(19950 more tasks not listed; call list_tasks to show them)"
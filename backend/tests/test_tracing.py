@@ -0,0 +1,133 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel, create_engine
+from sqlmodel.pool import StaticPool
+
+from ..main import app
+from ..database import get_session
+from ..better_auth import get_current_user
+from ..models import User, Task
+from .. import agent, intent_router, tracing
+from ..openai_client import OpenAIClient
+
+
+class StubOpenAIClient:
+    def __init__(self, intent):
+        self.intent = intent
+
+    async def classify_intent_async(self, message, history):
+        await asyncio.sleep(0)
+        return dict(self.intent)
+
+
+class RecordingTracer:
+    """Stands in for an OpenTelemetry tracer; keeps the spans it was asked to start."""
+
+    def __init__(self):
+        self.spans = []
+
+    def start_as_current_span(self, name):
+        otel_span = SimpleNamespace(name=name, attributes={})
+        otel_span.set_attribute = otel_span.attributes.__setitem__
+        self.spans.append(otel_span)
+
+        class _Current:
+            def __enter__(self):
+                return otel_span
+
+            def __exit__(self, *exc):
+                return None
+
+        return _Current()
+
+
+@pytest.fixture(name="engine")
+def engine_fixture():
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        session.add(User(id="user-1", email="user-1@example.com", password_hash="x"))
+        session.add(Task(user_id="user-1", title="Buy milk"))
+        session.commit()
+    yield engine
+
+
+@pytest.fixture(name="client")
+def client_fixture(engine, monkeypatch):
+    def get_session_override():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(intent_router, "INTENT_ROUTER_MIN_CONFIDENCE", 1.1)
+    monkeypatch.setattr(agent, "openai_client", StubOpenAIClient({"intent": "create", "task_title": "Walk the dog"}))
+    app.dependency_overrides.clear()
+    app.dependency_overrides[get_session] = get_session_override
+    app.dependency_overrides[get_current_user] = lambda: User(id="user-1", email="user-1@example.com", password_hash="x")
+    yield TestClient(app)
+    app.dependency_overrides.clear()
+
+
+def test_timing_breakdown_behind_debug_header(client):
+    response = client.post("/api/user-1/chat", json={"message": "I should walk the dog"})
+    assert response.status_code == 200
+    assert "timings" not in response.json()
+
+    response = client.post("/api/user-1/chat", json={"message": "I should walk the dog"},
+                           headers={"X-Debug-Timing": "1"})
+    assert response.status_code == 200
+    timings = response.json()["timings"]
+    spans = {entry["name"]: entry for entry in timings}
+
+    assert timings[0]["name"] == "chat" and timings[0]["parent"] is None
+    # A new conversation; the first request added a task
+    fetch = spans["chat.fetch"]["attributes"]
+    assert (fetch["history_length"], fetch["task_count"], fetch["pending_action"]) == (0, 2, False)
+    assert spans["chat.run"]["attributes"]["intent"] == "create"
+    assert spans["chat.run"]["attributes"]["intent_source"] == "llm"
+    # Work done in worker threads is attributed to the stage that started it
+    assert spans["mcp.add_task"]["parent"] == "chat.run"
+    assert spans["crud.create_task"]["parent"] == "mcp.add_task"
+    assert spans["crud.save_messages"]["parent"] == "chat.persist"
+    assert all(entry["duration_ms"] >= 0 for entry in timings)
+    assert spans["chat"]["duration_ms"] >= spans["chat.run"]["duration_ms"]
+
+
+def test_llm_requests_are_spans():
+    def create(**kwargs):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content='{"intent": "read"}'))])
+
+    client = OpenAIClient()
+    client._api_key = "test-key"
+    client._client = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    with tracing.collect_timings() as timings:
+        with tracing.span("chat.run"):
+            client.classify_intent("show my list", [], use_cache=False)
+    assert [(entry["name"], entry["parent"]) for entry in timings] == [
+        ("chat.run", None), ("llm.classify_intent", "chat.run")
+    ]
+
+
+def test_spans_go_to_opentelemetry_when_enabled(monkeypatch):
+    tracer = RecordingTracer()
+    monkeypatch.setattr(tracing, "TRACING_ENABLED", True)
+    monkeypatch.setattr(tracing, "otel_trace", SimpleNamespace(get_tracer=lambda name: tracer))
+
+    with tracing.span("chat.run", history_length=3, intent=None):
+        tracing.annotate(intent="read")
+
+    assert [span.name for span in tracer.spans] == ["chat.run"]
+    assert tracer.spans[0].attributes == {"history_length": 3, "intent": "read"}
+
+
+def test_disabled_tracing_is_a_no_op():
+    with tracing.span("chat.run", history_length=3) as span:
+        span.set_attribute("intent", "read")
+        tracing.annotate(intent="read")
+    assert span is tracing._NOOP_SPAN
@@ -0,0 +1,125 @@
+"""
+Single-call tool calling for the chat agent.
+
+In "tools" orchestration mode the agent sends one chat-completions request in which the
+MCP tools (see TaskMCPTools) are declared as function tools with strict JSON schemas.
+The model either answers in text (general chat) or returns tool calls whose arguments
+are guaranteed to match the schema, which the orchestrator executes directly. This
+replaces the classify-then-chat pipeline (two sequential completions and free-form JSON
+parsing) with a single round-trip.
+
+Tasks are referred to by their user-friendly number (1-based position in the list);
+the current list is included in the system prompt so no lookup round-trip is needed.
+At most TOOL_PROMPT_MAX_TASKS tasks are listed, pending ones first, with their numbers
+from the full list; the prompt says how many were left out.
+The user id is never exposed to the model; it is supplied by the orchestrator.
+"""
+from dataclasses import dataclass
+from typing import Any, Dict, List
+import json
+import os
+
+# Tasks listed in the system prompt; heavy users can have tens of thousands
+TOOL_PROMPT_MAX_TASKS = int(os.getenv("TOOL_PROMPT_MAX_TASKS", "100"))
+
+
+def _function(name: str, description: str, properties: Dict[str, Any]) -> Dict[str, Any]:
+    # Strict mode: every property is required (optional ones are nullable) and no extras are allowed
+    return {
+        "type": "function",
+        "function": {
+            "name": name,
+            "description": description,
+            "strict": True,
+            "parameters": {
+                "type": "object",
+                "properties": properties,
+                "required": list(properties),
+                "additionalProperties": False,
+            },
+        },
+    }
+
+
+_TASK_NUMBER = {"type": "integer", "description": "The task's number in the user's task list"}
+
+TOOL_SCHEMAS: List[Dict[str, Any]] = [
+    _function("add_task", "Create a new task", {
+        "title": {"type": "string", "description": "The task title"},
+        "description": {"type": ["string", "null"], "description": "Optional task details"},
+    }),
+    _function("list_tasks", "Show the user's tasks", {
+        "status": {"type": "string", "enum": ["all", "pending", "completed"], "description": "Which tasks to show"},
+    }),
+    _function("complete_task", "Mark a task as completed", {
+        "task_number": _TASK_NUMBER,
+    }),
+    _function("delete_task", "Delete a task (the user is asked to confirm)", {
+        "task_number": _TASK_NUMBER,
+    }),
+    _function("update_task", "Rename a task (the user is asked to confirm) or change its description", {
+        "task_number": _TASK_NUMBER,
+        "title": {"type": ["string", "null"], "description": "New title, or null to keep it"},
+        "description": {"type": ["string", "null"], "description": "New description, or null to keep it"},
+    }),
+]
+
+TOOL_NAMES = frozenset(tool["function"]["name"] for tool in TOOL_SCHEMAS)
+
+SYSTEM_PROMPT = """You are a helpful todo list assistant. Manage the user's tasks with the available tools.
+Call a tool whenever the user asks to add, list, complete, rename, update or delete tasks; refer to tasks by
+their number in the list below. Do not ask for confirmation yourself: deletes and renames are confirmed by
+the application. For anything else, answer briefly and helpfully without calling a tool.
+
+The user's tasks:
+{tasks}"""
+
+
+@dataclass
+class ToolCall:
+    name: str
+    arguments: Dict[str, Any]
+
+
+def build_messages(message: str, history: List[Dict[str, str]], tasks: List,
+                   max_tasks: int = TOOL_PROMPT_MAX_TASKS) -> List[Dict[str, str]]:
+    """
+    Messages for the tool-calling request: instructions with the task list, history, current message.
+    """
+    messages = [{"role": "system", "content": SYSTEM_PROMPT.format(tasks=_task_lines(tasks, max_tasks))}]
+    messages += [{"role": m.get("role", "user"), "content": m.get("content", "")} for m in history]
+    messages.append({"role": "user", "content": message})
+    return messages
+
+
+def _task_lines(tasks: List, max_tasks: int) -> str:
+    """
+    The task list for the system prompt: up to max_tasks tasks, pending before completed,
+    each under its number in the full list so tool calls still resolve to the right task.
+    """
+    if not tasks:
+        return "(no tasks)"
+    numbered = list(enumerate(tasks, start=1))
+    shown = sorted(numbered, key=lambda item: item[1].completed)[:max_tasks]
+    shown.sort(key=lambda item: item[0])
+    lines = [f"{number}. {t.title} [{'x' if t.completed else ' '}]" for number, t in shown]
+    omitted = len(tasks) - len(shown)
+    if omitted:
+        lines.append(f"({omitted} more tasks not listed; call list_tasks to show them)")
+    return "\n".join(lines)
+
+
+def parse_tool_calls(raw_calls: List[Dict[str, str]]) -> List[ToolCall]:
+    """
+    Decode tool calls returned by the model ({"name": ..., "arguments": "<json>"}).
+    Raises ValueError for unknown tools or arguments that are not a JSON object.
+    """
+    calls = []
+    for raw in raw_calls:
+        if raw.get("name") not in TOOL_NAMES:
+            raise ValueError(f"Unknown tool: {raw.get('name')}")
+        arguments = json.loads(raw.get("arguments") or "{}")
+        if not isinstance(arguments, dict):
+            raise ValueError(f"Invalid arguments for {raw['name']}")
+        calls.append(ToolCall(name=raw["name"], arguments=arguments))
+    return calls
@@ -0,0 +1,136 @@
+"""
+Span-based tracing for the chat lifecycle, OpenTelemetry compatible and off by default.
+
+span(name, **attributes) marks a unit of work: the chat endpoint, each orchestrator stage
+(FETCH, RUN, PERSIST), crud queries (see traced), MCP tool calls and LLM requests.
+
+- With TRACING_ENABLED=true and the opentelemetry-api package installed, spans are
+  reported to the OpenTelemetry tracer; exporting them is up to the SDK the deployment
+  configures (without one the API itself is a no-op).
+- Inside collect_timings(), spans are also recorded as a timing breakdown for the
+  current request (the chat endpoint returns it behind the X-Debug-Timing header).
+
+Otherwise span() does nothing beyond a context variable lookup.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional
+import functools
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+TRACING_ENABLED = os.getenv("TRACING_ENABLED", "false").lower() == "true"
+TRACER_NAME = "evolution-of-todo"
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+if TRACING_ENABLED and otel_trace is None:
+    logger.warning("TRACING_ENABLED is set but opentelemetry-api is not installed; spans are not exported")
+
+# Timing entries of the current request (collect_timings), and the innermost active span
+_timings: ContextVar[Optional[List[Dict[str, Any]]]] = ContextVar("trace_timings", default=None)
+_current: ContextVar[Optional["Span"]] = ContextVar("trace_current_span", default=None)
+
+
+def _tracer():
+    if TRACING_ENABLED and otel_trace is not None:
+        return otel_trace.get_tracer(TRACER_NAME)
+    return None
+
+
+class Span:
+    """Handle for the active span: attributes go to the OpenTelemetry span and the timing entry."""
+
+    def __init__(self, name: str = "", otel_span=None, entry: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self._otel_span = otel_span
+        self._entry = entry
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if value is None:
+            return
+        if self._otel_span is not None:
+            self._otel_span.set_attribute(key, value)
+        if self._entry is not None:
+            self._entry.setdefault("attributes", {})[key] = value
+
+
+_NOOP_SPAN = Span()
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[Span]:
+    """Trace the block as a span named `name`; None attribute values are left out."""
+    timings = _timings.get()
+    tracer = _tracer()
+    if timings is None and tracer is None:
+        yield _NOOP_SPAN
+        return
+
+    entry = None
+    if timings is not None:
+        parent = _current.get()
+        entry = {"name": name, "parent": parent.name if parent is not None else None}
+        timings.append(entry)
+    start = time.perf_counter()
+    with (tracer.start_as_current_span(name) if tracer is not None else _no_otel_span()) as otel_span:
+        handle = Span(name, otel_span, entry)
+        for key, value in attributes.items():
+            handle.set_attribute(key, value)
+        token = _current.set(handle)
+        try:
+            yield handle
+        finally:
+            if entry is not None:
+                entry["duration_ms"] = round((time.perf_counter() - start) * 1000.0, 3)
+            try:
+                _current.reset(token)
+            except ValueError:
+                # A generator span finished in another context (e.g. closed by a different task)
+                pass
+
+
+@contextmanager
+def _no_otel_span() -> Iterator[None]:
+    yield None
+
+
+def annotate(**attributes: Any) -> None:
+    """Set attributes on the innermost active span (e.g. the intent, once it is known)."""
+    current = _current.get()
+    if current is not None:
+        for key, value in attributes.items():
+            current.set_attribute(key, value)
+
+
+def traced(func: Callable) -> Callable:
+    """Decorator: run the function in a span named <module>.<function>, e.g. crud.get_task."""
+    name = f"{func.__module__.rsplit('.', 1)[-1]}.{func.__name__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return func(*args, **kwargs)
+
+    return wrapper
+
+
+@contextmanager
+def collect_timings() -> Iterator[List[Dict[str, Any]]]:
+    """
+    Record the spans of the enclosed work (including work handed to threads with
+    asyncio.to_thread / run_in_threadpool, which copy the context) into the yielded list,
+    in start order: {"name", "parent", "duration_ms", "attributes"}.
+    """
+    timings: List[Dict[str, Any]] = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _timings.reset(token)
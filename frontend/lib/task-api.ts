@@ -13,21 +13,31 @@ const getAuthToken = (): string | null => {
 const taskApi = {
   /**
    * Get all tasks for a user
+   * The backend returns tasks in pages; follow the X-Next-Cursor header until exhausted.
    */
   getTasks: async (userId: string): Promise<Task[]> => {
     const token = getAuthToken();
-    const response = await fetch(`${BACKEND_URL}/api/${userId}/tasks`, {
-      headers: {
-        'Authorization': `Bearer ${token}`,
-        'Content-Type': 'application/json',
+    const tasks: Task[] = [];
+    let cursor: string | null = null;
+
+    do {
+      const query: string = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+      const response: Response = await fetch(`${BACKEND_URL}/api/${userId}/tasks${query}`, {
+        headers: {
+          'Authorization': `Bearer ${token}`,
+          'Content-Type': 'application/json',
+        }
+      });
+
+      if (!response.ok) {
+        throw new Error(`Failed to fetch tasks: ${response.status} ${response.statusText}`);
       }
-    });
 
-    if (!response.ok) {
-      throw new Error(`Failed to fetch tasks: ${response.status} ${response.statusText}`);
-    }
+      tasks.push(...(await response.json()));
+      cursor = response.headers?.get('X-Next-Cursor') ?? null;
+    } while (cursor);
 
-    return response.json();
+    return tasks;
   },
 
   /**